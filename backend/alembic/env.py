@@ -19,7 +19,8 @@ config = context.config
 
 # Interpret the config file for Python logging.
 # This line sets up loggers basically.
-if config.config_file_name is not None:
+# （由应用内调用时保留调用方的日志配置）
+if config.config_file_name is not None and "connection" not in config.attributes:
     fileConfig(config.config_file_name)
 
 # add your model's MetaData object here
@@ -63,6 +64,14 @@ def run_migrations_online() -> None:
     and associate a connection with the context.
 
     """
+    # 由 app.migrations 调用时复用其连接（与建表、补列在同一事务内）
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        context.configure(connection=connection, target_metadata=target_metadata)
+        with context.begin_transaction():
+            context.run_migrations()
+        return
+
     configuration = config.get_section(config.config_ini_section)
     db_url = DATABASE_URL.replace("sqlite+aiosqlite://", "sqlite://")
     configuration["sqlalchemy.url"] = db_url
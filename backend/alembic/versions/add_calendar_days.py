@@ -0,0 +1,31 @@
+"""add calendar_days table
+
+Revision ID: add_calendar_days
+Revises: add_job_rollups
+Create Date: 2026-01-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_calendar_days'
+down_revision = 'add_job_rollups'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'calendar_days',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('kind', sa.String(length=10), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=True),
+        sa.PrimaryKeyConstraint('day'),
+        sa.CheckConstraint("kind IN ('holiday', 'workday')", name='valid_calendar_kind'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('calendar_days')
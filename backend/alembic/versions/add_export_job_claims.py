@@ -0,0 +1,26 @@
+"""add owner and heartbeat_at to export_jobs for atomic claims
+
+Revision ID: add_export_job_claims
+Revises: add_search_index
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_export_job_claims'
+down_revision = 'add_search_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('export_jobs', sa.Column('owner', sa.String(length=64), nullable=True))
+    op.add_column('export_jobs', sa.Column('heartbeat_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('export_jobs', 'heartbeat_at')
+    op.drop_column('export_jobs', 'owner')
@@ -0,0 +1,48 @@
+"""add export_jobs table
+
+Revision ID: add_export_jobs
+Revises: add_calendar_days
+Create Date: 2026-01-26 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_export_jobs'
+down_revision = 'add_calendar_days'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'export_jobs',
+        sa.Column('id', sa.String(length=32), nullable=False),
+        sa.Column('kind', sa.String(length=50), nullable=False),
+        sa.Column('params', sa.Text(), nullable=False),
+        sa.Column('fingerprint', sa.String(length=64), nullable=False),
+        sa.Column('generation', sa.String(length=100), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('rows_total', sa.Integer(), nullable=True),
+        sa.Column('rows_done', sa.Integer(), nullable=False),
+        sa.Column('file_name', sa.String(length=100), nullable=True),
+        sa.Column('size', sa.Integer(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('creator_id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+        sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['creator_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.CheckConstraint("status IN ('queued', 'running', 'done', 'failed')", name='valid_export_job_status'),
+    )
+    op.create_index('idx_export_jobs_fingerprint', 'export_jobs', ['fingerprint', 'generation'])
+    op.create_index('idx_export_jobs_created', 'export_jobs', ['created_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('idx_export_jobs_created', table_name='export_jobs')
+    op.drop_index('idx_export_jobs_fingerprint', table_name='export_jobs')
+    op.drop_table('export_jobs')
@@ -0,0 +1,38 @@
+"""add row_version to projects/comments for the incremental export feed
+
+Revision ID: add_feed_row_versions
+Revises: add_export_jobs
+Create Date: 2026-02-02 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_feed_row_versions'
+down_revision = 'add_export_jobs'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('projects', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('row_version', sa.Integer(), server_default='0', nullable=False))
+        batch_op.create_index('idx_project_version', ['row_version'], unique=False)
+    with op.batch_alter_table('comments', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('row_version', sa.Integer(), server_default='0', nullable=False))
+        batch_op.create_index('idx_comment_version', ['row_version'], unique=False)
+    with op.batch_alter_table('work_items', schema=None) as batch_op:
+        batch_op.create_index('idx_work_item_version', ['row_version'], unique=False)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('work_items', schema=None) as batch_op:
+        batch_op.drop_index('idx_work_item_version')
+    with op.batch_alter_table('comments', schema=None) as batch_op:
+        batch_op.drop_index('idx_comment_version')
+        batch_op.drop_column('row_version')
+    with op.batch_alter_table('projects', schema=None) as batch_op:
+        batch_op.drop_index('idx_project_version')
+        batch_op.drop_column('row_version')
@@ -0,0 +1,62 @@
+"""add job_rollups table
+
+Revision ID: add_job_rollups
+Revises: add_work_item_row_version
+Create Date: 2026-01-12 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_job_rollups'
+down_revision = 'add_work_item_row_version'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'job_rollups',
+        sa.Column('job_id', sa.Integer(), nullable=False),
+        sa.Column('child_count', sa.Integer(), nullable=False),
+        sa.Column('todo_count', sa.Integer(), nullable=False),
+        sa.Column('doing_count', sa.Integer(), nullable=False),
+        sa.Column('blocked_count', sa.Integer(), nullable=False),
+        sa.Column('done_count', sa.Integer(), nullable=False),
+        sa.Column('cancelled_count', sa.Integer(), nullable=False),
+        sa.Column('deleted_count', sa.Integer(), nullable=False),
+        sa.Column('child_min_planned_start', sa.Date(), nullable=True),
+        sa.Column('child_max_planned_end', sa.Date(), nullable=True),
+        sa.Column('child_estimated_hours', sa.Float(), nullable=False),
+        sa.Column('child_actual_hours', sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(['job_id'], ['work_items.id']),
+        sa.PrimaryKeyConstraint('job_id'),
+    )
+    op.execute("""
+        INSERT INTO job_rollups (
+            job_id, child_count, todo_count, doing_count, blocked_count, done_count, cancelled_count, deleted_count,
+            child_min_planned_start, child_max_planned_end, child_estimated_hours, child_actual_hours
+        )
+        SELECT j.id,
+               COUNT(t.id),
+               COALESCE(SUM(t.status = 'todo'), 0),
+               COALESCE(SUM(t.status = 'doing'), 0),
+               COALESCE(SUM(t.status = 'blocked'), 0),
+               COALESCE(SUM(t.status = 'done'), 0),
+               COALESCE(SUM(t.status = 'cancelled'), 0),
+               COALESCE(SUM(t.status = 'deleted'), 0),
+               MIN(t.planned_start_date),
+               MAX(t.planned_end_date),
+               COALESCE(SUM(t.estimated_hours), 0),
+               COALESCE(SUM(t.actual_hours), 0)
+        FROM work_items j
+        LEFT JOIN work_items t ON t.parent_id = j.id AND t.kind = 'TASK' AND t.deleted_at IS NULL
+        WHERE j.kind = 'JOB'
+        GROUP BY j.id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('job_rollups')
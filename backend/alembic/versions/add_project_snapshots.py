@@ -0,0 +1,41 @@
+"""add project_snapshots table for burndown and cumulative-flow charts
+
+Revision ID: add_project_snapshots
+Revises: add_feed_row_versions
+Create Date: 2026-02-09 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_project_snapshots'
+down_revision = 'add_feed_row_versions'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'project_snapshots',
+        sa.Column('project_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('total_count', sa.Integer(), nullable=False),
+        sa.Column('todo_count', sa.Integer(), nullable=False),
+        sa.Column('doing_count', sa.Integer(), nullable=False),
+        sa.Column('blocked_count', sa.Integer(), nullable=False),
+        sa.Column('done_count', sa.Integer(), nullable=False),
+        sa.Column('cancelled_count', sa.Integer(), nullable=False),
+        sa.Column('estimated_hours', sa.Float(), nullable=False),
+        sa.Column('actual_hours', sa.Float(), nullable=False),
+        sa.Column('remaining_hours', sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(['project_id'], ['projects.id']),
+        sa.PrimaryKeyConstraint('project_id', 'day'),
+    )
+    op.create_index('idx_project_snapshot_day', 'project_snapshots', ['day'])
+
+
+def downgrade() -> None:
+    op.drop_index('idx_project_snapshot_day', table_name='project_snapshots')
+    op.drop_table('project_snapshots')
@@ -0,0 +1,29 @@
+"""add search_index FTS5 table for full-text search
+
+Revision ID: add_search_index
+Revises: add_project_snapshots
+Create Date: 2026-02-16 00:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_search_index'
+down_revision = 'add_project_snapshots'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # 索引内容在应用启动时由 search_service 全量建立
+    op.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5("
+        "code, title, body, entity_type UNINDEXED, entity_id UNINDEXED, project_id UNINDEXED, ref UNINDEXED, "
+        "tokenize = 'unicode61 remove_diacritics 2')"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS search_index")
+    op.execute("DELETE FROM data_versions WHERE scope IN ('search_projects', 'search_work_items', 'search_comments')")
@@ -0,0 +1,38 @@
+"""add work item row_version/updated_at and data_versions table
+
+Revision ID: add_work_item_row_version
+Revises: 58e20ee29f6a
+Create Date: 2026-01-05 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_work_item_row_version'
+down_revision = '58e20ee29f6a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'data_versions',
+        sa.Column('scope', sa.String(length=50), nullable=False),
+        sa.Column('value', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+        sa.PrimaryKeyConstraint('scope'),
+    )
+    with op.batch_alter_table('work_items', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True))
+        batch_op.add_column(sa.Column('row_version', sa.Integer(), server_default='0', nullable=False))
+        batch_op.create_index('idx_work_item_project_version', ['project_id', 'row_version'], unique=False)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('work_items', schema=None) as batch_op:
+        batch_op.drop_index('idx_work_item_project_version')
+        batch_op.drop_column('row_version')
+        batch_op.drop_column('updated_at')
+    op.drop_table('data_versions')
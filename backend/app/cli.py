@@ -0,0 +1,69 @@
+"""
+命令行：数据库迁移与演示数据预置（部署或升级时执行一次，应用启动时不再做）
+
+    python -m app.cli migrate [--seed]   迁移到当前版本并导入节假日日历（--seed 同时预置演示用户）
+    python -m app.cli seed               预置 admin 与演示用户
+    python -m app.cli check              校验数据库版本（不一致时退出码为 1）
+"""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+from sqlalchemy.ext.asyncio import create_async_engine
+from .config import DATABASE_URL, HOLIDAY_CALENDAR_FILE
+from .migrations import SCHEMA_REVISION, SchemaVersionError, check_schema, migrate, seed_demo_users
+
+
+async def _check(url: str):
+    engine = create_async_engine(url)
+    try:
+        await check_schema(engine)
+    finally:
+        await engine.dispose()
+
+
+async def _import_calendar(url: str, path: Path):
+    from .services.calendar_service import calendar_service
+    engine = create_async_engine(url)
+    try:
+        return await calendar_service.import_file(engine, path)
+    finally:
+        await engine.dispose()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="数据库迁移与演示数据")
+    parser.add_argument("--database-url", default=DATABASE_URL, help="默认取 DATABASE_URL")
+    sub = parser.add_subparsers(dest="command", required=True)
+    migrate_cmd = sub.add_parser("migrate", help="迁移到当前版本")
+    migrate_cmd.add_argument("--seed", action="store_true", help="同时预置演示用户")
+    migrate_cmd.add_argument("--calendar-file", type=Path, default=HOLIDAY_CALENDAR_FILE,
+                             help="节假日日历数据文件，默认取 HOLIDAY_CALENDAR_FILE，不存在则跳过")
+    sub.add_parser("seed", help="预置 admin 与演示用户")
+    sub.add_parser("check", help="校验数据库版本")
+    args = parser.parse_args(argv)
+
+    if args.command == "migrate":
+        action = migrate(args.database_url)
+        print(f"数据库已迁移到 {SCHEMA_REVISION}（{action}）")
+        if args.calendar_file.exists():
+            version, updated = asyncio.run(_import_calendar(args.database_url, args.calendar_file))
+            print(f"节假日日历已导入（版本 {version}）" if version is not None else "节假日日历无变化")
+            if updated:
+                print(f"重算工时 {updated} 个工作项")
+        if args.seed:
+            print(f"新增预置用户 {seed_demo_users(args.database_url)} 个")
+    elif args.command == "seed":
+        print(f"新增预置用户 {seed_demo_users(args.database_url)} 个")
+    else:
+        try:
+            asyncio.run(_check(args.database_url))
+        except SchemaVersionError as e:
+            print(e, file=sys.stderr)
+            return 1
+        print(f"数据库版本 {SCHEMA_REVISION}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
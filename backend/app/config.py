@@ -1,5 +1,7 @@
 import os
 from pathlib import Path
+from typing import Dict, Optional
+from pydantic import BaseModel
 from pydantic_settings import BaseSettings
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -26,19 +28,122 @@ SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 1440
 
+# 令牌→用户缓存：单条有效期（秒，不超过令牌本身的过期时间）与最大条数；其他进程停用用户后最多延迟一个有效期生效
+AUTH_CACHE_TTL = int(os.getenv("AUTH_CACHE_TTL", "60"))
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+
+# 密码哈希线程池：同时进行的 bcrypt 计算数（bcrypt 计算时释放 GIL）；排队超过该时长（秒）时记录警告
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_SLOW_QUEUE = float(os.getenv("PASSWORD_HASH_SLOW_QUEUE", "1.0"))
+
 # 轮询配置
 NOTIFICATION_POLL_INTERVAL = 60  # 秒
 
+# 编号号段大小：每个worker一次预留的编号数量（重启时未发放部分会留下空号）
+SEQUENCE_BLOCK_SIZE = int(os.getenv("SEQUENCE_BLOCK_SIZE", "20"))
+
+# 操作日志异步写入：队列积压上限（达到后记录日志的请求等待）、单条 INSERT 的最大行数
+OPERATION_LOG_QUEUE_SIZE = int(os.getenv("OPERATION_LOG_QUEUE_SIZE", "5000"))
+OPERATION_LOG_BATCH_SIZE = int(os.getenv("OPERATION_LOG_BATCH_SIZE", "500"))
+# 为 true 时所有操作日志都在请求事务内同步写入（与旧行为一致）
+OPERATION_LOG_STRICT = os.getenv("OPERATION_LOG_STRICT", "false").lower() == "true"
+
+# 节假日日历数据文件（python -m app.cli migrate 时按文件覆盖的年份导入 calendar_days），文件不存在则跳过
+HOLIDAY_CALENDAR_FILE = Path(os.getenv("HOLIDAY_CALENDAR_FILE", str(BASE_DIR / "data" / "holidays.json")))
+# 检查其他进程是否改动了日历的间隔（秒）
+CALENDAR_POLL_INTERVAL = int(os.getenv("CALENDAR_POLL_INTERVAL", "60"))
+# 日历变更后重算工时时每块处理的工作项数
+CALENDAR_RECOMPUTE_CHUNK = int(os.getenv("CALENDAR_RECOMPUTE_CHUNK", "500"))
+
+# 后台导出：暂存目录、并发生成的任务数、结果保留时长（小时）
+EXPORT_SPOOL_DIR = Path(os.getenv("EXPORT_SPOOL_DIR", str(BASE_DIR / "exports")))
+EXPORT_WORKERS = int(os.getenv("EXPORT_WORKERS", "2"))
+EXPORT_RETENTION_HOURS = int(os.getenv("EXPORT_RETENTION_HOURS", "24"))
+# 生成中的任务超过该时长（秒）未刷新心跳时，视为所在进程已退出，启动时重新排队
+EXPORT_STALE_SECONDS = int(os.getenv("EXPORT_STALE_SECONDS", "300"))
+
+# 项目每日快照：后台按工作项写版本增量刷新当天快照的间隔（秒）
+SNAPSHOT_INTERVAL = int(os.getenv("SNAPSHOT_INTERVAL", "300"))
+
+
+class EngineProfile(BaseModel):
+    """数据库引擎配置档：SQL回显、SQLite PRAGMA 与连接池大小"""
+    echo: bool = False
+    journal_mode: Optional[str] = None      # WAL / DELETE，None 表示保持SQLite默认
+    synchronous: Optional[str] = None       # OFF / NORMAL / FULL
+    cache_size: Optional[int] = None        # 负数表示KiB，如 -65536 = 64MB
+    mmap_size: Optional[int] = None         # 字节
+    busy_timeout: Optional[int] = None      # 毫秒
+    temp_store: Optional[str] = None        # DEFAULT / FILE / MEMORY
+    pool_size: Optional[int] = None         # None 表示沿用方言默认连接池
+    max_overflow: int = 10
+    pool_timeout: int = 30
+    pool_recycle: int = -1
+
+    def sqlite_pragmas(self) -> Dict[str, str]:
+        """按执行顺序返回需在每个新连接上设置的PRAGMA"""
+        pragmas: Dict[str, str] = {}
+        # busy_timeout 需最先设置，后续切换 journal_mode 时才能等待其他写连接
+        if self.busy_timeout is not None:
+            pragmas["busy_timeout"] = str(self.busy_timeout)
+        if self.journal_mode:
+            pragmas["journal_mode"] = self.journal_mode
+        if self.synchronous:
+            pragmas["synchronous"] = self.synchronous
+        if self.cache_size is not None:
+            pragmas["cache_size"] = str(self.cache_size)
+        if self.mmap_size is not None:
+            pragmas["mmap_size"] = str(self.mmap_size)
+        if self.temp_store:
+            pragmas["temp_store"] = self.temp_store
+        return pragmas
+
+
+# 引擎配置档：dev 保持原有行为（回显SQL、默认日志模式）；prod 关闭回显并启用WAL
+ENGINE_PROFILES: Dict[str, EngineProfile] = {
+    "dev": EngineProfile(echo=True),
+    "prod": EngineProfile(
+        echo=False,
+        journal_mode="WAL",
+        synchronous="NORMAL",
+        cache_size=-65536,
+        mmap_size=256 * 1024 * 1024,
+        busy_timeout=5000,
+        temp_store="MEMORY",
+        pool_size=5,
+        max_overflow=10,
+        pool_timeout=30,
+    ),
+}
+
 
 class Settings(BaseSettings):
     """应用设置"""
     secret_key: str = SECRET_KEY
     algorithm: str = ALGORITHM
     access_token_expire_minutes: int = ACCESS_TOKEN_EXPIRE_MINUTES
+    # 数据库引擎配置档（DB_PROFILE=dev|prod），DB_ECHO 可单独覆盖SQL回显
+    db_profile: str = "dev"
+    db_echo: Optional[bool] = None
+    db_pool_size: Optional[int] = None
+    db_busy_timeout: Optional[int] = None
     
     class Config:
         env_file = ".env"
 
+    def engine_profile(self) -> EngineProfile:
+        """解析当前生效的引擎配置档（含环境变量覆盖项）"""
+        if self.db_profile not in ENGINE_PROFILES:
+            raise ValueError(f"未知的数据库配置档: {self.db_profile}. 可选: {', '.join(ENGINE_PROFILES)}")
+        overrides = {}
+        if self.db_echo is not None:
+            overrides["echo"] = self.db_echo
+        if self.db_pool_size is not None:
+            overrides["pool_size"] = self.db_pool_size
+        if self.db_busy_timeout is not None:
+            overrides["busy_timeout"] = self.db_busy_timeout
+        return ENGINE_PROFILES[self.db_profile].model_copy(update=overrides)
+
 
 # 创建设置实例
 settings = Settings()
@@ -1,10 +1,49 @@
-from sqlalchemy import MetaData
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy import MetaData, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
-from .config import DATABASE_URL
+from .config import DATABASE_URL, EngineProfile, settings
 
-engine = create_async_engine(DATABASE_URL, echo=True, future=True)
+
+def create_engine_for_profile(url: str, profile: EngineProfile) -> AsyncEngine:
+    """
+    按配置档创建异步引擎
+
+    - SQLite 文件库：在每个新连接上设置 profile 中的 PRAGMA
+    - 设置了 pool_size 时使用显式大小的连接池（内存库保持 StaticPool）
+    """
+    sa_url = make_url(url)
+    is_sqlite = sa_url.get_backend_name() == "sqlite"
+    is_memory = is_sqlite and (not sa_url.database or sa_url.database == ":memory:")
+
+    kwargs = {"echo": profile.echo, "future": True}
+    if profile.pool_size is not None and not is_memory:
+        kwargs.update(
+            poolclass=AsyncAdaptedQueuePool,
+            pool_size=profile.pool_size,
+            max_overflow=profile.max_overflow,
+            pool_timeout=profile.pool_timeout,
+            pool_recycle=profile.pool_recycle,
+        )
+    engine = create_async_engine(url, **kwargs)
+
+    pragmas = profile.sqlite_pragmas() if is_sqlite else {}
+    if pragmas:
+        @event.listens_for(engine.sync_engine, "connect")
+        def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            try:
+                for name, value in pragmas.items():
+                    cursor.execute(f"PRAGMA {name}={value}")
+            finally:
+                cursor.close()
+
+    return engine
+
+
+engine = create_engine_for_profile(DATABASE_URL, settings.engine_profile())
 async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
 
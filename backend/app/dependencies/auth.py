@@ -1,14 +1,13 @@
 """
 认证依赖项
 """
-from typing import Optional
+from typing import Optional, Union
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
 from app.database import get_db
 from app.models import User
-from app.services.auth_service import auth_service
+from app.services.auth_service import auth_service, CurrentUser
 from app.schemas.auth import CurrentUserResponse, UserResponse
 
 
@@ -19,7 +18,7 @@ security = HTTPBearer()
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: AsyncSession = Depends(get_db)
-) -> User:
+) -> CurrentUser:
     """
     获取当前用户
     
@@ -28,7 +27,7 @@ async def get_current_user(
         db: 数据库会话
         
     Returns:
-        当前用户对象
+        当前用户快照（不可变，不绑定请求会话；需要修改用户时按 id 重新查询）
         
     Raises:
         HTTPException: 如果认证失败
@@ -43,7 +42,7 @@ async def get_current_user(
         raise credentials_exception
     
     token = credentials.credentials
-    user = await auth_service.get_current_user(db, token)
+    user = await auth_service.resolve_token(db, token)
     
     if user is None:
         raise credentials_exception
@@ -54,7 +53,7 @@ async def get_current_user(
 async def get_current_user_optional(
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
     db: AsyncSession = Depends(get_db)
-) -> Optional[User]:
+) -> Optional[CurrentUser]:
     """
     可选的当前用户（用于公开接口）
     
@@ -63,19 +62,19 @@ async def get_current_user_optional(
         db: 数据库会话
         
     Returns:
-        当前用户对象，如果没有认证则为None
+        当前用户快照，如果没有认证则为None
     """
     if not credentials:
         return None
     
     try:
         token = credentials.credentials
-        return await auth_service.get_current_user(db, token)
+        return await auth_service.resolve_token(db, token)
     except Exception:
         return None
 
 
-def create_user_response(user: User) -> UserResponse:
+def create_user_response(user: Union[User, CurrentUser]) -> UserResponse:
     """创建用户响应模型"""
     return UserResponse(
         id=user.id,
@@ -90,7 +89,7 @@ def create_user_response(user: User) -> UserResponse:
     )
 
 
-def create_current_user_response(user: User) -> CurrentUserResponse:
+def create_current_user_response(user: Union[User, CurrentUser]) -> CurrentUserResponse:
     """创建当前用户响应模型"""
     user_response = create_user_response(user)
     # TODO: 根据用户角色和权限设置实际的权限列表
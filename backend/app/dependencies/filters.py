@@ -0,0 +1,28 @@
+"""
+筛选条件依赖项
+"""
+from typing import Optional
+from fastapi import Query
+from app.schemas.export import ExportFilters
+
+
+def work_item_filters(
+    project_ids: Optional[str] = Query(None),
+    assignee_ids: Optional[str] = Query(None),
+    role: str = Query("both"),
+    status: Optional[str] = Query(None),
+    start: Optional[str] = Query(None),
+    end: Optional[str] = Query(None),
+    include_deleted: bool = Query(False),
+    archived: bool = Query(False),
+) -> ExportFilters:
+    """
+    解析工作项筛选查询参数（导出与统计接口共用）
+
+    Returns:
+        归一化后的筛选条件
+    """
+    return ExportFilters.from_query(
+        project_ids=project_ids, assignee_ids=assignee_ids, role=role, status=status,
+        start=start, end=end, include_deleted=include_deleted, archived=archived,
+    )
@@ -1,3 +1,4 @@
+import logging
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
@@ -6,7 +7,8 @@ from .config import DATABASE_URL
 from .exceptions import AppException
 from .database import engine
 from . import models  # Import models to create tables
-import bcrypt
+
+logger = logging.getLogger(__name__)
 
 app = FastAPI(
     title="项目管理系统",
@@ -46,122 +48,57 @@ async def general_exception_handler(request: Request, exc: Exception):
 
 @app.on_event("startup")
 async def startup():
-    # 创建数据库表（使用同步引擎避免greenlet依赖）
-    from sqlalchemy import create_engine as create_sync_engine
-    from sqlalchemy import text
-    from .config import DATABASE_URL
-    sync_url = DATABASE_URL.replace("+aiosqlite", "")
-    sync_engine = create_sync_engine(sync_url)
-    with sync_engine.begin() as conn:
-        models.Base.metadata.create_all(conn)
-        # 轻量迁移：为projects添加creator_id列（若不存在），并填充默认值
-        try:
-            cols = conn.execute(text("PRAGMA table_info(projects)")).fetchall()
-            names = {c[1] for c in cols}  # (cid, name, type, notnull, dflt_value, pk)
-            if "creator_id" not in names:
-                conn.execute(text("ALTER TABLE projects ADD COLUMN creator_id INTEGER"))
-                conn.execute(text("UPDATE projects SET creator_id = owner_id WHERE creator_id IS NULL"))
-            if "priority" not in names:
-                conn.execute(text("ALTER TABLE projects ADD COLUMN priority TEXT"))
-                conn.execute(text("UPDATE projects SET priority = 'medium' WHERE priority IS NULL"))
-            if "label_path" not in names:
-                conn.execute(text("ALTER TABLE projects ADD COLUMN label_path TEXT"))
-        except Exception as e:
-            # 忽略迁移错误，确保服务可启动
-            pass
-        # 轻量迁移：为work_items添加estimated_hours列（若不存在）
-        try:
-            cols_wi = conn.execute(text("PRAGMA table_info(work_items)")).fetchall()
-            names_wi = {c[1] for c in cols_wi}
-            if "estimated_hours" not in names_wi:
-                conn.execute(text("ALTER TABLE work_items ADD COLUMN estimated_hours REAL"))
-            if "label_path" not in names_wi:
-                conn.execute(text("ALTER TABLE work_items ADD COLUMN label_path TEXT"))
-        except Exception:
-            pass
-        # 轻量迁移：创建project_non_dev_works表（若不存在）
-        try:
-            conn.execute(text("""
-                CREATE TABLE IF NOT EXISTS project_non_dev_works (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    project_id INTEGER NOT NULL,
-                    report_period_start DATE NOT NULL,
-                    report_period_end DATE NOT NULL,
-                    title VARCHAR(500) NOT NULL,
-                    description TEXT,
-                    creator_id INTEGER NOT NULL,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    updated_at DATETIME,
-                    deleted_at DATETIME,
-                    FOREIGN KEY (project_id) REFERENCES projects(id),
-                    FOREIGN KEY (creator_id) REFERENCES users(id)
-                )
-            """))
-            conn.execute(text("CREATE INDEX IF NOT EXISTS idx_non_dev_work_project ON project_non_dev_works(project_id)"))
-            conn.execute(text("CREATE INDEX IF NOT EXISTS idx_non_dev_work_period ON project_non_dev_works(project_id, report_period_start, report_period_end)"))
-            conn.execute(text("CREATE INDEX IF NOT EXISTS idx_non_dev_work_creator ON project_non_dev_works(creator_id)"))
-            conn.execute(text("CREATE INDEX IF NOT EXISTS idx_non_dev_work_deleted ON project_non_dev_works(deleted_at)"))
-        except Exception:
-            pass
-        
-        # 轻量迁移：为project_non_dev_works添加work_type字段（若不存在）
-        try:
-            cols_ndw = conn.execute(text("PRAGMA table_info(project_non_dev_works)")).fetchall()
-            names_ndw = {c[1] for c in cols_ndw}
-            if "work_type" not in names_ndw:
-                conn.execute(text("ALTER TABLE project_non_dev_works ADD COLUMN work_type VARCHAR(50) DEFAULT 'other_work'"))
-                conn.execute(text("CREATE INDEX IF NOT EXISTS idx_non_dev_work_type ON project_non_dev_works(work_type)"))
-        except Exception:
-            pass
-        # 轻量迁移：为users添加phone与avatar_key列（若不存在）
-        try:
-            cols_u = conn.execute(text("PRAGMA table_info(users)")).fetchall()
-            names_u = {c[1] for c in cols_u}
-            if "phone" not in names_u:
-                conn.execute(text("ALTER TABLE users ADD COLUMN phone TEXT"))
-            if "avatar_key" not in names_u:
-                conn.execute(text("ALTER TABLE users ADD COLUMN avatar_key TEXT"))
-            if "email" not in names_u:
-                conn.execute(text("ALTER TABLE users ADD COLUMN email TEXT"))
-            if "full_name" not in names_u:
-                conn.execute(text("ALTER TABLE users ADD COLUMN full_name TEXT"))
-        except Exception:
-            pass
-        try:
-            rows = conn.execute(text("SELECT id FROM users WHERE username = 'admin'"))
-            exists = rows.first() is not None
-            if not exists:
-                pw = bcrypt.hashpw("123".encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-                conn.execute(text("INSERT INTO users (username, email_prefix, password_hash, is_active, created_at) VALUES (:u, :e, :p, 1, CURRENT_TIMESTAMP)")
-                             , {"u": "admin", "e": "admin", "p": pw})
-            # 预置演示用户，确保前后端一致
-            demo_users = [
-                {"username":"demo", "email_prefix":"demo", "full_name":"呆某"},
-                {"username":"zhangs123", "email_prefix":"zhangs123", "full_name":"张三"},
-                {"username":"zhif1", "email_prefix":"zhif1", "full_name":"智飞"},
-                {"username":"zhangxm", "email_prefix":"zhangxm", "full_name":"张项目"}
-            ]
-            for du in demo_users:
-                try:
-                    row = conn.execute(text("SELECT id FROM users WHERE username = :u"), {"u": du["username"]}).first()
-                    if not row:
-                        pw = bcrypt.hashpw("123".encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-                        conn.execute(text("INSERT INTO users (username, email_prefix, password_hash, is_active, full_name, created_at) VALUES (:u, :e, :p, 1, :f, CURRENT_TIMESTAMP)"),
-                                     {"u": du["username"], "e": du["email_prefix"], "p": pw, "f": du.get("full_name")})
-                except Exception:
-                    pass
-        except Exception:
-            pass
+    # 只校验数据库版本；建表、迁移与演示用户预置由 python -m app.cli migrate --seed 执行
+    from .migrations import check_schema
+    await check_schema(engine)
+
+    # 加载节假日日历（数据文件由 python -m app.cli migrate 导入），并在后台补做尚未完成的工时重算
+    from .services.calendar_service import calendar_service
+    try:
+        await calendar_service.startup(engine)
+    except Exception:
+        logger.exception("加载节假日日历失败，工时估算将不考虑节假日")
+    # 重新排入上次退出时未完成的后台导出
+    from .services.export_service import export_service
+    try:
+        await export_service.startup(engine)
+    except Exception:
+        logger.exception("重新排入未完成的后台导出失败")
+    # 项目每日快照（燃尽图、累积流图）
+    from .services.snapshot_service import snapshot_service
+    snapshot_service.start(engine)
+    # 全文检索索引（首次启动在后台全量建立）
+    from .services.search_service import search_service
+    await search_service.startup(engine)
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    # 等待异步写入器中积压的操作日志全部落库
+    from .services.operation_log_writer import operation_log_writer
+    await operation_log_writer.flush()
+    # 未完成的工时重算在下次启动时补齐
+    from .services.calendar_service import calendar_service
+    await calendar_service.stop()
+    from .services.export_service import export_service
+    await export_service.stop()
+    from .services.snapshot_service import snapshot_service
+    await snapshot_service.stop()
+    from .services.search_service import search_service
+    await search_service.stop()
+    from .services.password_hasher import password_hasher
+    password_hasher.shutdown()
 
 
 @app.get("/health")
 def health():
-    return {"status": "ok", "database": DATABASE_URL}
+    from .services.password_hasher import password_hasher
+    return {"status": "ok", "database": DATABASE_URL, "password_hasher": password_hasher.stats()}
 
 
 # 导入并注册路由
 from .routers import auth, project, work_items, comments, notifications, attachments, users, labels, exports, non_dev_works
-from .routers import watch, operation_logs
+from .routers import watch, operation_logs, calendar, stats, search
 app.include_router(auth.router)
 app.include_router(project.router)
 app.include_router(work_items.router)
@@ -174,3 +111,6 @@ app.include_router(users.router)
 app.include_router(labels.router)
 app.include_router(exports.router)
 app.include_router(non_dev_works.router)
+app.include_router(calendar.router)
+app.include_router(stats.router)
+app.include_router(search.router)
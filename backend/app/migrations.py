@@ -0,0 +1,224 @@
+"""
+数据库结构版本 - 启动时只校验版本，迁移与演示数据预置由命令行显式执行（python -m app.cli）
+
+- SCHEMA_REVISION 为当前代码对应的 Alembic head；启动时读取 alembic_version 比对，不一致则拒绝启动。
+- migrate()：空库按当前模型建表后标记为 head；已由 Alembic 管理的库执行 upgrade head；
+  尚无版本记录的旧库（由早期启动时 create_all + 补列建立）先补齐缺失的列与表，再标记为 head。
+- seed_demo_users()：预置 admin 与演示用户，共用一个默认密码哈希。
+"""
+import logging
+from pathlib import Path
+from typing import Optional
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncEngine
+from . import models
+from .config import DATABASE_URL
+
+logger = logging.getLogger(__name__)
+
+
+# 当前代码对应的迁移版本（与 alembic/versions 的 head 一致，由测试保证）
+SCHEMA_REVISION = "add_export_job_claims"
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# 预置的演示用户（默认密码 123）
+DEMO_USERS = [
+    {"username": "demo", "email_prefix": "demo", "full_name": "呆某"},
+    {"username": "zhangs123", "email_prefix": "zhangs123", "full_name": "张三"},
+    {"username": "zhif1", "email_prefix": "zhif1", "full_name": "智飞"},
+    {"username": "zhangxm", "email_prefix": "zhangxm", "full_name": "张项目"},
+]
+
+
+class SchemaVersionError(RuntimeError):
+    """数据库结构版本与代码不一致"""
+
+
+def sync_url(url: str = DATABASE_URL) -> str:
+    return url.replace("+aiosqlite", "")
+
+
+def _alembic_config(connection: Connection):
+    from alembic.config import Config
+    cfg = Config(str(BACKEND_DIR / "alembic.ini"))
+    cfg.set_main_option("script_location", str(BACKEND_DIR / "alembic"))
+    # env.py 使用传入的连接，而不是按配置新建引擎
+    cfg.attributes["connection"] = connection
+    return cfg
+
+
+def _reconcile_legacy(conn: Connection):
+    """为早期启动时建立的旧库补齐列、索引与表（均可重复执行）"""
+    # 轻量迁移：为projects添加creator_id列（若不存在），并填充默认值
+    try:
+        cols = conn.execute(text("PRAGMA table_info(projects)")).fetchall()
+        names = {c[1] for c in cols}  # (cid, name, type, notnull, dflt_value, pk)
+        if "creator_id" not in names:
+            conn.execute(text("ALTER TABLE projects ADD COLUMN creator_id INTEGER"))
+            conn.execute(text("UPDATE projects SET creator_id = owner_id WHERE creator_id IS NULL"))
+        if "priority" not in names:
+            conn.execute(text("ALTER TABLE projects ADD COLUMN priority TEXT"))
+            conn.execute(text("UPDATE projects SET priority = 'medium' WHERE priority IS NULL"))
+        if "label_path" not in names:
+            conn.execute(text("ALTER TABLE projects ADD COLUMN label_path TEXT"))
+        if "row_version" not in names:
+            conn.execute(text("ALTER TABLE projects ADD COLUMN row_version INTEGER NOT NULL DEFAULT 0"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS idx_project_version ON projects(row_version)"))
+    except OperationalError:
+        # 旧库结构各异：单项补齐失败时记录并继续其余各项
+        logger.exception("旧库补齐 projects 列与索引失败")
+    # 轻量迁移：为work_items添加estimated_hours列（若不存在）
+    try:
+        cols_wi = conn.execute(text("PRAGMA table_info(work_items)")).fetchall()
+        names_wi = {c[1] for c in cols_wi}
+        if "estimated_hours" not in names_wi:
+            conn.execute(text("ALTER TABLE work_items ADD COLUMN estimated_hours REAL"))
+        if "label_path" not in names_wi:
+            conn.execute(text("ALTER TABLE work_items ADD COLUMN label_path TEXT"))
+        if "updated_at" not in names_wi:
+            conn.execute(text("ALTER TABLE work_items ADD COLUMN updated_at DATETIME"))
+        if "row_version" not in names_wi:
+            conn.execute(text("ALTER TABLE work_items ADD COLUMN row_version INTEGER NOT NULL DEFAULT 0"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS idx_work_item_project_version ON work_items(project_id, row_version)"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS idx_work_item_version ON work_items(row_version)"))
+    except OperationalError:
+        logger.exception("旧库补齐 work_items 列与索引失败")
+    # 轻量迁移：为comments添加row_version列（若不存在）
+    try:
+        cols_c = conn.execute(text("PRAGMA table_info(comments)")).fetchall()
+        if "row_version" not in {c[1] for c in cols_c}:
+            conn.execute(text("ALTER TABLE comments ADD COLUMN row_version INTEGER NOT NULL DEFAULT 0"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS idx_comment_version ON comments(row_version)"))
+    except OperationalError:
+        logger.exception("旧库补齐 comments 列与索引失败")
+    # 轻量迁移：为尚无汇总行的JOB补齐子任务汇总（job_rollups表由create_all创建）
+    try:
+        from .services.job_rollup_service import BACKFILL_SQL
+        conn.execute(text(BACKFILL_SQL))
+    except OperationalError:
+        logger.exception("旧库补齐 JOB 子任务汇总失败")
+    # 轻量迁移：创建project_non_dev_works表（若不存在）
+    try:
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS project_non_dev_works (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                project_id INTEGER NOT NULL,
+                report_period_start DATE NOT NULL,
+                report_period_end DATE NOT NULL,
+                title VARCHAR(500) NOT NULL,
+                description TEXT,
+                creator_id INTEGER NOT NULL,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                updated_at DATETIME,
+                deleted_at DATETIME,
+                FOREIGN KEY (project_id) REFERENCES projects(id),
+                FOREIGN KEY (creator_id) REFERENCES users(id)
+            )
+        """))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS idx_non_dev_work_project ON project_non_dev_works(project_id)"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS idx_non_dev_work_period ON project_non_dev_works(project_id, report_period_start, report_period_end)"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS idx_non_dev_work_creator ON project_non_dev_works(creator_id)"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS idx_non_dev_work_deleted ON project_non_dev_works(deleted_at)"))
+    except OperationalError:
+        logger.exception("旧库创建 project_non_dev_works 表失败")
+
+    # 轻量迁移：为project_non_dev_works添加work_type字段（若不存在）
+    try:
+        cols_ndw = conn.execute(text("PRAGMA table_info(project_non_dev_works)")).fetchall()
+        names_ndw = {c[1] for c in cols_ndw}
+        if "work_type" not in names_ndw:
+            conn.execute(text("ALTER TABLE project_non_dev_works ADD COLUMN work_type VARCHAR(50) DEFAULT 'other_work'"))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS idx_non_dev_work_type ON project_non_dev_works(work_type)"))
+    except OperationalError:
+        logger.exception("旧库补齐 project_non_dev_works.work_type 列失败")
+    # 轻量迁移：为users添加phone与avatar_key列（若不存在）
+    try:
+        cols_u = conn.execute(text("PRAGMA table_info(users)")).fetchall()
+        names_u = {c[1] for c in cols_u}
+        if "phone" not in names_u:
+            conn.execute(text("ALTER TABLE users ADD COLUMN phone TEXT"))
+        if "avatar_key" not in names_u:
+            conn.execute(text("ALTER TABLE users ADD COLUMN avatar_key TEXT"))
+        if "email" not in names_u:
+            conn.execute(text("ALTER TABLE users ADD COLUMN email TEXT"))
+        if "full_name" not in names_u:
+            conn.execute(text("ALTER TABLE users ADD COLUMN full_name TEXT"))
+    except OperationalError:
+        logger.exception("旧库补齐 users 列失败")
+
+
+def migrate(url: str = DATABASE_URL) -> str:
+    """
+    将数据库迁移到 SCHEMA_REVISION
+
+    Returns:
+        执行的操作：created（空库建表）/ adopted（旧库补齐后纳入版本管理）/ upgraded（执行迁移）
+    """
+    from alembic import command
+    engine = create_engine(sync_url(url))
+    try:
+        with engine.begin() as conn:
+            tables = set(inspect(conn).get_table_names())
+            if "alembic_version" in tables:
+                command.upgrade(_alembic_config(conn), "head")
+                return "upgraded"
+            action = "adopted" if "users" in tables else "created"
+            models.Base.metadata.create_all(conn)
+            if action == "adopted":
+                _reconcile_legacy(conn)
+            command.stamp(_alembic_config(conn), "head")
+            return action
+    finally:
+        engine.dispose()
+
+
+def seed_demo_users(url: str = DATABASE_URL) -> int:
+    """
+    预置 admin 与演示用户（已存在的跳过）
+
+    Returns:
+        新增的用户数
+    """
+    from .services.password_hasher import hash_password
+    engine = create_engine(sync_url(url))
+    created = 0
+    try:
+        with engine.begin() as conn:
+            existing = {r[0] for r in conn.execute(text("SELECT username FROM users"))}
+            missing = [u for u in [{"username": "admin", "email_prefix": "admin", "full_name": None}, *DEMO_USERS]
+                       if u["username"] not in existing]
+            if missing:
+                # 所有预置用户共用同一个默认密码哈希
+                password_hash = hash_password("123")
+                conn.execute(
+                    text("INSERT INTO users (username, email_prefix, password_hash, is_active, full_name, created_at) "
+                         "VALUES (:username, :email_prefix, :password_hash, 1, :full_name, CURRENT_TIMESTAMP)"),
+                    [{**u, "password_hash": password_hash} for u in missing],
+                )
+                created = len(missing)
+    finally:
+        engine.dispose()
+    return created
+
+
+async def current_revision(engine: AsyncEngine) -> Optional[str]:
+    """数据库记录的迁移版本（尚未纳入版本管理时为 None）"""
+    async with engine.connect() as conn:
+        try:
+            return (await conn.execute(text("SELECT version_num FROM alembic_version"))).scalar()
+        except OperationalError:
+            # 尚无 alembic_version 表
+            return None
+
+
+async def check_schema(engine: AsyncEngine):
+    """启动时校验数据库版本，不一致时抛出 SchemaVersionError"""
+    revision = await current_revision(engine)
+    if revision != SCHEMA_REVISION:
+        raise SchemaVersionError(
+            f"数据库版本为 {revision or '未初始化'}，代码需要 {SCHEMA_REVISION}；"
+            f"请先执行 python -m app.cli migrate"
+        )
@@ -3,7 +3,7 @@ from typing import Optional, List
 from enum import Enum
 from sqlalchemy import (
     Column, Integer, String, Boolean, DateTime, Date, Float, ForeignKey, 
-    Text, UniqueConstraint, CheckConstraint, Index, MetaData
+    Text, UniqueConstraint, CheckConstraint, Index, MetaData, DDL, event
 )
 from sqlalchemy.orm import relationship, declarative_base
 from sqlalchemy.sql import func
@@ -61,6 +61,7 @@ class Project(Base):
     label_path = Column(String(500), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     deleted_at = Column(DateTime(timezone=True), nullable=True)
+    row_version = Column(Integer, default=0, server_default="0", nullable=False)  # projects 计数器分配的写版本，用于增量导出
     
     # 约束
     __table_args__ = (
@@ -69,6 +70,7 @@ class Project(Base):
         Index("idx_project_owner", "owner_id"),
         Index("idx_project_status", "status"),
         Index("idx_project_deleted", "deleted_at"),
+        Index("idx_project_version", "row_version"),
     )
     
     # 关系
@@ -101,7 +103,9 @@ class WorkItem(Base):
     estimated_hours = Column(Float, nullable=True)  # 预估工时（小时）
     creator_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime(timezone=True), nullable=True)
     deleted_at = Column(DateTime(timezone=True), nullable=True)
+    row_version = Column(Integer, default=0, server_default="0", nullable=False)  # 全局单调递增的写版本，用于增量同步
     
     # 约束
     __table_args__ = (
@@ -118,6 +122,8 @@ class WorkItem(Base):
         Index("idx_work_item_assignee", "assignee_id"),
         Index("idx_work_item_status", "status"),
         Index("idx_work_item_deleted", "deleted_at"),
+        Index("idx_work_item_project_version", "project_id", "row_version"),
+        Index("idx_work_item_version", "row_version"),
     )
     
     # 关系
@@ -169,6 +175,7 @@ class Comment(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), nullable=True)
     deleted_at = Column(DateTime(timezone=True), nullable=True)
+    row_version = Column(Integer, default=0, server_default="0", nullable=False)  # comments 计数器分配的写版本，用于增量导出
     
     # 约束
     __table_args__ = (
@@ -176,6 +183,7 @@ class Comment(Base):
         Index("idx_comment_entity", "entity_type", "entity_id"),
         Index("idx_comment_author", "author_id"),
         Index("idx_comment_deleted", "deleted_at"),
+        Index("idx_comment_version", "row_version"),
     )
     
     # 关系
@@ -286,6 +294,66 @@ class Sequence(Base):
     )
 
 
+class DataVersion(Base):
+    __tablename__ = "data_versions"
+
+    scope = Column(String(50), primary_key=True)  # 计数器名称，如 row_version
+    value = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
+class CalendarDay(Base):
+    """节假日日历：法定节假日与调休工作日（其余日期按周一至周五为工作日）"""
+    __tablename__ = "calendar_days"
+
+    day = Column(Date, primary_key=True)
+    kind = Column(String(10), nullable=False)  # holiday / workday
+    name = Column(String(100), nullable=True)  # 如 春节、国庆节调休
+
+    __table_args__ = (
+        CheckConstraint("kind IN ('holiday', 'workday')", name="valid_calendar_kind"),
+    )
+
+
+class JobRollup(Base):
+    """JOB下未删除TASK的汇总，随子任务增删改增量维护"""
+    __tablename__ = "job_rollups"
+
+    job_id = Column(Integer, ForeignKey("work_items.id"), primary_key=True)
+    child_count = Column(Integer, default=0, nullable=False)
+    todo_count = Column(Integer, default=0, nullable=False)
+    doing_count = Column(Integer, default=0, nullable=False)
+    blocked_count = Column(Integer, default=0, nullable=False)
+    done_count = Column(Integer, default=0, nullable=False)
+    cancelled_count = Column(Integer, default=0, nullable=False)
+    deleted_count = Column(Integer, default=0, nullable=False)
+    child_min_planned_start = Column(Date, nullable=True)
+    child_max_planned_end = Column(Date, nullable=True)
+    child_estimated_hours = Column(Float, default=0, nullable=False)
+    child_actual_hours = Column(Float, default=0, nullable=False)
+
+
+class ProjectSnapshot(Base):
+    """项目每日快照：当天最后一次快照时未删除工作项的各状态条数与工时合计（当天无变化的项目不写行）"""
+    __tablename__ = "project_snapshots"
+
+    project_id = Column(Integer, ForeignKey("projects.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    total_count = Column(Integer, default=0, nullable=False)
+    todo_count = Column(Integer, default=0, nullable=False)
+    doing_count = Column(Integer, default=0, nullable=False)
+    blocked_count = Column(Integer, default=0, nullable=False)
+    done_count = Column(Integer, default=0, nullable=False)
+    cancelled_count = Column(Integer, default=0, nullable=False)
+    estimated_hours = Column(Float, default=0, nullable=False)
+    actual_hours = Column(Float, default=0, nullable=False)
+    remaining_hours = Column(Float, default=0, nullable=False)  # 未完成（非 done/cancelled）工作项的预计工时
+
+    __table_args__ = (
+        Index("idx_project_snapshot_day", "day"),
+    )
+
+
 class Watch(Base):
     __tablename__ = "watches"
 
@@ -380,4 +448,44 @@ class OperationLog(Base):
         Index("idx_operation_logs_created", "created_at"),
     )
     
-    user = relationship("User", foreign_keys=[user_id])
\ No newline at end of file
+    user = relationship("User", foreign_keys=[user_id])
+
+
+class ExportJob(Base):
+    """后台导出任务：文件生成到暂存目录，按筛选指纹与数据代数复用结果"""
+    __tablename__ = "export_jobs"
+
+    id = Column(String(32), primary_key=True)  # uuid hex
+    kind = Column(String(50), nullable=False)  # jobs-tasks.xlsx
+    params = Column(Text, nullable=False)  # 归一化后的筛选条件（JSON）
+    fingerprint = Column(String(64), nullable=False)
+    generation = Column(String(100), nullable=False)  # 创建时的数据代数
+    status = Column(String(20), default="queued", nullable=False)
+    rows_total = Column(Integer, nullable=True)
+    rows_done = Column(Integer, default=0, nullable=False)
+    file_name = Column(String(100), nullable=True)  # 暂存目录下的文件名
+    size = Column(Integer, nullable=True)
+    error = Column(Text, nullable=True)
+    creator_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    owner = Column(String(64), nullable=True)  # 正在生成的工作进程（认领时写入）
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)  # 生成中定期刷新，超时视为进程已退出
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        CheckConstraint("status IN ('queued', 'running', 'done', 'failed')", name="valid_export_job_status"),
+        Index("idx_export_jobs_fingerprint", "fingerprint", "generation"),
+        Index("idx_export_jobs_created", "created_at"),
+    )
+
+
+# 全文检索索引（FTS5 虚拟表，不对应ORM模型）：项目、工作项、评论共用一张表，
+# rowid = 实体ID * 4 + 类型编号；中文在写入前按字切分（见 search_service），由 unicode61 分词
+SEARCH_INDEX_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5("
+    "code, title, body, entity_type UNINDEXED, entity_id UNINDEXED, project_id UNINDEXED, ref UNINDEXED, "
+    "tokenize = 'unicode61 remove_diacritics 2')"
+)
+event.listen(Base.metadata, "after_create", DDL(SEARCH_INDEX_DDL))
+event.listen(Base.metadata, "before_drop", DDL("DROP TABLE IF EXISTS search_index"))
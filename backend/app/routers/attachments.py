@@ -4,8 +4,8 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from pathlib import Path
 from app.database import get_db
-from app.dependencies.auth import get_current_user
-from app.models import Attachment, Comment, User
+from app.dependencies.auth import get_current_user, CurrentUser
+from app.models import Attachment, Comment
 from app.config import ATTACHMENTS_DIR, ALLOWED_MIME_TYPES, MAX_ATTACHMENT_SIZE
 
 
@@ -13,7 +13,7 @@ router = APIRouter(prefix="/api/attachments", tags=["附件"])
 
 
 @router.post("/comments/{comment_id}")
-async def upload_attachment(comment_id: int, file: UploadFile = File(...), db: AsyncSession = Depends(get_db), current_user: User = Depends(get_current_user)):
+async def upload_attachment(comment_id: int, file: UploadFile = File(...), db: AsyncSession = Depends(get_db), current_user: CurrentUser = Depends(get_current_user)):
     c = await db.get(Comment, comment_id)
     if not c:
         raise HTTPException(status_code=404, detail="评论不存在")
@@ -33,14 +33,14 @@ async def upload_attachment(comment_id: int, file: UploadFile = File(...), db: A
 
 
 @router.get("/comments/{comment_id}")
-async def list_attachments(comment_id: int, db: AsyncSession = Depends(get_db), current_user: User = Depends(get_current_user)):
+async def list_attachments(comment_id: int, db: AsyncSession = Depends(get_db), current_user: CurrentUser = Depends(get_current_user)):
     result = await db.execute(select(Attachment).where(Attachment.comment_id == comment_id))
     items = result.scalars().all()
     return [{"id": a.id, "file_name": a.original_filename, "size": a.file_size, "mime": a.mime_type} for a in items]
 
 
 @router.get("/{id}")
-async def download_attachment(id: int, db: AsyncSession = Depends(get_db), current_user: User = Depends(get_current_user)):
+async def download_attachment(id: int, db: AsyncSession = Depends(get_db), current_user: CurrentUser = Depends(get_current_user)):
     a = await db.get(Attachment, id)
     if not a:
         raise HTTPException(status_code=404, detail="附件不存在")
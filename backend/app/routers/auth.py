@@ -8,7 +8,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.database import get_db
 from app.services.auth_service import auth_service
 from app.schemas.auth import UserLogin, Token, CurrentUserResponse
-from app.dependencies.auth import get_current_user, create_current_user_response
+from app.dependencies.auth import get_current_user, CurrentUser, create_current_user_response
 from app.config import settings
 from app.models import User
 
@@ -54,7 +54,7 @@ async def login(
 
 @router.get("/me", response_model=CurrentUserResponse)
 async def get_current_user_info(
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """
     获取当前用户信息
@@ -0,0 +1,74 @@
+"""
+节假日日历路由：查询与按年替换法定节假日/调休工作日
+"""
+from datetime import date
+from typing import List, Literal, Optional
+from fastapi import APIRouter, Depends, Query
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import get_db
+from app.dependencies.auth import get_current_user, CurrentUser
+from app.exceptions import ForbiddenException, ValidationException
+from app.services.calendar_service import calendar_service
+from app.services.version_service import version_service, CALENDAR_SCOPE, CALENDAR_APPLIED_SCOPE
+
+router = APIRouter(prefix="/api/calendar", tags=["节假日日历"])
+
+
+class CalendarDayItem(BaseModel):
+    date: date
+    kind: Literal['holiday', 'workday']
+    name: Optional[str] = None
+
+
+class CalendarYearReplace(BaseModel):
+    days: List[CalendarDayItem]
+
+
+async def _calendar_payload(db: AsyncSession, year: int) -> dict:
+    version, applied = await version_service.current_many(db, CALENDAR_SCOPE, CALENDAR_APPLIED_SCOPE)
+    days = await calendar_service.list_days(db, date(year, 1, 1), date(year, 12, 31))
+    return {
+        "year": year,
+        "version": version,
+        # 工时重算已应用到的日历版本，小于 version 表示后台重算尚未完成
+        "applied_version": applied,
+        "days": [{"date": d.day.isoformat(), "kind": d.kind, "name": d.name} for d in days],
+    }
+
+
+@router.get("")
+async def get_calendar(
+    year: int = Query(default_factory=lambda: date.today().year, ge=1, le=9999),
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    return await _calendar_payload(db, year)
+
+
+@router.put("/{year}")
+async def replace_calendar_year(
+    year: int,
+    body: CalendarYearReplace,
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """整年替换日历；内容有变化时提交后在后台重算受影响工作项的工时"""
+    if current_user.username != 'admin':
+        raise ForbiddenException("需要管理员权限")
+    if not 1 <= year <= 9999:
+        raise ValidationException("年份无效")
+    days = {}
+    for item in body.days:
+        if item.date in days:
+            raise ValidationException("日期重复", details={"date": item.date.isoformat()})
+        days[item.date] = (item.kind, item.name)
+    version, changed = await calendar_service.replace_range(db, date(year, 1, 1), date(year, 12, 31), days)
+    if version is not None:
+        await db.commit()
+        await calendar_service.refresh(db)
+        calendar_service.schedule_recompute(db.bind, changed)
+    payload = await _calendar_payload(db, year)
+    payload["recompute_days"] = len(changed)
+    return payload
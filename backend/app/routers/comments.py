@@ -1,10 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.database import get_db
-from app.dependencies.auth import get_current_user
-from app.models import User, Comment, OperationType, EntityType
+from app.dependencies.auth import get_current_user, CurrentUser
+from app.models import Comment, OperationType, EntityType
 from app.services.comment_service import comment_service
 from app.services.operation_log_service import operation_log_service
+from app.services.version_service import version_service, USERS_SCOPE
+from app.services.user_directory import user_directory
+from app.utils.etag import conditional_response
 from pydantic import BaseModel, Field
 
 
@@ -22,7 +25,7 @@ class CommentEdit(BaseModel):
 
 
 @router.post("/", response_model=dict)
-async def create_comment(body: CommentCreate, db: AsyncSession = Depends(get_db), current_user: User = Depends(get_current_user)):
+async def create_comment(body: CommentCreate, db: AsyncSession = Depends(get_db), current_user: CurrentUser = Depends(get_current_user)):
     try:
         c = await comment_service.add_comment(db, entity_type=body.entity_type, entity_id=body.entity_id, author_id=current_user.id, content=body.content)
         
@@ -52,25 +55,33 @@ async def create_comment(body: CommentCreate, db: AsyncSession = Depends(get_db)
             entity_id=body.entity_id,
             operation_content=f"添加评论失败",
             result_status="failure",
-            failure_reason=str(e)
+            failure_reason=str(e),
+            strict=True
         )
         raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.get("/{entity_type}/{entity_id}", response_model=list[dict])
-async def list_comments(entity_type: str, entity_id: int, db: AsyncSession = Depends(get_db), current_user: User = Depends(get_current_user)):
+async def list_comments(entity_type: str, entity_id: int, request: Request, response: Response, db: AsyncSession = Depends(get_db), current_user: CurrentUser = Depends(get_current_user)):
+    validator = await comment_service.comments_validator(db, entity_type=entity_type, entity_id=entity_id)
+    not_modified = conditional_response(
+        request, response, "comments", entity_type, entity_id, *validator, await version_service.current(db, USERS_SCOPE)
+    )
+    if not_modified:
+        return not_modified
     items = await comment_service.list_comments(db, entity_type=entity_type, entity_id=entity_id)
+    authors = await user_directory.get_many(db, [c.author_id for c in items])
     result: list[dict] = []
     for c in items:
-        author: User | None = await db.get(User, c.author_id)
+        author = authors.get(c.author_id)
         result.append({
             "id": c.id,
             "author_id": c.author_id,
             "author": {
-                "id": author.id if author else c.author_id,
-                "username": author.username if author else None,
-                "email_prefix": author.email_prefix if author else None,
-                "full_name": author.full_name if author else None,
+                "id": author["id"] if author else c.author_id,
+                "username": author["username"] if author else None,
+                "email_prefix": author["email_prefix"] if author else None,
+                "full_name": author["full_name"] if author else None,
             },
             "content": c.content,
             "created_at": c.created_at.isoformat()
@@ -79,7 +90,7 @@ async def list_comments(entity_type: str, entity_id: int, db: AsyncSession = Dep
 
 
 @router.patch("/{id}", response_model=dict)
-async def edit_comment(id: int, body: CommentEdit, db: AsyncSession = Depends(get_db), current_user: User = Depends(get_current_user)):
+async def edit_comment(id: int, body: CommentEdit, db: AsyncSession = Depends(get_db), current_user: CurrentUser = Depends(get_current_user)):
     try:
         c = await comment_service.edit_comment(db, id=id, content=body.content)
         
@@ -107,13 +118,14 @@ async def edit_comment(id: int, body: CommentEdit, db: AsyncSession = Depends(ge
             entity_id=0,
             operation_content=f"更新评论失败",
             result_status="failure",
-            failure_reason=str(e)
+            failure_reason=str(e),
+            strict=True
         )
         raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.delete("/{id}", response_model=dict)
-async def delete_comment(id: int, db: AsyncSession = Depends(get_db), current_user: User = Depends(get_current_user)):
+async def delete_comment(id: int, db: AsyncSession = Depends(get_db), current_user: CurrentUser = Depends(get_current_user)):
     try:
         c = await comment_service.delete_comment(db, id=id)
         
@@ -141,13 +153,14 @@ async def delete_comment(id: int, db: AsyncSession = Depends(get_db), current_us
             entity_id=0,
             operation_content=f"删除评论失败",
             result_status="failure",
-            failure_reason=str(e)
+            failure_reason=str(e),
+            strict=True
         )
         raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.get("/context/{id}", response_model=dict)
-async def resolve_comment_context(id: int, db: AsyncSession = Depends(get_db), current_user: User = Depends(get_current_user)):
+async def resolve_comment_context(id: int, db: AsyncSession = Depends(get_db), current_user: CurrentUser = Depends(get_current_user)):
     try:
         url = await comment_service.resolve_comment_url(db, id=id)
         return {"url": url}
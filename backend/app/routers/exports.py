@@ -1,200 +1,162 @@
-from fastapi import APIRouter, Query, Depends
-from fastapi.responses import StreamingResponse
-from typing import Optional, List, Tuple, Dict
-import io
-from openpyxl import Workbook
+from fastapi import APIRouter, Query, Depends, Header
+from fastapi.responses import FileResponse, StreamingResponse
+from typing import Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, or_, func
 from app.database import get_db
-from app.models import WorkItem, Project, User
-from app.dependencies.auth import get_current_user
+from app.models import ExportJob
+from app.dependencies.auth import get_current_user, CurrentUser
+from app.dependencies.filters import work_item_filters
+from app.exceptions import BadRequestException, ConflictException, NotFoundException
+from app.schemas.export import ExportFilters, ExportJobCreate, ExportJobResponse
+from app.services.export_service import (
+    export_service, stream_jobs_tasks, stream_jobs_tasks_rows, row_writer, JOBS_TASKS_KIND, XLSX_MEDIA_TYPE,
+)
+from app.services.change_feed_service import change_feed_service, decode_cursor
+from app.utils.row_stream import parquet_available
 
 router = APIRouter(prefix="/api/export", tags=["exports"])
 
-def _parse_ids(s: Optional[str]) -> List[int]:
-    if not s:
-        return []
-    ids: List[int] = []
-    for part in str(s).split(','):
-        part = part.strip()
-        if not part:
-            continue
-        try:
-            ids.append(int(part))
-        except Exception:
-            continue
-    return ids
-
-def _to_date_str(d) -> str:
-    try:
-        return d.isoformat()
-    except Exception:
-        return ""
 
 @router.get("/jobs-tasks.xlsx")
 async def export_jobs_tasks(
     dimension: str = Query("project"),
-    project_ids: Optional[str] = Query(None),
-    assignee_ids: Optional[str] = Query(None),
-    role: str = Query("both"),
-    status: Optional[str] = Query(None),
-    start: Optional[str] = Query(None),
-    end: Optional[str] = Query(None),
-    include_deleted: bool = Query(False),
-    archived: bool = Query(False),
+    filters: ExportFilters = Depends(work_item_filters),
     tz: Optional[str] = Query(None),
     locale: Optional[str] = Query(None),
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
-    p_ids = _parse_ids(project_ids)
-    a_ids = _parse_ids(assignee_ids)
-    statuses = [s.strip() for s in (status or '').split(',') if s.strip()]
-
-    wi_filters = []
-    if p_ids:
-        wi_filters.append(WorkItem.project_id.in_(p_ids))
-    if a_ids:
-        if role == 'owner':
-            wi_filters.append(or_(Project.owner_id.in_(a_ids)))
-        elif role == 'assignee':
-            wi_filters.append(or_(WorkItem.assignee_id.in_(a_ids)))
-        else:
-            wi_filters.append(or_(WorkItem.assignee_id.in_(a_ids), Project.owner_id.in_(a_ids)))
-    if statuses:
-        wi_filters.append(WorkItem.status.in_(statuses))
-    if not include_deleted:
-        wi_filters.append(WorkItem.deleted_at.is_(None))
-    if archived:
-        wi_filters.append(Project.status == 'archived')
+    headers = {"Content-Disposition": f"attachment; filename={JOBS_TASKS_KIND}"}
+    return StreamingResponse(stream_jobs_tasks(db.bind, filters), media_type=XLSX_MEDIA_TYPE, headers=headers)
+
+
+# Accept 中可识别的媒体类型 → 导出格式
+_ACCEPT_FORMATS = {
+    "text/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "application/vnd.apache.parquet": "parquet",
+    "application/parquet": "parquet",
+    "application/x-parquet": "parquet",
+    XLSX_MEDIA_TYPE: "xlsx",
+}
+
+
+def _negotiate_format(fmt: Optional[str], accept: Optional[str]) -> str:
+    """format 参数优先；否则按 Accept 的 q 值取第一个可用格式；都没有时为 CSV"""
+    if fmt:
+        fmt = fmt.lower()
+        if fmt not in ("csv", "ndjson", "parquet", "xlsx"):
+            raise BadRequestException("不支持的导出格式", details={"format": fmt, "supported": ["csv", "ndjson", "parquet", "xlsx"]})
+        if fmt == "parquet" and not parquet_available():
+            raise BadRequestException("服务器未安装 pyarrow，无法导出 Parquet")
+        return fmt
+    candidates = []
+    for i, part in enumerate((accept or "").split(",")):
+        media, _, params = part.strip().partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        found = _ACCEPT_FORMATS.get(media.strip().lower())
+        if found and q > 0 and (found != "parquet" or parquet_available()):
+            candidates.append((-q, i, found))
+    return min(candidates)[2] if candidates else "csv"
+
+
+@router.get("/jobs-tasks")
+async def export_jobs_tasks_rows(
+    format: Optional[str] = Query(None, description="csv / ndjson / parquet / xlsx；不传时按 Accept 协商"),
+    accept: Optional[str] = Header(None),
+    filters: ExportFilters = Depends(work_item_filters),
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """jobs-tasks 的机器可读导出：一行一个工作项，边查询边输出"""
+    fmt = _negotiate_format(format, accept)
+    if fmt == "xlsx":
+        stream, media_type = stream_jobs_tasks(db.bind, filters), XLSX_MEDIA_TYPE
     else:
-        wi_filters.append(Project.status != 'archived')
-
-    # 时间范围交集：planned范围与查询(start/end)有重叠
-    from datetime import date
-    start_d = None
-    end_d = None
-    try:
-        start_d = date.fromisoformat(start) if start else None
-        end_d = date.fromisoformat(end) if end else None
-    except Exception:
-        start_d = None
-        end_d = None
-    if start_d:
-        wi_filters.append(or_(WorkItem.planned_end_date.is_(None), WorkItem.planned_end_date >= start_d))
-    if end_d:
-        wi_filters.append(or_(WorkItem.planned_start_date.is_(None), WorkItem.planned_start_date <= end_d))
-
-    base_stmt = select(WorkItem, Project, User).join(Project, WorkItem.project_id == Project.id).join(User, WorkItem.assignee_id == User.id, isouter=True)
-    if wi_filters:
-        base_stmt = base_stmt.where(and_(*wi_filters))
-
-    jobs_stmt = base_stmt.where(WorkItem.kind == 'JOB')
-    tasks_stmt = base_stmt.where(WorkItem.kind == 'TASK')
-
-    jobs_res = await db.execute(jobs_stmt)
-    tasks_res = await db.execute(tasks_stmt)
-    jobs_rows = jobs_res.all()
-    tasks_rows = tasks_res.all()
-
-    # 预取父JOB code映射
-    parent_map: Dict[int, str] = {}
-    for wi, prj, usr in jobs_rows:
-        parent_map[wi.id] = wi.code
-
-    wb = Workbook()
-    ws_jobs = wb.active
-    ws_jobs.title = "Jobs"
-    ws_jobs.append(["ID","标题","项目","Owner","Assignee","状态","开始时间","结束时间","预计工时","记录工时","进度"]) 
-    for wi, prj, usr in jobs_rows:
-        owner_name = ''
-        try:
-            owner_stmt = await db.execute(select(User).where(User.id == prj.owner_id))
-            owner_user = owner_stmt.scalar_one_or_none()
-            owner_name = (owner_user.full_name or owner_user.username or owner_user.email_prefix) if owner_user else ''
-        except Exception:
-            owner_name = ''
-        assignee_name = ''
-        if usr:
-            assignee_name = usr.full_name or usr.username or usr.email_prefix or ''
-        pct = ''
-        try:
-            if wi.estimated_hours and wi.actual_hours is not None and wi.estimated_hours > 0:
-                pct = f"{round((wi.actual_hours/wi.estimated_hours)*100)}%"
-        except Exception:
-            pct = ''
-        ws_jobs.append([
-            wi.code,
-            wi.title,
-            prj.code if hasattr(prj, 'code') else (prj.name or ''),
-            owner_name,
-            assignee_name,
-            wi.status,
-            _to_date_str(wi.planned_start_date or wi.start_date),
-            _to_date_str(wi.planned_end_date or wi.end_date),
-            wi.estimated_hours or '',
-            wi.actual_hours or '',
-            pct,
-        ])
-
-    ws_tasks = wb.create_sheet("Tasks")
-    ws_tasks.append(["ID","标题","项目","Owner","Assignee","状态","开始时间","结束时间","预计工时","记录工时","ParentID"]) 
-    for wi, prj, usr in tasks_rows:
-        owner_name = ''
-        try:
-            owner_stmt = await db.execute(select(User).where(User.id == prj.owner_id))
-            owner_user = owner_stmt.scalar_one_or_none()
-            owner_name = (owner_user.full_name or owner_user.username or owner_user.email_prefix) if owner_user else ''
-        except Exception:
-            owner_name = ''
-        assignee_name = ''
-        if usr:
-            assignee_name = usr.full_name or usr.username or usr.email_prefix or ''
-        parent_code = ''
-        try:
-            if wi.parent_id:
-                parent_code = parent_map.get(wi.parent_id, '')
-                if not parent_code:
-                    p_stmt = await db.execute(select(WorkItem.code).where(WorkItem.id == wi.parent_id))
-                    parent_code = p_stmt.scalar_one_or_none() or ''
-        except Exception:
-            parent_code = ''
-        ws_tasks.append([
-            wi.code,
-            wi.title,
-            prj.code if hasattr(prj, 'code') else (prj.name or ''),
-            owner_name,
-            assignee_name,
-            wi.status,
-            _to_date_str(wi.planned_start_date or wi.start_date),
-            _to_date_str(wi.planned_end_date or wi.end_date),
-            wi.estimated_hours or '',
-            wi.actual_hours or '',
-            parent_code,
-        ])
-
-    # Summary：按项目与负责人聚合
-    ws_sum = wb.create_sheet("Summary")
-    ws_sum.append(["项目","负责人","预计工时","记录工时","偏差"]) 
-    # 聚合数据来源：jobs + tasks
-    agg: Dict[Tuple[str,str], Tuple[float,float]] = {}
-    def add_agg(proj_name: str, assignee_name: str, est: float, act: float):
-        key = (proj_name or '', assignee_name or '')
-        cur = agg.get(key, (0.0, 0.0))
-        agg[key] = (cur[0] + (est or 0.0), cur[1] + (act or 0.0))
-    for w, p, u in jobs_rows:
-        pname = p.code if hasattr(p, 'code') else (p.name or '')
-        aname = (u.full_name or u.username or u.email_prefix) if u else ''
-        add_agg(pname, aname, w.estimated_hours or 0.0, w.actual_hours or 0.0)
-    for w, p, u in tasks_rows:
-        pname = p.code if hasattr(p, 'code') else (p.name or '')
-        aname = (u.full_name or u.username or u.email_prefix) if u else ''
-        add_agg(pname, aname, w.estimated_hours or 0.0, w.actual_hours or 0.0)
-    for (pname, aname), (est, act) in agg.items():
-        ws_sum.append([pname, aname, est, act, (est - act)])
-
-    buf = io.BytesIO()
-    wb.save(buf)
-    buf.seek(0)
-    headers = {"Content-Disposition": "attachment; filename=jobs-tasks.xlsx"}
-    return StreamingResponse(buf, media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", headers=headers)
+        writer = row_writer(fmt)
+        stream, media_type = stream_jobs_tasks_rows(db.bind, filters, writer), writer.media_type
+    headers = {"Content-Disposition": f"attachment; filename=jobs-tasks.{fmt}", "Vary": "Accept"}
+    return StreamingResponse(stream, media_type=media_type, headers=headers)
+
+
+@router.get("/changes")
+async def export_changes(
+    cursor: Optional[str] = Query(None, description="上次拉取返回的游标；不传时从头全量"),
+    limit: int = Query(10000, ge=1, le=100000, description="本次最多输出的记录数"),
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """
+    增量导出：以 NDJSON 输出游标之后新增或修改的项目、工作项、评论与操作日志（软删除输出为删除标记）
+
+    最后一行为 {"type": "end", "cursor": ..., "has_more": ...}；中途的检查点游标可用于断点续拉。
+    """
+    position = decode_cursor(cursor)
+    return StreamingResponse(
+        change_feed_service.stream(db.bind, position, limit),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-store"},
+    )
+
+
+def _job_response(job: ExportJob, cached: bool = False) -> ExportJobResponse:
+    resp = ExportJobResponse.model_validate(job)
+    resp.cached = cached
+    if job.status == 'done':
+        resp.download_url = f"/api/export/jobs/{job.id}/download"
+    return resp
+
+
+@router.post("/jobs", response_model=ExportJobResponse)
+async def create_export_job(
+    body: ExportJobCreate,
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """创建后台导出任务；相同条件且数据未变化时直接返回已有任务（cached=true）"""
+    filters = ExportFilters(**body.model_dump(exclude={"kind"}))
+    job, cached = await export_service.create(db, filters, current_user.id)
+    if not cached:
+        await db.commit()
+        export_service.submit(db.bind, job.id)
+    return _job_response(job, cached)
+
+
+@router.get("/jobs/{job_id}", response_model=ExportJobResponse)
+async def get_export_job(
+    job_id: str,
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    job = await db.get(ExportJob, job_id)
+    # 只能查看、下载自己创建的任务；他人的任务按不存在处理
+    if not job or job.creator_id != current_user.id:
+        raise NotFoundException("导出任务不存在")
+    return _job_response(job)
+
+
+@router.get("/jobs/{job_id}/download")
+async def download_export_job(
+    job_id: str,
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    job = await db.get(ExportJob, job_id)
+    # 只能查看、下载自己创建的任务；他人的任务按不存在处理
+    if not job or job.creator_id != current_user.id:
+        raise NotFoundException("导出任务不存在")
+    if job.status != 'done':
+        raise ConflictException("导出尚未完成", details={"status": job.status})
+    path = export_service.file_path(job)
+    if not path.exists():
+        raise NotFoundException("导出文件已过期，请重新导出")
+    return FileResponse(path, media_type=XLSX_MEDIA_TYPE, filename=job.kind)
@@ -1,13 +1,17 @@
 """
 标签树路由：从 .docs/tech/菜单级联关系.xlsx 解析为树形JSON
 """
-from fastapi import APIRouter
+import hashlib
+import json
+from fastapi import APIRouter, Request, Response
 from pathlib import Path
 from typing import List, Dict, Any
+from app.utils.etag import conditional_response
 
 router = APIRouter(prefix="/api/labels", tags=["标签树"])
 
 _CACHE: Dict[str, Any] | None = None
+_CACHE_DIGEST: str | None = None
 
 
 def _excel_path() -> Path:
@@ -79,9 +83,14 @@ def _parse_excel() -> List[Dict[str, Any]]:
 
 
 @router.get("/tree")
-async def get_label_tree():
-    global _CACHE
+async def get_label_tree(request: Request, response: Response):
+    global _CACHE, _CACHE_DIGEST
     if _CACHE is None:
         _CACHE = {"items": _parse_excel()}
+        # 内容只解析一次，用其序列化结果的摘要作为校验值
+        _CACHE_DIGEST = hashlib.sha1(json.dumps(_CACHE, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+    not_modified = conditional_response(request, response, "labels", _CACHE_DIGEST)
+    if not_modified:
+        return not_modified
     return _CACHE
 
@@ -5,8 +5,8 @@ from sqlalchemy import and_, or_, select
 from datetime import date
 
 from app.database import get_db
-from app.models import ProjectNonDevWork, Project, User
-from app.dependencies.auth import get_current_user
+from app.models import ProjectNonDevWork, Project
+from app.dependencies.auth import get_current_user, CurrentUser
 from app.exceptions import AppException
 from pydantic import BaseModel
 from datetime import datetime
@@ -49,7 +49,7 @@ class NonDevWorkResponse(BaseModel):
 async def create_non_dev_work(
     work_data: NonDevWorkCreate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """创建非开发工作说明"""
     
@@ -90,7 +90,7 @@ async def get_non_dev_works_by_report(
     start_date: date = Query(..., description="报告开始日期"),
     end_date: date = Query(..., description="报告结束日期"),
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """根据周报期间获取非开发工作说明列表"""
     
@@ -133,7 +133,7 @@ async def get_project_non_dev_works(
     start_date: Optional[date] = Query(None, description="开始日期"),
     end_date: Optional[date] = Query(None, description="结束日期"),
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """获取项目的非开发工作说明列表"""
     
@@ -183,7 +183,7 @@ async def update_non_dev_work(
     work_id: int,
     work_data: NonDevWorkUpdate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """更新非开发工作说明"""
     
@@ -223,7 +223,7 @@ async def update_non_dev_work(
 async def delete_non_dev_work(
     work_id: int,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """删除非开发工作说明"""
     
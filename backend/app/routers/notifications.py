@@ -2,8 +2,8 @@ from fastapi import APIRouter, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from app.database import get_db
-from app.dependencies.auth import get_current_user
-from app.models import Notification, User
+from app.dependencies.auth import get_current_user, CurrentUser
+from app.models import Notification
 
 
 router = APIRouter(prefix="/api/notifications", tags=["通知"])
@@ -15,7 +15,7 @@ async def list_notifications(
     page: int = Query(1, ge=1),
     page_size: int = Query(10, ge=1, le=100),
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     base = select(Notification).where(Notification.user_id == current_user.id)
     if unread:
@@ -37,7 +37,7 @@ async def list_notifications(
 
 
 @router.patch("/{id}")
-async def mark_read(id: int, db: AsyncSession = Depends(get_db), current_user: User = Depends(get_current_user)):
+async def mark_read(id: int, db: AsyncSession = Depends(get_db), current_user: CurrentUser = Depends(get_current_user)):
     n = await db.get(Notification, id)
     if n and n.user_id == current_user.id:
         n.is_read = True
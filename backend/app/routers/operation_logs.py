@@ -1,10 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
 from app.database import get_db
-from app.dependencies.auth import get_current_user
-from app.models import User, EntityType
+from app.dependencies.auth import get_current_user, CurrentUser
+from app.models import EntityType
 from app.services.operation_log_service import operation_log_service
+from app.services.user_directory import user_directory
 from pydantic import BaseModel
 
 
@@ -15,7 +15,7 @@ router = APIRouter(prefix="/api/operation-logs", tags=["操作日志"])
 async def get_recent_operation_logs(
     limit: int = Query(50, ge=1, le=200),
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """获取最近的操作日志"""
     logs = await operation_log_service.get_recent_logs(db, limit=limit)
@@ -23,11 +23,8 @@ async def get_recent_operation_logs(
     # 获取所有用户ID，批量查询用户信息
     user_ids = list(set(log.user_id for log in logs if log.user_id))
     user_map = {}
-    if user_ids:
-        stmt = select(User).where(User.id.in_(user_ids))
-        users_result = await db.execute(stmt)
-        for user in users_result.scalars().all():
-            user_map[user.id] = user.full_name or user.username
+    for uid, user in (await user_directory.get_many(db, user_ids)).items():
+        user_map[uid] = user["full_name"] or user["username"]
     
     items = []
     for log in logs:
@@ -68,7 +65,7 @@ async def get_operation_logs(
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     try:
         entity_type_enum = EntityType(entity_type)
@@ -86,12 +83,9 @@ async def get_operation_logs(
     # 获取所有用户ID，批量查询用户信息
     user_ids = list(set(log.user_id for log in result["items"] if log.user_id))
     user_map = {}
-    if user_ids:
-        stmt = select(User).where(User.id.in_(user_ids))
-        users_result = await db.execute(stmt)
-        for user in users_result.scalars().all():
-            # 优先使用 full_name，没有则使用 username
-            user_map[user.id] = user.full_name or user.username
+    for uid, user in (await user_directory.get_many(db, user_ids)).items():
+        # 优先使用 full_name，没有则使用 username
+        user_map[uid] = user["full_name"] or user["username"]
     
     items = []
     for log in result["items"]:
@@ -2,17 +2,19 @@
 项目API路由
 """
 from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.database import get_db
 from app.services.project_service import project_service
 from app.services.operation_log_service import operation_log_service
+from app.services.version_service import version_service, PROJECTS_SCOPE, USERS_SCOPE
+from app.utils.etag import conditional_response
+from app.services.user_directory import user_directory
 from app.schemas.project import (
     ProjectCreate, ProjectUpdate, ProjectResponse, 
-    ProjectListResponse, ProjectQuery
+    ProjectListResponse, ProjectQuery, ProjectStatisticsQuery
 )
-from app.dependencies.auth import get_current_user
-from app.models import User
+from app.dependencies.auth import get_current_user, CurrentUser
 from app.exceptions import AppException
 from app.models import OperationType, EntityType
 
@@ -24,7 +26,7 @@ router = APIRouter(prefix="/api/projects", tags=["项目"])
 async def create_project(
     project_data: ProjectCreate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """
     创建新项目
@@ -58,7 +60,8 @@ async def create_project(
             entity_id=0,
             operation_content=f"创建项目失败: {project_data.name}",
             result_status="failure",
-            failure_reason=str(e.detail)
+            failure_reason=str(e.detail),
+            strict=True
         )
         raise HTTPException(status_code=e.status_code, detail=e.detail)
 
@@ -68,7 +71,7 @@ async def get_project(
     project_id: int,
     include_deleted: bool = Query(False, description="是否包含已删除的项目"),
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """
     获取项目详情
@@ -85,15 +88,9 @@ async def get_project(
             )
         
         # 拼接可展示的创建者/所有者前缀与用户名
-        from sqlalchemy import select
-        owner = None
-        creator = None
-        if project.owner_id:
-            res_o = await db.execute(select(User).where(User.id == project.owner_id))
-            owner = res_o.scalars().first()
-        if project.creator_id:
-            res_c = await db.execute(select(User).where(User.id == project.creator_id))
-            creator = res_c.scalars().first()
+        users = await user_directory.get_many(db, [project.owner_id, project.creator_id])
+        owner = users.get(project.owner_id)
+        creator = users.get(project.creator_id)
         return {
             "id": project.id,
             "code": project.code,
@@ -108,10 +105,10 @@ async def get_project(
             "archived": project.archived,
             "created_at": project.created_at,
             "deleted_at": project.deleted_at,
-            "owner_username": owner.username if owner else None,
-            "owner_prefix": owner.email_prefix if owner else None,
-            "creator_username": creator.username if creator else None,
-            "creator_prefix": creator.email_prefix if creator else None,
+            "owner_username": owner["username"] if owner else None,
+            "owner_prefix": owner["email_prefix"] if owner else None,
+            "creator_username": creator["username"] if creator else None,
+            "creator_prefix": creator["email_prefix"] if creator else None,
             "label_path": project.label_path,
         }
     except AppException as e:
@@ -120,6 +117,8 @@ async def get_project(
 
 @router.get("", response_model=ProjectListResponse)
 async def list_projects(
+    request: Request,
+    response: Response,
     status: Optional[str] = Query(None, description="项目状态筛选"),
     archived: Optional[bool] = Query(None, description="归档状态筛选"),
     include_deleted: bool = Query(False, description="是否包含已删除的项目"),
@@ -127,14 +126,21 @@ async def list_projects(
     page: int = Query(1, ge=1, description="页码"),
     size: int = Query(10, ge=1, le=100, description="每页数量"),
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """
     获取项目列表
     
-    支持分页、筛选、搜索功能
+    支持分页、筛选、搜索功能；项目或用户未变化时按 If-None-Match 返回 304
     """
     try:
+        not_modified = conditional_response(
+            request, response, "projects", status, archived, include_deleted, search, page, size,
+            *await version_service.current_many(db, PROJECTS_SCOPE, USERS_SCOPE)
+        )
+        if not_modified:
+            return not_modified
+
         # 构建查询参数
         query_params = ProjectQuery(
             status=status,
@@ -164,7 +170,7 @@ async def update_project(
     project_id: int,
     project_data: ProjectUpdate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """
     更新项目
@@ -195,19 +201,14 @@ async def update_project(
         }
         
         # 获取旧的 owner 和 creator 用户名（用于显示）
-        from sqlalchemy import select
         old_owner_name = None
         old_creator_name = None
-        if old_project.owner_id:
-            res = await db.execute(select(User).where(User.id == old_project.owner_id))
-            u = res.scalars().first()
-            if u:
-                old_owner_name = u.full_name or u.username
-        if old_project.creator_id:
-            res = await db.execute(select(User).where(User.id == old_project.creator_id))
-            u = res.scalars().first()
-            if u:
-                old_creator_name = u.full_name or u.username
+        u = await user_directory.get(db, old_project.owner_id)
+        if u:
+            old_owner_name = u["full_name"] or u["username"]
+        u = await user_directory.get(db, old_project.creator_id)
+        if u:
+            old_creator_name = u["full_name"] or u["username"]
         
         project = await project_service.update_project(
             db, project_id, project_data, current_user.id
@@ -228,11 +229,9 @@ async def update_project(
         # 检查 owner_id 是否变化（通过 owner_prefix/owner_email 间接修改）
         if project.owner_id != old_values.get('owner_id'):
             new_owner_name = None
-            if project.owner_id:
-                res = await db.execute(select(User).where(User.id == project.owner_id))
-                u = res.scalars().first()
-                if u:
-                    new_owner_name = u.full_name or u.username
+            u = await user_directory.get(db, project.owner_id)
+            if u:
+                new_owner_name = u["full_name"] or u["username"]
             await operation_log_service.log_field_change(
                 db,
                 user_id=current_user.id,
@@ -249,11 +248,9 @@ async def update_project(
         # 检查 creator_id 是否变化（通过 creator_prefix/creator_email 间接修改）
         if project.creator_id != old_values.get('creator_id'):
             new_creator_name = None
-            if project.creator_id:
-                res = await db.execute(select(User).where(User.id == project.creator_id))
-                u = res.scalars().first()
-                if u:
-                    new_creator_name = u.full_name or u.username
+            u = await user_directory.get(db, project.creator_id)
+            if u:
+                new_creator_name = u["full_name"] or u["username"]
             await operation_log_service.log_field_change(
                 db,
                 user_id=current_user.id,
@@ -317,7 +314,8 @@ async def update_project(
             entity_id=project_id,
             operation_content=f"更新项目失败: 项目ID {project_id}",
             result_status="failure",
-            failure_reason=str(e.detail)
+            failure_reason=str(e.detail),
+            strict=True
         )
         raise HTTPException(status_code=e.status_code, detail=e.detail)
 
@@ -326,7 +324,7 @@ async def update_project(
 async def archive_project(
     project_id: int,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """
     归档项目
@@ -353,7 +351,7 @@ async def archive_project(
 async def unarchive_project(
     project_id: int,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """
     取消归档项目
@@ -380,7 +378,7 @@ async def unarchive_project(
 async def soft_delete_project(
     project_id: int,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """
     软删除项目
@@ -421,7 +419,8 @@ async def soft_delete_project(
             entity_id=project_id,
             operation_content=f"删除项目失败: 项目ID {project_id}",
             result_status="failure",
-            failure_reason=str(e.detail)
+            failure_reason=str(e.detail),
+            strict=True
         )
         raise HTTPException(status_code=e.status_code, detail=e.detail)
 
@@ -430,7 +429,7 @@ async def soft_delete_project(
 async def restore_project(
     project_id: int,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """
     恢复软删除的项目
@@ -453,11 +452,36 @@ async def restore_project(
         raise HTTPException(status_code=e.status_code, detail=e.detail)
 
 
+@router.post("/statistics")
+async def get_projects_statistics(
+    body: ProjectStatisticsQuery,
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """
+    批量获取项目统计信息（替代逐项目调用 statistics）
+    
+    一次分组查询返回各项目每种状态的工作项数（含按 JOB/TASK 拆分）、工时合计与逾期数；
+    未变化的项目直接取缓存。items 按请求顺序排列，不存在的项目被忽略。
+    """
+    try:
+        statistics = await project_service.get_projects_statistics(db, body.project_ids)
+        seen = set()
+        items = []
+        for pid in body.project_ids:
+            if pid in statistics and pid not in seen:
+                seen.add(pid)
+                items.append(statistics[pid])
+        return {"items": items}
+    except AppException as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+
 @router.get("/{project_id}/statistics")
 async def get_project_statistics(
     project_id: int,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """
     获取项目统计信息
@@ -0,0 +1,28 @@
+"""
+全文检索路由：跨项目、工作项、评论按相关度检索
+"""
+from typing import Optional
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import get_db
+from app.dependencies.auth import get_current_user, CurrentUser
+from app.schemas.search import SearchResponse
+from app.services.search_service import search_service
+
+router = APIRouter(prefix="/api/search", tags=["检索"])
+
+
+@router.get("", response_model=SearchResponse)
+async def search(
+    q: str = Query(..., min_length=1, max_length=200, description="关键词，空格分隔的多个词需同时命中"),
+    types: Optional[str] = Query(None, description="逗号分隔的类型：project / work_item / comment，默认全部"),
+    page: int = Query(1, ge=1),
+    size: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """按相关度（编号 > 标题 > 正文）分页返回命中的项目、工作项与评论"""
+    parsed = search_service.parse_types(types)
+    result = await search_service.search(db, q, parsed, page, size)
+    return {"page": page, "size": size, **result}
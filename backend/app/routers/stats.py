@@ -0,0 +1,89 @@
+"""
+统计路由：工作项工时与状态分布的聚合、仪表盘、燃尽图与累积流图
+"""
+from datetime import date, timedelta
+from typing import Optional
+from fastapi import APIRouter, Depends, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import get_db
+from app.dependencies.auth import get_current_user, CurrentUser
+from app.dependencies.filters import work_item_filters
+from app.schemas.export import ExportFilters
+from app.schemas.stats import AggregateResponse
+from app.services.aggregation_service import aggregation_service, MAX_LABEL_DEPTH
+from app.services.dashboard_service import dashboard_service
+from app.services.snapshot_service import snapshot_service, snapshot_day
+from app.utils.etag import conditional_response
+
+router = APIRouter(prefix="/api/stats", tags=["统计"])
+
+# 燃尽图/累积流图未指定起始日期时的天数
+DEFAULT_SERIES_DAYS = 30
+
+
+@router.get("/aggregate", response_model=AggregateResponse)
+async def aggregate(
+    group_by: str = Query("project", description="逗号分隔的分组维度：project / assignee / label / week"),
+    kind: Optional[str] = Query(None, pattern="^(JOB|TASK)$", description="仅统计 JOB 或 TASK"),
+    label_depth: int = Query(1, ge=1, le=MAX_LABEL_DEPTH, description="按标签分组时取前几级"),
+    filters: ExportFilters = Depends(work_item_filters),
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """按维度汇总工作项的条数、预计/记录工时与各状态条数（筛选参数与 jobs-tasks 导出一致）"""
+    dims = aggregation_service.parse_group_by(group_by)
+    groups = await aggregation_service.aggregate(db, filters, dims, kind=kind, label_depth=label_depth)
+    return {"group_by": dims, "groups": groups}
+
+
+@router.get("/dashboard")
+async def dashboard(
+    request: Request,
+    response: Response,
+    project_id: Optional[int] = Query(None, description="仅统计该项目"),
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """
+    data-statistics.html 的全部图表数据：KPI、状态/优先级分布、负责人负载、逾期、完成趋势与预估准确度
+
+    结果在服务端缓存，工作项/项目/用户有写入时重算；数据未变化时按 If-None-Match 返回 304
+    """
+    generation = await dashboard_service.generation(db)
+    today = date.today()
+    not_modified = conditional_response(request, response, "dashboard", project_id, today, *generation)
+    if not_modified:
+        return not_modified
+    return await dashboard_service.get(db, project_id, generation=generation, today=today)
+
+
+def _series_range(start: Optional[date], end: Optional[date]) -> tuple:
+    end = end or snapshot_day()
+    return start or end - timedelta(days=DEFAULT_SERIES_DAYS - 1), end
+
+
+@router.get("/burndown")
+async def burndown(
+    project_id: int = Query(..., description="项目ID"),
+    start: Optional[date] = Query(None, description="起始日期，默认结束日期前30天"),
+    end: Optional[date] = Query(None, description="结束日期，默认当天"),
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """项目燃尽图：每天的剩余工作项数、剩余预计工时与理想线（读取每日快照）"""
+    start, end = _series_range(start, end)
+    return await snapshot_service.burndown(db, project_id, start, end)
+
+
+@router.get("/cumulative-flow")
+async def cumulative_flow(
+    project_id: Optional[int] = Query(None, description="仅统计该项目；为空时汇总全部项目"),
+    start: Optional[date] = Query(None, description="起始日期，默认结束日期前30天"),
+    end: Optional[date] = Query(None, description="结束日期，默认当天"),
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """累积流图：每天各状态的工作项数（读取每日快照）"""
+    start, end = _series_range(start, end)
+    return await snapshot_service.cumulative_flow(db, start, end, project_id)
@@ -1,12 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update
+from sqlalchemy import select, update, func
 from app.database import get_db
 from app.models import User
-from app.dependencies.auth import get_current_user
+from app.dependencies.auth import get_current_user, CurrentUser, create_user_response
 from app.schemas.user import UpdateMeRequest, UserProfileResponse
 from sqlalchemy.exc import IntegrityError
 from app.services.auth_service import auth_service
+from app.services.version_service import version_service, USERS_SCOPE
+from app.services.user_directory import user_directory
+from app.utils.etag import conditional_response
 from pydantic import BaseModel, Field
 from typing import List
 
@@ -16,7 +19,7 @@ ALLOWED_AVATARS = {"cat_1","cat_2","cat_3","dog_1","dog_2","dog_3"}
 
 
 @router.patch("/me", response_model=UserProfileResponse)
-async def update_me(payload: UpdateMeRequest, db: AsyncSession = Depends(get_db), current_user: User = Depends(get_current_user)):
+async def update_me(payload: UpdateMeRequest, db: AsyncSession = Depends(get_db), current_user: CurrentUser = Depends(get_current_user)):
     if payload.avatar_key is not None and payload.avatar_key not in ALLOWED_AVATARS:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail={"code":"INVALID_AVATAR","message":"头像不合法"})
 
@@ -34,18 +37,32 @@ async def update_me(payload: UpdateMeRequest, db: AsyncSession = Depends(get_db)
         user.phone = payload.phone
     if payload.avatar_key is not None:
         user.avatar_key = payload.avatar_key
+    await version_service.bump(db, USERS_SCOPE)
 
     try:
         await db.commit()
     except IntegrityError:
         await db.rollback()
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail={"code":"UNIQUE_CONSTRAINT","message":"唯一性冲突"})
+    user_directory.invalidate()
+    auth_service.invalidate_user(current_user.id)
     await db.refresh(user)
-    return UserProfileResponse.model_validate(user)
+    return UserProfileResponse(**create_user_response(user).model_dump())
+
+
+async def users_validator(db: AsyncSession) -> tuple:
+    """用户列表的校验值：变更代数 + 用户数 + 最大ID（覆盖未经接口写入的新增用户）"""
+    generation = await version_service.current(db, USERS_SCOPE)
+    res = await db.execute(select(func.count(User.id), func.max(User.id)))
+    count, max_id = res.one()
+    return generation, count, max_id
 
 
 @router.get("", response_model=list[dict])
-async def list_users(db: AsyncSession = Depends(get_db), current_user: User = Depends(get_current_user)):
+async def list_users(request: Request, response: Response, db: AsyncSession = Depends(get_db), current_user: CurrentUser = Depends(get_current_user)):
+    not_modified = conditional_response(request, response, "users", *await users_validator(db))
+    if not_modified:
+        return not_modified
     stmt = select(User).where(User.is_active == True)
     res = await db.execute(stmt)
     users = res.scalars().all()
@@ -61,13 +78,28 @@ async def list_users(db: AsyncSession = Depends(get_db), current_user: User = De
     ]
 
 
+@router.get("/suggest", response_model=list[dict])
+async def suggest_users(
+    q: str = Query(..., min_length=1, max_length=50, description="用户名/邮箱前缀/姓名/拼音首字母的前缀"),
+    limit: int = Query(10, ge=1, le=50),
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """负责人联想：从进程内用户目录的前缀索引返回匹配的启用用户"""
+    users = await user_directory.suggest(db, q, limit=limit)
+    return [
+        {"id": u["id"], "username": u["username"], "email_prefix": u["email_prefix"], "full_name": u["full_name"]}
+        for u in users
+    ]
+
+
 class UserSeed(BaseModel):
     email: str = Field(..., description="邮箱")
     full_name: str = Field(..., description="姓名")
 
 
 @router.post("/reset")
-async def reset_users(payload: List[UserSeed], db: AsyncSession = Depends(get_db), current_user: User = Depends(get_current_user)):
+async def reset_users(payload: List[UserSeed], db: AsyncSession = Depends(get_db), current_user: CurrentUser = Depends(get_current_user)):
     if not current_user or (current_user.username != 'admin'):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail={"code":"FORBIDDEN","message":"需要管理员权限"})
 
@@ -81,6 +113,8 @@ async def reset_users(payload: List[UserSeed], db: AsyncSession = Depends(get_db
         admin_user.is_active = True
         await db.flush()
 
+    # 新用户的默认密码哈希，每个请求最多计算一次
+    default_hash = None
     for seed in payload:
         prefix = (seed.email.split('@')[0]).strip()
         username = prefix
@@ -97,20 +131,24 @@ async def reset_users(payload: List[UserSeed], db: AsyncSession = Depends(get_db
             user.full_name = full_name
             user.is_active = True
         else:
-            hashed = auth_service.get_password_hash("123456")
+            if default_hash is None:
+                default_hash = await auth_service.get_password_hash_async("123456")
             user = User(
                 username=username,
                 email_prefix=prefix,
                 email=email,
                 full_name=full_name,
-                password_hash=hashed,
+                password_hash=default_hash,
                 is_active=True,
             )
             db.add(user)
+    await version_service.bump(db, USERS_SCOPE)
 
     try:
         await db.commit()
     except IntegrityError:
         await db.rollback()
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail={"code":"UNIQUE_CONSTRAINT","message":"唯一性冲突"})
+    user_directory.invalidate()
+    auth_service.invalidate_all()
     return {"ok": True}
@@ -2,96 +2,258 @@
 工作项API路由（任务/子任务统一模型）
 """
 from typing import List, Optional, Dict, Any, Set
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
 from pydantic import BaseModel
 from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, and_, or_, func
 from app.database import get_db
-from app.models import WorkItem, User
-from app.dependencies.auth import get_current_user
-from app.schemas.work_item import WorkItemCreate, WorkItemUpdate, WorkItemResponse, WorkItemBatchUpdateRequest
+from app.models import WorkItem
+from app.dependencies.auth import get_current_user, CurrentUser
+from app.schemas.work_item import WorkItemCreate, WorkItemUpdate, WorkItemResponse, WorkItemBatchUpdateRequest, WorkItemQueryRequest
 from app.services.work_item_service import work_item_service
 from app.services.operation_log_service import operation_log_service
+from app.services.version_service import version_service, USERS_SCOPE
+from app.services.user_directory import user_directory
+from app.services.job_rollup_service import job_rollup_service
+from app.utils.etag import conditional_response
 from app.models import OperationType, EntityType
 
 
 router = APIRouter(prefix="/api/work-items", tags=["工作项"])
 
 
+def _build_job_tree(items: List[WorkItem], to_dict) -> List[Dict[str, Any]]:
+    """将扁平工作项构造成 JOB→TASK 两级结构"""
+    jobs = [wi for wi in items if wi.kind == "JOB"]
+    tasks_by_parent: Dict[int, List[WorkItem]] = {}
+    for wi in items:
+        if wi.kind == "TASK" and wi.parent_id:
+            tasks_by_parent.setdefault(wi.parent_id, []).append(wi)
+
+    response = []
+    for job in jobs:
+        job_dict = to_dict(job)
+        job_dict["subtasks"] = [to_dict(t) for t in tasks_by_parent.get(job.id, [])]
+        response.append(job_dict)
+    return response
+
+
+async def _board_users_map(db: AsyncSession, items: List[WorkItem]) -> Dict[int, Dict[str, Any]]:
+    """从用户目录取负责人/创建人信息以便返回可显示的前缀"""
+    user_ids: Set[int] = set()
+    for wi in items:
+        user_ids.add(wi.assignee_id)
+        user_ids.add(wi.creator_id)
+    return await user_directory.get_many(db, user_ids)
+
+
+async def _job_rollups(db: AsyncSession, items: List[WorkItem]) -> Dict[int, Dict[str, Any]]:
+    """一次查询取出列表中各JOB的子任务汇总（各状态数量、子任务计划范围、工时合计）"""
+    rollups = await job_rollup_service.get_many(db, [wi.id for wi in items if wi.kind == "JOB"])
+    return {job_id: job_rollup_service.to_dict(r) for job_id, r in rollups.items()}
+
+
+def _board_item_dict(wi: WorkItem, users_map: Dict[int, Dict[str, Any]], rollups: Dict[int, Dict[str, Any]]) -> Dict[str, Any]:
+    """看板/甘特图使用的工作项字段（JOB附带子任务汇总 rollup）"""
+    item = {
+        "id": wi.id,
+        "code": wi.code,
+        "title": wi.title,
+        "status": wi.status,
+        "priority": wi.priority,
+        "description": wi.description,
+        "assignee_id": wi.assignee_id,
+        "assignee_prefix": users_map.get(wi.assignee_id, {}).get("email_prefix"),
+        "assignee_username": users_map.get(wi.assignee_id, {}).get("username"),
+        "creator_id": wi.creator_id,
+        "creator_prefix": users_map.get(wi.creator_id, {}).get("email_prefix"),
+        "creator_username": users_map.get(wi.creator_id, {}).get("username"),
+        "planned_start": wi.planned_start_date.isoformat() if wi.planned_start_date else None,
+        "planned_end": wi.planned_end_date.isoformat() if wi.planned_end_date else None,
+        "completed_at": wi.completed_at.isoformat() if wi.completed_at else None,
+        "actual_hours": wi.actual_hours,
+        "estimated_hours": wi.estimated_hours,
+        "label_path": wi.label_path,
+        "updated_at": wi.updated_at.isoformat() if wi.updated_at else None,
+        "row_version": wi.row_version,
+    }
+    if wi.kind == "JOB":
+        item["rollup"] = rollups.get(wi.id)
+    return item
+
+
 @router.get("/by-project/{project_id}")
 async def list_work_items_by_project(
     project_id: int,
+    request: Request,
+    response: Response,
     include_deleted: bool = Query(False, description="是否包含已删除工作项"),
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """
     返回指定项目的任务/子任务列表（两级结构），包含计划开始/结束与状态
+
+    cursor 为项目内（含已删除）最大的 row_version，可作为 /changes 的 since 参数继续增量拉取。
     """
+    # 先取游标再取数据：期间提交的写入版本更大，下次增量拉取时会被再次返回
+    cursor_res = await db.execute(select(func.max(WorkItem.row_version)).where(WorkItem.project_id == project_id))
+    cursor = cursor_res.scalar() or 0
+    # 游标即项目内最大写版本；负责人显示名随用户变更代数失效
+    not_modified = conditional_response(
+        request, response, "by-project", project_id, include_deleted, cursor, await version_service.current(db, USERS_SCOPE)
+    )
+    if not_modified:
+        return not_modified
+
     stmt = select(WorkItem).where(WorkItem.project_id == project_id)
     if not include_deleted:
         stmt = stmt.where(WorkItem.deleted_at.is_(None))
     result = await db.execute(stmt)
     items: List[WorkItem] = result.scalars().all()
 
-    # 预取相关用户信息以便返回可显示的负责人/创建人前缀
-    assignee_ids: Set[int] = set()
-    creator_ids: Set[int] = set()
-    for wi in items:
+    users_map = await _board_users_map(db, items)
+    rollups = await _job_rollups(db, items)
+    return {
+        "items": _build_job_tree(items, lambda wi: _board_item_dict(wi, users_map, rollups)),
+        "cursor": cursor,
+    }
+
+
+@router.get("/by-project/{project_id}/changes")
+async def list_work_item_changes(
+    project_id: int,
+    since: int = Query(0, ge=0, description="上次拉取得到的游标"),
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """
+    增量拉取项目内 row_version 大于 since 的工作项
+
+    返回扁平列表：upserted 为新增或修改的工作项（含 kind/parent_id，供客户端合并到树中；
+    子任务变化导致JOB汇总变化时该JOB也会返回），
+    deleted 为已软删除的工作项ID；删除的JOB由客户端连同其子任务一并移除。
+    没有变化时 cursor 保持为 since。
+    """
+    stmt = (
+        select(WorkItem)
+        .where(WorkItem.project_id == project_id, WorkItem.row_version > since)
+        .order_by(WorkItem.row_version, WorkItem.id)
+    )
+    result = await db.execute(stmt)
+    items: List[WorkItem] = result.scalars().all()
+
+    live = [wi for wi in items if wi.deleted_at is None]
+    users_map = await _board_users_map(db, live)
+    rollups = await _job_rollups(db, live)
+    upserted = []
+    for wi in live:
+        item = _board_item_dict(wi, users_map, rollups)
+        item["kind"] = wi.kind
+        item["parent_id"] = wi.parent_id
+        upserted.append(item)
+    return {
+        "upserted": upserted,
+        "deleted": [wi.id for wi in items if wi.deleted_at is not None],
+        "cursor": max((wi.row_version for wi in items), default=since),
+    }
+
+
+@router.post("/query")
+async def query_work_items(
+    body: WorkItemQueryRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """
+    跨项目批量获取工作项（替代逐项目调用 by-project）
+
+    返回按项目分组的 JOB→TASK 两级结构；负责人/创建人的展示信息去重后放在 users 表中。
+    仅TASK命中筛选时，其父JOB作为容器一并返回（matched=false）。
+    """
+    filters = [WorkItem.project_id.in_(body.project_ids)]
+    if not body.include_deleted:
+        filters.append(WorkItem.deleted_at.is_(None))
+    if body.status:
+        filters.append(WorkItem.status.in_(body.status))
+    if body.assignee_ids:
+        filters.append(WorkItem.assignee_id.in_(body.assignee_ids))
+    if body.kind:
+        filters.append(WorkItem.kind == body.kind)
+    # 计划范围与查询窗口有交集
+    if body.planned_from:
+        filters.append(or_(WorkItem.planned_end_date.is_(None), WorkItem.planned_end_date >= body.planned_from))
+    if body.planned_to:
+        filters.append(or_(WorkItem.planned_start_date.is_(None), WorkItem.planned_start_date <= body.planned_to))
+    if body.label_prefix:
+        filters.append(WorkItem.label_path.startswith(body.label_prefix, autoescape=True))
+
+    matched = select(WorkItem.id, WorkItem.parent_id).where(and_(*filters)).cte("matched")
+    # 容器JOB不参与筛选条件，但同样排除已删除的
+    container = WorkItem.id.in_(select(matched.c.parent_id))
+    if not body.include_deleted:
+        container = and_(container, WorkItem.deleted_at.is_(None))
+    stmt = (
+        select(WorkItem, matched.c.id.is_not(None).label("matched"))
+        .outerjoin(matched, WorkItem.id == matched.c.id)
+        .where(or_(matched.c.id.is_not(None), container))
+        .order_by(WorkItem.project_id, WorkItem.id)
+    )
+    rows = (await db.execute(stmt)).all()
+
+    matched_ids: Set[int] = {wi.id for wi, is_matched in rows if is_matched}
+    items_by_project: Dict[int, List[WorkItem]] = {pid: [] for pid in body.project_ids}
+    user_ids: Set[int] = set()
+    for wi, _ in rows:
+        items_by_project.setdefault(wi.project_id, []).append(wi)
         if wi.assignee_id:
-            assignee_ids.add(wi.assignee_id)
+            user_ids.add(wi.assignee_id)
         if wi.creator_id:
-            creator_ids.add(wi.creator_id)
-    user_ids: Set[int] = assignee_ids.union(creator_ids)
-    users_map: Dict[int, Dict[str, Any]] = {}
-    if user_ids:
-        users_stmt = select(User).where(User.id.in_(list(user_ids)))
-        users_res = await db.execute(users_stmt)
-        users: List[User] = users_res.scalars().all()
-        for u in users:
-            users_map[u.id] = {
-                "username": u.username,
-                "email_prefix": u.email_prefix,
-            }
-
-    # 构造两级结构
-    jobs = [wi for wi in items if wi.kind == "JOB"]
-    tasks_by_parent: Dict[int, List[WorkItem]] = {}
-    for wi in items:
-        if wi.kind == "TASK" and wi.parent_id:
-            tasks_by_parent.setdefault(wi.parent_id, []).append(wi)
+            user_ids.add(wi.creator_id)
+
+    users: Dict[int, Dict[str, Any]] = {}
+    for uid, u in (await user_directory.get_many(db, user_ids)).items():
+        users[uid] = {
+            "username": u["username"],
+            "email_prefix": u["email_prefix"],
+            "full_name": u["full_name"],
+            "avatar_key": u["avatar_key"],
+        }
+
+    rollups = await _job_rollups(db, [wi for wi, _ in rows])
 
     def wi_to_dict(wi: WorkItem) -> Dict[str, Any]:
-        return {
+        item = {
             "id": wi.id,
             "code": wi.code,
+            "kind": wi.kind,
+            "project_id": wi.project_id,
+            "parent_id": wi.parent_id,
             "title": wi.title,
             "status": wi.status,
             "priority": wi.priority,
             "description": wi.description,
             "assignee_id": wi.assignee_id,
-            "assignee_prefix": users_map.get(wi.assignee_id, {}).get("email_prefix"),
-            "assignee_username": users_map.get(wi.assignee_id, {}).get("username"),
             "creator_id": wi.creator_id,
-            "creator_prefix": users_map.get(wi.creator_id, {}).get("email_prefix"),
-            "creator_username": users_map.get(wi.creator_id, {}).get("username"),
             "planned_start": wi.planned_start_date.isoformat() if wi.planned_start_date else None,
             "planned_end": wi.planned_end_date.isoformat() if wi.planned_end_date else None,
             "completed_at": wi.completed_at.isoformat() if wi.completed_at else None,
             "actual_hours": wi.actual_hours,
             "estimated_hours": wi.estimated_hours,
             "label_path": wi.label_path,
+            "created_at": wi.created_at.isoformat() if wi.created_at else None,
+            "deleted_at": wi.deleted_at.isoformat() if wi.deleted_at else None,
+            "matched": wi.id in matched_ids,
         }
+        if wi.kind == "JOB":
+            item["rollup"] = rollups.get(wi.id)
+        return item
 
-    response = []
-    for job in jobs:
-        job_dict = wi_to_dict(job)
-        children = [wi_to_dict(t) for t in tasks_by_parent.get(job.id, [])]
-        job_dict["subtasks"] = children
-        response.append(job_dict)
-
-    return {"items": response}
+    return {
+        "projects": {pid: _build_job_tree(items, wi_to_dict) for pid, items in items_by_project.items()},
+        "users": users,
+    }
 
 
 @router.get("/name-exists")
@@ -100,7 +262,7 @@ async def check_name_exists(
     type: str = Query(..., pattern="^(job|task)$", description="类型：job或task"),
     title: str = Query(..., min_length=1, max_length=500, description="标题"),
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     kind = 'JOB' if type.lower() == 'job' else 'TASK'
     stmt = select(WorkItem).where(
@@ -118,21 +280,16 @@ async def check_name_exists(
 async def get_work_item_by_id(
     id: int,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     stmt = select(WorkItem).where(WorkItem.id == id, WorkItem.deleted_at.is_(None))
     res = await db.execute(stmt)
     wi: Optional[WorkItem] = res.scalars().first()
     if not wi:
         raise HTTPException(status_code=404, detail="工作项不存在")
-    assignee = None
-    creator = None
-    if wi.assignee_id:
-        res_a = await db.execute(select(User).where(User.id == wi.assignee_id))
-        assignee = res_a.scalars().first()
-    if wi.creator_id:
-        res_c = await db.execute(select(User).where(User.id == wi.creator_id))
-        creator = res_c.scalars().first()
+    users = await user_directory.get_many(db, [wi.assignee_id, wi.creator_id])
+    assignee = users.get(wi.assignee_id)
+    creator = users.get(wi.creator_id)
     return {
         "id": wi.id,
         "code": wi.code,
@@ -144,11 +301,11 @@ async def get_work_item_by_id(
         "priority": wi.priority,
         "description": wi.description,
         "assignee_id": wi.assignee_id,
-        "assignee_prefix": assignee.email_prefix if assignee else None,
-        "assignee_username": assignee.username if assignee else None,
+        "assignee_prefix": assignee["email_prefix"] if assignee else None,
+        "assignee_username": assignee["username"] if assignee else None,
         "creator_id": wi.creator_id,
-        "creator_prefix": creator.email_prefix if creator else None,
-        "creator_username": creator.username if creator else None,
+        "creator_prefix": creator["email_prefix"] if creator else None,
+        "creator_username": creator["username"] if creator else None,
         "planned_start_date": wi.planned_start_date,
         "planned_end_date": wi.planned_end_date,
         "completed_at": wi.completed_at,
@@ -164,21 +321,16 @@ async def get_work_item_by_id(
 async def get_work_item_by_code(
     code: str,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     stmt = select(WorkItem).where(WorkItem.code == code, WorkItem.deleted_at.is_(None))
     res = await db.execute(stmt)
     wi: Optional[WorkItem] = res.scalars().first()
     if not wi:
         raise HTTPException(status_code=404, detail="工作项不存在")
-    assignee = None
-    creator = None
-    if wi.assignee_id:
-        res_a = await db.execute(select(User).where(User.id == wi.assignee_id))
-        assignee = res_a.scalars().first()
-    if wi.creator_id:
-        res_c = await db.execute(select(User).where(User.id == wi.creator_id))
-        creator = res_c.scalars().first()
+    users = await user_directory.get_many(db, [wi.assignee_id, wi.creator_id])
+    assignee = users.get(wi.assignee_id)
+    creator = users.get(wi.creator_id)
     return {
         "id": wi.id,
         "code": wi.code,
@@ -190,11 +342,11 @@ async def get_work_item_by_code(
         "priority": wi.priority,
         "description": wi.description,
         "assignee_id": wi.assignee_id,
-        "assignee_prefix": assignee.email_prefix if assignee else None,
-        "assignee_username": assignee.username if assignee else None,
+        "assignee_prefix": assignee["email_prefix"] if assignee else None,
+        "assignee_username": assignee["username"] if assignee else None,
         "creator_id": wi.creator_id,
-        "creator_prefix": creator.email_prefix if creator else None,
-        "creator_username": creator.username if creator else None,
+        "creator_prefix": creator["email_prefix"] if creator else None,
+        "creator_username": creator["username"] if creator else None,
         "planned_start_date": wi.planned_start_date,
         "planned_end_date": wi.planned_end_date,
         "completed_at": wi.completed_at,
@@ -210,7 +362,7 @@ async def get_work_item_by_code(
 async def create_work_item(
     body: WorkItemCreate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     try:
         wi = await work_item_service.create(
@@ -257,7 +409,8 @@ async def create_work_item(
             entity_id=0,
             operation_content=f"创建{kind_name}失败: {body.title}",
             result_status="failure",
-            failure_reason=str(e)
+            failure_reason=str(e),
+            strict=True
         )
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -266,38 +419,20 @@ async def create_work_item(
 async def batch_update_work_items(
     body: WorkItemBatchUpdateRequest,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """
     批量更新工作项，保证在一个事务中全部成功或全部失败。
     返回已更新的工作项列表（扁平），前端可据此合并本地缓存。
     """
-    updated = []
+    items = [item.dict(exclude_unset=True) for item in body.items]
     try:
         if db.in_transaction():
             async with db.begin_nested():
-                for item in body.items:
-                    wi = await work_item_service.update(
-                        db,
-                        id=item.id,
-                        data={k: v for k, v in item.dict(exclude_unset=True).items() if k != 'id'},
-                        current_user_id=current_user.id,
-                    )
-                    if not wi:
-                        raise HTTPException(status_code=404, detail=f"工作项不存在: {item.id}")
-                    updated.append(wi)
+                updated = await work_item_service.batch_update(db, items=items, current_user_id=current_user.id)
         else:
             async with db.begin():
-                for item in body.items:
-                    wi = await work_item_service.update(
-                        db,
-                        id=item.id,
-                        data={k: v for k, v in item.dict(exclude_unset=True).items() if k != 'id'},
-                        current_user_id=current_user.id,
-                    )
-                    if not wi:
-                        raise HTTPException(status_code=404, detail=f"工作项不存在: {item.id}")
-                    updated.append(wi)
+                updated = await work_item_service.batch_update(db, items=items, current_user_id=current_user.id)
         return {"items": [
             {
                 "id": wi.id,
@@ -329,7 +464,7 @@ async def update_work_item(
     id: int,
     body: WorkItemUpdate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     try:
         # 先获取旧数据，用于记录变更
@@ -410,7 +545,8 @@ async def update_work_item(
             entity_id=id,
             operation_content=f"更新工作项失败: ID {id}",
             result_status="failure",
-            failure_reason=str(e)
+            failure_reason=str(e),
+            strict=True
         )
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -426,7 +562,7 @@ async def cascade_status(
     id: int,
     body: CascadeStatusRequest,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     try:
         async with db.begin():
@@ -466,7 +602,7 @@ async def cascade_status(
 async def delete_work_item(
     id: int,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     try:
         wi = await work_item_service.soft_delete(db, id=id, current_user_id=current_user.id)
@@ -500,6 +636,7 @@ async def delete_work_item(
             entity_id=id,
             operation_content=f"删除工作项失败: ID {id}",
             result_status="failure",
-            failure_reason=str(e)
+            failure_reason=str(e),
+            strict=True
         )
         raise HTTPException(status_code=400, detail=str(e))
@@ -0,0 +1,89 @@
+"""
+导出相关的Pydantic模型
+"""
+import hashlib
+import json
+from datetime import date, datetime
+from typing import List, Optional
+from pydantic import BaseModel, Field, field_validator
+
+
+def _parse_ids(s: Optional[str]) -> List[int]:
+    # 逗号分隔的ID，忽略无法解析的部分
+    ids: List[int] = []
+    for part in str(s or '').split(','):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            ids.append(int(part))
+        except Exception:
+            continue
+    return ids
+
+
+def _parse_date(s: Optional[str]) -> Optional[date]:
+    try:
+        return date.fromisoformat(s) if s else None
+    except Exception:
+        return None
+
+
+class ExportFilters(BaseModel):
+    """jobs-tasks 导出的筛选条件（已归一化：ID与状态去重排序）"""
+    project_ids: List[int] = Field(default_factory=list, description="项目ID")
+    assignee_ids: List[int] = Field(default_factory=list, description="负责人/Owner用户ID")
+    role: str = Field("both", pattern="^(owner|assignee|both)$", description="assignee_ids 匹配的角色")
+    statuses: List[str] = Field(default_factory=list, description="工作项状态")
+    start: Optional[date] = Field(None, description="计划区间与之重叠的开始日期")
+    end: Optional[date] = Field(None, description="计划区间与之重叠的结束日期")
+    include_deleted: bool = False
+    archived: bool = False
+
+    @field_validator("project_ids", "assignee_ids", "statuses")
+    @classmethod
+    def _normalize(cls, value):
+        return sorted(set(value))
+
+    @classmethod
+    def from_query(cls, *, project_ids: Optional[str], assignee_ids: Optional[str], role: str, status: Optional[str],
+                   start: Optional[str], end: Optional[str], include_deleted: bool, archived: bool) -> "ExportFilters":
+        """按同步导出接口的查询参数解析（宽松：无法解析的ID与日期忽略，未知角色按 both）"""
+        return cls(
+            project_ids=_parse_ids(project_ids),
+            assignee_ids=_parse_ids(assignee_ids),
+            role=role if role in ('owner', 'assignee') else 'both',
+            statuses=[s.strip() for s in (status or '').split(',') if s.strip()],
+            start=_parse_date(start),
+            end=_parse_date(end),
+            include_deleted=include_deleted,
+            archived=archived,
+        )
+
+    def fingerprint(self) -> str:
+        """筛选条件的稳定哈希，用于复用相同条件的导出结果"""
+        payload = json.dumps(self.model_dump(mode="json"), sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ExportJobCreate(ExportFilters):
+    """创建后台导出任务请求模型"""
+    kind: str = Field("jobs-tasks.xlsx", pattern="^jobs-tasks\\.xlsx$", description="导出类型")
+
+
+class ExportJobResponse(BaseModel):
+    """后台导出任务状态"""
+    id: str
+    kind: str
+    status: str  # queued / running / done / failed
+    rows_total: Optional[int] = None
+    rows_done: int = 0
+    size: Optional[int] = None
+    error: Optional[str] = None
+    cached: bool = False
+    created_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    download_url: Optional[str] = None
+
+    class Config:
+        from_attributes = True
@@ -73,3 +73,8 @@ class ProjectQuery(BaseModel):
     search: Optional[str] = Field(None, description="搜索关键词（名称或描述）")
     page: int = Field(1, ge=1, description="页码")
     size: int = Field(10, ge=1, le=100, description="每页数量")
+
+
+class ProjectStatisticsQuery(BaseModel):
+    """批量获取项目统计信息"""
+    project_ids: List[int] = Field(..., min_length=1, max_length=5000, description="项目ID列表")
@@ -0,0 +1,25 @@
+"""
+全文检索相关的Pydantic模型
+"""
+from typing import List, Optional
+from pydantic import BaseModel
+
+
+class SearchHit(BaseModel):
+    """一条检索结果"""
+    type: str  # project / work_item / comment
+    id: int
+    code: Optional[str] = None
+    title: Optional[str] = None  # 已转义，命中处以 <mark> 标出
+    snippet: str  # 命中附近的片段，格式同 title
+    project_id: Optional[int] = None
+    ref: Optional[str] = None  # 项目为状态，工作项为 JOB/TASK，评论为 "对象类型:对象ID"
+    score: float
+
+
+class SearchResponse(BaseModel):
+    """检索响应"""
+    total: int
+    page: int
+    size: int
+    items: List[SearchHit]
@@ -0,0 +1,20 @@
+"""
+统计相关的Pydantic模型
+"""
+from typing import Any, Dict, List
+from pydantic import BaseModel
+
+
+class AggregateGroup(BaseModel):
+    """一个分组的汇总"""
+    keys: Dict[str, Any]  # 分组键，如 project_id/project_code、assignee_id/assignee_name、label、week
+    count: int
+    estimated_hours: float
+    actual_hours: float
+    by_status: Dict[str, int]
+
+
+class AggregateResponse(BaseModel):
+    """聚合统计响应"""
+    group_by: List[str]
+    groups: List[AggregateGroup]
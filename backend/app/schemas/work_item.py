@@ -1,5 +1,5 @@
 from datetime import date, datetime
-from typing import Optional
+from typing import Optional, List
 from pydantic import BaseModel, Field
 
 
@@ -83,3 +83,15 @@ class WorkItemBatchUpdateItem(BaseModel):
 
 class WorkItemBatchUpdateRequest(BaseModel):
     items: list[WorkItemBatchUpdateItem]
+
+
+class WorkItemQueryRequest(BaseModel):
+    """跨项目批量查询工作项"""
+    project_ids: List[int] = Field(..., min_length=1, max_length=5000, description="项目ID列表")
+    status: Optional[List[str]] = Field(None, description="状态筛选")
+    assignee_ids: Optional[List[int]] = Field(None, description="负责人ID筛选")
+    kind: Optional[str] = Field(None, pattern="^(JOB|TASK)$", description="类型筛选")
+    planned_from: Optional[date] = Field(None, description="计划区间起（与计划范围有交集即命中）")
+    planned_to: Optional[date] = Field(None, description="计划区间止")
+    label_prefix: Optional[str] = Field(None, min_length=1, max_length=500, description="标签路径前缀")
+    include_deleted: bool = Field(False, description="是否包含已删除工作项")
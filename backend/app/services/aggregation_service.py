@@ -0,0 +1,160 @@
+"""
+聚合统计服务 - 工作项工时与状态分布的 SQL GROUP BY 汇总
+
+按项目、负责人、标签前缀、周任意组合分组，一次查询返回每组的条数、预计/记录工时合计与各状态条数；
+导出的 Summary 工作表与 /api/stats/aggregate 共用，汇总不再需要把明细行全部读进内存。
+筛选条件与 jobs-tasks 导出一致（ExportFilters）。
+"""
+from typing import Dict, List, Optional, Sequence
+from sqlalchemy import select, and_, or_, func, case, literal
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+from app.exceptions import ValidationException
+from app.models import WorkItem, Project, User
+from app.schemas.export import ExportFilters
+
+
+# 可用的分组维度
+GROUP_DIMENSIONS = ("project", "assignee", "label", "week")
+# 参与分状态计数的状态（与 work_items 的状态约束一致）
+STATUSES = ("todo", "doing", "blocked", "done", "cancelled", "deleted")
+# 未结束的状态：计划结束日期已过时视为逾期
+OPEN_STATUSES = ("todo", "doing", "blocked")
+_METRIC_NAMES = {"count", "estimated_hours", "actual_hours"} | {f"status_{s}" for s in STATUSES}
+# 标签前缀最多取到的层级
+MAX_LABEL_DEPTH = 5
+
+
+def display_name(user):
+    """用户显示名：与 full_name or username or email_prefix 一致，空字符串视为缺失"""
+    return func.coalesce(func.nullif(user.full_name, ''), func.nullif(user.username, ''), user.email_prefix, '')
+
+
+def work_item_conditions(filters: ExportFilters) -> list:
+    """按筛选条件生成工作项的 WHERE 条件（调用方需联表 projects）"""
+    conditions = []
+    if filters.project_ids:
+        conditions.append(WorkItem.project_id.in_(filters.project_ids))
+    if filters.assignee_ids:
+        a_ids = filters.assignee_ids
+        if filters.role == 'owner':
+            conditions.append(Project.owner_id.in_(a_ids))
+        elif filters.role == 'assignee':
+            conditions.append(WorkItem.assignee_id.in_(a_ids))
+        else:
+            conditions.append(or_(WorkItem.assignee_id.in_(a_ids), Project.owner_id.in_(a_ids)))
+    if filters.statuses:
+        conditions.append(WorkItem.status.in_(filters.statuses))
+    if not filters.include_deleted:
+        conditions.append(WorkItem.deleted_at.is_(None))
+    if filters.archived:
+        conditions.append(Project.status == 'archived')
+    else:
+        conditions.append(Project.status != 'archived')
+    # 时间范围交集：planned范围与查询(start/end)有重叠
+    if filters.start:
+        conditions.append(or_(WorkItem.planned_end_date.is_(None), WorkItem.planned_end_date >= filters.start))
+    if filters.end:
+        conditions.append(or_(WorkItem.planned_start_date.is_(None), WorkItem.planned_start_date <= filters.end))
+    return conditions
+
+
+def label_prefix(path, depth: int):
+    """标签路径（以 / 分隔）的前 depth 级；不足 depth 级时为完整路径"""
+    padded = path + literal('/')
+    end = func.instr(padded, '/')
+    for _ in range(depth - 1):
+        # 下一个 / 的位置；已到末尾时 instr 返回 0，位置保持不变
+        step = func.instr(func.substr(padded, end + 1), '/')
+        end = case((step > 0, end + step), else_=end)
+    return func.nullif(func.substr(path, 1, end - 1), '')
+
+
+def week_start(column):
+    """日期所在周的周一（ISO 字符串）"""
+    return func.date(column, '-6 days', 'weekday 1')
+
+
+class AggregationService:
+    """聚合统计服务"""
+
+    def parse_group_by(self, group_by: Optional[str]) -> List[str]:
+        """解析逗号分隔的分组维度（去重保序）"""
+        dims: List[str] = []
+        for part in (group_by or '').split(','):
+            part = part.strip()
+            if not part:
+                continue
+            if part not in GROUP_DIMENSIONS:
+                raise ValidationException("不支持的分组维度", details={"group_by": part, "supported": list(GROUP_DIMENSIONS)})
+            if part not in dims:
+                dims.append(part)
+        if not dims:
+            raise ValidationException("至少需要一个分组维度", details={"supported": list(GROUP_DIMENSIONS)})
+        return dims
+
+    def build_stmt(self, filters: ExportFilters, group_by: Sequence[str], kind: Optional[str] = None, label_depth: int = 1):
+        """
+        构造聚合查询
+
+        Args:
+            filters: 筛选条件
+            group_by: 分组维度（GROUP_DIMENSIONS 的子集，按给定顺序排序）
+            kind: 仅统计 JOB 或 TASK；为空时两者都统计
+            label_depth: 按标签分组时取前几级
+        """
+        keys = []
+        stmt_joins = [(Project, WorkItem.project_id == Project.id, False)]
+        for dim in group_by:
+            if dim == "project":
+                keys += [Project.id.label("project_id"), Project.code.label("project_code")]
+            elif dim == "assignee":
+                assignee = aliased(User)
+                stmt_joins.append((assignee, WorkItem.assignee_id == assignee.id, True))
+                keys += [WorkItem.assignee_id.label("assignee_id"), display_name(assignee).label("assignee_name")]
+            elif dim == "label":
+                depth = max(1, min(label_depth, MAX_LABEL_DEPTH))
+                keys.append(label_prefix(WorkItem.label_path, depth).label("label"))
+            elif dim == "week":
+                keys.append(week_start(func.coalesce(WorkItem.planned_start_date, WorkItem.start_date)).label("week"))
+
+        metrics = [
+            func.count(WorkItem.id).label("count"),
+            func.coalesce(func.sum(WorkItem.estimated_hours), 0.0).label("estimated_hours"),
+            func.coalesce(func.sum(WorkItem.actual_hours), 0.0).label("actual_hours"),
+        ] + [
+            func.sum(case((WorkItem.status == s, 1), else_=0)).label(f"status_{s}") for s in STATUSES
+        ]
+        stmt = select(*keys, *metrics).select_from(WorkItem)
+        for target, onclause, outer in stmt_joins:
+            stmt = stmt.join(target, onclause, isouter=outer)
+        conditions = work_item_conditions(filters)
+        if kind:
+            conditions.append(WorkItem.kind == kind)
+        if conditions:
+            stmt = stmt.where(and_(*conditions))
+        return stmt.group_by(*keys).order_by(*keys)
+
+    async def aggregate(self, session: AsyncSession, filters: ExportFilters, group_by: Sequence[str],
+                        kind: Optional[str] = None, label_depth: int = 1) -> List[Dict]:
+        """
+        执行聚合查询
+
+        Returns:
+            每组一条：{"keys": {...}, "count", "estimated_hours", "actual_hours", "by_status": {...}}
+        """
+        res = await session.execute(self.build_stmt(filters, group_by, kind, label_depth))
+        rows = []
+        for row in res.mappings():
+            rows.append({
+                "keys": {k: v for k, v in row.items() if k not in _METRIC_NAMES},
+                "count": row["count"],
+                "estimated_hours": float(row["estimated_hours"] or 0.0),
+                "actual_hours": float(row["actual_hours"] or 0.0),
+                "by_status": {s: row[f"status_{s}"] or 0 for s in STATUSES},
+            })
+        return rows
+
+
+# 创建全局实例
+aggregation_service = AggregationService()
@@ -1,26 +1,70 @@
 """
 认证服务 - 支持中文名与邮箱前缀登录
+
+已验证的令牌缓存为 令牌 → 当前用户快照（CurrentUser，不可变、不绑定会话），带 TTL 的 LRU，
+命中时认证不查库；用户被编辑或停用时按用户或整体失效。
 """
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Optional, Union
+from typing import NamedTuple, Optional, Tuple, Union
 from jose import JWTError, jwt
-import bcrypt
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from app.models import User
-from app.config import settings
+from app.config import settings, AUTH_CACHE_TTL, AUTH_CACHE_SIZE
+from app.services.password_hasher import password_hasher, hash_password, check_password
+
+
+class CurrentUser(NamedTuple):
+    """当前登录用户的快照（路由依赖注入的用户对象）"""
+    id: int
+    username: str
+    email_prefix: str
+    email: Optional[str]
+    full_name: Optional[str]
+    phone: Optional[str]
+    avatar_key: Optional[str]
+    is_active: bool
+    created_at: Optional[datetime]
+
+    @classmethod
+    def from_user(cls, user: User) -> "CurrentUser":
+        return cls(
+            id=user.id,
+            username=user.username,
+            email_prefix=user.email_prefix,
+            email=user.email,
+            full_name=user.full_name,
+            phone=user.phone,
+            avatar_key=user.avatar_key,
+            is_active=bool(user.is_active),
+            created_at=user.created_at,
+        )
 
 
 class AuthService:
     """认证服务"""
+
+    def __init__(self):
+        # 令牌 → (过期时刻 monotonic, 用户快照)，按最近使用排序
+        self._token_cache: "OrderedDict[str, Tuple[float, CurrentUser]]" = OrderedDict()
     
     def verify_password(self, plain_password: str, hashed_password: str) -> bool:
-        """验证密码"""
-        return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+        """验证密码（同步；请求中使用 verify_password_async）"""
+        return check_password(plain_password, hashed_password)
     
     def get_password_hash(self, password: str) -> str:
-        """获取密码哈希"""
-        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        """获取密码哈希（同步；请求中使用 get_password_hash_async）"""
+        return hash_password(password)
+
+    async def verify_password_async(self, plain_password: str, hashed_password: str) -> bool:
+        """在密码哈希线程池中验证密码"""
+        return await password_hasher.verify(plain_password, hashed_password)
+
+    async def get_password_hash_async(self, password: str) -> str:
+        """在密码哈希线程池中获取密码哈希"""
+        return await password_hasher.hash(password)
     
     def create_access_token(self, data: dict, expires_delta: Optional[timedelta] = None) -> str:
         """创建访问令牌"""
@@ -41,7 +85,7 @@ class AuthService:
             username: str = payload.get("sub")
             if username is None:
                 return None
-            return {"username": username}
+            return {"username": username, "exp": payload.get("exp")}
         except JWTError:
             return None
     
@@ -68,7 +112,7 @@ class AuthService:
             return None
         
         # 验证密码
-        if not self.verify_password(password, user.password_hash):
+        if not await self.verify_password_async(password, user.password_hash):
             return None
         
         # 检查用户是否激活
@@ -77,34 +121,50 @@ class AuthService:
         
         return user
     
-    async def get_current_user(self, session: AsyncSession, token: str) -> Optional[User]:
+    async def resolve_token(self, session: AsyncSession, token: str) -> Optional[CurrentUser]:
         """
-        获取当前用户
-        
+        令牌 → 当前用户快照（认证依赖使用）；缓存命中时不解码、不查库
+
         Args:
-            session: 数据库会话
+            session: 数据库会话（仅在未命中时使用）
             token: JWT令牌
-            
+
         Returns:
-            用户对象，如果令牌无效返回None
+            用户快照，令牌无效或用户不存在/已停用时返回None
         """
+        now = time.monotonic()
+        cached = self._token_cache.get(token)
+        if cached:
+            if cached[0] > now:
+                self._token_cache.move_to_end(token)
+                return cached[1]
+            del self._token_cache[token]
+
         token_data = self.verify_token(token)
-        if not token_data:
-            return None
-        
-        username = token_data.get("username")
-        if not username:
+        if not token_data or not token_data.get("username"):
             return None
-        
-        # 查询用户
-        stmt = select(User).where(User.username == username)
-        result = await session.execute(stmt)
+        result = await session.execute(select(User).where(User.username == token_data["username"]))
         user = result.scalar_one_or_none()
-        
         if not user or not user.is_active:
             return None
-        
-        return user
+
+        current = CurrentUser.from_user(user)
+        expires = now + AUTH_CACHE_TTL
+        if token_data.get("exp"):
+            expires = min(expires, now + token_data["exp"] - time.time())
+        self._token_cache[token] = (expires, current)
+        while len(self._token_cache) > AUTH_CACHE_SIZE:
+            self._token_cache.popitem(last=False)
+        return current
+
+    def invalidate_user(self, user_id: int):
+        """丢弃该用户的全部缓存令牌（用户信息修改并提交后调用）"""
+        for token in [t for t, (_, u) in self._token_cache.items() if u.id == user_id]:
+            del self._token_cache[token]
+
+    def invalidate_all(self):
+        """清空令牌缓存（批量停用/重置用户后调用）"""
+        self._token_cache.clear()
 
 
 # 创建全局实例
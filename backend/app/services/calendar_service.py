@@ -0,0 +1,324 @@
+"""
+节假日日历服务 - 将 calendar_days 表加载为进程内工作日历，并在日历变更后批量重算工时
+
+- 日历版本为 data_versions 中的 calendar 计数器，日历内容每次实际变化时递增。
+  进程内日历（utils/worktime）在启动时加载、本进程改动日历提交后立即重载；其他进程的改动由后台
+  每 CALENDAR_POLL_INTERVAL 秒一次的版本号查询（主键查询）发现后重载，请求路径上不产生额外查询。
+- 日历变更提交后，由后台任务按主键分块重算受影响工作项的预估/实际工时：每块先分配版本号（取得写锁），
+  再读取一块、用批量接口计算、以一条按主键的 executemany UPDATE 写回值有变化的行，并刷新相关JOB汇总的工时合计。
+  全部完成后将 calendar_applied 计数器记为已应用的版本；进程启动时若其落后于 calendar，则全表重算一遍。
+- 数据文件（HOLIDAY_CALENDAR_FILE，JSON）由 python -m app.cli migrate 导入（按文件覆盖的年份整年替换）并同步重算工时，
+  应用启动时只加载日历。
+"""
+import asyncio
+import json
+import logging
+from datetime import date, datetime, time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import select, update, delete, and_, or_, func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from app.config import CALENDAR_RECOMPUTE_CHUNK, CALENDAR_POLL_INTERVAL
+from app.exceptions import ValidationException
+from app.models import CalendarDay, WorkItem
+from app.services.job_rollup_service import job_rollup_service
+from app.services.version_service import (
+    version_service, CALENDAR_SCOPE, CALENDAR_APPLIED_SCOPE, ROW_VERSION_SCOPE,
+)
+from app.utils import worktime
+
+
+logger = logging.getLogger(__name__)
+
+CALENDAR_KINDS = ('holiday', 'workday')
+# 重算时读取的列
+_COLUMNS = (
+    WorkItem.id, WorkItem.kind, WorkItem.parent_id, WorkItem.status,
+    WorkItem.planned_start_date, WorkItem.planned_end_date, WorkItem.start_date, WorkItem.completed_at,
+    WorkItem.estimated_hours, WorkItem.actual_hours,
+)
+
+
+class CalendarService:
+    """节假日日历服务"""
+
+    def __init__(self):
+        self._version: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._poller: Optional[asyncio.Task] = None
+
+    def invalidate(self):
+        """丢弃进程内日历（恢复为仅按星期判断），下次计算工时前重载"""
+        self._install([])
+        self._version = None
+
+    @staticmethod
+    def _install(rows: Iterable[Tuple[date, str]]):
+        holidays = {d for d, kind in rows if kind == 'holiday'}
+        workdays = {d for d, kind in rows if kind == 'workday'}
+        worktime.SPECIAL_HOLIDAYS.clear()
+        worktime.SPECIAL_HOLIDAYS.update(holidays)
+        worktime.SPECIAL_WORKDAYS.clear()
+        worktime.SPECIAL_WORKDAYS.update(workdays)
+        worktime.reload_calendar()
+
+    async def refresh(self, session: AsyncSession) -> int:
+        """
+        日历版本变化时将 calendar_days 重载到进程内（本进程提交日历改动后调用）
+
+        Args:
+            session: 数据库会话
+
+        Returns:
+            当前日历版本
+        """
+        version = await version_service.current(session, CALENDAR_SCOPE)
+        if version != self._version:
+            rows = (await session.execute(select(CalendarDay.day, CalendarDay.kind))).all()
+            self._install(rows)
+            self._version = version
+        return version
+
+    async def list_days(self, session: AsyncSession, start: date, end: date) -> List[CalendarDay]:
+        res = await session.execute(
+            select(CalendarDay).where(CalendarDay.day >= start, CalendarDay.day <= end).order_by(CalendarDay.day)
+        )
+        return list(res.scalars().all())
+
+    async def replace_range(
+        self, session: AsyncSession, start: date, end: date, days: Dict[date, Tuple[str, Optional[str]]]
+    ) -> Tuple[Optional[int], Set[date]]:
+        """
+        用给定内容整体替换 [start, end] 内的日历
+
+        Args:
+            session: 数据库会话（调用方提交）
+            start: 区间开始
+            end: 区间结束
+            days: 日期 → (kind, 名称)，区间内未列出的日期恢复为按星期判断
+
+        Returns:
+            (新日历版本，内容未变化时为 None；工作日属性发生变化、需重算工时的日期)
+        """
+        for d, (kind, _) in days.items():
+            if kind not in CALENDAR_KINDS:
+                raise ValidationException(f"无效的日历类型: {kind}", details={"date": d.isoformat()})
+            if not (start <= d <= end):
+                raise ValidationException("日期超出替换范围", details={"date": d.isoformat()})
+        existing = {c.day: (c.kind, c.name) for c in await self.list_days(session, start, end)}
+        removed = existing.keys() - days.keys()
+        upserts = [
+            {"day": d, "kind": kind, "name": name}
+            for d, (kind, name) in days.items() if existing.get(d) != (kind, name)
+        ]
+        if not removed and not upserts:
+            return None, set()
+        # 先取得写锁再改写
+        version = await version_service.bump(session, CALENDAR_SCOPE)
+        if removed:
+            await session.execute(delete(CalendarDay).where(CalendarDay.day.in_(removed)))
+        if upserts:
+            stmt = sqlite_insert(CalendarDay).values(upserts)
+            await session.execute(stmt.on_conflict_do_update(
+                index_elements=["day"], set_={"kind": stmt.excluded.kind, "name": stmt.excluded.name}
+            ))
+        changed = {d for d in existing.keys() | days.keys() if existing.get(d, (None,))[0] != days.get(d, (None,))[0]}
+        return version, changed
+
+    async def load_file(self, session: AsyncSession, path: Path) -> Tuple[Optional[int], Set[date]]:
+        """
+        从 JSON 数据文件导入日历，按文件覆盖的年份整年替换
+
+        文件格式：{"years": [2025], "holidays": {"2025-01-01": "元旦"}, "workdays": {"2025-01-26": "春节调休"}}，
+        years 可省略（默认取日期所在年份），列出但没有日期的年份会被清空。
+
+        Returns:
+            同 replace_range（多个年份合并）
+        """
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+        days: Dict[date, Tuple[str, Optional[str]]] = {}
+        for kind, key in (('holiday', 'holidays'), ('workday', 'workdays')):
+            for text, name in (data.get(key) or {}).items():
+                days[date.fromisoformat(text)] = (kind, name)
+        years = set(data.get("years") or []) | {d.year for d in days}
+        version, changed = None, set()
+        for year in sorted(years):
+            in_year = {d: v for d, v in days.items() if d.year == year}
+            v, c = await self.replace_range(session, date(year, 1, 1), date(year, 12, 31), in_year)
+            version = v or version
+            changed |= c
+        return version, changed
+
+    async def recompute(self, bind: AsyncEngine, days: Optional[Iterable[date]] = None, *, chunk_size: int = CALENDAR_RECOMPUTE_CHUNK) -> int:
+        """
+        按当前日历分块重算工作项工时
+
+        Args:
+            bind: 数据库引擎
+            days: 工作日属性发生变化的日期；为 None 时重算全部工作项
+            chunk_size: 每块（每个事务）处理的工作项数
+
+        Returns:
+            工时有变化而被改写的工作项数
+        """
+        days = sorted(days) if days is not None else None
+        async with AsyncSession(bind, expire_on_commit=False) as session:
+            target = await self.refresh(session)
+        if days == []:
+            # 只改了名称等不影响工作日的内容：无需重算，但要标记为已应用，否则下次启动会全表重算
+            await self._mark_applied(bind, target)
+            return 0
+        calendar = worktime.get_calendar()
+
+        stmt = select(*_COLUMNS).where(WorkItem.deleted_at.is_(None))
+        if days:
+            lo, hi = days[0], days[-1]
+            stmt = stmt.where(or_(
+                and_(WorkItem.planned_start_date <= hi, WorkItem.planned_end_date >= lo),
+                and_(
+                    WorkItem.status == 'done',
+                    func.coalesce(WorkItem.start_date, WorkItem.planned_start_date) <= hi,
+                    WorkItem.completed_at >= datetime.combine(lo, time.min),
+                ),
+            ))
+        last_id, updated = 0, 0
+        while True:
+            async with AsyncSession(bind, expire_on_commit=False) as session:
+                # 先分配版本号取得写锁，读到的日期在本事务内不会再被改动
+                version = await version_service.bump(session, ROW_VERSION_SCOPE)
+                rows = (await session.execute(
+                    stmt.where(WorkItem.id > last_id).order_by(WorkItem.id).limit(chunk_size)
+                )).all()
+                if not rows:
+                    await session.rollback()
+                    break
+                last_id = rows[-1].id
+                estimated = calendar.count_workdays_many(
+                    [r.planned_start_date for r in rows], [r.planned_end_date for r in rows]
+                )
+                actual = calendar.count_workdays_many(
+                    [r.start_date or r.planned_start_date for r in rows],
+                    [r.completed_at.date() if r.completed_at else None for r in rows],
+                )
+                now = datetime.utcnow()
+                changes, jobs = [], set()
+                for r, est_days, act_days in zip(rows, estimated, actual):
+                    est, act = r.estimated_hours, r.actual_hours
+                    if r.planned_start_date and r.planned_end_date:
+                        est = float(est_days * 8) or None
+                    if r.status == 'done' and r.completed_at and (r.start_date or r.planned_start_date):
+                        act = float(act_days * 8)
+                    if (est, act) != (r.estimated_hours, r.actual_hours):
+                        changes.append(dict(id=r.id, estimated_hours=est, actual_hours=act, row_version=version, updated_at=now))
+                        if r.kind == 'TASK' and r.parent_id:
+                            jobs.add(r.parent_id)
+                if changes:
+                    await session.execute(update(WorkItem), changes)
+                    await job_rollup_service.refresh_hours(session, jobs, version)
+                    await session.commit()
+                    updated += len(changes)
+                else:
+                    await session.rollback()
+        await self._mark_applied(bind, target)
+        return updated
+
+    async def _mark_applied(self, bind: AsyncEngine, target: int):
+        """把已应用的日历版本推进到 target"""
+        async with AsyncSession(bind, expire_on_commit=False) as session:
+            if target > await version_service.current(session, CALENDAR_APPLIED_SCOPE):
+                await version_service.assign(session, CALENDAR_APPLIED_SCOPE, target)
+                await session.commit()
+
+    def schedule_recompute(self, bind: AsyncEngine, days: Optional[Iterable[date]] = None) -> asyncio.Task:
+        """
+        在后台重算工时（日历变更提交后调用）；多次调用按顺序依次执行
+
+        Args:
+            bind: 数据库引擎
+            days: 同 recompute
+
+        Returns:
+            后台任务
+        """
+        previous = self._task
+        days = set(days) if days is not None else None
+
+        async def run():
+            if previous is not None:
+                await asyncio.gather(previous, return_exceptions=True)
+            try:
+                count = await self.recompute(bind, days)
+                logger.info("日历变更后重算工时完成，更新 %d 个工作项", count)
+            except Exception:
+                logger.exception("日历变更后重算工时失败，将在下次启动时重试")
+
+        self._task = asyncio.get_running_loop().create_task(run())
+        return self._task
+
+    async def wait(self):
+        """等待已安排的重算完成"""
+        if self._task is not None:
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    async def stop(self):
+        """停止版本轮询并取消进行中的重算（未完成的部分在下次启动时补齐）"""
+        for task in (self._poller, self._task):
+            if task is not None and not task.done():
+                task.cancel()
+        await asyncio.gather(*(t for t in (self._poller, self._task) if t is not None), return_exceptions=True)
+        self._poller = None
+
+    def start_polling(self, bind: AsyncEngine, interval: float = CALENDAR_POLL_INTERVAL):
+        """后台定期检查日历版本，发现其他进程的改动后重载"""
+        async def poll():
+            while True:
+                await asyncio.sleep(interval)
+                try:
+                    async with AsyncSession(bind) as session:
+                        await self.refresh(session)
+                except Exception:
+                    logger.exception("检查节假日日历版本失败")
+
+        if self._poller is None or self._poller.done():
+            self._poller = asyncio.get_running_loop().create_task(poll())
+
+    async def import_file(self, bind: AsyncEngine, path: Path) -> Tuple[Optional[int], int]:
+        """
+        导入日历数据文件并重算受影响工作项的工时（命令行迁移时执行，完成后返回）
+
+        Args:
+            bind: 数据库引擎
+            path: 日历数据文件
+
+        Returns:
+            (新日历版本，内容未变化时为 None；工时有变化而被改写的工作项数)
+        """
+        async with AsyncSession(bind, expire_on_commit=False) as session:
+            before, applied = await version_service.current_many(session, CALENDAR_SCOPE, CALENDAR_APPLIED_SCOPE)
+            version, changed = await self.load_file(session, path)
+            if version is not None:
+                await session.commit()
+        if version is None and applied >= before:
+            return None, 0
+        # 导入前已重算完毕时只重算本次导入影响的日期，否则（上次重算未完成）全表重算
+        return version, await self.recompute(bind, changed if applied >= before else None)
+
+    async def startup(self, bind: AsyncEngine):
+        """
+        启动时加载进程内日历、开始版本轮询，并安排尚未完成的工时重算
+
+        Args:
+            bind: 数据库引擎
+        """
+        async with AsyncSession(bind, expire_on_commit=False) as session:
+            applied = await version_service.current(session, CALENDAR_APPLIED_SCOPE)
+            current = await self.refresh(session)
+        self.start_polling(bind)
+        if applied < current:
+            # 上次重算未完成（进程在重算中途退出）：全表重算
+            self.schedule_recompute(bind)
+
+
+# 创建全局实例
+calendar_service = CalendarService()
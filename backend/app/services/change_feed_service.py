@@ -0,0 +1,140 @@
+"""
+增量导出服务 - 按变更游标输出自上次拉取以来新增或修改的数据（供数仓增量加载）
+
+- 数据源：项目、工作项、评论按各自的 row_version（由 data_versions 计数器分配），操作日志按自增 id。
+  计数器在写事务内递增，分配顺序与提交顺序一致，按版本号推进的游标不会漏掉之后才提交的较小版本。
+- 游标记录每个数据源已输出到的 (版本, id)，同一版本内（批量写入）按 id 继续，按此做键集分页。
+- 软删除的行输出为删除标记（op=delete），不带行内容。
+- 每次拉取以开始时的各计数器为上界，结果不会被拉取期间的写入无限拉长；输出中定期给出检查点游标，
+  连接中断后可从最后一个检查点续拉（检查点之后已收到的行会重复，按 id 覆盖即可）。
+"""
+import base64
+import json
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import select, func, tuple_
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from app.exceptions import BadRequestException
+from app.models import Project, WorkItem, Comment, OperationLog
+from app.services.version_service import version_service, ROW_VERSION_SCOPE, PROJECTS_SCOPE, COMMENTS_SCOPE
+
+
+# 每页读取的行数（一页一个短事务）
+FEED_PAGE_SIZE = 1000
+
+# (数据源名称, 模型, 版本计数器；None 表示按自增 id)
+FEED_SOURCES = (
+    ("project", Project, PROJECTS_SCOPE),
+    ("work_item", WorkItem, ROW_VERSION_SCOPE),
+    ("comment", Comment, COMMENTS_SCOPE),
+    ("operation_log", OperationLog, None),
+)
+
+Cursor = Dict[str, Tuple[int, int]]
+
+
+def encode_cursor(cursor: Cursor) -> str:
+    payload = json.dumps({name: list(pos) for name, pos in cursor.items()}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: Optional[str]) -> Cursor:
+    """解析游标；为空时从头开始（全量）"""
+    cursor: Cursor = {name: (0, 0) for name, _, _ in FEED_SOURCES}
+    if not token:
+        return cursor
+    try:
+        raw = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        for name, pos in raw.items():
+            if name not in cursor:
+                raise ValueError(name)
+            version, last_id = pos
+            cursor[name] = (int(version), int(last_id))
+    except Exception:
+        raise BadRequestException("游标无效", details={"cursor": token})
+    return cursor
+
+
+def _jsonable(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+class ChangeFeedService:
+    """增量导出服务"""
+
+    async def _bounds(self, db: AsyncSession) -> Dict[str, int]:
+        """本次拉取的上界：各计数器当前值与操作日志最大 id"""
+        scopes = [scope for _, _, scope in FEED_SOURCES if scope]
+        values = dict(zip(scopes, await version_service.current_many(db, *scopes)))
+        max_log_id = (await db.execute(select(func.max(OperationLog.id)))).scalar_one() or 0
+        return {name: values[scope] if scope else max_log_id for name, _, scope in FEED_SOURCES}
+
+    def _page_stmt(self, model, by_version: bool, pos: Tuple[int, int], bound: int, size: int):
+        columns = model.__table__.columns
+        if by_version:
+            version = model.row_version
+            return (
+                select(*columns)
+                .where(tuple_(version, model.id) > tuple_(*pos), version <= bound)
+                .order_by(version, model.id)
+                .limit(size)
+            )
+        return select(*columns).where(model.id > pos[1], model.id <= bound).order_by(model.id).limit(size)
+
+    def _record(self, name: str, by_version: bool, row) -> dict:
+        data = {key: _jsonable(value) for key, value in row._mapping.items()}
+        version = data["row_version"] if by_version else data["id"]
+        if data.get("deleted_at") is not None:
+            return {"type": name, "op": "delete", "id": data["id"], "version": version, "deleted_at": data["deleted_at"]}
+        return {"type": name, "op": "upsert" if by_version else "insert", "id": data["id"], "version": version, "data": data}
+
+    async def stream(self, bind: AsyncEngine, cursor: Cursor, limit: int, page_size: int = FEED_PAGE_SIZE):
+        """
+        以 NDJSON 逐行输出 cursor 之后的变更
+
+        每页之后输出一行检查点 {"type": "checkpoint", "cursor": ...}；
+        最后一行为 {"type": "end", "cursor": ..., "has_more": ...}，has_more 为真表示达到 limit，应以该游标继续拉取。
+
+        Args:
+            bind: 数据库引擎（在其上另开会话）
+            cursor: decode_cursor() 解析出的游标
+            limit: 本次最多输出的记录数
+            page_size: 每页读取的行数
+        """
+        cursor = dict(cursor)
+        remaining = limit
+        has_more = False
+        async with AsyncSession(bind) as db:
+            bounds = await self._bounds(db)
+            await db.rollback()
+            for name, model, scope in FEED_SOURCES:
+                by_version = scope is not None
+                while remaining > 0:
+                    stmt = self._page_stmt(model, by_version, cursor[name], bounds[name], min(page_size, remaining))
+                    page = (await db.execute(stmt)).all()
+                    # 每页结束读事务，释放读锁
+                    await db.rollback()
+                    if not page:
+                        break
+                    lines: List[str] = []
+                    for row in page:
+                        record = self._record(name, by_version, row)
+                        lines.append(json.dumps(record, ensure_ascii=False))
+                    last = page[-1]
+                    cursor[name] = (last.row_version if by_version else last.id, last.id)
+                    remaining -= len(page)
+                    lines.append(json.dumps({"type": "checkpoint", "cursor": encode_cursor(cursor)}))
+                    yield ("\n".join(lines) + "\n").encode("utf-8")
+                    if len(page) < page_size:
+                        break
+                if remaining <= 0:
+                    # 达到上限：若该数据源或之后的数据源仍有数据，由客户端续拉
+                    has_more = True
+                    break
+        yield (json.dumps({"type": "end", "cursor": encode_cursor(cursor), "has_more": has_more}) + "\n").encode("utf-8")
+
+
+# 创建全局实例
+change_feed_service = ChangeFeedService()
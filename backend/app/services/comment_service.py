@@ -2,9 +2,10 @@ import re
 from datetime import datetime
 from typing import List
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, func
 from app.models import Comment, Mention, User, Notification, Project, WorkItem
 from app.exceptions import NotFoundException, ForbiddenException
+from app.services.version_service import version_service, COMMENTS_SCOPE
 from app.utils.html import sanitize_html
 
 
@@ -29,6 +30,7 @@ class CommentService:
                 raise ForbiddenException('项目已归档，禁止写操作')
 
         c = Comment(entity_type=entity_type, entity_id=entity_id, author_id=author_id, content=sanitize_html(content))
+        c.row_version = await version_service.bump(session, COMMENTS_SCOPE)
         session.add(c)
         await session.flush()
         await session.refresh(c)
@@ -65,12 +67,20 @@ class CommentService:
         result = await session.execute(stmt)
         return list(result.scalars().all())
 
+    async def comments_validator(self, session: AsyncSession, *, entity_type: str, entity_id: int) -> tuple:
+        """评论列表的廉价校验值：新增、编辑、删除任一发生都会改变其中一项"""
+        stmt = select(
+            func.count(Comment.id), func.max(Comment.id), func.max(Comment.updated_at), func.max(Comment.deleted_at)
+        ).where(Comment.entity_type == entity_type, Comment.entity_id == entity_id)
+        return tuple((await session.execute(stmt)).one())
+
     async def edit_comment(self, session: AsyncSession, *, id: int, content: str) -> Comment:
         c = await session.get(Comment, id)
         if not c or c.deleted_at is not None:
             raise NotFoundException('评论不存在')
         c.content = sanitize_html(content)
         c.updated_at = datetime.utcnow()
+        c.row_version = await version_service.bump(session, COMMENTS_SCOPE)
         await session.flush()
         await session.refresh(c)
         return c
@@ -80,6 +90,7 @@ class CommentService:
         if not c or c.deleted_at is not None:
             raise NotFoundException('评论不存在')
         c.deleted_at = datetime.utcnow()
+        c.row_version = await version_service.bump(session, COMMENTS_SCOPE)
         await session.flush()
         await session.refresh(c)
         return c
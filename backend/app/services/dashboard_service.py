@@ -0,0 +1,320 @@
+"""
+仪表盘统计服务 - data-statistics.html 所需的各项序列在服务端以分组 SQL 算好后一次返回
+
+页面不再下载全部项目、用户与工作项树后在浏览器里计算。结果按 (项目筛选, 当天日期) 缓存在进程内，
+以工作项/项目/用户三个版本计数器作为代数：任一有写入即重算；跨天时逾期与趋势随日期变化，同样重算。
+"""
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import select, and_, func, case
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+from app.models import Project, WorkItem, User
+from app.services.aggregation_service import display_name, OPEN_STATUSES
+from app.services.version_service import version_service, ROW_VERSION_SCOPE, PROJECTS_SCOPE, USERS_SCOPE
+
+
+# 缓存的 (项目筛选, 日期) 组合上限
+DASHBOARD_CACHE_SIZE = 32
+# 列表类序列的长度
+TOP_PROJECTS = 5
+UPCOMING_DEADLINES = 10
+UPCOMING_DAYS = 30
+OVERDUE_ITEMS = 10
+ASSIGNEE_LOAD = 50
+# 趋势序列的长度
+TREND_DAYS = 7
+TREND_WEEKS = 12
+TREND_MONTHS = 6
+# 生产力统计窗口（天）
+PRODUCTIVITY_DAYS = 30
+# 实际/预计工时比在此区间内视为预估准确
+ACCURACY_RANGE = (0.8, 1.2)
+
+
+def _month_start(d: date, months_back: int = 0) -> date:
+    index = d.year * 12 + d.month - 1 - months_back
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _iso(value) -> Optional[str]:
+    return value.isoformat() if value is not None else None
+
+
+class DashboardService:
+    """仪表盘统计服务"""
+
+    def __init__(self):
+        # (项目筛选, 日期) → (引擎, 代数, 结果)
+        self._cache: "OrderedDict[Tuple[Optional[int], date], Tuple[Any, tuple, dict]]" = OrderedDict()
+
+    def invalidate(self):
+        self._cache.clear()
+
+    async def generation(self, session: AsyncSession) -> tuple:
+        """仪表盘依赖的数据代数（一次主键查询）"""
+        return await version_service.current_many(session, ROW_VERSION_SCOPE, PROJECTS_SCOPE, USERS_SCOPE)
+
+    async def get(self, session: AsyncSession, project_id: Optional[int] = None, generation: Optional[tuple] = None,
+                  today: Optional[date] = None) -> Dict[str, Any]:
+        """
+        获取仪表盘数据（命中缓存时不查询明细）
+
+        Args:
+            session: 数据库会话
+            project_id: 仅统计该项目；为空时统计全部
+            generation: 调用方已读取的 generation()，避免重复查询
+            today: 统计基准日（默认当天）
+        """
+        today = today or date.today()
+        if generation is None:
+            generation = await self.generation(session)
+        key = (project_id, today)
+        cached = self._cache.get(key)
+        if cached and cached[0] is session.bind and cached[1] == generation:
+            self._cache.move_to_end(key)
+            return cached[2]
+        payload = await self.compute(session, project_id, today)
+        self._cache[key] = (session.bind, generation, payload)
+        self._cache.move_to_end(key)
+        while len(self._cache) > DASHBOARD_CACHE_SIZE:
+            self._cache.popitem(last=False)
+        return payload
+
+    async def compute(self, session: AsyncSession, project_id: Optional[int], today: date) -> Dict[str, Any]:
+        """以分组查询计算仪表盘的全部序列"""
+        project_scope = [Project.deleted_at.is_(None)]
+        if project_id is not None:
+            project_scope.append(Project.id == project_id)
+        wi_scope = [WorkItem.deleted_at.is_(None), *project_scope]
+        week_start = today - timedelta(days=today.weekday())
+        month_start = _month_start(today)
+        overdue = and_(WorkItem.planned_end_date < today, WorkItem.status.in_(OPEN_STATUSES))
+
+        # 项目：数量、状态与逾期
+        p = (await session.execute(
+            select(
+                func.count(Project.id).label("total"),
+                func.sum(case((Project.status == 'active', 1), else_=0)).label("active"),
+                func.sum(case((Project.status == 'archived', 1), else_=0)).label("archived"),
+                func.sum(case((func.date(Project.created_at) >= month_start.isoformat(), 1), else_=0)).label("new_this_month"),
+                func.sum(case((and_(Project.end_date < today, Project.status == 'active'), 1), else_=0)).label("overdue"),
+            ).where(*project_scope)
+        )).one()
+        projects = [
+            {"id": r.id, "code": r.code, "name": r.name}
+            for r in (await session.execute(
+                select(Project.id, Project.code, Project.name).where(*project_scope).order_by(Project.code)
+            )).all()
+        ]
+
+        # 工作项：按类型、状态、优先级分组
+        groups = (await session.execute(
+            select(
+                WorkItem.kind, WorkItem.status, WorkItem.priority,
+                func.count(WorkItem.id).label("count"),
+                func.sum(case((overdue, 1), else_=0)).label("overdue"),
+                func.sum(case((func.date(WorkItem.created_at) >= week_start.isoformat(), 1), else_=0)).label("new_this_week"),
+                func.sum(case((func.date(WorkItem.completed_at) >= week_start.isoformat(), 1), else_=0)).label("done_this_week"),
+            )
+            .join(Project, WorkItem.project_id == Project.id)
+            .where(*wi_scope)
+            .group_by(WorkItem.kind, WorkItem.status, WorkItem.priority)
+        )).all()
+        by_status: Dict[str, int] = {}
+        by_priority: Dict[str, int] = {}
+        counts = {"JOB": 0, "TASK": 0}
+        jobs_new_this_week = tasks_done = tasks_done_this_week = overdue_items = 0
+        for g in groups:
+            by_status[g.status] = by_status.get(g.status, 0) + g.count
+            by_priority[g.priority] = by_priority.get(g.priority, 0) + g.count
+            counts[g.kind] = counts.get(g.kind, 0) + g.count
+            overdue_items += g.overdue or 0
+            if g.kind == 'JOB':
+                jobs_new_this_week += g.new_this_week or 0
+            elif g.status == 'done':
+                tasks_done += g.count
+                tasks_done_this_week += g.done_this_week or 0
+        work_items = counts["JOB"] + counts["TASK"]
+
+        # 负责人负载
+        assignee = aliased(User)
+        load_rows = (await session.execute(
+            select(
+                WorkItem.assignee_id, display_name(assignee).label("name"),
+                func.count(WorkItem.id).label("total"),
+                *[func.sum(case((WorkItem.status == s, 1), else_=0)).label(s) for s in ("todo", "doing", "blocked", "done")],
+                func.coalesce(func.sum(WorkItem.estimated_hours), 0.0).label("estimated_hours"),
+                func.coalesce(func.sum(WorkItem.actual_hours), 0.0).label("actual_hours"),
+            )
+            .join(Project, WorkItem.project_id == Project.id)
+            .join(assignee, WorkItem.assignee_id == assignee.id)
+            .where(*wi_scope)
+            .group_by(WorkItem.assignee_id)
+            .order_by(func.count(WorkItem.id).desc(), WorkItem.assignee_id)
+        )).all()
+        assignee_load = [
+            {
+                "assignee_id": r.assignee_id, "name": r.name, "total": r.total,
+                "todo": r.todo, "doing": r.doing, "blocked": r.blocked, "done": r.done,
+                "estimated_hours": float(r.estimated_hours), "actual_hours": float(r.actual_hours),
+            }
+            for r in load_rows[:ASSIGNEE_LOAD]
+        ]
+
+        # 完成度最高的项目
+        done_count = func.sum(case((WorkItem.status == 'done', 1), else_=0))
+        top_projects = [
+            {"id": r.id, "code": r.code, "name": r.name, "total": r.total, "done": r.done,
+             "progress": round(r.done * 100 / r.total) if r.total else 0}
+            for r in (await session.execute(
+                select(Project.id, Project.code, Project.name,
+                       func.count(WorkItem.id).label("total"), done_count.label("done"))
+                .join(WorkItem, WorkItem.project_id == Project.id)
+                .where(*wi_scope)
+                .group_by(Project.id)
+                .order_by((done_count * 1.0 / func.count(WorkItem.id)).desc(), func.count(WorkItem.id).desc(), Project.id)
+                .limit(TOP_PROJECTS)
+            )).all()
+        ]
+
+        # 即将到期的项目
+        upcoming = [
+            {"id": r.id, "code": r.code, "name": r.name, "end_date": _iso(r.end_date), "days_until": (r.end_date - today).days}
+            for r in (await session.execute(
+                select(Project.id, Project.code, Project.name, Project.end_date)
+                .where(*project_scope, Project.status == 'active',
+                       Project.end_date >= today, Project.end_date <= today + timedelta(days=UPCOMING_DAYS))
+                .order_by(Project.end_date, Project.id)
+                .limit(UPCOMING_DEADLINES)
+            )).all()
+        ]
+
+        # 逾期最久的工作项
+        overdue_rows = (await session.execute(
+            select(WorkItem.id, WorkItem.code, WorkItem.title, WorkItem.kind, WorkItem.status, WorkItem.planned_end_date,
+                   Project.code.label("project_code"), display_name(assignee).label("assignee_name"))
+            .join(Project, WorkItem.project_id == Project.id)
+            .join(assignee, WorkItem.assignee_id == assignee.id, isouter=True)
+            .where(*wi_scope, overdue)
+            .order_by(WorkItem.planned_end_date, WorkItem.id)
+            .limit(OVERDUE_ITEMS)
+        )).all()
+        overdue_list = [
+            {"id": r.id, "code": r.code, "title": r.title, "kind": r.kind, "status": r.status,
+             "project_code": r.project_code, "assignee_name": r.assignee_name or None,
+             "planned_end_date": _iso(r.planned_end_date), "days_overdue": (today - r.planned_end_date).days}
+            for r in overdue_rows
+        ]
+
+        # 趋势：按天取新建与完成数，再在内存中汇总为日/周/月序列（行数只与窗口天数有关）
+        since = min(_month_start(today, TREND_MONTHS - 1), week_start - timedelta(weeks=TREND_WEEKS - 1))
+        created_day = func.date(WorkItem.created_at)
+        created = dict((await session.execute(
+            select(created_day, func.count(WorkItem.id))
+            .join(Project, WorkItem.project_id == Project.id)
+            .where(*wi_scope, created_day >= since.isoformat())
+            .group_by(created_day)
+        )).all())
+        completed_day = func.date(WorkItem.completed_at)
+        completed = dict((await session.execute(
+            select(completed_day, func.count(WorkItem.id))
+            .join(Project, WorkItem.project_id == Project.id)
+            .where(*wi_scope, WorkItem.status == 'done', completed_day >= since.isoformat())
+            .group_by(completed_day)
+        )).all())
+        trend = self._trend(today, week_start, created, completed)
+
+        # 预估准确度与平均完成天数（已完成的工作项）
+        ratio = WorkItem.actual_hours / WorkItem.estimated_hours
+        has_hours = and_(WorkItem.estimated_hours > 0, WorkItem.actual_hours.is_not(None))
+        acc = (await session.execute(
+            select(
+                func.sum(case((has_hours, 1), else_=0)).label("items"),
+                func.sum(case((has_hours, WorkItem.estimated_hours), else_=0.0)).label("estimated"),
+                func.sum(case((has_hours, WorkItem.actual_hours), else_=0.0)).label("actual"),
+                func.sum(case((and_(has_hours, ratio < ACCURACY_RANGE[0]), 1), else_=0)).label("under"),
+                func.sum(case((and_(has_hours, ratio > ACCURACY_RANGE[1]), 1), else_=0)).label("over"),
+                func.avg(func.julianday(WorkItem.completed_at)
+                         - func.julianday(func.coalesce(WorkItem.start_date, WorkItem.created_at))).label("avg_days"),
+                func.sum(case((func.date(WorkItem.completed_at) > (today - timedelta(days=PRODUCTIVITY_DAYS)).isoformat(), 1),
+                              else_=0)).label("recent_done"),
+            )
+            .join(Project, WorkItem.project_id == Project.id)
+            .where(*wi_scope, WorkItem.status == 'done')
+        )).one()
+        acc_items = acc.items or 0
+        estimated, actual = float(acc.estimated or 0.0), float(acc.actual or 0.0)
+        active_assignees = len(load_rows)
+
+        return {
+            "today": today.isoformat(),
+            "generated_at": datetime.utcnow().isoformat(),
+            "project_id": project_id,
+            "kpis": {
+                "projects": p.total or 0,
+                "projects_active": p.active or 0,
+                "projects_archived": p.archived or 0,
+                "projects_new_this_month": p.new_this_month or 0,
+                "overdue_projects": p.overdue or 0,
+                "jobs": counts["JOB"],
+                "jobs_new_this_week": jobs_new_this_week,
+                "tasks": counts["TASK"],
+                "tasks_done": tasks_done,
+                "tasks_done_this_week": tasks_done_this_week,
+                "work_items": work_items,
+                "work_items_done": by_status.get("done", 0),
+                "completion_rate": round(by_status.get("done", 0) * 100 / work_items) if work_items else 0,
+                "overdue_work_items": overdue_items,
+                "active_assignees": active_assignees,
+                "avg_completion_days": round(acc.avg_days, 1) if acc.avg_days is not None else None,
+                # 近 PRODUCTIVITY_DAYS 天平均每人每天完成的工作项数
+                "productivity": round((acc.recent_done or 0) / active_assignees / PRODUCTIVITY_DAYS, 2) if active_assignees else 0,
+            },
+            "projects": projects,
+            "status_distribution": [{"status": k, "count": v} for k, v in sorted(by_status.items())],
+            "priority_distribution": [{"priority": k, "count": v} for k, v in sorted(by_priority.items())],
+            "assignee_load": assignee_load,
+            "top_projects": top_projects,
+            "upcoming_deadlines": upcoming,
+            "overdue_items": overdue_list,
+            "completion_trend": trend,
+            "estimate_accuracy": {
+                "items": acc_items,
+                "estimated_hours": estimated,
+                "actual_hours": actual,
+                "ratio": round(actual / estimated, 3) if estimated else None,
+                "under": acc.under or 0,
+                "on_target": acc_items - (acc.under or 0) - (acc.over or 0),
+                "over": acc.over or 0,
+            },
+        }
+
+    def _trend(self, today: date, week_start: date, created: Dict[str, int], completed: Dict[str, int]) -> Dict[str, List[dict]]:
+        days = [today - timedelta(days=i) for i in range(TREND_DAYS - 1, -1, -1)]
+        weeks = [week_start - timedelta(weeks=i) for i in range(TREND_WEEKS - 1, -1, -1)]
+        months = [_month_start(today, i) for i in range(TREND_MONTHS - 1, -1, -1)]
+        by_week: Dict[date, List[int]] = {w: [0, 0] for w in weeks}
+        by_month: Dict[Tuple[int, int], List[int]] = {(m.year, m.month): [0, 0] for m in months}
+        for idx, series in enumerate((created, completed)):
+            for day_str, n in series.items():
+                if not day_str:
+                    continue
+                d = date.fromisoformat(day_str)
+                w = d - timedelta(days=d.weekday())
+                if w in by_week:
+                    by_week[w][idx] += n
+                if (d.year, d.month) in by_month:
+                    by_month[(d.year, d.month)][idx] += n
+        return {
+            "days": [{"date": d.isoformat(), "created": created.get(d.isoformat(), 0), "completed": completed.get(d.isoformat(), 0)}
+                     for d in days],
+            "weeks": [{"week": w.isoformat(), "created": by_week[w][0], "completed": by_week[w][1]} for w in weeks],
+            "months": [{"month": f"{m.year:04d}-{m.month:02d}", "created": by_month[(m.year, m.month)][0],
+                        "completed": by_month[(m.year, m.month)][1]} for m in months],
+        }
+
+
+# 创建全局实例
+dashboard_service = DashboardService()
@@ -0,0 +1,421 @@
+"""
+导出服务 - jobs-tasks 导出的查询构造与流式生成，以及后台导出任务
+
+- 同步下载（GET /api/export/jobs-tasks.xlsx）与后台任务共用同一套筛选归一化、联表查询与流式写出。
+  查询按主键分页读取，每页一个短事务，长时间导出不会一直占用SQLite的读锁。
+- 行格式（GET /api/export/jobs-tasks，CSV / NDJSON / Parquet）复用同一查询与分页，一行一个工作项，供程序消费。
+- 后台任务：POST 创建任务（export_jobs 表），进程内最多 EXPORT_WORKERS 个协程并发生成文件到暂存目录，
+  每页回写一次进度；完成后由下载接口直接返回文件。多个 worker 进程共用任务表：生成前以
+  UPDATE ... WHERE status='queued' 原子认领，生成中随进度刷新心跳；心跳超时的 running 任务才会在启动时重新排队。
+- 结果复用：指纹为归一化筛选条件的哈希，数据代数由工作项/用户/项目三个版本计数器组成。
+  指纹与代数都相同的任务（排队中、生成中或已完成且文件仍在）直接返回；数据有任何写入后代数变化，旧结果自然不再命中。
+"""
+import asyncio
+import json
+import logging
+import os
+import socket
+import uuid
+from collections import deque
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Awaitable, Callable, Deque, Optional, Set, Tuple
+from sqlalchemy import select, delete, update, and_, or_, func
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy.orm import aliased
+from app.config import EXPORT_SPOOL_DIR, EXPORT_WORKERS, EXPORT_RETENTION_HOURS, EXPORT_STALE_SECONDS
+from app.models import WorkItem, Project, User, ExportJob
+from app.schemas.export import ExportFilters
+from app.services.aggregation_service import aggregation_service, display_name, work_item_conditions
+from app.services.version_service import version_service, ROW_VERSION_SCOPE, USERS_SCOPE, PROJECTS_SCOPE
+from app.utils.row_stream import WRITERS, ParquetStreamWriter
+from app.utils.xlsx_stream import XlsxStreamWriter
+
+
+logger = logging.getLogger(__name__)
+
+# 每页从数据库取回的行数、攒够多少字节交给调用方一块
+EXPORT_FETCH_SIZE = 1000
+EXPORT_CHUNK_SIZE = 256 * 1024
+# Parquet 每个行组的行数
+EXPORT_ROW_GROUP_SIZE = 10000
+JOBS_TASKS_KIND = "jobs-tasks.xlsx"
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# 行格式（CSV / NDJSON / Parquet）导出的列：一行一个工作项，缺失值为空
+JOBS_TASKS_COLUMNS = [
+    ("id", "int"), ("code", "str"), ("kind", "str"), ("title", "str"),
+    ("project_code", "str"), ("owner", "str"), ("assignee", "str"), ("parent_code", "str"), ("status", "str"),
+    ("planned_start_date", "date"), ("planned_end_date", "date"), ("start_date", "date"), ("end_date", "date"),
+    ("estimated_hours", "float"), ("actual_hours", "float"),
+]
+
+
+def _to_date_str(d) -> str:
+    try:
+        return d.isoformat()
+    except Exception:
+        return ""
+
+
+def _progress(estimated, actual) -> str:
+    if estimated and actual is not None and estimated > 0:
+        return f"{round((actual / estimated) * 100)}%"
+    return ''
+
+
+def build_jobs_tasks_stmt(filters: ExportFilters):
+    """按筛选条件构造导出查询：一次联表取出项目编号、Owner/Assignee 姓名与父JOB编号"""
+    owner = aliased(User)
+    assignee = aliased(User)
+    parent = aliased(WorkItem)
+    stmt = (
+        select(
+            WorkItem.id, WorkItem.code, WorkItem.kind, WorkItem.title, WorkItem.status,
+            WorkItem.planned_start_date, WorkItem.start_date, WorkItem.planned_end_date, WorkItem.end_date,
+            WorkItem.estimated_hours, WorkItem.actual_hours,
+            Project.code.label("project_code"),
+            display_name(owner).label("owner_name"),
+            display_name(assignee).label("assignee_name"),
+            func.coalesce(parent.code, '').label("parent_code"),
+        )
+        .join(Project, WorkItem.project_id == Project.id)
+        .join(owner, Project.owner_id == owner.id, isouter=True)
+        .join(assignee, WorkItem.assignee_id == assignee.id, isouter=True)
+        .join(parent, WorkItem.parent_id == parent.id, isouter=True)
+    )
+    conditions = work_item_conditions(filters)
+    if conditions:
+        stmt = stmt.where(and_(*conditions))
+    return stmt
+
+
+async def _pages(db: AsyncSession, stmt):
+    """按主键分页执行查询，逐页产出；每页结束读事务，释放读锁"""
+    stmt = stmt.order_by(WorkItem.id).limit(EXPORT_FETCH_SIZE)
+    last_id = 0
+    while True:
+        page = (await db.execute(stmt.where(WorkItem.id > last_id))).all()
+        await db.rollback()
+        if page:
+            yield page
+        if len(page) < EXPORT_FETCH_SIZE:
+            break
+        last_id = page[-1].id
+
+
+async def stream_jobs_tasks(bind: AsyncEngine, filters: ExportFilters,
+                            progress: Optional[Callable[[int], Awaitable[None]]] = None):
+    """
+    边查询边写出 XLSX：按主键分页读取，写入流式工作簿，攒够一块即交给调用方
+
+    Summary 按项目与负责人聚合，由聚合服务以一条 GROUP BY 查询算出，不依赖已写出的明细行。
+
+    Args:
+        bind: 数据库引擎（在其上另开会话；同步下载时请求依赖已退出）
+        filters: 筛选条件
+        progress: 每读完一页以累计行数回调
+    """
+    writer = XlsxStreamWriter(["Jobs", "Tasks", "Summary"])
+    yield writer.drain()
+    base_stmt = build_jobs_tasks_stmt(filters)
+    done = 0
+
+    sheets = (
+        ("Jobs", 'JOB', "进度"),
+        ("Tasks", 'TASK', "ParentID"),
+    )
+    async with AsyncSession(bind) as db:
+        for sheet, kind, last_header in sheets:
+            writer.begin_sheet(sheet)
+            writer.append(["ID","标题","项目","Owner","Assignee","状态","开始时间","结束时间","预计工时","记录工时",last_header])
+            async for page in _pages(db, base_stmt.where(WorkItem.kind == kind)):
+                for row in page:
+                    writer.append([
+                        row.code,
+                        row.title,
+                        row.project_code,
+                        row.owner_name,
+                        row.assignee_name,
+                        row.status,
+                        _to_date_str(row.planned_start_date or row.start_date),
+                        _to_date_str(row.planned_end_date or row.end_date),
+                        row.estimated_hours or '',
+                        row.actual_hours or '',
+                        _progress(row.estimated_hours, row.actual_hours) if kind == 'JOB' else row.parent_code,
+                    ])
+                done += len(page)
+                if progress is not None:
+                    await progress(done)
+                if writer.buffered >= EXPORT_CHUNK_SIZE:
+                    yield writer.drain()
+
+        # Summary：按项目与负责人聚合
+        groups = await aggregation_service.aggregate(db, filters, ["project", "assignee"])
+        await db.rollback()
+    writer.begin_sheet("Summary")
+    writer.append(["项目","负责人","预计工时","记录工时","偏差"])
+    for g in groups:
+        est, act = g["estimated_hours"], g["actual_hours"]
+        writer.append([g["keys"]["project_code"], g["keys"]["assignee_name"], est, act, (est - act)])
+    writer.close()
+    yield writer.drain()
+
+
+def row_writer(fmt: str):
+    """按格式创建行写入器（csv / ndjson / parquet）"""
+    if fmt == "parquet":
+        return ParquetStreamWriter(JOBS_TASKS_COLUMNS, row_group_size=EXPORT_ROW_GROUP_SIZE)
+    return WRITERS[fmt](JOBS_TASKS_COLUMNS)
+
+
+async def stream_jobs_tasks_rows(bind: AsyncEngine, filters: ExportFilters, writer):
+    """
+    以行格式边查询边写出：JOB 与 TASK 同在一个结果集中按主键顺序输出
+
+    Args:
+        bind: 数据库引擎
+        filters: 筛选条件
+        writer: row_writer() 创建的写入器（在路由中创建，便于格式不可用时提前报错）
+    """
+    yield writer.drain()
+    async with AsyncSession(bind) as db:
+        async for page in _pages(db, build_jobs_tasks_stmt(filters)):
+            for row in page:
+                writer.append([
+                    row.id, row.code, row.kind, row.title,
+                    row.project_code, row.owner_name or None, row.assignee_name or None, row.parent_code or None, row.status,
+                    row.planned_start_date, row.planned_end_date, row.start_date, row.end_date,
+                    row.estimated_hours, row.actual_hours,
+                ])
+            if writer.buffered >= EXPORT_CHUNK_SIZE:
+                yield writer.drain()
+    writer.close()
+    yield writer.drain()
+
+
+class _ClaimLost(Exception):
+    """任务已不归本进程所有（心跳超时后被其他进程接管）"""
+
+
+class ExportJobService:
+    """后台导出任务服务"""
+
+    def __init__(self, spool_dir: Path = EXPORT_SPOOL_DIR, workers: int = EXPORT_WORKERS):
+        self.spool_dir = Path(spool_dir)
+        self.workers = workers
+        self._pending: Deque[Tuple[AsyncEngine, str]] = deque()
+        self._tasks: Set[asyncio.Task] = set()
+        # 进度与心跳回写的最小间隔（秒）
+        self.progress_interval = 1.0
+        self.stale_seconds = EXPORT_STALE_SECONDS
+        # 本进程的认领标识
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    async def data_generation(self, session: AsyncSession) -> str:
+        """导出内容依赖的数据代数：工作项、用户、项目任一有写入即变化"""
+        rows, users, projects = await version_service.current_many(session, ROW_VERSION_SCOPE, USERS_SCOPE, PROJECTS_SCOPE)
+        return f"{rows}:{users}:{projects}"
+
+    def file_path(self, job: ExportJob) -> Optional[Path]:
+        return self.spool_dir / job.file_name if job.file_name else None
+
+    async def create(self, session: AsyncSession, filters: ExportFilters, creator_id: int) -> Tuple[ExportJob, bool]:
+        """
+        创建导出任务；同一用户相同条件且数据未变化的任务直接复用
+
+        Args:
+            session: 数据库会话（调用方提交后调用 submit）
+            filters: 筛选条件
+            creator_id: 创建人
+
+        Returns:
+            (任务, 是否复用已有任务)
+        """
+        fingerprint = filters.fingerprint()
+        generation = await self.data_generation(session)
+        res = await session.execute(
+            select(ExportJob).where(
+                ExportJob.kind == JOBS_TASKS_KIND,
+                ExportJob.fingerprint == fingerprint,
+                ExportJob.generation == generation,
+                ExportJob.creator_id == creator_id,
+                ExportJob.status != 'failed',
+            ).order_by(ExportJob.created_at.desc()).limit(1)
+        )
+        existing = res.scalars().first()
+        if existing and (existing.status != 'done' or self.file_path(existing).exists()):
+            return existing, True
+        job = ExportJob(
+            id=uuid.uuid4().hex,
+            kind=JOBS_TASKS_KIND,
+            params=json.dumps(filters.model_dump(mode="json"), ensure_ascii=False),
+            fingerprint=fingerprint,
+            generation=generation,
+            status='queued',
+            rows_done=0,
+            creator_id=creator_id,
+            created_at=datetime.utcnow(),
+        )
+        session.add(job)
+        await session.flush()
+        return job, False
+
+    def submit(self, bind: AsyncEngine, job_id: str):
+        """排入生成队列（任务提交后调用），按需启动工作协程"""
+        self._pending.append((bind, job_id))
+        loop = asyncio.get_running_loop()
+        self._tasks = {t for t in self._tasks if not t.done() and t.get_loop() is loop}
+        while self._pending and len(self._tasks) < self.workers:
+            task = loop.create_task(self._worker())
+            self._tasks.add(task)
+
+    async def wait(self):
+        """等待队列中的任务全部生成完毕"""
+        while self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+            self._tasks = {t for t in self._tasks if not t.done()}
+
+    async def stop(self):
+        """取消生成中的任务（认领随之释放，下次启动时重新排队）"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+        self._pending.clear()
+
+    async def _worker(self):
+        while self._pending:
+            bind, job_id = self._pending.popleft()
+            try:
+                await self._build(bind, job_id)
+            except Exception:
+                logger.exception("导出任务 %s 生成失败", job_id)
+
+    async def _update(self, bind: AsyncEngine, job_id: str, **values) -> bool:
+        """改写本进程认领的任务；任务已不归本进程所有时返回 False"""
+        async with AsyncSession(bind) as session:
+            res = await session.execute(
+                update(ExportJob)
+                .where(ExportJob.id == job_id, ExportJob.owner == self.worker_id, ExportJob.status == 'running')
+                .values(**values)
+            )
+            await session.commit()
+            return res.rowcount == 1
+
+    async def _claim(self, bind: AsyncEngine, job_id: str) -> Optional[ExportJob]:
+        """原子地认领排队中的任务；已被其他进程认领、已完成或不存在时返回 None"""
+        now = datetime.utcnow()
+        async with AsyncSession(bind, expire_on_commit=False) as session:
+            res = await session.execute(
+                update(ExportJob)
+                .where(ExportJob.id == job_id, ExportJob.status == 'queued')
+                .values(status='running', owner=self.worker_id, heartbeat_at=now, started_at=now, rows_done=0)
+            )
+            await session.commit()
+            if res.rowcount != 1:
+                return None
+            return await session.get(ExportJob, job_id)
+
+    async def _build(self, bind: AsyncEngine, job_id: str):
+        job = await self._claim(bind, job_id)
+        if job is None:
+            return
+        try:
+            filters = ExportFilters(**json.loads(job.params))
+            async with AsyncSession(bind) as session:
+                total = (await session.execute(
+                    select(func.count()).select_from(build_jobs_tasks_stmt(filters).subquery())
+                )).scalar_one()
+        except asyncio.CancelledError:
+            await self._release(bind, job_id)
+            raise
+        except Exception as e:
+            await self._update(bind, job_id, status='failed', error=str(e), finished_at=datetime.utcnow())
+            raise
+        if not await self._update(bind, job_id, rows_total=total, heartbeat_at=datetime.utcnow()):
+            return
+
+        self.spool_dir.mkdir(parents=True, exist_ok=True)
+        file_name = f"{job_id}.xlsx"
+        # 临时文件名带随机后缀：心跳超时被接管后，原进程即使仍在写也不会与接管者写同一个文件
+        part = self.spool_dir / f"{file_name}.{uuid.uuid4().hex[:8]}.part"
+        last_report = 0.0
+        loop = asyncio.get_running_loop()
+
+        async def report(done: int):
+            nonlocal last_report
+            if loop.time() - last_report >= self.progress_interval:
+                last_report = loop.time()
+                if not await self._update(bind, job_id, rows_done=done, heartbeat_at=datetime.utcnow()):
+                    raise _ClaimLost(job_id)
+
+        try:
+            size = 0
+            with open(part, "wb") as f:
+                async for chunk in stream_jobs_tasks(bind, filters, progress=report):
+                    f.write(chunk)
+                    size += len(chunk)
+        except _ClaimLost:
+            part.unlink(missing_ok=True)
+            logger.warning("导出任务 %s 已被其他进程接管，停止生成", job_id)
+            return
+        except asyncio.CancelledError:
+            part.unlink(missing_ok=True)
+            await self._release(bind, job_id)
+            raise
+        except Exception as e:
+            part.unlink(missing_ok=True)
+            await self._update(bind, job_id, status='failed', error=str(e), finished_at=datetime.utcnow())
+            raise
+        os.replace(part, self.spool_dir / file_name)
+        await self._update(bind, job_id, status='done', rows_done=total, file_name=file_name, size=size,
+                           finished_at=datetime.utcnow())
+        await self.prune(bind)
+
+    async def _release(self, bind: AsyncEngine, job_id: str):
+        """放弃本进程认领的任务（停止时调用），交回队列由下次启动的进程重新认领"""
+        async with AsyncSession(bind) as session:
+            await session.execute(
+                update(ExportJob)
+                .where(ExportJob.id == job_id, ExportJob.owner == self.worker_id, ExportJob.status == 'running')
+                .values(status='queued', owner=None, heartbeat_at=None)
+            )
+            await session.commit()
+
+    async def prune(self, bind: AsyncEngine):
+        """删除超过保留时长的任务及其文件"""
+        cutoff = datetime.utcnow() - timedelta(hours=EXPORT_RETENTION_HOURS)
+        async with AsyncSession(bind) as session:
+            res = await session.execute(
+                select(ExportJob).where(ExportJob.created_at < cutoff, ExportJob.status.in_(('done', 'failed')))
+            )
+            expired = res.scalars().all()
+            if not expired:
+                return
+            for job in expired:
+                path = self.file_path(job)
+                if path is not None:
+                    path.unlink(missing_ok=True)
+            await session.execute(delete(ExportJob).where(ExportJob.id.in_([j.id for j in expired])))
+            await session.commit()
+
+    async def startup(self, bind: AsyncEngine):
+        """重新排入未完成的任务：排队中的，以及心跳超时（所在进程已退出）的生成中任务"""
+        stale = datetime.utcnow() - timedelta(seconds=self.stale_seconds)
+        async with AsyncSession(bind) as session:
+            await session.execute(
+                update(ExportJob)
+                .where(ExportJob.status == 'running', or_(ExportJob.heartbeat_at.is_(None), ExportJob.heartbeat_at < stale))
+                .values(status='queued', owner=None, heartbeat_at=None)
+            )
+            await session.commit()
+            res = await session.execute(
+                select(ExportJob.id).where(ExportJob.status == 'queued').order_by(ExportJob.created_at)
+            )
+            for job_id in res.scalars().all():
+                self.submit(bind, job_id)
+
+
+# 创建全局实例
+export_service = ExportJobService()
@@ -0,0 +1,304 @@
+"""
+JOB汇总服务 - 维护 job_rollups 中每个JOB的子任务汇总
+
+汇总包括各状态子任务数、子任务最早计划开始/最晚计划结束、子任务预估/实际工时合计。
+TASK 每次新建、修改、删除、级联时，调用方在写入前后各取一次子任务快照交给 apply()，
+在内存中按差量更新汇总行并随同一次 flush 写回；父状态汇总与JOB计划校验只需读取一行。
+
+汇总行在调用方首次写入（版本号递增）之后读取，此时已持有SQLite写锁，读改写不会与其他写事务交错。
+缺失的汇总行（如未经服务写入的历史数据）按需用一次聚合查询补齐。
+"""
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func, case, update
+from app.models import WorkItem, JobRollup
+
+
+# 汇总计数的状态（与 work_items 的状态约束一致）
+ROLLUP_STATUSES = ('todo', 'doing', 'blocked', 'done', 'cancelled', 'deleted')
+
+
+class ChildState(NamedTuple):
+    """计入汇总的子任务字段快照"""
+    id: Optional[int]
+    parent_id: int
+    status: str
+    planned_start_date: Optional[object]
+    planned_end_date: Optional[object]
+    estimated_hours: float
+    actual_hours: float
+
+
+# 为尚无汇总行的JOB补齐汇总（启动迁移时执行，可重复执行）
+BACKFILL_SQL = """
+INSERT INTO job_rollups (
+    job_id, child_count, todo_count, doing_count, blocked_count, done_count, cancelled_count, deleted_count,
+    child_min_planned_start, child_max_planned_end, child_estimated_hours, child_actual_hours
+)
+SELECT j.id,
+       COUNT(t.id),
+       COALESCE(SUM(t.status = 'todo'), 0),
+       COALESCE(SUM(t.status = 'doing'), 0),
+       COALESCE(SUM(t.status = 'blocked'), 0),
+       COALESCE(SUM(t.status = 'done'), 0),
+       COALESCE(SUM(t.status = 'cancelled'), 0),
+       COALESCE(SUM(t.status = 'deleted'), 0),
+       MIN(t.planned_start_date),
+       MAX(t.planned_end_date),
+       COALESCE(SUM(t.estimated_hours), 0),
+       COALESCE(SUM(t.actual_hours), 0)
+FROM work_items j
+LEFT JOIN work_items t ON t.parent_id = j.id AND t.kind = 'TASK' AND t.deleted_at IS NULL
+WHERE j.kind = 'JOB' AND NOT EXISTS (SELECT 1 FROM job_rollups r WHERE r.job_id = j.id)
+GROUP BY j.id
+"""
+
+
+def _empty(job_id: int) -> dict:
+    values = dict(job_id=job_id, child_count=0, child_min_planned_start=None, child_max_planned_end=None,
+                  child_estimated_hours=0.0, child_actual_hours=0.0)
+    values.update({f"{s}_count": 0 for s in ROLLUP_STATUSES})
+    return values
+
+
+def _hours(value: float) -> float:
+    # 避免浮点增减累积误差
+    return round(value, 4)
+
+
+class JobRollupService:
+    """JOB汇总服务"""
+
+    @staticmethod
+    def snapshot(wi: WorkItem) -> Optional[ChildState]:
+        """取子任务当前快照；非TASK或已删除时返回 None（不计入汇总）"""
+        if wi.kind != 'TASK' or not wi.parent_id or wi.deleted_at is not None:
+            return None
+        return ChildState(wi.id, wi.parent_id, wi.status, wi.planned_start_date, wi.planned_end_date,
+                          wi.estimated_hours or 0.0, wi.actual_hours or 0.0)
+
+    @staticmethod
+    def uniform_status(rollup: JobRollup) -> Optional[str]:
+        """子任务状态全部一致时返回该状态，否则（含无子任务）返回 None"""
+        if not rollup.child_count:
+            return None
+        for s in ROLLUP_STATUSES:
+            if getattr(rollup, f"{s}_count") == rollup.child_count:
+                return s
+        return None
+
+    @staticmethod
+    def to_dict(rollup: JobRollup) -> dict:
+        """树接口中返回的汇总字段"""
+        return {
+            "child_count": rollup.child_count,
+            "status_counts": {s: getattr(rollup, f"{s}_count") for s in ROLLUP_STATUSES},
+            "child_min_planned_start": rollup.child_min_planned_start.isoformat() if rollup.child_min_planned_start else None,
+            "child_max_planned_end": rollup.child_max_planned_end.isoformat() if rollup.child_max_planned_end else None,
+            "child_estimated_hours": rollup.child_estimated_hours,
+            "child_actual_hours": rollup.child_actual_hours,
+        }
+
+    async def _aggregate(self, session: AsyncSession, job_ids: Iterable[int], exclude_ids: Iterable[int] = ()) -> Dict[int, dict]:
+        stmt = select(
+            WorkItem.parent_id,
+            func.count(),
+            *[func.sum(case((WorkItem.status == s, 1), else_=0)) for s in ROLLUP_STATUSES],
+            func.min(WorkItem.planned_start_date),
+            func.max(WorkItem.planned_end_date),
+            func.coalesce(func.sum(WorkItem.estimated_hours), 0.0),
+            func.coalesce(func.sum(WorkItem.actual_hours), 0.0),
+        ).where(
+            WorkItem.parent_id.in_(list(job_ids)),
+            WorkItem.kind == 'TASK',
+            WorkItem.deleted_at.is_(None),
+        ).group_by(WorkItem.parent_id)
+        exclude_ids = [i for i in exclude_ids if i]
+        if exclude_ids:
+            stmt = stmt.where(WorkItem.id.notin_(exclude_ids))
+        result: Dict[int, dict] = {}
+        for row in (await session.execute(stmt)).all():
+            job_id, count, *status_counts, min_start, max_end, est, act = row
+            values = _empty(job_id)
+            values.update({f"{s}_count": n for s, n in zip(ROLLUP_STATUSES, status_counts)})
+            values.update(child_count=count, child_min_planned_start=min_start, child_max_planned_end=max_end,
+                          child_estimated_hours=_hours(est), child_actual_hours=_hours(act))
+            result[job_id] = values
+        return result
+
+    async def get_many(self, session: AsyncSession, job_ids: Iterable[int], *, for_update: bool = False) -> Dict[int, JobRollup]:
+        """
+        批量读取JOB汇总
+
+        Args:
+            session: 数据库会话
+            job_ids: JOB ID
+            for_update: 为 True 时将补算出的缺失汇总行加入会话，随下次 flush 写入
+
+        Returns:
+            job_id → 汇总
+        """
+        wanted = set(job_ids)
+        if not wanted:
+            return {}
+        res = await session.execute(select(JobRollup).where(JobRollup.job_id.in_(wanted)))
+        rollups = {r.job_id: r for r in res.scalars().all()}
+        missing = wanted - rollups.keys()
+        if missing:
+            computed = await self._aggregate(session, missing)
+            for job_id in missing:
+                rollup = JobRollup(**computed.get(job_id, _empty(job_id)))
+                if for_update:
+                    session.add(rollup)
+                rollups[job_id] = rollup
+        return rollups
+
+    async def get(self, session: AsyncSession, job_id: int) -> JobRollup:
+        """读取单个JOB的汇总"""
+        return (await self.get_many(session, [job_id]))[job_id]
+
+    def init_job(self, session: AsyncSession, job: WorkItem):
+        """为新建JOB写入空汇总行（需已分配ID）"""
+        session.add(JobRollup(**_empty(job.id)))
+
+    @staticmethod
+    def _add(rollup: JobRollup, state: ChildState, sign: int):
+        rollup.child_count += sign
+        setattr(rollup, f"{state.status}_count", getattr(rollup, f"{state.status}_count") + sign)
+        rollup.child_estimated_hours = _hours(rollup.child_estimated_hours + sign * state.estimated_hours)
+        rollup.child_actual_hours = _hours(rollup.child_actual_hours + sign * state.actual_hours)
+
+    async def apply(
+        self,
+        session: AsyncSession,
+        changes: Iterable[Tuple[Optional[ChildState], Optional[ChildState]]],
+        version: int,
+    ) -> Dict[int, JobRollup]:
+        """
+        按子任务写入前后的快照差量更新汇总，并为受影响的JOB分配与子任务相同的 row_version
+
+        汇总与计划范围的补算都排除本次改动的子任务、改用其写入前快照，因此调用前后是否已 flush 均可。
+        子任务移出最早开始/最晚结束边界时，用一次聚合查询重算计划范围。
+
+        Args:
+            session: 数据库会话
+            changes: (写入前快照, 写入后快照)，新建时前者为 None，删除时后者为 None
+            version: 本次写入分配的版本号
+
+        Returns:
+            job_id → 更新后的汇总
+        """
+        changes = [(before, after) for before, after in changes if before != after]
+        job_ids = {s.parent_id for pair in changes for s in pair if s}
+        if not job_ids:
+            return {}
+        changed_ids: Dict[int, set] = {}
+        for pair in changes:
+            for state in pair:
+                if state:
+                    changed_ids.setdefault(state.parent_id, set()).add(state.id)
+
+        def others(jobs) -> set:
+            return set().union(*[changed_ids[j] for j in jobs])
+
+        with session.no_autoflush:
+            res = await session.execute(select(JobRollup).where(JobRollup.job_id.in_(job_ids)))
+            rollups = {r.job_id: r for r in res.scalars().all()}
+            missing = job_ids - rollups.keys()
+            if missing:
+                # 缺失的汇总行：其余子任务来自数据库，本次改动的子任务取写入前快照
+                computed = await self._aggregate(session, missing, exclude_ids=others(missing))
+                for job_id in missing:
+                    rollup = JobRollup(**computed.get(job_id, _empty(job_id)))
+                    for before, _ in changes:
+                        if before and before.parent_id == job_id:
+                            self._add(rollup, before, 1)
+                    session.add(rollup)
+                    rollups[job_id] = rollup
+            else:
+                computed = {}
+
+            afters: Dict[int, List[ChildState]] = {}
+            range_dirty = set()
+            for before, after in changes:
+                if before:
+                    rollup = rollups[before.parent_id]
+                    self._add(rollup, before, -1)
+                    # 处于边界的子任务移出JOB、被删除或向内收缩时，边界可能收缩
+                    moved = after is None or after.parent_id != before.parent_id
+                    if before.parent_id not in missing and (
+                            (before.planned_start_date and before.planned_start_date == rollup.child_min_planned_start and
+                             (moved or not after.planned_start_date or after.planned_start_date > before.planned_start_date)) or
+                            (before.planned_end_date and before.planned_end_date == rollup.child_max_planned_end and
+                             (moved or not after.planned_end_date or after.planned_end_date < before.planned_end_date))):
+                        range_dirty.add(before.parent_id)
+                if after:
+                    self._add(rollups[after.parent_id], after, 1)
+                    afters.setdefault(after.parent_id, []).append(after)
+
+            # 补算的JOB与边界可能收缩的JOB：其余子任务的范围来自数据库，本次改动的子任务取写入后的值
+            if range_dirty:
+                computed.update(await self._aggregate(session, range_dirty, exclude_ids=others(range_dirty)))
+            for job_id in job_ids:
+                rollup = rollups[job_id]
+                if job_id in missing or job_id in range_dirty:
+                    base = computed.get(job_id)
+                    starts = [base["child_min_planned_start"]] if base else []
+                    ends = [base["child_max_planned_end"]] if base else []
+                else:
+                    starts = [rollup.child_min_planned_start]
+                    ends = [rollup.child_max_planned_end]
+                starts = [d for d in starts + [a.planned_start_date for a in afters.get(job_id, [])] if d]
+                ends = [d for d in ends + [a.planned_end_date for a in afters.get(job_id, [])] if d]
+                rollup.child_min_planned_start = min(starts) if starts else None
+                rollup.child_max_planned_end = max(ends) if ends else None
+
+                # 汇总属于JOB在树接口中的表示，JOB随之进入增量同步
+                job = await session.get(WorkItem, job_id)
+                if job is not None:
+                    job.row_version = version
+        return rollups
+
+    async def replace(self, session: AsyncSession, job_id: int, children: Iterable[WorkItem]) -> JobRollup:
+        """用已加载的全部未删除子任务重置汇总（级联等整组改写场景）"""
+        with session.no_autoflush:
+            rollup = await session.get(JobRollup, job_id)
+        if rollup is None:
+            rollup = JobRollup(job_id=job_id)
+            session.add(rollup)
+        for key, value in _empty(job_id).items():
+            setattr(rollup, key, value)
+        states = [s for s in (self.snapshot(c) for c in children) if s]
+        for state in states:
+            self._add(rollup, state, 1)
+        starts = [s.planned_start_date for s in states if s.planned_start_date]
+        ends = [s.planned_end_date for s in states if s.planned_end_date]
+        rollup.child_min_planned_start = min(starts) if starts else None
+        rollup.child_max_planned_end = max(ends) if ends else None
+        return rollup
+
+    async def refresh_hours(self, session: AsyncSession, job_ids: Iterable[int], version: int):
+        """
+        按子任务重新聚合工时合计（批量重算子任务工时后调用，其余汇总字段不变）
+
+        Args:
+            session: 数据库会话（须已持有写锁，即已分配过版本号）
+            job_ids: 子任务工时有变化的JOB
+            version: 本次写入的版本号，JOB随之进入增量同步
+        """
+        job_ids = set(job_ids)
+        if not job_ids:
+            return
+        computed = await self._aggregate(session, job_ids)
+        for job_id, rollup in (await self.get_many(session, job_ids, for_update=True)).items():
+            values = computed.get(job_id, _empty(job_id))
+            rollup.child_estimated_hours = values['child_estimated_hours']
+            rollup.child_actual_hours = values['child_actual_hours']
+        await session.execute(
+            update(WorkItem).where(WorkItem.id.in_(job_ids)).values(row_version=version),
+            execution_options={"synchronize_session": False},
+        )
+
+
+# 创建全局实例
+job_rollup_service = JobRollupService()
@@ -1,7 +1,10 @@
+from datetime import datetime
 from typing import List, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
+from app.config import OPERATION_LOG_STRICT
 from app.models import OperationLog, OperationType, EntityType
+from app.services.operation_log_writer import operation_log_writer
 
 
 class OperationLogService:
@@ -18,9 +21,21 @@ class OperationLogService:
         failure_reason: Optional[str] = None,
         field_name: Optional[str] = None,
         old_value: Optional[str] = None,
-        new_value: Optional[str] = None
-    ) -> OperationLog:
-        log = OperationLog(
+        new_value: Optional[str] = None,
+        strict: bool = False
+    ) -> Optional[OperationLog]:
+        """
+        记录操作日志
+
+        默认交给 operation_log_writer 异步批量写入：成功日志在请求事务提交后入队（回滚则丢弃），
+        失败日志立即入队，不随请求事务回滚。strict=True 时在调用方会话内同步写入并返回日志对象：
+        成功日志随调用方事务提交或回滚；失败日志先回滚调用方尚未提交的改动（失败路径随后整体回滚），
+        再单独提交日志，保证返回前已落库、不经过队列。
+
+        Returns:
+            strict 模式下为已写入的日志，否则为 None
+        """
+        row = dict(
             user_id=user_id,
             username=username,
             operation_type=operation_type.value,
@@ -31,12 +46,24 @@ class OperationLogService:
             failure_reason=failure_reason,
             field_name=field_name,
             old_value=old_value,
-            new_value=new_value
+            new_value=new_value,
+            created_at=datetime.utcnow()
         )
-        session.add(log)
-        await session.flush()
-        await session.refresh(log)
-        return log
+        if strict or OPERATION_LOG_STRICT or session.bind is None:
+            log = OperationLog(**row)
+            if result_status == "failure" and session.bind is not None:
+                await session.rollback()
+                session.add(log)
+                await session.commit()
+                return log
+            session.add(log)
+            await session.flush()
+            return log
+        if result_status == "failure":
+            await operation_log_writer.submit(session.bind, [row])
+        else:
+            await operation_log_writer.enqueue_after_commit(session, row)
+        return None
 
     # 字段名中英文映射
     FIELD_NAME_MAP = {
@@ -71,8 +98,9 @@ class OperationLogService:
         field_name: str,
         old_value: Optional[str],
         new_value: Optional[str],
-        operation_type: OperationType
-    ) -> OperationLog:
+        operation_type: OperationType,
+        strict: bool = False
+    ) -> Optional[OperationLog]:
         # 将字段名翻译成中文
         field_name_cn = self.FIELD_NAME_MAP.get(field_name, field_name)
         operation_content = f"将 {field_name_cn} 从 '{old_value or '(空)'}' 修改为 '{new_value or '(空)'}'"
@@ -86,7 +114,8 @@ class OperationLogService:
             operation_content=operation_content,
             field_name=field_name,
             old_value=old_value,
-            new_value=new_value
+            new_value=new_value,
+            strict=strict
         )
 
     async def get_operation_logs(
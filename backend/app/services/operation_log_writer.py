@@ -0,0 +1,117 @@
+"""
+操作日志异步写入器 - 将请求中产生的操作日志攒批，在独立连接上以多行 INSERT 写入
+
+- 成功日志暂存在会话的 info 中，随请求事务提交后才入队；事务回滚则丢弃，与业务数据保持一致。
+- 失败日志直接入队，不随请求事务回滚（请求会话在出错后往往已不可用）。
+- 队列有上限：积压达到上限时，记录日志的协程等待写入协程消化一批后再继续（背压）。
+- 写入协程在有积压时按需启动、清空后退出；应用关闭时调用 flush() 等待全部写完。
+"""
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from sqlalchemy import event, insert
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy.orm import Session
+from app.config import OPERATION_LOG_BATCH_SIZE, OPERATION_LOG_QUEUE_SIZE
+from app.models import OperationLog
+
+
+logger = logging.getLogger(__name__)
+
+# 会话内待提交的日志：(引擎, [行])
+_PENDING_KEY = "operation_logs_pending"
+
+
+class OperationLogWriter:
+    """操作日志批量写入器"""
+
+    def __init__(self, max_pending: int = OPERATION_LOG_QUEUE_SIZE, batch_size: int = OPERATION_LOG_BATCH_SIZE):
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self._pending: Deque[Tuple[AsyncEngine, Dict[str, Any]]] = deque()
+        self._task: Optional[asyncio.Task] = None
+        # 每写完一批时唤醒等待队列空间的协程
+        self._space: Optional[asyncio.Future] = None
+
+    @property
+    def pending(self) -> int:
+        """队列中尚未写入的日志条数"""
+        return len(self._pending)
+
+    def _running(self) -> bool:
+        return (
+            self._task is not None
+            and not self._task.done()
+            and self._task.get_loop() is asyncio.get_running_loop()
+        )
+
+    def submit_nowait(self, bind: AsyncEngine, rows: List[Dict[str, Any]]):
+        """
+        入队并确保写入协程运行（不等待队列空间，供事务提交钩子调用）
+
+        Args:
+            bind: 日志写入的目标引擎
+            rows: operation_logs 行数据
+        """
+        self._pending.extend((bind, row) for row in rows)
+        if self._pending and not self._running():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def submit(self, bind: AsyncEngine, rows: List[Dict[str, Any]]):
+        """等待队列空间后入队"""
+        await self.wait_for_capacity()
+        self.submit_nowait(bind, rows)
+
+    async def wait_for_capacity(self):
+        """积压达到上限时等待写入协程消化（背压）"""
+        while len(self._pending) >= self.max_pending and self._running():
+            if self._space is None or self._space.done():
+                self._space = asyncio.get_running_loop().create_future()
+            await asyncio.shield(self._space)
+
+    async def flush(self):
+        """等待队列中的日志全部写入（应用关闭时调用）"""
+        if self._pending and not self._running():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        while self._running():
+            await asyncio.shield(self._task)
+
+    async def _run(self):
+        while self._pending:
+            batch: Dict[AsyncEngine, List[Dict[str, Any]]] = {}
+            for _ in range(min(self.batch_size, len(self._pending))):
+                bind, row = self._pending.popleft()
+                batch.setdefault(bind, []).append(row)
+            for bind, rows in batch.items():
+                try:
+                    async with bind.begin() as conn:
+                        await conn.execute(insert(OperationLog).values(rows))
+                except Exception:
+                    logger.exception("写入操作日志失败，丢弃 %d 条", len(rows))
+            if self._space is not None and not self._space.done():
+                self._space.set_result(None)
+
+    async def enqueue_after_commit(self, session: AsyncSession, row: Dict[str, Any]):
+        """暂存一条日志，待会话事务提交后入队"""
+        await self.wait_for_capacity()
+        bind, rows = session.info.setdefault(_PENDING_KEY, (session.bind, []))
+        rows.append(row)
+
+
+@event.listens_for(Session, "after_commit")
+def _submit_committed_logs(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending:
+        operation_log_writer.submit_nowait(*pending)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_rolled_back_logs(session, previous_transaction):
+    # 只在最外层事务回滚时丢弃；保存点回滚不影响外层事务已记录的日志
+    if previous_transaction.parent is None:
+        session.info.pop(_PENDING_KEY, None)
+
+
+# 创建全局实例
+operation_log_writer = OperationLogWriter()
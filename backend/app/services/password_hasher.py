@@ -0,0 +1,108 @@
+"""
+密码哈希执行器 - 在独立的有界线程池中执行 bcrypt，避免阻塞事件循环
+
+- 每次 bcrypt 计算约数百毫秒；在请求协程中直接调用会让同一 worker 上的其他请求一起等待。
+- 线程池大小即并发上限（PASSWORD_HASH_WORKERS），超出的调用在池内排队，不占用事件循环。
+- 记录排队等待与计算耗时，stats() 返回当前并发、排队数与累计指标；排队过久时记录警告。
+"""
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+import bcrypt
+from app.config import PASSWORD_HASH_WORKERS, PASSWORD_HASH_SLOW_QUEUE
+
+
+logger = logging.getLogger(__name__)
+
+
+def hash_password(password: str) -> str:
+    """bcrypt 哈希（同步，在线程池中执行）"""
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+
+
+def check_password(password: str, hashed: str) -> bool:
+    """bcrypt 校验（同步，在线程池中执行）"""
+    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+
+
+class PasswordHasher:
+    """有界线程池中的密码哈希与校验"""
+
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS):
+        self.workers = workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._submitted = 0
+        self._running = 0
+        self._running_lock = threading.Lock()
+        self._completed = 0
+        self._queue_wait_total = 0.0
+        self._queue_wait_max = 0.0
+        self._run_total = 0.0
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+        return self._executor
+
+    async def _run(self, fn: Callable[..., Any], *args) -> Any:
+        queued_at = time.perf_counter()
+        timing = {}
+
+        def job():
+            timing["started"] = time.perf_counter()
+            with self._running_lock:
+                self._running += 1
+            try:
+                return fn(*args)
+            finally:
+                with self._running_lock:
+                    self._running -= 1
+                timing["finished"] = time.perf_counter()
+
+        self._submitted += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._pool(), job)
+        finally:
+            self._submitted -= 1
+            if "started" in timing:
+                wait = timing["started"] - queued_at
+                self._completed += 1
+                self._queue_wait_total += wait
+                self._queue_wait_max = max(self._queue_wait_max, wait)
+                self._run_total += timing["finished"] - timing["started"]
+                if wait >= PASSWORD_HASH_SLOW_QUEUE:
+                    logger.warning("密码哈希排队 %.2f 秒（并发上限 %d）", wait, self.workers)
+
+    async def hash(self, password: str) -> str:
+        """生成密码哈希"""
+        return await self._run(hash_password, password)
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        """校验密码"""
+        return await self._run(check_password, password, hashed)
+
+    def stats(self) -> Dict[str, Any]:
+        """并发、排队与耗时指标（毫秒）"""
+        done = self._completed or 1
+        return {
+            "workers": self.workers,
+            "running": self._running,
+            "queued": self._submitted - self._running,
+            "completed": self._completed,
+            "queue_wait_avg_ms": round(self._queue_wait_total / done * 1000, 1),
+            "queue_wait_max_ms": round(self._queue_wait_max * 1000, 1),
+            "run_avg_ms": round(self._run_total / done * 1000, 1),
+        }
+
+    def shutdown(self):
+        """关闭线程池（应用关闭时调用）"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# 创建全局实例
+password_hasher = PasswordHasher()
@@ -1,20 +1,33 @@
 """
 项目服务 - 处理项目相关的业务逻辑
 """
+from collections import OrderedDict
 from datetime import datetime, date
-from typing import Optional, List, Tuple
+from typing import Any, Dict, Optional, List, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, or_, and_
+from sqlalchemy import select, func, or_, and_, case
 from sqlalchemy.orm import selectinload
-from app.models import Project, User, WorkItem
+from app.models import Project, WorkItem
 from app.utils.html import sanitize_html
 from app.schemas.project import ProjectCreate, ProjectUpdate, ProjectQuery
 from app.services.sequence_service import sequence_service
+from app.services.version_service import version_service, PROJECTS_SCOPE
+from app.services.user_directory import user_directory
+from app.services.aggregation_service import STATUSES, OPEN_STATUSES
+from app.services.search_service import search_service
 from app.exceptions import AppException, NotFoundException, ForbiddenException, ValidationException
 
 
+# 缓存统计信息的项目数上限
+PROJECT_STATS_CACHE_SIZE = 10000
+
+
 class ProjectService:
     """项目服务"""
+
+    def __init__(self):
+        # 项目ID → (引擎, (代数, 日期), 统计信息)
+        self._stats_cache: "OrderedDict[int, Tuple[Any, tuple, dict]]" = OrderedDict()
     
     async def create_project(
         self, 
@@ -51,6 +64,7 @@ class ProjectService:
         )
         
         session.add(project)
+        project.row_version = await version_service.bump(session, PROJECTS_SCOPE)
         await session.flush()  # 获取ID
         await session.refresh(project)
         
@@ -141,8 +155,14 @@ class ProjectService:
         if not query.include_deleted:
             conditions.append(Project.deleted_at.is_(None))
         
-        # 搜索功能
-        if query.search:
+        # 搜索功能：走全文索引；索引不含已删除项目，包含已删除项目或关键词无可检索字符时用 LIKE
+        matched = None
+        if query.search and not query.include_deleted:
+            matched = search_service.match_ids(query.search, "project")
+        if matched is not None:
+            await search_service.sync(session.bind)
+            conditions.append(Project.id.in_(select(matched.c.entity_id)))
+        elif query.search:
             search_term = f"%{query.search}%"
             conditions.append(
                 or_(
@@ -201,9 +221,8 @@ class ProjectService:
         
         update_data = project_data.dict(exclude_unset=True)
         # 描述单独权限控制：Reporter或demo/admin可编辑；其他字段仍需所有者权限
-        resu = await session.execute(select(User).where(User.id == current_user_id))
-        cu = resu.scalars().first()
-        is_admin = bool(cu and cu.username in ("demo", "admin"))
+        cu = await user_directory.get(session, current_user_id)
+        is_admin = bool(cu and cu["username"] in ("demo", "admin"))
         wants_only_desc = set(update_data.keys()) == {"description"}
         wants_only_priority = set(update_data.keys()) == {"priority"}
         wants_only_label = set(update_data.keys()) == {"label_path"}
@@ -245,10 +264,9 @@ class ProjectService:
                 cp = creator_email.strip()
                 lookup = cp.split("@", 1)[0] if "@" in cp else cp
             if lookup:
-                res = await session.execute(select(User).where(User.email_prefix == lookup))
-                u = res.scalars().first()
+                u = await user_directory.find_by_prefix(session, lookup)
                 if u:
-                    project.creator_id = u.id
+                    project.creator_id = u["id"]
         # Owner解析：优先 owner_id，其次 owner_prefix/owner_email
         owner_id = update_data.pop("owner_id", None)
         owner_prefix = update_data.pop("owner_prefix", None)
@@ -263,10 +281,9 @@ class ProjectService:
                 oe = owner_email.strip()
                 o_lookup = oe.split("@", 1)[0] if "@" in oe else oe
             if o_lookup:
-                res_o = await session.execute(select(User).where(User.email_prefix == o_lookup))
-                o = res_o.scalars().first()
+                o = await user_directory.find_by_prefix(session, o_lookup)
                 if o:
-                    project.owner_id = o.id
+                    project.owner_id = o["id"]
         # 其它字段直接赋值
         for field, value in update_data.items():
             if field == 'description':
@@ -275,6 +292,7 @@ class ProjectService:
                 setattr(project, field, value)
         
         project.updated_at = datetime.utcnow()
+        project.row_version = await version_service.bump(session, PROJECTS_SCOPE)
         await session.flush()
         await session.refresh(project)
         
@@ -310,6 +328,7 @@ class ProjectService:
         project.status = "archived"
         project.updated_at = datetime.utcnow()
         
+        project.row_version = await version_service.bump(session, PROJECTS_SCOPE)
         await session.flush()
         await session.refresh(project)
         
@@ -345,6 +364,7 @@ class ProjectService:
         project.status = "active"
         project.updated_at = datetime.utcnow()
         
+        project.row_version = await version_service.bump(session, PROJECTS_SCOPE)
         await session.flush()
         await session.refresh(project)
         
@@ -372,10 +392,8 @@ class ProjectService:
             return None
         
         # Check if user is admin
-        stmt_user = select(User).where(User.id == current_user_id)
-        result_user = await session.execute(stmt_user)
-        current_user_obj = result_user.scalars().first()
-        is_admin = bool(current_user_obj and current_user_obj.username in ("demo", "admin"))
+        current_user_obj = await user_directory.get(session, current_user_id)
+        is_admin = bool(current_user_obj and current_user_obj["username"] in ("demo", "admin"))
         
         # 权限验证：只有项目所有者或管理员可以删除项目
         if not is_admin and project.owner_id != current_user_id:
@@ -385,6 +403,7 @@ class ProjectService:
         project.deleted_at = datetime.utcnow()
         project.updated_at = datetime.utcnow()
         
+        project.row_version = await version_service.bump(session, PROJECTS_SCOPE)
         await session.flush()
         await session.refresh(project)
         
@@ -424,6 +443,7 @@ class ProjectService:
         project.deleted_at = None
         project.updated_at = datetime.utcnow()
         
+        project.row_version = await version_service.bump(session, PROJECTS_SCOPE)
         await session.flush()
         await session.refresh(project)
         
@@ -442,37 +462,100 @@ class ProjectService:
             project_id: 项目ID
             
         Returns:
-            统计信息字典
+            统计信息字典（结构同 get_projects_statistics 的单项）
         """
         # 检查项目是否存在
         project = await self.get_project(session, project_id)
         if not project:
             raise NotFoundException("项目不存在")
         
-        # 获取工作项统计
-        stmt = select(
-            func.count(WorkItem.id).label('total_count'),
-            func.sum(func.case((WorkItem.status == 'todo', 1), else_=0)).label('todo_count'),
-            func.sum(func.case((WorkItem.status == 'doing', 1), else_=0)).label('doing_count'),
-            func.sum(func.case((WorkItem.status == 'done', 1), else_=0)).label('done_count')
-        ).where(
-            and_(
-                WorkItem.project_id == project_id,
-                WorkItem.deleted_at.is_(None)
-            )
-        )
+        stats = await self.get_projects_statistics(session, [project_id])
+        return stats[project_id]
+
+    async def get_projects_statistics(
+        self,
+        session: AsyncSession,
+        project_ids: List[int],
+        today: Optional[date] = None
+    ) -> Dict[int, dict]:
+        """
+        批量获取项目统计信息
         
-        result = await session.execute(stmt)
-        stats = result.one()
-        
-        return {
-            "project_id": project_id,
-            "total_work_items": stats.total_count or 0,
-            "todo_count": stats.todo_count or 0,
-            "doing_count": stats.doing_count or 0,
-            "done_count": stats.done_count or 0
-        }
+        每个项目的统计按其代数（项目下工作项的最大 row_version）与当天日期缓存：
+        先以一次分组查询读取各项目的代数，只对代数变化的项目以一次按 (项目, 类型, 状态) 的分组查询重算。
+        
+        Args:
+            session: 数据库会话
+            project_ids: 项目ID列表
+            today: 判断逾期的基准日（默认当天）
+            
+        Returns:
+            {项目ID: 统计信息}，不存在的项目不出现在结果中；每项包含各状态条数（*_count）、
+            预计/记录工时合计、逾期条数（overdue_count）以及按 JOB/TASK 拆分的同样指标（by_kind）
+        """
+        today = today or date.today()
+        ids = sorted(set(project_ids))
+        if not ids:
+            return {}
+        res = await session.execute(
+            select(Project.id, func.coalesce(func.max(WorkItem.row_version), 0))
+            .outerjoin(WorkItem, WorkItem.project_id == Project.id)
+            .where(Project.id.in_(ids))
+            .group_by(Project.id)
+        )
+        generations = dict(res.all())
+
+        result: Dict[int, dict] = {}
+        stale: List[int] = []
+        for pid, generation in generations.items():
+            cached = self._stats_cache.get(pid)
+            if cached and cached[0] is session.bind and cached[1] == (generation, today):
+                self._stats_cache.move_to_end(pid)
+                result[pid] = cached[2]
+            else:
+                stale.append(pid)
+
+        if stale:
+            overdue = and_(WorkItem.planned_end_date < today, WorkItem.status.in_(OPEN_STATUSES))
+            res = await session.execute(
+                select(
+                    WorkItem.project_id, WorkItem.kind, WorkItem.status,
+                    func.count(WorkItem.id).label('count'),
+                    func.coalesce(func.sum(WorkItem.estimated_hours), 0.0).label('estimated_hours'),
+                    func.coalesce(func.sum(WorkItem.actual_hours), 0.0).label('actual_hours'),
+                    func.sum(case((overdue, 1), else_=0)).label('overdue_count'),
+                )
+                .where(WorkItem.project_id.in_(stale), WorkItem.deleted_at.is_(None))
+                .group_by(WorkItem.project_id, WorkItem.kind, WorkItem.status)
+            )
+            computed = {pid: self._empty_statistics(pid) for pid in stale}
+            for row in res.all():
+                stats = computed[row.project_id]
+                for target in (stats, stats["by_kind"][row.kind]):
+                    target["total_work_items"] += row.count
+                    target[f"{row.status}_count"] += row.count
+                    target["estimated_hours"] += float(row.estimated_hours)
+                    target["actual_hours"] += float(row.actual_hours)
+                    target["overdue_count"] += row.overdue_count or 0
+            for pid, stats in computed.items():
+                self._stats_cache[pid] = (session.bind, (generations[pid], today), stats)
+                self._stats_cache.move_to_end(pid)
+                result[pid] = stats
+            while len(self._stats_cache) > PROJECT_STATS_CACHE_SIZE:
+                self._stats_cache.popitem(last=False)
+        return result
 
+    @staticmethod
+    def _empty_statistics(project_id: int) -> dict:
+        def metrics() -> dict:
+            return {
+                "total_work_items": 0,
+                **{f"{s}_count": 0 for s in STATUSES},
+                "estimated_hours": 0.0,
+                "actual_hours": 0.0,
+                "overdue_count": 0,
+            }
+        return {"project_id": project_id, **metrics(), "by_kind": {"JOB": metrics(), "TASK": metrics()}}
 
 # 创建全局实例
 project_service = ProjectService()
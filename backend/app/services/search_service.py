@@ -0,0 +1,267 @@
+"""
+全文检索服务 - 基于 SQLite FTS5 的项目、工作项、评论检索
+
+- 索引表 search_index 由 models 中的 DDL 随 create_all 创建；rowid = 实体ID * 4 + 类型编号，便于按实体增删。
+- 中文分词：unicode61 会把连续汉字当成一个词，因此写入前在每个汉字两侧加空格（按字切分），
+  查询时把中文词组转成相邻字的短语查询，任意长度的中文片段都能命中；英文/数字按词匹配，最后一个词按前缀匹配。
+- 同步：以各自的写版本计数器（projects / row_version / comments）为游标，把上次同步之后写入的行重新写入索引
+  （已删除的行从索引移除）。检索前先追平，写路径上不增加任何语句；批量更新、级联、恢复等所有写入方式都被覆盖。
+- 排序：bm25，编号、标题、正文的权重依次降低。
+"""
+import asyncio
+import html
+import logging
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import select, text, tuple_, and_, or_, case, cast, literal, Integer, String
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from app.exceptions import ValidationException
+from app.models import Project, WorkItem, Comment, DataVersion
+from app.services.version_service import (
+    version_service, PROJECTS_SCOPE, ROW_VERSION_SCOPE, COMMENTS_SCOPE,
+    SEARCH_PROJECTS_SCOPE, SEARCH_WORK_ITEMS_SCOPE, SEARCH_COMMENTS_SCOPE,
+)
+
+
+logger = logging.getLogger(__name__)
+
+# 实体类型 → rowid 中的类型编号
+SEARCH_TYPES = {"project": 1, "work_item": 2, "comment": 3}
+# 每次同步读取的行数
+SEARCH_SYNC_CHUNK = 500
+# bm25 权重：code, title, body
+_BM25 = "bm25(search_index, 5.0, 3.0, 1.0)"
+
+_CJK = "㐀-䶿一-鿿豈-﫿"
+_CJK_CHAR = re.compile(f"([{_CJK}])")
+_QUERY_TOKEN = re.compile(f"[{_CJK}]|[^\\W_{_CJK}]+")
+_TAG = re.compile(r"<[^>]+>")
+# snippet 中命中片段的临时标记
+_HL_START, _HL_END = "\x02", "\x03"
+
+
+def segment(value: Optional[str]) -> str:
+    """写入索引前的文本：去掉 HTML 标签，汉字两侧加空格"""
+    if not value:
+        return ""
+    plain = html.unescape(_TAG.sub(" ", value))
+    return _CJK_CHAR.sub(r" \1 ", plain)
+
+
+def build_match(q: str) -> Optional[str]:
+    """
+    将用户输入转成 FTS5 MATCH 表达式：空白分隔的各词之间为 AND，每个词是一个短语，
+    词末为英文/数字时按前缀匹配。没有可检索的字符时返回 None。
+    """
+    phrases = []
+    for term in q.split():
+        tokens = _QUERY_TOKEN.findall(term.lower())
+        if not tokens:
+            continue
+        phrase = '"' + " ".join(tokens) + '"'
+        if not _CJK_CHAR.match(tokens[-1]):
+            phrase += "*"
+        phrases.append(phrase)
+    return " ".join(phrases) or None
+
+
+def _is_cjk(ch: str) -> bool:
+    return bool(_CJK_CHAR.match(ch))
+
+
+def render_snippet(raw: str) -> str:
+    """把 snippet 还原为展示文本：去掉按字切分加入的空格，转义后用 <mark> 标出命中"""
+    out: List[str] = []
+    i, n = 0, len(raw)
+    while i < n:
+        if raw[i].isspace():
+            j = i
+            while j < n and raw[j].isspace():
+                j += 1
+            prev = next((c for c in reversed(out) if c not in (_HL_START, _HL_END)), "")
+            nxt = next((c for c in raw[j:] if c not in (_HL_START, _HL_END)), "")
+            if not (_is_cjk(prev) or _is_cjk(nxt)) and prev and nxt:
+                out.append(" ")
+            i = j
+            continue
+        out.append(raw[i])
+        i += 1
+    escaped = html.escape("".join(out))
+    return escaped.replace(_HL_START, "<mark>").replace(_HL_END, "</mark>")
+
+
+class SearchService:
+    """全文检索服务"""
+
+    def __init__(self):
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def _sources(self):
+        """(类型, 模型, 写版本计数器, 已同步计数器, 查询)；查询列统一为 id, row_version, removed, code, title, body, project_id, ref"""
+        target = WorkItem.__table__.alias("comment_target")
+        return (
+            ("project", Project, PROJECTS_SCOPE, SEARCH_PROJECTS_SCOPE, select(
+                Project.id, Project.row_version, Project.deleted_at.is_not(None).label("removed"),
+                Project.code, Project.name.label("title"), Project.description.label("body"),
+                Project.id.label("project_id"), Project.status.label("ref"),
+            )),
+            ("work_item", WorkItem, ROW_VERSION_SCOPE, SEARCH_WORK_ITEMS_SCOPE, select(
+                WorkItem.id, WorkItem.row_version,
+                or_(WorkItem.deleted_at.is_not(None), WorkItem.status == 'deleted').label("removed"),
+                WorkItem.code, WorkItem.title, WorkItem.description.label("body"),
+                WorkItem.project_id, WorkItem.kind.label("ref"),
+            )),
+            # 评论：所属项目取自评论对象（工作项评论经联表取其项目），ref 为 "对象类型:对象ID"
+            ("comment", Comment, COMMENTS_SCOPE, SEARCH_COMMENTS_SCOPE, select(
+                Comment.id, Comment.row_version, Comment.deleted_at.is_not(None).label("removed"),
+                literal("").label("code"), literal("").label("title"), Comment.content.label("body"),
+                case((Comment.entity_type == 'project', Comment.entity_id), else_=target.c.project_id).label("project_id"),
+                (Comment.entity_type + ":" + cast(Comment.entity_id, String)).label("ref"),
+            ).outerjoin(target, and_(Comment.entity_type == 'work_item', target.c.id == Comment.entity_id))),
+        )
+
+    async def sync(self, bind: AsyncEngine) -> int:
+        """
+        将上次同步之后写入的项目、工作项、评论写入索引（独立会话中执行并提交，并发调用串行）
+
+        Returns:
+            重新索引的行数
+        """
+        async with self._lock:
+            async with AsyncSession(bind) as session:
+                total = await self._sync(session)
+                await session.commit()
+            return total
+
+    async def _sync(self, session: AsyncSession) -> int:
+        sources = self._sources()
+        scopes = [s for _, _, scope, applied, _ in sources for s in (scope, applied)]
+        res = await session.execute(select(DataVersion.scope, DataVersion.value).where(DataVersion.scope.in_(scopes)))
+        values = dict(res.all())
+        total = 0
+        for name, model, scope, applied_scope, stmt in sources:
+            head = values.get(scope, 0)
+            if applied_scope in values:
+                if values[applied_scope] >= head:
+                    continue
+                pos: Tuple[int, int] = (values[applied_scope], 0)
+            else:
+                # 从未同步过：包括写版本为 0 的存量数据
+                pos = (-1, 0)
+            total += await self._index_source(session, name, model, stmt, pos, head)
+            await version_service.assign(session, applied_scope, head)
+        return total
+
+    async def _index_source(self, session: AsyncSession, name: str, model, stmt, pos: Tuple[int, int], head: int) -> int:
+        type_code = SEARCH_TYPES[name]
+        count = 0
+        while True:
+            page = (await session.execute(
+                stmt.where(tuple_(model.row_version, model.id) > tuple_(*pos), model.row_version <= head)
+                .order_by(model.row_version, model.id)
+                .limit(SEARCH_SYNC_CHUNK)
+            )).all()
+            if not page:
+                return count
+            rowids = [r.id * 4 + type_code for r in page]
+            await session.execute(
+                text(f"DELETE FROM search_index WHERE rowid IN ({', '.join(str(r) for r in rowids)})")
+            )
+            rows = [
+                {
+                    "rowid": r.id * 4 + type_code, "code": r.code or "", "title": segment(r.title), "body": segment(r.body),
+                    "entity_type": name, "entity_id": r.id, "project_id": r.project_id, "ref": r.ref,
+                }
+                for r in page if not r.removed
+            ]
+            if rows:
+                await session.execute(text(
+                    "INSERT INTO search_index (rowid, code, title, body, entity_type, entity_id, project_id, ref) "
+                    "VALUES (:rowid, :code, :title, :body, :entity_type, :entity_id, :project_id, :ref)"
+                ), rows)
+            count += len(page)
+            last = page[-1]
+            pos = (last.row_version, last.id)
+            if len(page) < SEARCH_SYNC_CHUNK:
+                return count
+
+    def parse_types(self, types: Optional[str]) -> List[str]:
+        """解析逗号分隔的实体类型（为空时为全部）"""
+        parsed = [t.strip() for t in (types or "").split(",") if t.strip()]
+        for t in parsed:
+            if t not in SEARCH_TYPES:
+                raise ValidationException("不支持的检索类型", details={"type": t, "supported": list(SEARCH_TYPES)})
+        return parsed or list(SEARCH_TYPES)
+
+    def match_ids(self, q: str, entity_type: str):
+        """
+        命中 q 的某类实体ID子查询（供列表接口替代 LIKE 搜索）；q 中没有可检索的字符时返回 None
+        """
+        match = build_match(q)
+        if match is None:
+            return None
+        return (
+            text("SELECT entity_id FROM search_index WHERE search_index MATCH :match AND entity_type = :entity_type")
+            .bindparams(match=match, entity_type=entity_type)
+            .columns(entity_id=Integer)
+            .subquery()
+        )
+
+    async def search(self, session: AsyncSession, q: str, types: Sequence[str], page: int, size: int) -> Dict:
+        """
+        检索并按相关度分页返回
+
+        Returns:
+            {"total": 命中总数, "items": [{"type", "id", "code", "title", "snippet", "project_id", "ref", "score"}]}
+        """
+        await self.sync(session.bind)
+        match = build_match(q)
+        if match is None:
+            return {"total": 0, "items": []}
+        codes = ", ".join(str(SEARCH_TYPES[t]) for t in types)
+        where = f"search_index MATCH :match AND (rowid % 4) IN ({codes})"
+        total = (await session.execute(text(f"SELECT count(*) FROM search_index WHERE {where}"), {"match": match})).scalar_one()
+        res = await session.execute(text(
+            f"SELECT entity_type, entity_id, code, project_id, ref, {_BM25} AS score, "
+            f"highlight(search_index, 1, '{_HL_START}', '{_HL_END}') AS title, "
+            f"snippet(search_index, -1, '{_HL_START}', '{_HL_END}', '…', 16) AS snippet "
+            f"FROM search_index WHERE {where} ORDER BY score LIMIT :limit OFFSET :offset"
+        ), {"match": match, "limit": size, "offset": (page - 1) * size})
+        items = [
+            {
+                "type": r.entity_type,
+                "id": r.entity_id,
+                "code": r.code or None,
+                "title": render_snippet(r.title) or None,
+                "snippet": render_snippet(r.snippet),
+                "project_id": r.project_id,
+                "ref": r.ref,
+                "score": round(-r.score, 4),
+            }
+            for r in res.all()
+        ]
+        return {"total": total, "items": items}
+
+    async def startup(self, bind: AsyncEngine):
+        """启动时在后台补建索引（首次启动为全量）"""
+        async def build():
+            try:
+                count = await self.sync(bind)
+                if count:
+                    logger.info("全文检索索引已同步 %d 行", count)
+            except Exception:
+                logger.exception("同步全文检索索引失败")
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(build())
+
+    async def stop(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+
+# 创建全局实例
+search_service = SearchService()
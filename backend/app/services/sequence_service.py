@@ -1,78 +1,160 @@
 """
-全局编号服务 - 事务生成唯一编号（PRO/JOB/TASK）
+全局编号服务 - 号段预留生成唯一编号（PRO/JOB/TASK）
+
+编号通过一条原子的 UPDATE ... RETURNING 在独立短事务中按号段（hi/lo）预留，
+预留结果缓存在本进程内存中逐个发放。多个 uvicorn worker 各自持有互不重叠的号段，
+调用方的事务边界不受影响（不会替调用方提交）。
 """
 import asyncio
-from typing import Optional
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
-from sqlalchemy.exc import IntegrityError
+from typing import Dict, List, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession, AsyncConnection
+from sqlalchemy import update, func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from app.config import SEQUENCE_BLOCK_SIZE
 from app.models import Sequence
 
 
+VALID_PREFIXES = ('PRO', 'JOB', 'TASK')
+
+
 class SequenceService:
     """全局编号服务"""
-    
-    def __init__(self):
-        self._lock = asyncio.Lock()
-    
+
+    def __init__(self, block_size: int = SEQUENCE_BLOCK_SIZE):
+        if block_size < 1:
+            raise ValueError("号段大小必须大于0")
+        self.block_size = block_size
+        self._locks: Dict[str, asyncio.Lock] = {}
+        # prefix -> (下一个可用值, 号段上限)，闭区间
+        self._blocks: Dict[str, Tuple[int, int]] = {}
+
+    def _validate_prefix(self, prefix: str):
+        if prefix not in VALID_PREFIXES:
+            raise ValueError(f"无效的前缀: {prefix}. 必须是 'PRO', 'JOB', 或 'TASK'")
+
+    def _lock_for(self, prefix: str) -> asyncio.Lock:
+        lock = self._locks.get(prefix)
+        if lock is None:
+            lock = self._locks[prefix] = asyncio.Lock()
+        return lock
+
+    @staticmethod
+    def _format(prefix: str, value: int) -> str:
+        return f"{prefix}-{value:04d}"
+
+    async def _increment(self, conn: AsyncConnection, prefix: str, size: int) -> int:
+        """原子地将序列增加 size，返回增加后的值（即本次预留区间的上限）"""
+        stmt = (
+            update(Sequence)
+            .where(Sequence.prefix == prefix)
+            .values(current_value=Sequence.current_value + size, updated_at=func.now())
+            .returning(Sequence.current_value)
+        )
+        hi = (await conn.execute(stmt)).scalar_one_or_none()
+        if hi is None:
+            # 首次使用该前缀：并发插入时由 ON CONFLICT 去重，再执行一次自增
+            await conn.execute(
+                sqlite_insert(Sequence).values(prefix=prefix, current_value=0).on_conflict_do_nothing(index_elements=["prefix"])
+            )
+            hi = (await conn.execute(stmt)).scalar_one()
+        return hi
+
+    async def _must_use_caller_transaction(self, session: AsyncSession) -> bool:
+        """
+        是否只能在调用方事务内预留：
+        会话未绑定引擎（无法开启独立连接），或调用方连接已开启SQLite写事务（独立连接会等待写锁直至超时）
+        """
+        if session.bind is None:
+            return True
+        if not session.in_transaction():
+            return False
+        conn = await session.connection()
+        raw = await conn.get_raw_connection()
+        return bool(getattr(raw.driver_connection, "in_transaction", False))
+
     async def generate_code(self, session: AsyncSession, prefix: str) -> str:
         """
         生成唯一编号
-        
+
         Args:
             session: 数据库会话
             prefix: 编号前缀 ('PRO', 'JOB', 'TASK')
-            
+
         Returns:
             生成的唯一编号 (如: PRO-0001, JOB-0001, TASK-0001)
-            
+
         Raises:
             ValueError: 如果前缀无效
         """
-        if prefix not in ['PRO', 'JOB', 'TASK']:
-            raise ValueError(f"无效的前缀: {prefix}. 必须是 'PRO', 'JOB', 或 'TASK'")
-        
-        async with self._lock:
-            # 获取或创建序列
-            sequence = await session.get(Sequence, prefix)
-            
-            if not sequence:
-                # 创建新的序列，起始值为0（生成编号从0001开始）
-                sequence = Sequence(prefix=prefix, current_value=0)
-                session.add(sequence)
-                await session.flush()
-            
-            # 增加序列值
-            sequence.current_value += 1
-            
-            # 生成编号，格式为: PREFIX-XXXX
-            code = f"{prefix}-{sequence.current_value:04d}"
-            
-            # 提交事务
-            await session.commit()
-            
-            return code
-    
+        codes = await self.reserve_codes(session, prefix, 1)
+        return codes[0]
+
+    async def reserve_codes(self, session: AsyncSession, prefix: str, n: int) -> List[str]:
+        """
+        批量预留 n 个连续发放的编号，最多一次数据库往返
+
+        本地号段不足时，一次性预留 (缺口 + block_size - 1) 个值，剩余部分留作后续发放。
+        若调用方已持有SQLite写锁，则改为在调用方事务内精确预留 n 个值（随其提交或回滚），
+        不写入本地号段缓存。
+
+        目前项目与工作项都只有逐个创建的入口（经 generate_code 以 n=1 调用）；
+        今后新增批量创建或导入时，应先按条数调用一次 reserve_codes 再逐条赋值，而不是逐条 generate_code。
+
+        Args:
+            session: 数据库会话
+            prefix: 编号前缀 ('PRO', 'JOB', 'TASK')
+            n: 需要的编号数量
+
+        Returns:
+            按递增顺序排列的编号列表
+        """
+        self._validate_prefix(prefix)
+        if n <= 0:
+            return []
+
+        if await self._must_use_caller_transaction(session):
+            hi = await self._increment(await session.connection(), prefix, n)
+            return [self._format(prefix, v) for v in range(hi - n + 1, hi + 1)]
+
+        async with self._lock_for(prefix):
+            next_value, hi = self._blocks.get(prefix, (1, 0))
+            values = list(range(next_value, min(hi, next_value + n - 1) + 1))
+            missing = n - len(values)
+            if missing > 0:
+                size = missing + self.block_size - 1
+                async with session.bind.begin() as conn:
+                    new_hi = await self._increment(conn, prefix, size)
+                new_lo = new_hi - size + 1
+                values.extend(range(new_lo, new_lo + missing))
+                next_value, hi = new_lo + missing, new_hi
+            else:
+                next_value += n
+            self._blocks[prefix] = (next_value, hi)
+            return [self._format(prefix, v) for v in values]
+
     async def get_next_value(self, session: AsyncSession, prefix: str) -> int:
         """
         获取下一个序列值（不增加）
-        
+
         Args:
             session: 数据库会话
             prefix: 编号前缀
-            
+
         Returns:
             下一个序列值
         """
+        next_value, hi = self._blocks.get(prefix, (1, 0))
+        if next_value <= hi:
+            return next_value
         sequence = await session.get(Sequence, prefix)
         if not sequence:
             return 1  # 默认下一个值（从0001开始）
         return sequence.current_value + 1
-    
+
     async def reset_sequence(self, session: AsyncSession, prefix: str, start_value: int = 0):
         """
         重置序列值（仅用于测试或维护）
-        
+
         Args:
             session: 数据库会话
             prefix: 编号前缀
@@ -84,8 +166,10 @@ class SequenceService:
         else:
             sequence = Sequence(prefix=prefix, current_value=start_value)
             session.add(sequence)
-        
+
         await session.commit()
+        # 丢弃本进程缓存的号段，下次从新的起始值预留
+        self._blocks.pop(prefix, None)
 
 
 # 创建全局实例
@@ -0,0 +1,237 @@
+"""
+项目快照服务 - 按天记录每个项目的各状态条数与工时合计，燃尽图与累积流图直接读快照
+
+- 增量：以工作项写版本（row_version）为变更游标，只重算上次快照之后有写入（状态变化、新建、删除、工时修改）的项目，
+  按项目分组一次查询算出计数与工时，写入 (项目, 当天) 一行；已处理到的版本记在 data_versions 的 snapshot_applied 中。
+- 稀疏存储：当天没有变化的项目不写行，取序列时沿用该日之前最近的一行，一年的序列是一次按 (项目, 日期) 的范围扫描。
+- 快照在后台每 SNAPSHOT_INTERVAL 秒执行一次，每天的行反映当天最后一次快照时的状态；日期按北京时间。
+"""
+import asyncio
+import logging
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Sequence
+from sqlalchemy import select, func, case, and_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from app.config import SNAPSHOT_INTERVAL
+from app.exceptions import NotFoundException, ValidationException
+from app.models import Project, ProjectSnapshot, WorkItem
+from app.services.version_service import version_service, ROW_VERSION_SCOPE, SNAPSHOT_APPLIED_SCOPE
+from app.utils.timezone import now_cst
+
+
+logger = logging.getLogger(__name__)
+
+# 快照中分别计数的状态
+SNAPSHOT_STATUSES = ("todo", "doing", "blocked", "done", "cancelled")
+# 视为已结束（不计入剩余工作）的状态
+CLOSED_STATUSES = ("done", "cancelled")
+# 每次分组查询的项目数
+SNAPSHOT_CHUNK = 500
+# 一次可查询的最大天数
+MAX_SERIES_DAYS = 366 * 3
+
+_METRICS = ("total_count", *(f"{s}_count" for s in SNAPSHOT_STATUSES), "estimated_hours", "actual_hours", "remaining_hours")
+
+
+def snapshot_day() -> date:
+    """当前快照日期（北京时间）"""
+    return now_cst().date()
+
+
+class SnapshotService:
+    """项目快照服务"""
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    def _counts_stmt(self, project_ids: Sequence[int]):
+        return (
+            select(
+                WorkItem.project_id,
+                func.count(WorkItem.id).label("total_count"),
+                *[func.sum(case((WorkItem.status == s, 1), else_=0)).label(f"{s}_count") for s in SNAPSHOT_STATUSES],
+                func.coalesce(func.sum(WorkItem.estimated_hours), 0.0).label("estimated_hours"),
+                func.coalesce(func.sum(WorkItem.actual_hours), 0.0).label("actual_hours"),
+                func.coalesce(func.sum(case((WorkItem.status.not_in(CLOSED_STATUSES), WorkItem.estimated_hours), else_=0.0)), 0.0)
+                .label("remaining_hours"),
+            )
+            .where(WorkItem.project_id.in_(project_ids), WorkItem.deleted_at.is_(None), WorkItem.status != 'deleted')
+            .group_by(WorkItem.project_id)
+        )
+
+    async def take(self, session: AsyncSession, day: Optional[date] = None) -> int:
+        """
+        为自上次快照以来有工作项写入的项目写入 day 当天的快照（在调用方事务内，由调用方提交）
+
+        首次执行（尚无进度）时为全部未删除项目写入快照。
+
+        Args:
+            session: 数据库会话
+            day: 快照日期（默认当天）
+
+        Returns:
+            写入快照的项目数
+        """
+        day = day or snapshot_day()
+        applied, head = await version_service.current_many(session, SNAPSHOT_APPLIED_SCOPE, ROW_VERSION_SCOPE)
+        # 尚无进度且快照表为空时首次全量
+        initial = not applied and not (await session.execute(select(ProjectSnapshot.project_id).limit(1))).first()
+        if not initial and applied >= head:
+            return 0
+        if not initial:
+            stmt = (
+                select(WorkItem.project_id).distinct()
+                .where(WorkItem.row_version > applied, WorkItem.row_version <= head)
+            )
+        else:
+            stmt = select(Project.id).where(Project.deleted_at.is_(None))
+        project_ids = sorted((await session.execute(stmt)).scalars().all())
+
+        for i in range(0, len(project_ids), SNAPSHOT_CHUNK):
+            chunk = project_ids[i:i + SNAPSHOT_CHUNK]
+            counts = {r.project_id: r for r in (await session.execute(self._counts_stmt(chunk))).all()}
+            rows = []
+            for pid in chunk:
+                r = counts.get(pid)
+                rows.append({"project_id": pid, "day": day, **{m: (getattr(r, m) or 0) if r else 0 for m in _METRICS}})
+            stmt = sqlite_insert(ProjectSnapshot).values(rows)
+            await session.execute(stmt.on_conflict_do_update(
+                index_elements=["project_id", "day"], set_={m: getattr(stmt.excluded, m) for m in _METRICS}
+            ))
+        await version_service.assign(session, SNAPSHOT_APPLIED_SCOPE, head)
+        return len(project_ids)
+
+    async def series(self, session: AsyncSession, start: date, end: date,
+                     project_id: Optional[int] = None) -> List[Dict]:
+        """
+        按天汇总快照（无快照的日期沿用之前最近一天的值）
+
+        Args:
+            session: 数据库会话
+            start: 起始日期（含）
+            end: 结束日期（含）
+            project_id: 仅统计该项目；为空时汇总全部未删除项目
+
+        Returns:
+            每天一条：{"date", "total_count", "todo_count", ..., "estimated_hours", "actual_hours", "remaining_hours"}
+        """
+        if start > end:
+            raise ValidationException("开始日期不能晚于结束日期", details={"start": start.isoformat(), "end": end.isoformat()})
+        if (end - start).days >= MAX_SERIES_DAYS:
+            raise ValidationException("查询范围过大", details={"max_days": MAX_SERIES_DAYS})
+
+        scope = [Project.deleted_at.is_(None)]
+        if project_id is not None:
+            scope.append(ProjectSnapshot.project_id == project_id)
+        columns = [ProjectSnapshot.project_id, ProjectSnapshot.day, *[getattr(ProjectSnapshot, m) for m in _METRICS]]
+
+        # 起始日之前每个项目最近的一行作为初值
+        latest = (
+            select(ProjectSnapshot.project_id, func.max(ProjectSnapshot.day).label("day"))
+            .join(Project, ProjectSnapshot.project_id == Project.id)
+            .where(*scope, ProjectSnapshot.day < start)
+            .group_by(ProjectSnapshot.project_id)
+            .subquery()
+        )
+        base = (await session.execute(
+            select(*columns).join(latest, and_(ProjectSnapshot.project_id == latest.c.project_id,
+                                               ProjectSnapshot.day == latest.c.day))
+        )).all()
+        rows = (await session.execute(
+            select(*columns)
+            .join(Project, ProjectSnapshot.project_id == Project.id)
+            .where(*scope, ProjectSnapshot.day >= start, ProjectSnapshot.day <= end)
+            .order_by(ProjectSnapshot.day, ProjectSnapshot.project_id)
+        )).all()
+
+        current: Dict[int, tuple] = {r.project_id: tuple(getattr(r, m) for m in _METRICS) for r in base}
+        totals = [sum(v[i] for v in current.values()) for i in range(len(_METRICS))]
+        points: List[Dict] = []
+        idx = 0
+        day = start
+        while day <= end:
+            # 当天有快照的项目：以新值替换旧值
+            while idx < len(rows) and rows[idx].day == day:
+                r = rows[idx]
+                values = tuple(getattr(r, m) for m in _METRICS)
+                old = current.get(r.project_id)
+                for i, v in enumerate(values):
+                    totals[i] += v - (old[i] if old else 0)
+                current[r.project_id] = values
+                idx += 1
+            point = {"date": day.isoformat()}
+            for name, value in zip(_METRICS, totals):
+                point[name] = round(value, 2) if isinstance(value, float) else value
+            points.append(point)
+            day += timedelta(days=1)
+        return points
+
+    async def burndown(self, session: AsyncSession, project_id: int, start: date, end: date) -> Dict:
+        """
+        燃尽图：每天的剩余工作项数与剩余预计工时，以及从起始日剩余工时线性降到 0 的理想线
+        """
+        project = await session.get(Project, project_id)
+        if not project or project.deleted_at is not None:
+            raise NotFoundException("项目不存在")
+        points = await self.series(session, start, end, project_id)
+        days = len(points) - 1
+        first = points[0]["remaining_hours"] if points else 0.0
+        return {
+            "project_id": project_id,
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "points": [
+                {
+                    "date": p["date"],
+                    "total_count": p["total_count"],
+                    "remaining_count": p["total_count"] - p["done_count"] - p["cancelled_count"],
+                    "remaining_hours": p["remaining_hours"],
+                    "ideal_hours": round(first * (days - i) / days, 2) if days else first,
+                }
+                for i, p in enumerate(points)
+            ],
+        }
+
+    async def cumulative_flow(self, session: AsyncSession, start: date, end: date,
+                              project_id: Optional[int] = None) -> Dict:
+        """累积流图：每天各状态的工作项数"""
+        points = await self.series(session, start, end, project_id)
+        return {
+            "project_id": project_id,
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "statuses": list(SNAPSHOT_STATUSES),
+            "points": [{"date": p["date"], **{s: p[f"{s}_count"] for s in SNAPSHOT_STATUSES}} for p in points],
+        }
+
+    async def run_once(self, bind: AsyncEngine) -> int:
+        """在独立会话中执行一次快照并提交"""
+        async with AsyncSession(bind) as session:
+            count = await self.take(session)
+            await session.commit()
+        return count
+
+    def start(self, bind: AsyncEngine, interval: float = SNAPSHOT_INTERVAL):
+        """后台定期快照（启动时先执行一次）"""
+        async def loop():
+            while True:
+                try:
+                    await self.run_once(bind)
+                except Exception:
+                    logger.exception("写入项目快照失败")
+                await asyncio.sleep(interval)
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(loop())
+
+    async def stop(self):
+        """停止后台快照"""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+
+# 创建全局实例
+snapshot_service = SnapshotService()
@@ -0,0 +1,180 @@
+"""
+用户目录服务 - 进程内缓存用户展示信息，替代各路由中逐行查询 User
+
+缓存包含 id→{username, email_prefix, full_name, avatar_key, is_active} 以及 email_prefix / username 索引。
+一致性依赖 data_versions 中的 users 变更代数：每个数据库会话最多读取一次代数（主键查询），
+代数变化时整体重载；未见过的ID或前缀（如启动时预置、未经接口写入的新用户）按需补查。
+
+联想搜索（suggest）使用同一份缓存上的前缀索引：username、email_prefix、full_name 以及姓名拼音首字母
+（pypinyin）统一转小写后排序，前缀查找为二分定位加顺序扫描；缓存变化后在下次联想时重建。
+"""
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from pypinyin import lazy_pinyin, Style
+from app.models import User
+from app.services.version_service import version_service, USERS_SCOPE
+
+
+_COLUMNS = (User.id, User.username, User.email_prefix, User.full_name, User.avatar_key, User.is_active)
+# 同一会话内只校验一次代数
+_CHECKED_KEY = "user_directory_checked"
+
+
+def pinyin_initials(name: Optional[str]) -> str:
+    """姓名的拼音首字母（如 张三 → zs）；无汉字时为空"""
+    if not name:
+        return ""
+    initials = "".join(lazy_pinyin(name, style=Style.FIRST_LETTER, errors="ignore")).lower()
+    return initials if initials != name.lower() else ""
+
+
+class UserDirectory:
+    """用户目录服务"""
+
+    def __init__(self):
+        self._by_id: Dict[int, Dict[str, Any]] = {}
+        self._by_prefix: Dict[str, int] = {}
+        self._by_username: Dict[str, int] = {}
+        self._generation: Optional[int] = None
+        # 联想索引：按 key 排序的 (小写 key, 字段优先级, 用户ID)，缓存变化时置空
+        self._suggest_keys: Optional[List[Tuple[str, int, int]]] = None
+        # 缓存所属的数据库引擎（测试或多库场景下切换引擎时重建）
+        self._bind = None
+
+    def invalidate(self):
+        """丢弃缓存，下次访问时重载（用户信息写入并提交后调用）"""
+        self._by_id.clear()
+        self._by_prefix.clear()
+        self._by_username.clear()
+        self._generation = None
+        self._suggest_keys = None
+
+    def _put(self, row) -> Dict[str, Any]:
+        uid, username, email_prefix, full_name, avatar_key, is_active = row
+        old = self._by_id.get(uid)
+        if old:
+            self._by_prefix.pop(old["email_prefix"], None)
+            self._by_username.pop(old["username"], None)
+        entry = {
+            "id": uid,
+            "username": username,
+            "email_prefix": email_prefix,
+            "full_name": full_name,
+            "avatar_key": avatar_key,
+            "is_active": bool(is_active),
+        }
+        self._by_id[uid] = entry
+        self._by_prefix[email_prefix] = uid
+        self._by_username[username] = uid
+        self._suggest_keys = None
+        return entry
+
+    async def _ensure_fresh(self, session: AsyncSession):
+        if self._bind is not session.bind:
+            self.invalidate()
+            self._bind = session.bind
+        elif self._generation is not None and session.info.get(_CHECKED_KEY):
+            return
+        generation = await version_service.current(session, USERS_SCOPE)
+        if generation != self._generation:
+            rows = (await session.execute(select(*_COLUMNS))).all()
+            self.invalidate()
+            for row in rows:
+                self._put(row)
+            self._generation = generation
+        session.info[_CHECKED_KEY] = True
+
+    async def get_many(self, session: AsyncSession, ids: Iterable[Optional[int]]) -> Dict[int, Dict[str, Any]]:
+        """
+        批量获取用户展示信息
+
+        Args:
+            session: 数据库会话
+            ids: 用户ID（忽略 None）
+
+        Returns:
+            id → 用户信息，不存在的ID不出现在结果中
+        """
+        await self._ensure_fresh(session)
+        wanted = {i for i in ids if i}
+        missing = [i for i in wanted if i not in self._by_id]
+        if missing:
+            for row in (await session.execute(select(*_COLUMNS).where(User.id.in_(missing)))).all():
+                self._put(row)
+        return {i: self._by_id[i] for i in wanted if i in self._by_id}
+
+    async def get(self, session: AsyncSession, user_id: Optional[int]) -> Optional[Dict[str, Any]]:
+        """获取单个用户展示信息"""
+        if not user_id:
+            return None
+        return (await self.get_many(session, [user_id])).get(user_id)
+
+    async def find_by_prefix(self, session: AsyncSession, email_prefix: str) -> Optional[Dict[str, Any]]:
+        """按邮箱前缀查找用户"""
+        await self._ensure_fresh(session)
+        uid = self._by_prefix.get(email_prefix)
+        if uid is None:
+            row = (await session.execute(select(*_COLUMNS).where(User.email_prefix == email_prefix))).first()
+            return self._put(row) if row else None
+        return self._by_id[uid]
+
+    async def find_by_username(self, session: AsyncSession, username: str) -> Optional[Dict[str, Any]]:
+        """按用户名查找用户"""
+        await self._ensure_fresh(session)
+        uid = self._by_username.get(username)
+        if uid is None:
+            row = (await session.execute(select(*_COLUMNS).where(User.username == username))).first()
+            return self._put(row) if row else None
+        return self._by_id[uid]
+
+    def _build_suggest_keys(self) -> List[Tuple[str, int, int]]:
+        keys = []
+        for uid, entry in self._by_id.items():
+            # 顺序即字段优先级：邮箱前缀、用户名、姓名、拼音首字母
+            values = (entry["email_prefix"], entry["username"], entry["full_name"], pinyin_initials(entry["full_name"]))
+            for rank, value in enumerate(values):
+                if value:
+                    keys.append((value.lower(), rank, uid))
+        keys.sort()
+        return keys
+
+    async def suggest(self, session: AsyncSession, q: str, limit: int = 10,
+                      include_inactive: bool = False) -> List[Dict[str, Any]]:
+        """
+        按前缀联想用户（负责人选择器等）
+
+        Args:
+            session: 数据库会话
+            q: 输入的前缀（不区分大小写），匹配 username、email_prefix、full_name、姓名拼音首字母
+            limit: 最多返回条数
+            include_inactive: 是否包含已停用用户
+
+        Returns:
+            用户信息列表：完全匹配在前，其次按命中字段（邮箱前缀、用户名、姓名、拼音）与用户名排序
+        """
+        await self._ensure_fresh(session)
+        prefix = q.strip().lower()
+        if not prefix:
+            return []
+        if self._suggest_keys is None:
+            self._suggest_keys = self._build_suggest_keys()
+        keys = self._suggest_keys
+        best: Dict[int, Tuple[bool, int]] = {}
+        i = bisect_left(keys, (prefix,))
+        while i < len(keys) and keys[i][0].startswith(prefix):
+            key, rank, uid = keys[i]
+            i += 1
+            entry = self._by_id[uid]
+            if not include_inactive and not entry["is_active"]:
+                continue
+            order = (key != prefix, rank)
+            if uid not in best or order < best[uid]:
+                best[uid] = order
+        ranked = sorted(best, key=lambda uid: (best[uid], self._by_id[uid]["username"]))
+        return [self._by_id[uid] for uid in ranked[:limit]]
+
+
+# 创建全局实例
+user_directory = UserDirectory()
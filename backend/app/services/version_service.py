@@ -0,0 +1,127 @@
+"""
+数据版本服务 - 维护 data_versions 表中的单调递增计数器
+
+计数器在调用方事务内通过 UPDATE ... RETURNING 原子递增，随调用方一起提交或回滚。
+SQLite 同一时刻只有一个写事务，递增会持有写锁直到提交，因此版本号的分配顺序与提交顺序一致：
+客户端以已见到的最大版本号为游标增量拉取时，不会漏掉之后才提交的较小版本。
+"""
+from datetime import datetime
+from typing import Iterable
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from app.models import DataVersion, WorkItem
+
+
+# 工作项写版本计数器
+ROW_VERSION_SCOPE = "row_version"
+# 用户信息（姓名、前缀、启用状态等）的变更代数
+USERS_SCOPE = "users"
+# 项目的变更代数（同时作为 projects.row_version）
+PROJECTS_SCOPE = "projects"
+# 评论写版本计数器（comments.row_version）
+COMMENTS_SCOPE = "comments"
+# 节假日日历版本
+CALENDAR_SCOPE = "calendar"
+# 已完成工时重算的日历版本
+CALENDAR_APPLIED_SCOPE = "calendar_applied"
+# 项目每日快照已处理到的工作项写版本
+SNAPSHOT_APPLIED_SCOPE = "snapshot_applied"
+# 全文检索索引已同步到的项目/工作项/评论写版本
+SEARCH_PROJECTS_SCOPE = "search_projects"
+SEARCH_WORK_ITEMS_SCOPE = "search_work_items"
+SEARCH_COMMENTS_SCOPE = "search_comments"
+
+
+class VersionService:
+    """数据版本服务"""
+
+    async def bump(self, session: AsyncSession, scope: str) -> int:
+        """
+        在调用方事务内将计数器加一
+
+        Args:
+            session: 数据库会话
+            scope: 计数器名称
+
+        Returns:
+            递增后的值
+        """
+        stmt = (
+            update(DataVersion)
+            .where(DataVersion.scope == scope)
+            .values(value=DataVersion.value + 1, updated_at=func.now())
+            .returning(DataVersion.value)
+        )
+        value = (await session.execute(stmt)).scalar_one_or_none()
+        if value is None:
+            await session.execute(
+                sqlite_insert(DataVersion).values(scope=scope, value=0).on_conflict_do_nothing(index_elements=["scope"])
+            )
+            value = (await session.execute(stmt)).scalar_one()
+        return value
+
+    async def assign(self, session: AsyncSession, scope: str, value: int):
+        """
+        在调用方事务内将计数器设为指定值（用于记录处理进度，而非分配新版本）
+
+        Args:
+            session: 数据库会话
+            scope: 计数器名称
+            value: 目标值
+        """
+        stmt = sqlite_insert(DataVersion).values(scope=scope, value=value)
+        await session.execute(stmt.on_conflict_do_update(
+            index_elements=["scope"], set_={"value": stmt.excluded.value, "updated_at": func.now()}
+        ))
+
+    async def current(self, session: AsyncSession, scope: str) -> int:
+        """
+        读取计数器当前值（不存在时为0）
+
+        Args:
+            session: 数据库会话
+            scope: 计数器名称
+
+        Returns:
+            当前值
+        """
+        res = await session.execute(select(DataVersion.value).where(DataVersion.scope == scope))
+        return res.scalar_one_or_none() or 0
+
+    async def current_many(self, session: AsyncSession, *scopes: str) -> tuple:
+        """
+        一次查询读取多个计数器
+
+        Args:
+            session: 数据库会话
+            scopes: 计数器名称
+
+        Returns:
+            与 scopes 顺序一致的当前值元组
+        """
+        res = await session.execute(select(DataVersion.scope, DataVersion.value).where(DataVersion.scope.in_(scopes)))
+        values = dict(res.all())
+        return tuple(values.get(scope, 0) for scope in scopes)
+
+    async def stamp_work_items(self, session: AsyncSession, items: Iterable[WorkItem]) -> int:
+        """
+        为同一事务内写入的工作项分配新的 row_version 并刷新 updated_at
+
+        Args:
+            session: 数据库会话
+            items: 本次写入的工作项
+
+        Returns:
+            分配的版本号
+        """
+        version = await self.bump(session, ROW_VERSION_SCOPE)
+        now = datetime.utcnow()
+        for wi in items:
+            wi.row_version = version
+            wi.updated_at = now
+        return version
+
+
+# 创建全局实例
+version_service = VersionService()
@@ -1,11 +1,15 @@
 from datetime import datetime
-from typing import Optional
+from typing import Dict, List, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from app.models import WorkItem, Project, User, AuditLog
+from sqlalchemy import select, insert, update, and_, or_
+from sqlalchemy.orm.attributes import set_committed_value
+from app.models import WorkItem, Project, AuditLog
 from app.utils.worktime import compute_estimated_hours, compute_actual_hours
 from app.utils.timezone import now_cst
 from app.services.sequence_service import sequence_service
+from app.services.version_service import version_service, ROW_VERSION_SCOPE
+from app.services.user_directory import user_directory
+from app.services.job_rollup_service import job_rollup_service
 from app.exceptions import ValidationException, NotFoundException, ForbiddenException
 from app.utils.html import sanitize_html
 
@@ -61,10 +65,9 @@ class WorkItemService:
                 p = assignee_email.strip()
                 lookup_prefix = p.split("@", 1)[0] if "@" in p else p
             if lookup_prefix:
-                res = await session.execute(select(User).where(User.email_prefix == lookup_prefix))
-                a_user = res.scalars().first()
+                a_user = await user_directory.find_by_prefix(session, lookup_prefix)
                 if a_user:
-                    resolved_assignee_id = a_user.id
+                    resolved_assignee_id = a_user["id"]
 
         wi = WorkItem(
             code=code,
@@ -80,19 +83,26 @@ class WorkItemService:
             estimated_hours=est_hours if est_hours > 0 else None,
             assignee_id=resolved_assignee_id,
         )
+        version = await version_service.stamp_work_items(session, [wi])
+        if kind == 'TASK':
+            await job_rollup_service.apply(session, [(None, job_rollup_service.snapshot(wi))], version)
         session.add(wi)
         await session.flush()
         await session.refresh(wi)
+        if kind == 'JOB':
+            job_rollup_service.init_job(session, wi)
         return wi
 
-    async def update(self, session: AsyncSession, *, id: int, data: dict, current_user_id: int) -> Optional[WorkItem]:
-        wi = await session.get(WorkItem, id)
-        if not wi or wi.deleted_at is not None:
-            return None
-        project = await session.get(Project, wi.project_id)
-        if project.archived:
-            raise ForbiddenException("项目已归档，禁止写操作")
+    async def _prepare_update(self, session: AsyncSession, wi: WorkItem, data: dict, current_user_id: int):
+        """
+        更新前的逐项数据准备（不访问工作项表）：完成态字段、负责人/Reporter解析、描述编辑权限
 
+        Args:
+            session: 数据库会话
+            wi: 待更新工作项（更新前状态）
+            data: 待更新字段，原地修改
+            current_user_id: 当前用户ID
+        """
         # 状态流转与完成态校验
         new_status = data.get('status')
         if new_status == 'done':
@@ -105,74 +115,23 @@ class WorkItemService:
             data['actual_hours'] = None
 
         # 负责人解析：优先 assignee_id，其次 assignee_prefix/assignee_email
-        assignee_prefix = data.pop("assignee_prefix", None)
-        assignee_email = data.pop("assignee_email", None)
-        if not data.get("assignee_id"):
+        # Reporter(创建人)解析：优先 creator_id，其次 creator_prefix/creator_email
+        for field in ('assignee', 'creator'):
+            prefix = data.pop(f"{field}_prefix", None)
+            email = data.pop(f"{field}_email", None)
+            if data.get(f"{field}_id"):
+                continue
             lookup_prefix = None
-            if assignee_prefix:
-                lookup_prefix = assignee_prefix.strip()
-            elif assignee_email:
+            if prefix:
+                lookup_prefix = prefix.strip()
+            elif email:
                 # 取邮箱前缀部分
-                p = assignee_email.strip()
-                if "@" in p:
-                    lookup_prefix = p.split("@", 1)[0]
-                else:
-                    lookup_prefix = p
+                p = email.strip()
+                lookup_prefix = p.split("@", 1)[0] if "@" in p else p
             if lookup_prefix:
-                res = await session.execute(select(User).where(User.email_prefix == lookup_prefix))
-                user = res.scalars().first()
+                user = await user_directory.find_by_prefix(session, lookup_prefix)
                 if user:
-                    data["assignee_id"] = user.id
-
-        # Reporter(创建人)解析：优先 creator_id，其次 creator_prefix/creator_email
-        creator_prefix = data.pop("creator_prefix", None)
-        creator_email = data.pop("creator_email", None)
-        if not data.get("creator_id"):
-            c_lookup = None
-            if creator_prefix:
-                c_lookup = creator_prefix.strip()
-            elif creator_email:
-                cp = creator_email.strip()
-                if "@" in cp:
-                    c_lookup = cp.split("@", 1)[0]
-                else:
-                    c_lookup = cp
-            if c_lookup:
-                res2 = await session.execute(select(User).where(User.email_prefix == c_lookup))
-                cuser = res2.scalars().first()
-                if cuser:
-                    data["creator_id"] = cuser.id
-
-        # 计划日期更新的基本校验与父子范围约束
-        new_start = data.get('planned_start_date', wi.planned_start_date)
-        new_end = data.get('planned_end_date', wi.planned_end_date)
-        if new_start and new_end and new_end < new_start:
-            raise ValidationException("计划结束日期不得早于开始日期")
-
-        if wi.kind == 'TASK':
-            if wi.parent_id:
-                parent = await session.get(WorkItem, wi.parent_id)
-                if not parent or parent.deleted_at is not None:
-                    raise NotFoundException("父任务不存在")
-                # 若父任务已设置计划范围，则子任务必须落入其中（要求子任务同时具备开始/结束计划）
-                if parent.planned_start_date and parent.planned_end_date and new_start and new_end:
-                    if new_start < parent.planned_start_date or new_end > parent.planned_end_date:
-                        raise ValidationException("子任务计划区间必须落入父任务计划范围")
-        else:  # JOB
-            # 若存在子任务计划范围，则父任务的计划必须覆盖所有子任务
-            # 仅在父有新计划（或已有计划）且子任务存在有效计划时进行校验
-            if new_start and new_end:
-                res = await session.execute(select(WorkItem).where(WorkItem.parent_id == wi.id, WorkItem.deleted_at.is_(None)))
-                children = res.scalars().all()
-                if children:
-                    # 计算子任务的最小开始与最大结束（仅考虑有计划日期的子任务）
-                    child_starts = [c.planned_start_date for c in children if c.planned_start_date]
-                    child_ends = [c.planned_end_date for c in children if c.planned_end_date]
-                    if child_starts and child_ends:
-                        min_child_start = min(child_starts)
-                        max_child_end = max(child_ends)
-                        if new_start > min_child_start or new_end < max_child_end:
-                            raise ValidationException("父任务计划范围必须覆盖所有子任务的计划区间")
+                    data[f"{field}_id"] = user["id"]
 
         # 描述编辑权限：仅 Reporter 或 demo/admin 可编辑
         if 'description' in data:
@@ -180,56 +139,236 @@ class WorkItemService:
             if current_user_id == wi.creator_id:
                 can = True
             else:
-                resu = await session.execute(select(User).where(User.id == current_user_id))
-                cu = resu.scalars().first()
-                if cu and cu.username in ('demo', 'admin'):
+                cu = await user_directory.get(session, current_user_id)
+                if cu and cu["username"] in ('demo', 'admin'):
                     can = True
             if not can:
                 raise ForbiddenException("仅创建人或管理员可编辑描述")
             data['description'] = sanitize_html(data['description']) if data['description'] is not None else None
 
-        old_status = wi.status
+    @staticmethod
+    def _check_planned_range(start, end):
+        if start and end and end < start:
+            raise ValidationException("计划结束日期不得早于开始日期")
+
+    @staticmethod
+    def _check_within_parent(parent_start, parent_end, start, end):
+        # 若父任务已设置计划范围，则子任务必须落入其中（要求子任务同时具备开始/结束计划）
+        if parent_start and parent_end and start and end:
+            if start < parent_start or end > parent_end:
+                raise ValidationException("子任务计划区间必须落入父任务计划范围")
+
+    @staticmethod
+    def _check_covers_children(start, end, child_ranges):
+        # 若存在子任务计划范围，则父任务的计划必须覆盖所有子任务
+        # 仅在父有新计划（或已有计划）且子任务存在有效计划时进行校验
+        if not (start and end):
+            return
+        # 计算子任务的最小开始与最大结束（仅考虑有计划日期的子任务）
+        child_starts = [s for s, _ in child_ranges if s]
+        child_ends = [e for _, e in child_ranges if e]
+        if child_starts and child_ends:
+            if start > min(child_starts) or end < max(child_ends):
+                raise ValidationException("父任务计划范围必须覆盖所有子任务的计划区间")
+
+    @staticmethod
+    def _apply_estimate(data: dict, start, end):
         # 若计划开始/结束发生变化，更新预估工时
         if ('planned_start_date' in data) or ('planned_end_date' in data):
-            est = compute_estimated_hours(new_start, new_end)
+            est = compute_estimated_hours(start, end)
             data['estimated_hours'] = est if est > 0 else None
         # 若进入完成态且未设置预估工时，补算一次
-        if (new_status == 'done') and not data.get('estimated_hours'):
-            est = compute_estimated_hours(new_start, new_end)
+        if (data.get('status') == 'done') and not data.get('estimated_hours'):
+            est = compute_estimated_hours(start, end)
             data['estimated_hours'] = est if est > 0 else None
 
+    @staticmethod
+    def _sync_parent_status(parent: WorkItem, target: str, current_user_id: int) -> dict:
+        """子任务状态全部一致时同步父JOB状态，返回对应审计记录的字段"""
+        parent_old = parent.status
+        parent.status = target
+        if target == 'done' and not parent.completed_at:
+            parent.completed_at = now_cst()
+            parent.actual_hours = parent.actual_hours or compute_actual_hours(parent.start_date or parent.planned_start_date, parent.completed_at)
+            parent.estimated_hours = compute_estimated_hours(parent.planned_start_date, parent.planned_end_date) or parent.estimated_hours
+        elif target in ('todo','doing') and parent_old == 'done':
+            parent.completed_at = None
+            parent.actual_hours = None
+        return dict(entity_type='work_item', entity_id=parent.id, action='status_sync', old_value=parent_old, new_value=target, user_id=current_user_id)
+
+    async def update(self, session: AsyncSession, *, id: int, data: dict, current_user_id: int) -> Optional[WorkItem]:
+        wi = await session.get(WorkItem, id)
+        if not wi or wi.deleted_at is not None:
+            return None
+        project = await session.get(Project, wi.project_id)
+        if project.archived:
+            raise ForbiddenException("项目已归档，禁止写操作")
+
+        before = job_rollup_service.snapshot(wi)
+        await self._prepare_update(session, wi, data, current_user_id)
+
+        # 计划日期更新的基本校验与父子范围约束
+        new_start = data.get('planned_start_date', wi.planned_start_date)
+        new_end = data.get('planned_end_date', wi.planned_end_date)
+        self._check_planned_range(new_start, new_end)
+
+        if wi.kind == 'TASK':
+            if wi.parent_id:
+                parent = await session.get(WorkItem, wi.parent_id)
+                if not parent or parent.deleted_at is not None:
+                    raise NotFoundException("父任务不存在")
+                self._check_within_parent(parent.planned_start_date, parent.planned_end_date, new_start, new_end)
+        elif new_start and new_end:  # JOB
+            rollup = await job_rollup_service.get(session, wi.id)
+            self._check_covers_children(new_start, new_end, [(rollup.child_min_planned_start, rollup.child_max_planned_end)])
+
+        old_status = wi.status
+        self._apply_estimate(data, new_start, new_end)
+
         for k, v in data.items():
             setattr(wi, k, v)
-        await session.flush()
-        await session.refresh(wi)
+        version = await version_service.stamp_work_items(session, [wi])
+        rollups = await job_rollup_service.apply(session, [(before, job_rollup_service.snapshot(wi))], version)
         if 'status' in data and old_status != wi.status:
             al = AuditLog(entity_type='work_item', entity_id=wi.id, action='status_change', old_value=old_status, new_value=wi.status, user_id=current_user_id)
             session.add(al)
         if wi.kind == 'TASK' and 'status' in data and wi.parent_id:
-            res = await session.execute(select(WorkItem).where(WorkItem.parent_id == wi.parent_id, WorkItem.deleted_at.is_(None)))
-            siblings = res.scalars().all()
-            if siblings:
-                statuses = {s.status for s in siblings}
-                if len(statuses) == 1:
-                    target = list(statuses)[0]
-                    parent = await session.get(WorkItem, wi.parent_id)
-                    if parent and parent.kind == 'JOB':
-                        parent_old = parent.status
-                        parent.status = target
-                        if target == 'done' and not parent.completed_at:
-                            parent.completed_at = now_cst()
-                            parent.actual_hours = parent.actual_hours or compute_actual_hours(parent.start_date or parent.planned_start_date, parent.completed_at)
-                            parent.estimated_hours = compute_estimated_hours(parent.planned_start_date, parent.planned_end_date) or parent.estimated_hours
-                        elif target in ('todo','doing') and parent_old == 'done':
-                            parent.completed_at = None
-                            parent.actual_hours = None
-                        await session.flush()
-                        await session.refresh(parent)
-                        al2 = AuditLog(entity_type='work_item', entity_id=parent.id, action='status_sync', old_value=parent_old, new_value=parent.status, user_id=current_user_id)
-                        session.add(al2)
+            # 由JOB汇总行判断子任务状态是否全部一致
+            rollup = rollups.get(wi.parent_id) or await job_rollup_service.get(session, wi.parent_id)
+            target = job_rollup_service.uniform_status(rollup)
+            if target:
+                parent = await session.get(WorkItem, wi.parent_id)
+                if parent and parent.kind == 'JOB':
+                    session.add(AuditLog(**self._sync_parent_status(parent, target, current_user_id)))
+                    parent.row_version = wi.row_version
+                    parent.updated_at = wi.updated_at
+        await session.flush()
+        await session.refresh(wi)
         return wi
 
+    async def batch_update(self, session: AsyncSession, *, items: List[dict], current_user_id: int) -> List[WorkItem]:
+        """
+        集合式批量更新工作项
+
+        用少量 IN 查询一次性加载目标工作项、所属项目、父任务与JOB汇总
+        （仅当JOB与其子任务同批修改时才加载该JOB的全部子任务），
+        按整批更新后的最终状态在内存中校验计划日期与父子范围约束，
+        再统一赋值、差量更新JOB汇总并据此汇总父JOB状态，最后一次 flush 写回（同列集合的 UPDATE 以 executemany 批量执行）。
+        任一校验失败即抛出异常且不写入任何数据，调用方回滚事务即可保持整批全有或全无。
+
+        Args:
+            session: 数据库会话
+            items: 每项包含 id 与待更新字段；同一ID出现多次时按顺序合并
+            current_user_id: 当前用户ID
+
+        Returns:
+            已更新的工作项（按首次出现顺序去重）
+
+        Raises:
+            NotFoundException: 工作项或父任务不存在
+            ForbiddenException: 项目已归档或无权编辑描述
+            ValidationException: 计划日期或父子范围约束不满足
+        """
+        changes: Dict[int, dict] = {}
+        for item in items:
+            data = dict(item)
+            changes.setdefault(data.pop('id'), {}).update(data)
+        if not changes:
+            return []
+
+        res = await session.execute(select(WorkItem).where(WorkItem.id.in_(list(changes))))
+        by_id: Dict[int, WorkItem] = {wi.id: wi for wi in res.scalars().all()}
+        targets: List[WorkItem] = []
+        for wid in changes:
+            wi = by_id.get(wid)
+            if not wi or wi.deleted_at is not None:
+                raise NotFoundException(f"工作项不存在: {wid}")
+            targets.append(wi)
+
+        res = await session.execute(select(Project).where(Project.id.in_({wi.project_id for wi in targets})))
+        if any(p.archived for p in res.scalars().all()):
+            raise ForbiddenException("项目已归档，禁止写操作")
+
+        # 父任务（含已删除，用于报错）+ 与子任务同批修改的JOB下的未删除子任务
+        parent_ids = {wi.parent_id for wi in targets if wi.kind == 'TASK' and wi.parent_id}
+        job_targets = {wi.id for wi in targets if wi.kind == 'JOB'}
+        job_ids = job_targets & parent_ids
+        res = await session.execute(select(WorkItem).where(or_(
+            WorkItem.id.in_(parent_ids),
+            and_(WorkItem.parent_id.in_(job_ids), WorkItem.deleted_at.is_(None)),
+        )))
+        children: Dict[int, List[WorkItem]] = {}
+        for wi in res.scalars().all():
+            by_id[wi.id] = wi
+            if wi.parent_id in job_ids and wi.deleted_at is None:
+                children.setdefault(wi.parent_id, []).append(wi)
+        # 其余JOB按汇总行的子任务计划范围校验
+        rollups = await job_rollup_service.get_many(session, job_targets - job_ids)
+        befores = {wi.id: job_rollup_service.snapshot(wi) for wi in targets}
+
+        for wi in targets:
+            await self._prepare_update(session, wi, changes[wi.id], current_user_id)
+
+        def final_range(wi: WorkItem):
+            data = changes.get(wi.id, {})
+            return data.get('planned_start_date', wi.planned_start_date), data.get('planned_end_date', wi.planned_end_date)
+
+        for wi in targets:
+            start, end = final_range(wi)
+            self._check_planned_range(start, end)
+            if wi.kind == 'TASK':
+                if wi.parent_id:
+                    parent = by_id.get(wi.parent_id)
+                    if not parent or parent.deleted_at is not None:
+                        raise NotFoundException("父任务不存在")
+                    self._check_within_parent(*final_range(parent), start, end)
+            elif wi.id in job_ids:
+                self._check_covers_children(start, end, [final_range(c) for c in children.get(wi.id, [])])
+            else:
+                rollup = rollups[wi.id]
+                self._check_covers_children(start, end, [(rollup.child_min_planned_start, rollup.child_max_planned_end)])
+            self._apply_estimate(changes[wi.id], start, end)
+
+        version = await version_service.stamp_work_items(session, targets)
+        logs: List[dict] = []
+        rollup_parents: List[int] = []
+        for wi in targets:
+            data = changes[wi.id]
+            old_status = wi.status
+            for k, v in data.items():
+                setattr(wi, k, v)
+            if 'status' in data and old_status != wi.status:
+                logs.append(dict(entity_type='work_item', entity_id=wi.id, action='status_change', old_value=old_status, new_value=wi.status, user_id=current_user_id))
+            if wi.kind == 'TASK' and 'status' in data and wi.parent_id and wi.parent_id not in rollup_parents:
+                rollup_parents.append(wi.parent_id)
+
+        # 子任务状态变化后按JOB汇总的最终状态同步父JOB
+        rollups = await job_rollup_service.apply(session, [(befores[wi.id], job_rollup_service.snapshot(wi)) for wi in targets], version)
+        unchanged = [pid for pid in rollup_parents if pid not in rollups]
+        if unchanged:
+            rollups.update(await job_rollup_service.get_many(session, unchanged))
+        for pid in rollup_parents:
+            target = job_rollup_service.uniform_status(rollups[pid])
+            parent = by_id.get(pid)
+            if target and parent and parent.kind == 'JOB':
+                logs.append(self._sync_parent_status(parent, target, current_user_id))
+                parent.row_version = version
+                parent.updated_at = targets[0].updated_at
+
+        await session.flush()
+        if logs:
+            # 审计记录无需回填主键，直接 executemany 插入
+            await session.execute(insert(AuditLog), logs)
+        return targets
+
     async def cascade_status(self, session: AsyncSession, *, job_id: int, target_status: str, current_user_id: int, completed_at: Optional[datetime] = None, actual_hours: Optional[float] = None) -> list[WorkItem]:
+        """
+        将JOB及其全部未删除子任务的状态统一改为 target_status
+
+        完成时间、实际工时、预估工时在内存中逐项算出，JOB与子任务以一次按主键的批量 UPDATE 写回，
+        审计记录以一次 executemany 插入；语句数与子任务数量无关，SQLite 写锁只在这几条语句期间持有。
+        返回的工作项即会话中的对象，已按写入值同步，无需再次查询。
+        """
         job = await session.get(WorkItem, job_id)
         if not job or job.kind != 'JOB' or job.deleted_at is not None:
             raise NotFoundException("工作项不存在或不是JOB")
@@ -238,35 +377,38 @@ class WorkItemService:
             raise ForbiddenException("项目已归档，禁止写操作")
         res = await session.execute(select(WorkItem).where(WorkItem.parent_id == job.id, WorkItem.deleted_at.is_(None)))
         tasks = res.scalars().all()
-        updated = []
+        updated = [job, *tasks]
         async with session.begin_nested():
-            prev_job_status = job.status
-            job.status = target_status
-            if target_status == 'done':
-                job.completed_at = completed_at or now_cst()
-                job.actual_hours = compute_actual_hours(job.start_date or job.planned_start_date, job.completed_at)
-                job.estimated_hours = compute_estimated_hours(job.planned_start_date, job.planned_end_date) or job.estimated_hours
-            else:
-                job.completed_at = None
-                job.actual_hours = None
-            await session.flush()
-            await session.refresh(job)
-            updated.append(job)
-            session.add(AuditLog(entity_type='work_item', entity_id=job.id, action='status_cascade', old_value=prev_job_status, new_value=job.status, user_id=current_user_id))
-            for t in tasks:
-                prev = t.status
-                t.status = target_status
+            # 整个级联共用一个版本号
+            version = await version_service.bump(session, ROW_VERSION_SCOPE)
+            now = datetime.utcnow()
+            done_at = (completed_at or now_cst()) if target_status == 'done' else None
+            rows: List[dict] = []
+            logs: List[dict] = []
+            # 子任务的开始/计划日期高度重复，工时按不同日期各算一次
+            actual_by_start: Dict = {}
+            estimated_by_range: Dict = {}
+            for wi in updated:
+                row = dict(id=wi.id, status=target_status, completed_at=done_at, actual_hours=None,
+                           estimated_hours=wi.estimated_hours, row_version=version, updated_at=now)
                 if target_status == 'done':
-                    t.completed_at = completed_at or now_cst()
-                    t.actual_hours = compute_actual_hours(t.start_date or t.planned_start_date, t.completed_at)
-                    t.estimated_hours = compute_estimated_hours(t.planned_start_date, t.planned_end_date) or t.estimated_hours
-                else:
-                    t.completed_at = None
-                    t.actual_hours = None
-                await session.flush()
-                await session.refresh(t)
-                updated.append(t)
-                session.add(AuditLog(entity_type='work_item', entity_id=t.id, action='status_cascade', old_value=prev, new_value=t.status, user_id=current_user_id))
+                    start = wi.start_date or wi.planned_start_date
+                    if start not in actual_by_start:
+                        actual_by_start[start] = compute_actual_hours(start, done_at)
+                    planned = (wi.planned_start_date, wi.planned_end_date)
+                    if planned not in estimated_by_range:
+                        estimated_by_range[planned] = compute_estimated_hours(*planned)
+                    row['actual_hours'] = actual_by_start[start]
+                    row['estimated_hours'] = estimated_by_range[planned] or wi.estimated_hours
+                rows.append(row)
+                logs.append(dict(entity_type='work_item', entity_id=wi.id, action='status_cascade', old_value=wi.status, new_value=target_status, user_id=current_user_id))
+            await session.execute(update(WorkItem), rows)
+            # 批量 UPDATE 不回写会话中的对象，按写入值同步且不标记为脏
+            for wi, row in zip(updated, rows):
+                for key, value in row.items():
+                    set_committed_value(wi, key, value)
+            await session.execute(insert(AuditLog), logs)
+            await job_rollup_service.replace(session, job.id, tasks)
         return updated
 
     async def soft_delete(self, session: AsyncSession, *, id: int, current_user_id: int) -> Optional[WorkItem]:
@@ -276,7 +418,10 @@ class WorkItemService:
         project = await session.get(Project, wi.project_id)
         if project.archived:
             raise ForbiddenException("项目已归档，禁止写操作")
+        before = job_rollup_service.snapshot(wi)
         wi.deleted_at = datetime.utcnow()
+        version = await version_service.stamp_work_items(session, [wi])
+        await job_rollup_service.apply(session, [(before, None)], version)
         await session.flush()
         await session.refresh(wi)
         return wi
@@ -0,0 +1,49 @@
+"""
+条件请求（ETag / If-None-Match）工具
+
+各路由先用廉价的校验值（最大 row_version、数据版本计数器等）构造 ETag，
+命中客户端缓存时直接返回 304，跳过重查询与序列化。
+"""
+import hashlib
+from typing import Optional
+from fastapi import Request, Response
+
+
+def make_etag(*parts) -> str:
+    """由资源标识与校验值生成弱 ETag"""
+    raw = "|".join(str(p) for p in parts)
+    return 'W/"' + hashlib.sha1(raw.encode("utf-8")).hexdigest()[:24] + '"'
+
+
+def _opaque(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """按弱比较判断 If-None-Match 是否包含当前 ETag"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(_opaque(t) == _opaque(etag) for t in if_none_match.split(","))
+
+
+def conditional_response(request: Request, response: Response, *parts) -> Optional[Response]:
+    """
+    计算 ETag；客户端缓存仍有效时返回 304 响应，否则在正常响应上附加 ETag 并返回 None
+
+    Args:
+        request: 当前请求
+        response: 路由注入的响应对象（用于设置响应头）
+        parts: 资源标识与校验值
+
+    Returns:
+        304 响应或 None
+    """
+    etag = make_etag(*parts)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
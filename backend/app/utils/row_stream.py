@@ -0,0 +1,179 @@
+"""
+面向程序消费的流式行格式：CSV、NDJSON、Parquet
+
+与 XlsxStreamWriter 相同的用法：append() 逐行追加，buffered 为待取走的字节数，drain() 取走，close() 收尾。
+列在构造时确定，每列带类型（int / float / str / date），值为 None 表示缺失。
+
+- CSV：UTF-8、首行为列名，缺失值写为空。
+- NDJSON：每行一个 JSON 对象，日期写为 ISO 字符串，缺失值为 null。
+- Parquet：依赖可选的 pyarrow；按 row_group_size 行攒成一个行组写出，内存只与行组大小有关。
+"""
+import csv
+import io
+import json
+from datetime import date
+from typing import Dict, List, Sequence, Tuple
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # 可选依赖：未安装时不提供 Parquet
+    pyarrow = None
+
+
+Column = Tuple[str, str]  # (列名, 类型：int / float / str / date)
+
+
+def _iso(value):
+    return value.isoformat() if isinstance(value, date) else value
+
+
+class CsvStreamWriter:
+    """流式 CSV 写入器"""
+
+    media_type = "text/csv; charset=utf-8"
+
+    def __init__(self, columns: Sequence[Column]):
+        self._buf = io.StringIO()
+        self._csv = csv.writer(self._buf, lineterminator="\n")
+        self._csv.writerow([name for name, _ in columns])
+
+    @property
+    def buffered(self) -> int:
+        return self._buf.tell()
+
+    def drain(self) -> bytes:
+        data = self._buf.getvalue().encode("utf-8")
+        self._buf.seek(0)
+        self._buf.truncate()
+        return data
+
+    def append(self, values: Sequence):
+        self._csv.writerow(['' if v is None else _iso(v) for v in values])
+
+    def close(self):
+        pass
+
+
+class NdjsonStreamWriter:
+    """流式 NDJSON 写入器"""
+
+    media_type = "application/x-ndjson"
+
+    def __init__(self, columns: Sequence[Column]):
+        self._names = [name for name, _ in columns]
+        self._parts: List[str] = []
+        self._size = 0
+
+    @property
+    def buffered(self) -> int:
+        return self._size
+
+    def drain(self) -> bytes:
+        data = "".join(self._parts).encode("utf-8")
+        self._parts.clear()
+        self._size = 0
+        return data
+
+    def append(self, values: Sequence):
+        line = json.dumps({k: _iso(v) for k, v in zip(self._names, values)}, ensure_ascii=False) + "\n"
+        self._parts.append(line)
+        self._size += len(line)
+
+    def close(self):
+        pass
+
+
+class _ParquetSink:
+    """收集 Parquet 输出的只追加写入目标（pyarrow 需要 tell 记录偏移）"""
+
+    def __init__(self):
+        self._buf = io.BytesIO()
+        self._pos = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        self._buf.write(data)
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    @property
+    def size(self) -> int:
+        return self._buf.tell()
+
+    def take(self) -> bytes:
+        data = self._buf.getvalue()
+        self._buf.seek(0)
+        self._buf.truncate()
+        return data
+
+
+class ParquetStreamWriter:
+    """
+    流式 Parquet 写入器
+
+    行先按列攒在内存，满 row_group_size 行写出一个行组；文件尾（元数据）在 close() 时写出。
+    """
+
+    media_type = "application/vnd.apache.parquet"
+
+    def __init__(self, columns: Sequence[Column], row_group_size: int = 10000, compression: str = "snappy"):
+        if pyarrow is None:
+            raise RuntimeError("未安装 pyarrow，无法写出 Parquet")
+        arrow_types = {"int": pyarrow.int64(), "float": pyarrow.float64(), "str": pyarrow.string(), "date": pyarrow.date32()}
+        self._schema = pyarrow.schema([(name, arrow_types[kind]) for name, kind in columns])
+        self._columns: List[List] = [[] for _ in columns]
+        self._rows = 0
+        self.row_group_size = row_group_size
+        self._sink = _ParquetSink()
+        self._writer = pyarrow.parquet.ParquetWriter(self._sink, self._schema, compression=compression)
+
+    @property
+    def buffered(self) -> int:
+        return self._sink.size
+
+    def drain(self) -> bytes:
+        return self._sink.take()
+
+    def append(self, values: Sequence):
+        for col, value in zip(self._columns, values):
+            col.append(value)
+        self._rows += 1
+        if self._rows >= self.row_group_size:
+            self._flush_group()
+
+    def _flush_group(self):
+        if not self._rows:
+            return
+        table = pyarrow.Table.from_arrays(
+            [pyarrow.array(col, type=field.type) for col, field in zip(self._columns, self._schema)],
+            schema=self._schema,
+        )
+        self._writer.write_table(table, row_group_size=self._rows)
+        for col in self._columns:
+            col.clear()
+        self._rows = 0
+
+    def close(self):
+        self._flush_group()
+        self._writer.close()
+
+
+WRITERS: Dict[str, type] = {
+    "csv": CsvStreamWriter,
+    "ndjson": NdjsonStreamWriter,
+    "parquet": ParquetStreamWriter,
+}
+
+
+def parquet_available() -> bool:
+    return pyarrow is not None
@@ -1,33 +1,95 @@
-from datetime import date, datetime, timedelta
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime
+from typing import Iterable, List, Optional, Sequence
 
-# 可在此维护法定节假日与调休工作日
+# 可在此维护法定节假日与调休工作日（运行中修改后需调用 reload_calendar()）
 SPECIAL_HOLIDAYS = set()
 SPECIAL_WORKDAYS = set()
 
+
+class WorkCalendar:
+    """
+    工作日历索引：周一至周五为工作日，再叠加节假日与调休
+
+    区间内的工作日数 = 按整周算出的周一至周五天数 + 区间内特殊日期的修正值。
+    特殊日期只记录真正改变结果的那部分（落在工作日的节假日 -1，落在周末的调休 +1），
+    按序号排序并维护前缀和，区间修正值由两次二分得到，整体与区间长度无关。
+    """
+
+    def __init__(self, holidays: Iterable[date] = (), workdays: Iterable[date] = ()):
+        holidays = set(holidays)
+        deltas = {d.toordinal(): -1 for d in holidays if d.weekday() < 5}
+        # 同时出现在两个集合中的日期按节假日处理，与 is_workday 保持一致
+        deltas.update({d.toordinal(): 1 for d in workdays if d.weekday() >= 5 and d not in holidays})
+        self._ordinals = sorted(deltas)
+        self._prefix = [0]
+        for o in self._ordinals:
+            self._prefix.append(self._prefix[-1] + deltas[o])
+        self._holidays = frozenset(holidays)
+        self._workdays = frozenset(workdays)
+
+    def is_workday(self, d: date) -> bool:
+        if d in self._holidays:
+            return False
+        if d in self._workdays:
+            return True
+        return d.weekday() < 5
+
+    @staticmethod
+    def _weekdays_through(ordinal: int) -> int:
+        """序号 1..ordinal 中周一至周五的天数（序号1即0001-01-01，为周一）"""
+        weeks, rest = divmod(ordinal, 7)
+        return weeks * 5 + min(rest, 5)
+
+    def _count_ordinals(self, start: int, end: int) -> int:
+        if end < start:
+            return 0
+        base = self._weekdays_through(end) - self._weekdays_through(start - 1)
+        ords = self._ordinals
+        return base + self._prefix[bisect_right(ords, end)] - self._prefix[bisect_left(ords, start)]
+
+    def count_workdays(self, start: Optional[date], end: Optional[date]) -> int:
+        if not start or not end:
+            return 0
+        return self._count_ordinals(start.toordinal(), end.toordinal())
+
+    def count_workdays_many(self, starts: Sequence[Optional[date]], ends: Sequence[Optional[date]]) -> List[int]:
+        """按位置批量计算工作日数，供报表与导出一次性处理整列日期"""
+        if len(starts) != len(ends):
+            raise ValueError("starts 与 ends 长度不一致")
+        count = self._count_ordinals
+        return [count(s.toordinal(), e.toordinal()) if s and e else 0 for s, e in zip(starts, ends)]
+
+
+_calendar: Optional[WorkCalendar] = None
+
+
+def reload_calendar() -> WorkCalendar:
+    """按 SPECIAL_HOLIDAYS / SPECIAL_WORKDAYS 的当前内容重建日历索引"""
+    global _calendar
+    _calendar = WorkCalendar(SPECIAL_HOLIDAYS, SPECIAL_WORKDAYS)
+    return _calendar
+
+
+def get_calendar() -> WorkCalendar:
+    return _calendar or reload_calendar()
+
+
 def is_workday(d: date) -> bool:
-    if d in SPECIAL_HOLIDAYS:
-        return False
-    if d in SPECIAL_WORKDAYS:
-        return True
-    # 周一至周五为工作日
-    return d.weekday() < 5
+    return get_calendar().is_workday(d)
 
 def count_workdays(start: date, end: date) -> int:
-    if not start or not end:
-        return 0
-    if end < start:
-        return 0
-    cur = start
-    days = 0
-    while cur <= end:
-        if is_workday(cur):
-            days += 1
-        cur += timedelta(days=1)
-    return days
+    return get_calendar().count_workdays(start, end)
+
+def count_workdays_many(starts: Sequence[Optional[date]], ends: Sequence[Optional[date]]) -> List[int]:
+    return get_calendar().count_workdays_many(starts, ends)
 
 def compute_estimated_hours(start: date, end: date) -> float:
     return float(count_workdays(start, end) * 8)
 
+def compute_estimated_hours_many(starts: Sequence[Optional[date]], ends: Sequence[Optional[date]]) -> List[float]:
+    return [float(n * 8) for n in count_workdays_many(starts, ends)]
+
 def compute_actual_hours(start: date, completed_at: datetime) -> float:
     if not start or not completed_at:
         return 0.0
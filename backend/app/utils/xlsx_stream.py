@@ -0,0 +1,181 @@
+"""
+流式 XLSX 写入：边追加行边产出 ZIP 字节，内存占用与行数无关
+
+- 工作簿结构（各工作表名称）预先确定，静态部件在开头一次写出；工作表按顺序逐个写入。
+- 文本一律写为内联字符串（inlineStr），无需在末尾汇总共享字符串表。
+- ZIP 写入不可回退的输出，各条目以数据描述符记录大小与校验值；调用方按需 drain() 取走已压缩的字节。
+"""
+import re
+import zipfile
+from typing import List, Optional, Sequence
+from xml.sax.saxutils import escape, quoteattr
+
+
+_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+_REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+_XML_DECL = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+# XML 1.0 不允许的控制字符（与 openpyxl 的 ILLEGAL_CHARACTERS_RE 一致）
+_ILLEGAL_XML = re.compile(r"[\000-\010]|[\013-\014]|[\016-\037]")
+# 单元格文本上限（Excel 限制）
+_MAX_CELL_TEXT = 32767
+
+
+def column_letter(index: int) -> str:
+    """0 起的列序号 → 列字母（0 → A，26 → AA）"""
+    letters = ""
+    index += 1
+    while index:
+        index, rem = divmod(index - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+
+class _Sink:
+    """收集 ZIP 输出的不可回退写入目标（无 tell/seek，zipfile 据此使用数据描述符）"""
+
+    def __init__(self):
+        self.parts: List[bytes] = []
+        self.size = 0
+
+    def write(self, data) -> int:
+        if data:
+            self.parts.append(bytes(data))
+            self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self) -> bytes:
+        data = b"".join(self.parts)
+        self.parts.clear()
+        self.size = 0
+        return data
+
+
+class XlsxStreamWriter:
+    """
+    流式 XLSX 写入器
+
+    用法：
+        writer = XlsxStreamWriter(["Jobs", "Tasks"])
+        writer.begin_sheet("Jobs"); writer.append([...]); ...; writer.end_sheet()
+        writer.close()
+        期间随时 writer.drain() 取走已产出的字节
+    """
+
+    def __init__(self, sheet_names: Sequence[str], compresslevel: int = 6):
+        if not sheet_names:
+            raise ValueError("至少需要一个工作表")
+        self.sheet_names = list(sheet_names)
+        self._sink = _Sink()
+        self._zip = zipfile.ZipFile(self._sink, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=compresslevel)
+        self._sheet = None
+        self._sheet_index = -1
+        self._row = 0
+        self._write_static_parts()
+
+    @property
+    def buffered(self) -> int:
+        """尚未取走的字节数"""
+        return self._sink.size
+
+    def drain(self) -> bytes:
+        """取走目前已产出的字节"""
+        return self._sink.take()
+
+    def _write_static_parts(self):
+        sheets = len(self.sheet_names)
+        overrides = "".join(
+            f'<Override PartName="/xl/worksheets/sheet{i}.xml" '
+            f'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+            for i in range(1, sheets + 1)
+        )
+        self._zip.writestr("[Content_Types].xml", (
+            _XML_DECL
+            + '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            '<Override PartName="/xl/styles.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+            + overrides + '</Types>'
+        ))
+        self._zip.writestr("_rels/.rels", (
+            _XML_DECL + f'<Relationships xmlns="{_PKG_REL_NS}">'
+            f'<Relationship Id="rId1" Type="{_REL_NS}/officeDocument" Target="xl/workbook.xml"/>'
+            '</Relationships>'
+        ))
+        sheet_entries = "".join(
+            f'<sheet name={quoteattr(name[:31])} sheetId="{i}" r:id="rId{i}"/>'
+            for i, name in enumerate(self.sheet_names, start=1)
+        )
+        self._zip.writestr("xl/workbook.xml", (
+            _XML_DECL + f'<workbook xmlns="{_NS}" xmlns:r="{_REL_NS}"><sheets>{sheet_entries}</sheets></workbook>'
+        ))
+        rels = "".join(
+            f'<Relationship Id="rId{i}" Type="{_REL_NS}/worksheet" Target="worksheets/sheet{i}.xml"/>'
+            for i in range(1, sheets + 1)
+        )
+        rels += f'<Relationship Id="rId{sheets + 1}" Type="{_REL_NS}/styles" Target="styles.xml"/>'
+        self._zip.writestr("xl/_rels/workbook.xml.rels", (
+            _XML_DECL + f'<Relationships xmlns="{_PKG_REL_NS}">{rels}</Relationships>'
+        ))
+        self._zip.writestr("xl/styles.xml", (
+            _XML_DECL + f'<styleSheet xmlns="{_NS}">'
+            '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+            '<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>'
+            '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+            '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+            '<cellXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/></cellXfs>'
+            '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+            '</styleSheet>'
+        ))
+
+    def begin_sheet(self, name: str):
+        """开始写入下一个工作表（须按构造时的顺序）"""
+        if self._sheet is not None:
+            self.end_sheet()
+        self._sheet_index += 1
+        if self._sheet_index >= len(self.sheet_names) or self.sheet_names[self._sheet_index] != name:
+            raise ValueError(f"工作表顺序不符: {name}")
+        self._sheet = self._zip.open(f"xl/worksheets/sheet{self._sheet_index + 1}.xml", mode="w")
+        self._sheet.write(f'{_XML_DECL}<worksheet xmlns="{_NS}"><sheetData>'.encode("utf-8"))
+        self._row = 0
+
+    @staticmethod
+    def _cell(ref: str, value) -> str:
+        if value is None or value == "":
+            return ""
+        if isinstance(value, bool):
+            return f'<c r="{ref}" t="b"><v>{int(value)}</v></c>'
+        if isinstance(value, (int, float)):
+            return f'<c r="{ref}"><v>{value!r}</v></c>'
+        text = _ILLEGAL_XML.sub("", str(value))[:_MAX_CELL_TEXT]
+        space = ' xml:space="preserve"' if text != text.strip() else ""
+        return f'<c r="{ref}" t="inlineStr"><is><t{space}>{escape(text)}</t></is></c>'
+
+    def append(self, values: Sequence):
+        """追加一行（None 与空字符串留空）"""
+        if self._sheet is None:
+            raise ValueError("尚未开始工作表")
+        self._row += 1
+        r = self._row
+        cells = "".join(self._cell(f"{column_letter(i)}{r}", v) for i, v in enumerate(values))
+        self._sheet.write(f'<row r="{r}">{cells}</row>'.encode("utf-8"))
+
+    def end_sheet(self):
+        if self._sheet is not None:
+            self._sheet.write(b"</sheetData></worksheet>")
+            self._sheet.close()
+            self._sheet = None
+
+    def close(self):
+        """写完剩余工作表（空表）与 ZIP 目录"""
+        self.end_sheet()
+        while self._sheet_index + 1 < len(self.sheet_names):
+            self.begin_sheet(self.sheet_names[self._sheet_index + 1])
+            self.end_sheet()
+        self._zip.close()
@@ -0,0 +1,94 @@
+"""
+JOB状态级联基准：不同子任务数量下 cascade_status 的耗时与语句数
+
+每个规模新建一个JOB及其子任务，交替级联为 done / todo 多轮，统计单次级联（含提交）的耗时与执行的SQL语句数。
+批量实现下语句数固定，耗时应随子任务数量近似持平。
+
+用法（在 backend 目录下）：
+    python -m benchmarks.bench_cascade_status --sizes 10,100,500,1000 --rounds 5
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Base, User, Project, WorkItem
+from app.services.work_item_service import work_item_service
+
+
+async def seed(session_factory, sizes: list[int]) -> dict[int, int]:
+    async with session_factory() as session:
+        user = User(username="bench", email_prefix="bench", password_hash="x", is_active=True)
+        session.add(user)
+        await session.flush()
+        project = Project(code="PRO-9999", name="bench", creator_id=user.id, owner_id=user.id)
+        session.add(project)
+        await session.flush()
+        start = date(2025, 1, 1)
+        jobs: dict[int, int] = {}
+        for size in sizes:
+            job = WorkItem(code=f"JOB-{size:06d}", kind="JOB", project_id=project.id, title=f"job {size}",
+                           creator_id=user.id, planned_start_date=start, planned_end_date=start + timedelta(days=60))
+            session.add(job)
+            await session.flush()
+            session.add_all([
+                WorkItem(code=f"TASK-{size:06d}-{t:05d}", kind="TASK", project_id=project.id, parent_id=job.id,
+                         title=f"task {size}-{t}", creator_id=user.id,
+                         planned_start_date=start + timedelta(days=t % 30), planned_end_date=start + timedelta(days=t % 30 + 5))
+                for t in range(size)
+            ])
+            jobs[size] = job.id
+        await session.commit()
+        return jobs
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="测量JOB状态级联耗时随子任务数量的变化")
+    parser.add_argument("--sizes", default="10,100,500,1000", help="逗号分隔的子任务数量")
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+
+    fd, path = tempfile.mkstemp(prefix="bench_cascade_", suffix=".db")
+    os.close(fd)
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    statements = 0
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        nonlocal statements
+        statements += 1
+
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        jobs = await seed(session_factory, sizes)
+
+        print(f"{'tasks':>8}{'p50(ms)':>10}{'max(ms)':>10}{'stmts':>8}")
+        for size in sizes:
+            latencies: list[float] = []
+            for i in range(args.rounds):
+                statements = 0
+                t0 = time.perf_counter()
+                async with session_factory() as session:
+                    await work_item_service.cascade_status(
+                        session, job_id=jobs[size], target_status="done" if i % 2 == 0 else "todo", current_user_id=1
+                    )
+                    await session.commit()
+                latencies.append(time.perf_counter() - t0)
+            print(f"{size:>8}{statistics.median(latencies) * 1000:>10.2f}{max(latencies) * 1000:>10.2f}{statements:>8}")
+    finally:
+        await engine.dispose()
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,127 @@
+"""
+数据统计页基准：原有的“拉全量明细再在浏览器汇总”与 /api/stats/dashboard 的对比
+
+新建一个库，批量插入若干项目（默认 1000 个，每个项目 jobs 个JOB、每个JOB tasks 个TASK），通过 ASGI 直接请求接口：
+- legacy：页面原先的三个请求（/api/projects、/api/users、POST /api/work-items/query 全部项目）
+- dashboard：首次（计算）、再次（缓存命中）、带 If-None-Match（304）
+每项给出响应字节数、请求耗时与 JSON 解析耗时（浏览器端渲染前需要的解析开销的近似）。
+
+用法（在 backend 目录下）：
+    python -m benchmarks.bench_dashboard --projects 1000
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.main import app
+from app.database import get_db
+from app.dependencies.auth import get_current_user
+from app.models import Base, User, Project, WorkItem
+from app.services.dashboard_service import dashboard_service
+
+STATUSES = ("todo", "doing", "blocked", "done")
+
+
+async def seed(engine, projects: int, jobs: int, tasks: int, users: int = 50):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(User), [
+            {"id": u, "username": f"user{u}", "email_prefix": f"user{u}", "full_name": f"用户{u}", "password_hash": "x", "is_active": True}
+            for u in range(1, users + 1)
+        ])
+        today = date.today()
+        await conn.execute(insert(Project), [
+            {"id": p, "code": f"PRO-{p:04d}", "name": f"项目 {p}", "creator_id": 1, "owner_id": p % users + 1,
+             "start_date": today - timedelta(days=p % 90), "end_date": today + timedelta(days=p % 60 - 10)}
+            for p in range(1, projects + 1)
+        ])
+        batch = []
+        next_id = 1
+        for p in range(1, projects + 1):
+            for _ in range(jobs):
+                job_id = next_id
+                for i in range(tasks + 1):
+                    is_job = i == 0
+                    status = STATUSES[next_id % len(STATUSES)]
+                    batch.append({
+                        "id": next_id, "code": f"{'JOB' if is_job else 'TASK'}-{next_id:07d}", "kind": "JOB" if is_job else "TASK",
+                        "project_id": p, "parent_id": None if is_job else job_id, "title": f"work item {next_id}",
+                        "status": status, "priority": "medium", "creator_id": 1, "assignee_id": next_id % users + 1,
+                        "planned_start_date": today - timedelta(days=20), "planned_end_date": today + timedelta(days=next_id % 30 - 15),
+                        "estimated_hours": 8.0, "actual_hours": 6.0 + next_id % 5,
+                    })
+                    next_id += 1
+            if len(batch) >= 10000:
+                await conn.execute(insert(WorkItem), batch)
+                batch.clear()
+        if batch:
+            await conn.execute(insert(WorkItem), batch)
+        return next_id - 1
+
+
+async def timed(label: str, send) -> tuple:
+    t0 = time.perf_counter()
+    resp = await send()
+    elapsed = time.perf_counter() - t0
+    t1 = time.perf_counter()
+    if resp.status_code == 200:
+        json.loads(resp.content)
+    parse = time.perf_counter() - t1
+    print(f"{label:<28}{resp.status_code:>6}{len(resp.content) / 1e3:>12.1f}{elapsed * 1000:>12.1f}{parse * 1000:>11.1f}")
+    return resp
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="对比数据统计页的全量明细拉取与服务端仪表盘汇总")
+    parser.add_argument("--projects", type=int, default=1000, help="项目数量")
+    parser.add_argument("--jobs", type=int, default=2, help="每个项目的JOB数量")
+    parser.add_argument("--tasks", type=int, default=5, help="每个JOB的TASK数量")
+    args = parser.parse_args()
+
+    fd, path = tempfile.mkstemp(prefix="bench_dashboard_", suffix=".db")
+    os.close(fd)
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def override_get_db():
+        async with factory() as session:
+            yield session
+            await session.commit()
+
+    async def override_user():
+        return User(id=1, username="user1", email_prefix="user1", is_active=True)
+
+    try:
+        items = await seed(engine, args.projects, args.jobs, args.tasks)
+        print(f"projects={args.projects} work_items={items}")
+        app.dependency_overrides[get_db] = override_get_db
+        app.dependency_overrides[get_current_user] = override_user
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+            print(f"{'request':<28}{'status':>6}{'size(KB)':>12}{'time(ms)':>12}{'parse(ms)':>11}")
+            await timed("legacy /api/projects", lambda: client.get("/api/projects"))
+            await timed("legacy /api/users", lambda: client.get("/api/users"))
+            await timed("legacy /work-items/query", lambda: client.post(
+                "/api/work-items/query", json={"project_ids": list(range(1, args.projects + 1))}))
+            first = await timed("dashboard (cold)", lambda: client.get("/api/stats/dashboard"))
+            await timed("dashboard (cached)", lambda: client.get("/api/stats/dashboard"))
+            await timed("dashboard (304)", lambda: client.get(
+                "/api/stats/dashboard", headers={"If-None-Match": first.headers["etag"]}))
+            await timed("dashboard project=1 (cold)", lambda: client.get("/api/stats/dashboard", params={"project_id": 1}))
+    finally:
+        app.dependency_overrides.clear()
+        dashboard_service.invalidate()
+        await engine.dispose()
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,158 @@
+"""
+引擎配置档基准：对比 dev / prod 在并发写入下的读路径延迟
+
+读路径：GET /api/work-items/by-project/{id}
+写负载：后台持续更新同一项目下的工作项状态
+
+用法（在 backend 目录下）：
+    python -m benchmarks.bench_engine_profiles --jobs 50 --tasks 10 --readers 8 --duration 10
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.config import ENGINE_PROFILES
+from app.database import create_engine_for_profile, get_db
+from app.dependencies.auth import get_current_user
+from app.main import app
+from app.models import Base, User, Project, WorkItem
+
+
+async def seed(session_factory, jobs: int, tasks: int) -> tuple[int, list[int]]:
+    async with session_factory() as session:
+        user = User(username="bench", email_prefix="bench", password_hash="x", is_active=True)
+        session.add(user)
+        await session.flush()
+        project = Project(code="PRO-9999", name="bench", creator_id=user.id, owner_id=user.id)
+        session.add(project)
+        await session.flush()
+        start = date(2025, 1, 1)
+        ids: list[int] = []
+        seq = 0
+        for j in range(jobs):
+            seq += 1
+            job = WorkItem(code=f"JOB-{seq:06d}", kind="JOB", project_id=project.id, title=f"job {j}",
+                           creator_id=user.id, assignee_id=user.id,
+                           planned_start_date=start, planned_end_date=start + timedelta(days=60))
+            session.add(job)
+            await session.flush()
+            ids.append(job.id)
+            for t in range(tasks):
+                seq += 1
+                task = WorkItem(code=f"TASK-{seq:06d}", kind="TASK", project_id=project.id, parent_id=job.id,
+                                title=f"task {j}-{t}", creator_id=user.id, assignee_id=user.id,
+                                planned_start_date=start, planned_end_date=start + timedelta(days=10))
+                session.add(task)
+                await session.flush()
+                ids.append(task.id)
+        await session.commit()
+        return project.id, ids
+
+
+async def run_profile(name: str, args) -> dict:
+    fd, path = tempfile.mkstemp(prefix=f"bench_{name}_", suffix=".db")
+    os.close(fd)
+    profile = ENGINE_PROFILES[name].model_copy(update={"echo": False if args.quiet else ENGINE_PROFILES[name].echo})
+    engine = create_engine_for_profile(f"sqlite+aiosqlite:///{path}", profile)
+    session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        project_id, ids = await seed(session_factory, args.jobs, args.tasks)
+
+        async def override_get_db():
+            async with session_factory() as session:
+                try:
+                    yield session
+                    await session.commit()
+                except Exception:
+                    await session.rollback()
+                    raise
+
+        async def override_user():
+            return User(id=1, username="bench", email_prefix="bench", is_active=True)
+
+        app.dependency_overrides[get_db] = override_get_db
+        app.dependency_overrides[get_current_user] = override_user
+
+        latencies: list[float] = []
+        errors = 0
+        writes = 0
+        deadline = time.perf_counter() + args.duration
+
+        async def reader(client: AsyncClient):
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                t0 = time.perf_counter()
+                resp = await client.get(f"/api/work-items/by-project/{project_id}")
+                latencies.append(time.perf_counter() - t0)
+                if resp.status_code != 200:
+                    errors += 1
+
+        async def writer():
+            nonlocal writes, errors
+            statuses = ["todo", "doing", "done"]
+            while time.perf_counter() < deadline:
+                try:
+                    async with session_factory() as session:
+                        await session.execute(
+                            update(WorkItem).where(WorkItem.id == random.choice(ids)).values(status=random.choice(statuses))
+                        )
+                        await session.commit()
+                    writes += 1
+                except Exception:
+                    errors += 1
+                await asyncio.sleep(0)
+
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+            await asyncio.gather(*[reader(client) for _ in range(args.readers)], *[writer() for _ in range(args.writers)])
+
+        latencies.sort()
+        return {
+            "profile": name,
+            "reads": len(latencies),
+            "writes": writes,
+            "errors": errors,
+            "rps": len(latencies) / args.duration,
+            "p50_ms": statistics.median(latencies) * 1000 if latencies else 0.0,
+            "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000 if latencies else 0.0,
+        }
+    finally:
+        app.dependency_overrides.clear()
+        await engine.dispose()
+        for suffix in ("", "-wal", "-shm"):
+            try:
+                os.remove(path + suffix)
+            except FileNotFoundError:
+                pass
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="对比数据库引擎配置档的读写并发表现")
+    parser.add_argument("--profiles", default="dev,prod")
+    parser.add_argument("--jobs", type=int, default=50)
+    parser.add_argument("--tasks", type=int, default=10)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--quiet", action="store_true", help="关闭所有配置档的SQL回显，仅比较存储层差异")
+    args = parser.parse_args()
+
+    results = [await run_profile(name.strip(), args) for name in args.profiles.split(",") if name.strip()]
+    print(f"{'profile':<8}{'reads':>8}{'writes':>8}{'errors':>8}{'req/s':>10}{'p50(ms)':>10}{'p95(ms)':>10}")
+    for r in results:
+        print(f"{r['profile']:<8}{r['reads']:>8}{r['writes']:>8}{r['errors']:>8}{r['rps']:>10.1f}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,59 @@
+"""
+jobs-tasks 各导出格式基准：同一数据集下 xlsx / csv / ndjson / parquet 的总耗时、峰值内存与输出大小
+
+数据集与 bench_export_xlsx 相同；直接调用行格式导出路由并逐块消费响应体。
+
+用法（在 backend 目录下）：
+    python -m benchmarks.bench_export_formats --rows 100000 --formats xlsx,csv,ndjson,parquet
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import tracemalloc
+
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.routers.exports import export_jobs_tasks_rows
+from app.schemas.export import ExportFilters
+from benchmarks.bench_export_xlsx import seed
+
+
+async def measure(engine, fmt: str) -> tuple:
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    size = 0
+    async with AsyncSession(engine) as db:
+        resp = await export_jobs_tasks_rows(format=fmt, accept=None, filters=ExportFilters(), db=db, current_user=None)
+        async for chunk in resp.body_iterator:
+            size += len(chunk)
+    total = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return total, peak, size
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="比较各导出格式的耗时与峰值内存")
+    parser.add_argument("--rows", type=int, default=100000, help="工作项数量")
+    parser.add_argument("--formats", default="xlsx,csv,ndjson,parquet", help="逗号分隔的导出格式")
+    args = parser.parse_args()
+    formats = [s.strip() for s in args.formats.split(",") if s.strip()]
+
+    fd, path = tempfile.mkstemp(prefix="bench_formats_", suffix=".db")
+    os.close(fd)
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    try:
+        await seed(engine, args.rows)
+        print(f"{'format':>8}{'total(s)':>10}{'rows/s':>10}{'peak(MB)':>10}{'size(MB)':>10}")
+        for fmt in formats:
+            total, peak, size = await measure(engine, fmt)
+            print(f"{fmt:>8}{total:>10.2f}{args.rows / total:>10.0f}{peak / 1e6:>10.2f}{size / 1e6:>10.2f}")
+    finally:
+        await engine.dispose()
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,92 @@
+"""
+jobs-tasks.xlsx 导出基准：不同行数下的首字节耗时、总耗时与峰值内存
+
+每个规模新建一个库，批量插入 1 个项目、rows/50 个JOB 与其余TASK，直接调用导出路由并逐块消费响应体。
+峰值内存用 tracemalloc 统计导出期间新分配的 Python 对象（不含已发送的字节），流式实现下应与行数无关。
+
+用法（在 backend 目录下）：
+    python -m benchmarks.bench_export_xlsx --rows 10000,100000,500000
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.models import Base, User, Project, WorkItem
+from app.routers.exports import export_jobs_tasks
+from app.schemas.export import ExportFilters
+
+
+async def seed(engine, rows: int):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(User), [
+            {"id": 1, "username": "bench", "email_prefix": "bench", "full_name": "基准", "password_hash": "x", "is_active": True},
+        ])
+        await conn.execute(insert(Project), [{"id": 1, "code": "PRO-0001", "name": "bench", "creator_id": 1, "owner_id": 1}])
+        jobs = max(1, rows // 50)
+        start = date(2025, 1, 1)
+        batch = []
+        for i in range(1, rows + 1):
+            is_job = i <= jobs
+            batch.append({
+                "id": i, "code": f"{'JOB' if is_job else 'TASK'}-{i:07d}", "kind": "JOB" if is_job else "TASK",
+                "project_id": 1, "parent_id": None if is_job else (i % jobs) + 1, "title": f"work item {i}",
+                "status": "todo", "priority": "medium", "creator_id": 1, "assignee_id": 1,
+                "planned_start_date": start, "planned_end_date": start + timedelta(days=10),
+                "estimated_hours": 64.0, "actual_hours": 8.0,
+            })
+            if len(batch) >= 10000:
+                await conn.execute(insert(WorkItem), batch)
+                batch.clear()
+        if batch:
+            await conn.execute(insert(WorkItem), batch)
+
+
+async def measure(engine) -> tuple:
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    first_byte = None
+    size = 0
+    async with AsyncSession(engine) as db:
+        resp = await export_jobs_tasks(
+            dimension="project", filters=ExportFilters(), tz=None, locale=None, db=db, current_user=None,
+        )
+        async for chunk in resp.body_iterator:
+            if first_byte is None:
+                first_byte = time.perf_counter() - t0
+            size += len(chunk)
+    total = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return first_byte, total, peak, size
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="测量流式XLSX导出的首字节耗时与峰值内存")
+    parser.add_argument("--rows", default="10000,100000", help="逗号分隔的工作项数量")
+    args = parser.parse_args()
+    sizes = [int(s) for s in args.rows.split(",") if s.strip()]
+
+    print(f"{'rows':>9}{'first(ms)':>11}{'total(s)':>10}{'peak(MB)':>10}{'size(MB)':>10}")
+    for rows in sizes:
+        fd, path = tempfile.mkstemp(prefix="bench_export_", suffix=".db")
+        os.close(fd)
+        engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+        try:
+            await seed(engine, rows)
+            first_byte, total, peak, size = await measure(engine)
+            print(f"{rows:>9}{first_byte * 1000:>11.2f}{total:>10.2f}{peak / 1e6:>10.2f}{size / 1e6:>10.2f}")
+        finally:
+            await engine.dispose()
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,96 @@
+"""
+启动耗时基准：对比旧启动流程（每次启动建表、补列探测、预置用户哈希）与版本校验
+
+- legacy：每次启动都执行的同步建表 + PRAGMA 探测/补列 + 汇总补齐（已迁移的库上）
+- seed hashing：空库首次启动时为 5 个预置用户逐个计算 bcrypt
+- check：启动时的版本校验（一次 SELECT）
+- startup：新 worker 进程执行完整 startup()（含日历、导出、快照、检索等服务启动）的耗时，单独子进程测量
+
+用法（在 backend 目录下）：
+    python -m benchmarks.bench_startup --runs 5
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app import models
+from app.migrations import _reconcile_legacy, check_schema, migrate, seed_demo_users, sync_url, DEMO_USERS
+from app.services.password_hasher import hash_password
+
+# 在子进程中导入应用并执行一次 startup/shutdown，输出 startup() 的耗时（毫秒）
+_STARTUP_PROBE = """
+import asyncio, time
+from app.main import startup, shutdown
+async def run():
+    t = time.perf_counter()
+    await startup()
+    print("startup_ms", (time.perf_counter() - t) * 1000)
+    await shutdown()
+asyncio.run(run())
+"""
+
+
+def legacy_boot(url: str):
+    engine = create_engine(sync_url(url))
+    with engine.begin() as conn:
+        models.Base.metadata.create_all(conn)
+        _reconcile_legacy(conn)
+    engine.dispose()
+
+
+def seed_hashing():
+    for _ in range(len(DEMO_USERS) + 1):
+        hash_password("123")
+
+
+async def schema_check(url: str):
+    engine = create_async_engine(url)
+    await check_schema(engine)
+    await engine.dispose()
+
+
+def worker_startup(url: str) -> float:
+    env = {**os.environ, "DATABASE_URL": url, "DB_ECHO": "false"}
+    out = subprocess.run([sys.executable, "-c", _STARTUP_PROBE], env=env, capture_output=True, text=True, check=True)
+    return next(float(line.split()[1]) for line in out.stdout.splitlines() if line.startswith("startup_ms "))
+
+
+def timed(fn, runs: int) -> float:
+    samples = []
+    for _ in range(runs):
+        t = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="对比旧启动流程与启动时版本校验的耗时")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite+aiosqlite:///{os.path.join(tmp, 'bench.db')}"
+        migrate(url)
+        seed_demo_users(url)
+        rows = [
+            ("legacy", timed(lambda: legacy_boot(url), args.runs)),
+            ("seed hashing", timed(seed_hashing, args.runs)),
+            ("check", timed(lambda: asyncio.run(schema_check(url)), args.runs)),
+            ("startup", statistics.median(worker_startup(url) for _ in range(args.runs))),
+        ]
+    print(f"{'step':<14}{'median(ms)':>12}")
+    for name, ms in rows:
+        print(f"{name:<14}{ms:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
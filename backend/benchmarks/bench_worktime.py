@@ -0,0 +1,74 @@
+"""
+工作日计算基准：逐日循环与日历索引在多年区间上的对比
+
+随机生成起止日期（跨度最长 --years 年），分别用逐日循环、单次接口与批量接口计算工作日数，
+校验三者结果一致并输出总耗时。节假日按每年约30个工作日假期与若干调休日构造。
+
+用法（在 backend 目录下）：
+    python -m benchmarks.bench_worktime --pairs 20000 --years 5
+"""
+import argparse
+import random
+import time
+from datetime import date, timedelta
+
+from app.utils.worktime import WorkCalendar
+
+
+def count_by_loop(calendar: WorkCalendar, start: date, end: date) -> int:
+    days, cur = 0, start
+    while cur <= end:
+        if calendar.is_workday(cur):
+            days += 1
+        cur += timedelta(days=1)
+    return days
+
+
+def build_calendar(rng: random.Random, first_year: int, years: int) -> WorkCalendar:
+    holidays, workdays = set(), set()
+    for year in range(first_year, first_year + years + 1):
+        day = date(year, 1, 1)
+        for _ in range(30):
+            holidays.add(day + timedelta(days=rng.randrange(365)))
+        for _ in range(6):
+            workdays.add(day + timedelta(days=rng.randrange(365)))
+    return WorkCalendar(holidays, workdays)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="对比逐日循环与日历索引的工作日计算耗时")
+    parser.add_argument("--pairs", type=int, default=20000, help="起止日期对数量")
+    parser.add_argument("--years", type=int, default=5, help="最大区间跨度（年）")
+    parser.add_argument("--loop-pairs", type=int, default=2000, help="逐日循环只跑前N对，避免耗时过长")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    first_year = 2020
+    calendar = build_calendar(rng, first_year, args.years * 2)
+    starts, ends = [], []
+    for _ in range(args.pairs):
+        start = date(first_year, 1, 1) + timedelta(days=rng.randrange(365 * args.years))
+        starts.append(start)
+        ends.append(start + timedelta(days=rng.randrange(365 * args.years)))
+
+    n = min(args.loop_pairs, args.pairs)
+    t0 = time.perf_counter()
+    looped = [count_by_loop(calendar, s, e) for s, e in zip(starts[:n], ends[:n])]
+    loop_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    single = [calendar.count_workdays(s, e) for s, e in zip(starts, ends)]
+    single_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    batch = calendar.count_workdays_many(starts, ends)
+    batch_s = time.perf_counter() - t0
+
+    assert looped == single[:n] == batch[:n] and single == batch
+    print(f"{'method':>10}{'pairs':>10}{'total(ms)':>12}{'per pair(us)':>14}")
+    for name, pairs, seconds in (("loop", n, loop_s), ("single", args.pairs, single_s), ("batch", args.pairs, batch_s)):
+        print(f"{name:>10}{pairs:>10}{seconds * 1000:>12.2f}{seconds / pairs * 1e6:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+测试公共夹具：每个用例一个已建表的临时 SQLite 数据库，以及把接口依赖指向该库的 ASGI 客户端
+
+各测试文件只预置自己的数据：通过 factory 写入，并把登录用户的 id 写入 current_user。
+"""
+from types import SimpleNamespace
+import pytest
+import pytest_asyncio
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from app.main import app
+from app.database import get_db
+from app.dependencies.auth import get_current_user
+from app.models import Base, User
+
+
+@pytest_asyncio.fixture
+async def engine(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+def factory(engine):
+    return sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+
+@pytest.fixture
+def current_user():
+    """api_client 的登录用户；预置数据后写入 id，用例中可修改 username 切换身份"""
+    return SimpleNamespace(id=None, username="alice")
+
+
+@pytest_asyncio.fixture
+async def db_client(factory):
+    """get_db 指向测试库的客户端（认证走真实流程）"""
+    async def override_get_db():
+        async with factory() as session:
+            yield session
+            await session.commit()
+
+    app.dependency_overrides[get_db] = override_get_db
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def api_client(db_client, current_user):
+    """在 db_client 基础上以 current_user 身份登录的客户端"""
+    async def override_user():
+        return User(id=current_user.id, username=current_user.username, email_prefix=current_user.username, is_active=True)
+
+    app.dependency_overrides[get_current_user] = override_user
+    return db_client
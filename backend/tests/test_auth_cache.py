@@ -0,0 +1,76 @@
+"""
+测试令牌→用户认证缓存
+"""
+import time
+import pytest
+import pytest_asyncio
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import User
+from app.services.auth_service import auth_service, CurrentUser
+
+
+@pytest_asyncio.fixture
+async def client(engine, factory, db_client):
+    async with factory() as session:
+        session.add_all([
+            User(username="admin", email_prefix="admin", password_hash="x"),
+            User(username="alice", email_prefix="alice", full_name="爱丽丝", password_hash="x"),
+        ])
+        await session.commit()
+    auth_service.invalidate_all()
+    yield db_client, engine
+    auth_service.invalidate_all()
+
+
+def bearer(username: str) -> dict:
+    return {"Authorization": f"Bearer {auth_service.create_access_token({'sub': username})}"}
+
+
+@pytest.mark.asyncio
+async def test_cached_token_skips_user_query(client):
+    c, engine = client
+    alice = bearer("alice")
+    resp = await c.get("/api/auth/me", headers=alice)
+    assert resp.status_code == 200 and resp.json()["user"]["full_name"] == "爱丽丝"
+
+    statements = []
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    resp = await c.get("/api/auth/me", headers=alice)
+    event.remove(engine.sync_engine, "before_cursor_execute", _record)
+    assert resp.status_code == 200 and statements == []
+    assert (await c.get("/api/auth/me", headers={"Authorization": "Bearer invalid"})).status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_edit_and_deactivate_invalidate(client):
+    c, _ = client
+    alice = bearer("alice")
+    resp = await c.patch("/api/users/me", headers=alice, json={"full_name": "Alice"})
+    assert resp.status_code == 200, resp.text
+    assert (await c.get("/api/auth/me", headers=alice)).json()["user"]["full_name"] == "Alice"
+
+    # 重置名单不含 alice：停用后其令牌立即失效
+    resp = await c.post("/api/users/reset", headers=bearer("admin"), json=[])
+    assert resp.status_code == 200, resp.text
+    assert (await c.get("/api/auth/me", headers=alice)).status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_cache_bounded_and_expiring(client, monkeypatch):
+    c, engine = client
+    monkeypatch.setattr("app.services.auth_service.AUTH_CACHE_SIZE", 2)
+    async with AsyncSession(engine) as session:
+        tokens = [auth_service.create_access_token({"sub": "alice", "n": i}) for i in range(3)]
+        users = [await auth_service.resolve_token(session, t) for t in tokens]
+        assert all(isinstance(u, CurrentUser) and u.username == "alice" for u in users)
+        assert list(auth_service._token_cache) == tokens[1:]
+
+        monkeypatch.setattr("app.services.auth_service.AUTH_CACHE_TTL", 0)
+        auth_service.invalidate_all()
+        await auth_service.resolve_token(session, tokens[0])
+        assert auth_service._token_cache[tokens[0]][0] <= time.monotonic()
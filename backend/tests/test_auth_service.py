@@ -187,7 +187,7 @@ async def test_get_current_user():
             token = auth_service.create_access_token({"sub": "currentuser"})
             
             # 获取当前用户
-            current_user = await auth_service.get_current_user(session, token)
+            current_user = await auth_service.resolve_token(session, token)
             
             assert current_user is not None
             assert current_user.username == "currentuser"
@@ -195,7 +195,7 @@ async def test_get_current_user():
             
             # 测试无效令牌
             invalid_token = "invalid_token"
-            invalid_user = await auth_service.get_current_user(session, invalid_token)
+            invalid_user = await auth_service.resolve_token(session, invalid_token)
             assert invalid_user is None
             
     finally:
@@ -0,0 +1,148 @@
+"""
+测试节假日日历的加载、版本与工时批量重算
+"""
+import json
+from datetime import date, datetime
+import pytest
+import pytest_asyncio
+from sqlalchemy import event, select
+from app.models import User, Project, WorkItem, JobRollup
+from app.services.calendar_service import calendar_service
+from app.services.job_rollup_service import job_rollup_service
+from app.services.version_service import version_service, CALENDAR_SCOPE, CALENDAR_APPLIED_SCOPE
+from app.services.work_item_service import work_item_service
+
+# 2025-05-01（周四）至 05-05（周一）劳动节，04-27（周日）调休
+MAY_DAY = {
+    **{date(2025, 5, d): ("holiday", "劳动节") for d in range(1, 6)},
+    date(2025, 4, 27): ("workday", "劳动节调休"),
+}
+
+
+@pytest_asyncio.fixture
+async def seeded(engine, factory):
+    async with factory() as session:
+        user = User(username="admin", email_prefix="admin", password_hash="x")
+        session.add(user)
+        await session.flush()
+        project = Project(code="PRO-0001", name="p", creator_id=user.id, owner_id=user.id)
+        session.add(project)
+        await session.flush()
+        job = await work_item_service.create(
+            session, project_id=project.id, kind="JOB", parent_id=None, title="j", status="todo",
+            creator_id=user.id, planned_start_date=date(2025, 4, 1), planned_end_date=date(2025, 6, 30),
+        )
+        # 跨劳动节、跨调休日、不受影响
+        ranges = [(date(2025, 4, 28), date(2025, 5, 9)), (date(2025, 4, 21), date(2025, 4, 30)), (date(2025, 6, 2), date(2025, 6, 6))]
+        tasks = [
+            await work_item_service.create(
+                session, project_id=project.id, kind="TASK", parent_id=job.id, title=f"t{i}", status="todo",
+                creator_id=user.id, planned_start_date=start, planned_end_date=end,
+            )
+            for i, (start, end) in enumerate(ranges)
+        ]
+        await work_item_service.update(
+            session, id=tasks[0].id, data={"status": "done", "completed_at": datetime(2025, 5, 6, 18)}, current_user_id=user.id,
+        )
+        await session.commit()
+        ids = {"user": user.id, "job": job.id, "tasks": [t.id for t in tasks]}
+    yield engine, factory, ids
+    calendar_service.invalidate()
+
+
+async def hours(factory) -> dict:
+    async with factory() as session:
+        rows = (await session.execute(select(WorkItem.id, WorkItem.estimated_hours, WorkItem.actual_hours, WorkItem.row_version))).all()
+    return {r.id: (r.estimated_hours, r.actual_hours, r.row_version) for r in rows}
+
+
+@pytest.mark.asyncio
+async def test_calendar_change_recomputes_affected_items_in_chunks(seeded):
+    engine, factory, ids = seeded
+    t0, t1, t2 = ids["tasks"]
+    before = await hours(factory)
+    assert before[t0][:2] == (80.0, 56.0)
+
+    async with factory() as session:
+        version, changed = await calendar_service.replace_range(session, date(2025, 1, 1), date(2025, 12, 31), MAY_DAY)
+        await session.commit()
+    assert changed == set(MAY_DAY)
+
+    statements = []
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    updated = await calendar_service.recompute(engine, changed, chunk_size=2)
+    event.remove(engine.sync_engine, "before_cursor_execute", _record)
+
+    after = await hours(factory)
+    # 劳动节占3个工作日；调休日落在 t1 区间内
+    assert after[t0][:2] == (56.0, 32.0)
+    assert after[t1][:2] == (before[t1][0] + 8, None)
+    assert after[t2] == before[t2]
+    assert after[ids["job"]][0] == before[ids["job"]][0] - 16
+    assert updated == 3
+    # 每块一条 UPDATE，不逐行读写
+    assert sum(s.startswith("UPDATE work_items SET") and "estimated_hours" in s for s in statements) == 2, statements
+    assert not any("WHERE work_items.id = ?" in s for s in statements if s.startswith("SELECT")), statements
+
+    async with factory() as session:
+        rollup = job_rollup_service.to_dict(await session.get(JobRollup, ids["job"]))
+        recount = job_rollup_service.to_dict(JobRollup(**(await job_rollup_service._aggregate(session, [ids["job"]]))[ids["job"]]))
+        assert rollup == recount
+        assert await version_service.current_many(session, CALENDAR_SCOPE, CALENDAR_APPLIED_SCOPE) == (version, version)
+
+
+@pytest.mark.asyncio
+async def test_file_import_reloads_process_calendar(seeded, tmp_path):
+    engine, factory, ids = seeded
+    path = tmp_path / "holidays.json"
+    path.write_text(json.dumps({
+        "holidays": {d.isoformat(): name for d, (kind, name) in MAY_DAY.items() if kind == "holiday"},
+        "workdays": {"2025-04-27": "劳动节调休"},
+    }), encoding="utf-8")
+    async with factory() as session:
+        version, changed = await calendar_service.load_file(session, path)
+        await session.commit()
+        assert await calendar_service.refresh(session) == version
+    async with factory() as session:
+        # 内容相同的重复导入不产生新版本
+        assert await calendar_service.load_file(session, path) == (None, set())
+        task = await work_item_service.create(
+            session, project_id=1, kind="TASK", parent_id=ids["job"], title="new", status="todo",
+            creator_id=ids["user"], planned_start_date=date(2025, 4, 28), planned_end_date=date(2025, 5, 9),
+        )
+        await session.commit()
+    assert version == 1 and task.estimated_hours == 56.0
+
+
+@pytest.mark.asyncio
+async def test_replace_year_api_schedules_recompute(seeded, api_client, current_user):
+    engine, factory, ids = seeded
+    current_user.id, current_user.username = ids["user"], "admin"
+    body = {"days": [{"date": d.isoformat(), "kind": kind, "name": name} for d, (kind, name) in MAY_DAY.items()]}
+    resp = await api_client.put("/api/calendar/2025", json=body)
+    assert resp.status_code == 200, resp.text
+    assert resp.json()["version"] == 1 and resp.json()["recompute_days"] == 6
+    await calendar_service.wait()
+
+    data = (await api_client.get("/api/calendar", params={"year": 2025})).json()
+    assert data["applied_version"] == data["version"] == 1 and len(data["days"]) == 6
+    assert (await hours(factory))[ids["tasks"][0]][:2] == (56.0, 32.0)
+
+    # 只改名称：产生新版本但无需重算，已应用版本同步推进（否则下次启动会全表重算）
+    before = await hours(factory)
+    body["days"][0]["name"] = "国际劳动节"
+    resp = await api_client.put("/api/calendar/2025", json=body)
+    assert resp.json()["version"] == 2 and resp.json()["recompute_days"] == 0
+    await calendar_service.wait()
+    data = (await api_client.get("/api/calendar", params={"year": 2025})).json()
+    assert data["applied_version"] == data["version"] == 2
+    assert await hours(factory) == before
+
+    bad = await api_client.put("/api/calendar/2025", json={"days": [{"date": "2024-12-31", "kind": "holiday"}]})
+    assert bad.status_code == 422
+    current_user.username = "alice"
+    assert (await api_client.put("/api/calendar/2025", json={"days": []})).status_code == 403
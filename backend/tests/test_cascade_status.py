@@ -0,0 +1,89 @@
+"""
+测试JOB状态级联的批量写入
+"""
+from datetime import date
+import pytest
+import pytest_asyncio
+from sqlalchemy import event, select
+from app.models import User, Project, WorkItem, AuditLog
+from app.services.work_item_service import work_item_service
+
+
+@pytest_asyncio.fixture
+async def session_factory(factory):
+    async with factory() as session:
+        user = User(username="alice", email_prefix="alice", password_hash="x")
+        session.add(user)
+        await session.flush()
+        session.add(Project(code="PRO-0001", name="p", creator_id=user.id, owner_id=user.id))
+        await session.commit()
+    yield factory
+
+
+async def seed_job(factory, title: str, tasks: int) -> int:
+    async with factory() as session:
+        job = WorkItem(code=f"JOB-{title}", kind="JOB", project_id=1, title=title, status="todo", creator_id=1,
+                       planned_start_date=date(2025, 3, 3), planned_end_date=date(2025, 3, 28))
+        session.add(job)
+        await session.flush()
+        session.add_all([
+            WorkItem(code=f"TASK-{title}-{i}", kind="TASK", project_id=1, parent_id=job.id, title=f"{title}-{i}",
+                     status="doing" if i % 2 else "todo", creator_id=1,
+                     planned_start_date=date(2025, 3, 3), planned_end_date=date(2025, 3, 7))
+            for i in range(tasks)
+        ])
+        await session.commit()
+        return job.id
+
+
+async def cascade_statements(factory, job_id: int, target_status: str) -> list:
+    statements = []
+
+    @event.listens_for(factory.kw["bind"].sync_engine, "before_cursor_execute")
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    async with factory() as session:
+        await work_item_service.cascade_status(session, job_id=job_id, target_status=target_status, current_user_id=1)
+        await session.commit()
+    event.remove(factory.kw["bind"].sync_engine, "before_cursor_execute", _record)
+    return statements
+
+
+@pytest.mark.asyncio
+async def test_statement_count_independent_of_child_count(session_factory):
+    small = await seed_job(session_factory, "small", 5)
+    large = await seed_job(session_factory, "large", 200)
+    # 预热：首次写入会创建版本计数器
+    await cascade_statements(session_factory, small, "doing")
+    small_statements = await cascade_statements(session_factory, small, "done")
+    large_statements = await cascade_statements(session_factory, large, "done")
+    assert len(large_statements) == len(small_statements), large_statements
+    assert sum(s.startswith("UPDATE work_items") for s in large_statements) == 1
+    assert sum(s.startswith("INSERT INTO audit_logs") for s in large_statements) == 1
+
+
+@pytest.mark.asyncio
+async def test_returned_items_match_database(session_factory):
+    job_id = await seed_job(session_factory, "j", 4)
+    async with session_factory() as session:
+        updated = await work_item_service.cascade_status(session, job_id=job_id, target_status="done", current_user_id=1)
+        await session.commit()
+    assert [wi.id for wi in updated][0] == job_id and len(updated) == 5
+    assert {wi.status for wi in updated} == {"done"}
+    assert len({wi.completed_at for wi in updated}) == 1
+    assert all(wi.actual_hours and wi.estimated_hours for wi in updated)
+
+    async with session_factory() as session:
+        stored = {wi.id: wi for wi in (await session.execute(select(WorkItem))).scalars().all()}
+        for wi in updated:
+            assert (stored[wi.id].status, stored[wi.id].actual_hours, stored[wi.id].estimated_hours, stored[wi.id].row_version) == \
+                (wi.status, wi.actual_hours, wi.estimated_hours, wi.row_version)
+        logs = (await session.execute(select(AuditLog).where(AuditLog.action == "status_cascade"))).scalars().all()
+        assert sorted((l.entity_id, l.new_value) for l in logs) == sorted((wi.id, "done") for wi in updated)
+        assert {l.old_value for l in logs} == {"todo", "doing"}
+
+    async with session_factory() as session:
+        reopened = await work_item_service.cascade_status(session, job_id=job_id, target_status="todo", current_user_id=1)
+        await session.commit()
+    assert all(wi.completed_at is None and wi.actual_hours is None for wi in reopened)
@@ -0,0 +1,98 @@
+"""
+测试增量导出 GET /api/export/changes
+"""
+import json
+from datetime import date
+import pytest
+import pytest_asyncio
+from app.models import User, Project, OperationLog
+from app.services.comment_service import comment_service
+from app.services.work_item_service import work_item_service
+
+
+@pytest_asyncio.fixture
+async def seeded(factory, api_client, current_user):
+    async with factory() as session:
+        alice = User(username="alice", email_prefix="alice", password_hash="x")
+        session.add(alice)
+        await session.flush()
+        project = Project(code="PRO-0001", name="p1", creator_id=alice.id, owner_id=alice.id)
+        session.add(project)
+        await session.flush()
+        job = await work_item_service.create(
+            session, project_id=project.id, kind="JOB", parent_id=None, title="j1", status="todo", creator_id=alice.id,
+            planned_start_date=date(2025, 1, 1), planned_end_date=date(2025, 1, 31),
+        )
+        tasks = [
+            await work_item_service.create(
+                session, project_id=project.id, kind="TASK", parent_id=job.id, title=f"t{i}", status="todo",
+                creator_id=alice.id, planned_start_date=date(2025, 1, 2), planned_end_date=date(2025, 1, 3),
+            )
+            for i in range(3)
+        ]
+        comment = await comment_service.add_comment(session, entity_type="work_item", entity_id=job.id, author_id=alice.id, content="c1")
+        session.add(OperationLog(user_id=alice.id, username="alice", operation_type="create", entity_type="job", entity_id=job.id,
+                                 operation_content="创建JOB", result_status="success"))
+        await session.commit()
+        ids = {"alice": alice.id, "job": job.id, "tasks": [t.id for t in tasks], "comment": comment.id}
+
+    current_user.id = ids["alice"]
+    yield api_client, factory, ids
+
+
+async def pull(client, **params):
+    resp = await client.get("/api/export/changes", params=params)
+    assert resp.status_code == 200, resp.text
+    lines = [json.loads(line) for line in resp.text.splitlines()]
+    assert lines[-1]["type"] == "end"
+    return [r for r in lines if r["type"] not in ("checkpoint", "end")], lines[-1]
+
+
+@pytest.mark.asyncio
+async def test_incremental_pull_returns_only_changes(seeded):
+    client, factory, ids = seeded
+    records, end = await pull(client)
+    assert end["has_more"] is False
+    assert sorted((r["type"], r["id"]) for r in records) == sorted(
+        [("project", 1), ("work_item", ids["job"]), ("comment", ids["comment"]), ("operation_log", 1)]
+        + [("work_item", i) for i in ids["tasks"]]
+    )
+    # 同一数据源内按 (版本, id) 递增
+    items = [(r["version"], r["id"]) for r in records if r["type"] == "work_item"]
+    assert items == sorted(items)
+    assert records[0]["data"]["code"] == "PRO-0001"
+
+    # 没有新写入时只有结束行，游标不变
+    again, end2 = await pull(client, cursor=end["cursor"])
+    assert again == [] and end2["cursor"] == end["cursor"]
+
+    async with factory() as session:
+        await work_item_service.update(session, id=ids["tasks"][1], data={"title": "t1'"}, current_user_id=ids["alice"])
+        await comment_service.delete_comment(session, id=ids["comment"])
+        await session.commit()
+    records, end3 = await pull(client, cursor=end["cursor"])
+    by_key = {(r["type"], r["id"]): r for r in records}
+    assert by_key[("work_item", ids["tasks"][1])]["data"]["title"] == "t1'"
+    assert ("work_item", ids["tasks"][0]) not in by_key
+    tombstone = by_key[("comment", ids["comment"])]
+    assert tombstone["op"] == "delete" and "data" not in tombstone and tombstone["deleted_at"]
+    assert end3["cursor"] != end["cursor"]
+
+
+@pytest.mark.asyncio
+async def test_keyset_pages_resume_from_cursor(seeded):
+    client, _, ids = seeded
+    full, _ = await pull(client)
+    collected, cursor = [], None
+    while True:
+        params = {"limit": 2} if cursor is None else {"limit": 2, "cursor": cursor}
+        records, end = await pull(client, **params)
+        assert len(records) <= 2
+        collected += records
+        cursor = end["cursor"]
+        if not end["has_more"]:
+            break
+    assert [(r["type"], r["id"]) for r in collected] == [(r["type"], r["id"]) for r in full]
+
+    resp = await client.get("/api/export/changes", params={"cursor": "not-a-cursor"})
+    assert resp.status_code == 400
@@ -0,0 +1,134 @@
+"""
+测试读接口的 ETag / If-None-Match 条件请求
+"""
+from datetime import date
+import pytest
+import pytest_asyncio
+from sqlalchemy import event
+from app.models import User, Project
+from app.services.work_item_service import work_item_service
+from app.services.version_service import version_service, USERS_SCOPE
+from app.utils.etag import etag_matches, make_etag
+
+
+@pytest_asyncio.fixture
+async def seeded(factory, api_client, current_user):
+    async with factory() as session:
+        alice = User(username="alice", email_prefix="alice", password_hash="x")
+        session.add(alice)
+        await session.flush()
+        project = Project(code="PRO-0001", name="p1", creator_id=alice.id, owner_id=alice.id)
+        session.add(project)
+        await session.flush()
+        job = await work_item_service.create(
+            session, project_id=project.id, kind="JOB", parent_id=None, title="j1", status="todo",
+            creator_id=alice.id, planned_start_date=date(2025, 1, 1), planned_end_date=date(2025, 1, 31),
+        )
+        await session.commit()
+        ids = {"alice": alice.id, "project": project.id, "job": job.id}
+
+    current_user.id = ids["alice"]
+    yield api_client, factory, ids
+
+
+def count_selects(engine, table: str) -> list:
+    statements = []
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and f"FROM {table}" in statement:
+            statements.append(statement)
+
+    return statements
+
+
+def test_etag_matching():
+    etag = make_etag("x", 1)
+    assert etag.startswith('W/"')
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"other", {etag[2:]}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches(None, etag)
+    assert not etag_matches(make_etag("x", 2), etag)
+
+
+@pytest.mark.asyncio
+async def test_by_project_not_modified_skips_tree_query(seeded):
+    client, factory, ids = seeded
+    url = f"/api/work-items/by-project/{ids['project']}"
+    res = await client.get(url)
+    etag = res.headers["etag"]
+
+    selects = count_selects(factory.kw["bind"], "work_items")
+    res = await client.get(url, headers={"If-None-Match": etag})
+    assert res.status_code == 304 and res.content == b""
+    assert res.headers["etag"] == etag
+    # 只执行了求最大版本号的聚合查询
+    assert len(selects) == 1 and "max(work_items.row_version)" in selects[0]
+
+    async with factory() as session:
+        await work_item_service.update(session, id=ids["job"], data={"title": "renamed"}, current_user_id=ids["alice"])
+        await session.commit()
+    res = await client.get(url, headers={"If-None-Match": etag})
+    assert res.status_code == 200 and res.headers["etag"] != etag
+    assert res.json()["items"][0]["title"] == "renamed"
+
+
+@pytest.mark.asyncio
+async def test_user_changes_invalidate_dependent_lists(seeded):
+    client, factory, ids = seeded
+    tree_etag = (await client.get(f"/api/work-items/by-project/{ids['project']}")).headers["etag"]
+    users_etag = (await client.get("/api/users")).headers["etag"]
+    projects_etag = (await client.get("/api/projects")).headers["etag"]
+    assert (await client.get("/api/users", headers={"If-None-Match": users_etag})).status_code == 304
+    assert (await client.get("/api/projects", headers={"If-None-Match": projects_etag})).status_code == 304
+
+    # 与 PATCH /api/users/me、/api/users/reset 提交前的操作一致
+    async with factory() as session:
+        await version_service.bump(session, USERS_SCOPE)
+        await session.commit()
+    assert (await client.get("/api/users", headers={"If-None-Match": users_etag})).status_code == 200
+    assert (await client.get("/api/projects", headers={"If-None-Match": projects_etag})).status_code == 200
+    res = await client.get(f"/api/work-items/by-project/{ids['project']}", headers={"If-None-Match": tree_etag})
+    assert res.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_projects_etag_depends_on_query_and_writes(seeded):
+    client, factory, ids = seeded
+    etag = (await client.get("/api/projects")).headers["etag"]
+    res = await client.get("/api/projects", params={"page": 2}, headers={"If-None-Match": etag})
+    assert res.status_code == 200
+
+    res = await client.put(f"/api/projects/{ids['project']}", json={"name": "p1-renamed"})
+    assert res.status_code == 200
+    res = await client.get("/api/projects", headers={"If-None-Match": etag})
+    assert res.status_code == 200
+    assert res.json()["items"][0]["name"] == "p1-renamed"
+
+
+@pytest.mark.asyncio
+async def test_comments_etag(seeded):
+    client, factory, ids = seeded
+    url = f"/api/comments/project/{ids['project']}"
+    etag = (await client.get(url)).headers["etag"]
+    assert (await client.get(url, headers={"If-None-Match": etag})).status_code == 304
+
+    res = await client.post("/api/comments/", json={"entity_type": "project", "entity_id": ids["project"], "content": "hi"})
+    comment_id = res.json()["id"]
+    res = await client.get(url, headers={"If-None-Match": etag})
+    assert res.status_code == 200 and len(res.json()) == 1
+    etag = res.headers["etag"]
+
+    await client.patch(f"/api/comments/{comment_id}", json={"content": "edited"})
+    res = await client.get(url, headers={"If-None-Match": etag})
+    assert res.status_code == 200 and res.json()[0]["content"] == "edited"
+
+
+@pytest.mark.asyncio
+async def test_labels_tree_etag(seeded):
+    client, factory, ids = seeded
+    res = await client.get("/api/labels/tree")
+    etag = res.headers["etag"]
+    res = await client.get("/api/labels/tree", headers={"If-None-Match": etag})
+    assert res.status_code == 304
@@ -0,0 +1,98 @@
+"""
+测试仪表盘统计 GET /api/stats/dashboard
+"""
+from datetime import date, datetime, timedelta
+import pytest
+import pytest_asyncio
+from sqlalchemy import event
+from app.models import User, Project, WorkItem
+from app.services.dashboard_service import dashboard_service
+from app.services.work_item_service import work_item_service
+
+
+@pytest_asyncio.fixture
+async def seeded(engine, factory, api_client, current_user):
+    today = date.today()
+    async with factory() as session:
+        alice = User(username="alice", email_prefix="alice", full_name="爱丽丝", password_hash="x")
+        bob = User(username="bob", email_prefix="bob", password_hash="x")
+        session.add_all([alice, bob])
+        await session.flush()
+        p1 = Project(code="PRO-0001", name="p1", creator_id=alice.id, owner_id=alice.id, end_date=today + timedelta(days=3))
+        p2 = Project(code="PRO-0002", name="p2", creator_id=alice.id, owner_id=bob.id, end_date=today - timedelta(days=1))
+        session.add_all([p1, p2])
+        await session.flush()
+        job = WorkItem(code="JOB-0001", kind="JOB", project_id=p1.id, title="j", status="doing", priority="high",
+                       creator_id=alice.id, assignee_id=alice.id, planned_end_date=today - timedelta(days=5))
+        session.add(job)
+        await session.flush()
+        session.add_all([
+            WorkItem(code="TASK-0001", kind="TASK", project_id=p1.id, parent_id=job.id, title="t1", status="done",
+                     creator_id=alice.id, assignee_id=bob.id, estimated_hours=8.0, actual_hours=12.0,
+                     completed_at=datetime.utcnow()),
+            WorkItem(code="TASK-0002", kind="TASK", project_id=p1.id, parent_id=job.id, title="t2", status="done",
+                     creator_id=alice.id, assignee_id=bob.id, estimated_hours=8.0, actual_hours=8.0,
+                     completed_at=datetime.utcnow()),
+            WorkItem(code="TASK-0003", kind="TASK", project_id=p1.id, parent_id=job.id, title="t3", status="todo",
+                     creator_id=alice.id, assignee_id=bob.id, planned_end_date=today + timedelta(days=1)),
+            WorkItem(code="JOB-0002", kind="JOB", project_id=p2.id, title="j2", status="todo", creator_id=alice.id),
+        ])
+        await session.commit()
+        ids = {"alice": alice.id, "p1": p1.id}
+
+    current_user.id = ids["alice"]
+    yield api_client, engine, factory, ids
+    dashboard_service.invalidate()
+
+
+@pytest.mark.asyncio
+async def test_dashboard_series(seeded):
+    client, _, _, ids = seeded
+    resp = await client.get("/api/stats/dashboard")
+    assert resp.status_code == 200
+    body = resp.json()
+    kpis = body["kpis"]
+    assert (kpis["projects"], kpis["jobs"], kpis["tasks"], kpis["tasks_done"]) == (2, 2, 3, 2)
+    assert kpis["completion_rate"] == 40 and kpis["active_assignees"] == 2
+    assert kpis["overdue_work_items"] == 1 and kpis["overdue_projects"] == 1
+    assert {s["status"]: s["count"] for s in body["status_distribution"]} == {"doing": 1, "done": 2, "todo": 2}
+    assert body["assignee_load"][0] == {
+        "assignee_id": 2, "name": "bob", "total": 3, "todo": 1, "doing": 0, "blocked": 0, "done": 2,
+        "estimated_hours": 16.0, "actual_hours": 20.0,
+    }
+    assert [o["code"] for o in body["overdue_items"]] == ["JOB-0001"] and body["overdue_items"][0]["days_overdue"] == 5
+    assert [u["code"] for u in body["upcoming_deadlines"]] == ["PRO-0001"]
+    assert body["top_projects"][0]["code"] == "PRO-0001" and body["top_projects"][0]["progress"] == 50
+    assert body["estimate_accuracy"] == {
+        "items": 2, "estimated_hours": 16.0, "actual_hours": 20.0, "ratio": 1.25, "under": 0, "on_target": 1, "over": 1,
+    }
+    trend = body["completion_trend"]
+    assert len(trend["days"]) == 7 and len(trend["weeks"]) == 12 and len(trend["months"]) == 6
+    assert trend["days"][-1]["completed"] == 2 and trend["days"][-1]["created"] == 5
+
+    scoped = (await client.get("/api/stats/dashboard", params={"project_id": ids["p1"]})).json()
+    assert scoped["kpis"]["jobs"] == 1 and [p["code"] for p in scoped["projects"]] == ["PRO-0001"]
+
+
+@pytest.mark.asyncio
+async def test_dashboard_cached_until_write(seeded):
+    client, engine, factory, ids = seeded
+    first = await client.get("/api/stats/dashboard")
+    statements = []
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    # 数据未变化：只读一次版本计数器
+    again = await client.get("/api/stats/dashboard")
+    assert again.json() == first.json() and len(statements) == 1
+    resp = await client.get("/api/stats/dashboard", headers={"If-None-Match": first.headers["etag"]})
+    assert resp.status_code == 304
+    event.remove(engine.sync_engine, "before_cursor_execute", _record)
+
+    async with factory() as session:
+        await work_item_service.update(session, id=4, data={"status": "done"}, current_user_id=ids["alice"])
+        await session.commit()
+    resp = await client.get("/api/stats/dashboard", headers={"If-None-Match": first.headers["etag"]})
+    assert resp.status_code == 200 and resp.json()["kpis"]["tasks_done"] == 3
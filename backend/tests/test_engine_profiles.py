@@ -0,0 +1,55 @@
+"""
+测试数据库引擎配置档
+"""
+import pytest
+from sqlalchemy import text
+from sqlalchemy.pool import AsyncAdaptedQueuePool, StaticPool
+from app.config import ENGINE_PROFILES, Settings
+from app.database import create_engine_for_profile
+
+
+def test_dev_profile_keeps_defaults():
+    """dev配置档保持SQL回显且不设置PRAGMA"""
+    profile = Settings(db_profile="dev").engine_profile()
+    assert profile.echo is True
+    assert profile.sqlite_pragmas() == {}
+
+
+def test_env_overrides():
+    """DB_ECHO / DB_POOL_SIZE 覆盖配置档中的值"""
+    profile = Settings(db_profile="prod", db_echo=True, db_pool_size=2).engine_profile()
+    assert profile.echo is True
+    assert profile.pool_size == 2
+    # 原配置档不被修改
+    assert ENGINE_PROFILES["prod"].echo is False
+
+
+def test_unknown_profile():
+    """未知配置档报错"""
+    with pytest.raises(ValueError, match="未知的数据库配置档"):
+        Settings(db_profile="staging").engine_profile()
+
+
+@pytest.mark.asyncio
+async def test_prod_profile_applies_pragmas(tmp_path):
+    """prod配置档在新连接上启用WAL等PRAGMA，并使用固定大小连接池"""
+    engine = create_engine_for_profile(f"sqlite+aiosqlite:///{tmp_path / 'prod.db'}", ENGINE_PROFILES["prod"])
+    try:
+        assert isinstance(engine.pool, AsyncAdaptedQueuePool)
+        async with engine.connect() as conn:
+            assert (await conn.execute(text("PRAGMA journal_mode"))).scalar() == "wal"
+            assert (await conn.execute(text("PRAGMA busy_timeout"))).scalar() == 5000
+            assert (await conn.execute(text("PRAGMA synchronous"))).scalar() == 1  # NORMAL
+            assert (await conn.execute(text("PRAGMA temp_store"))).scalar() == 2  # MEMORY
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_memory_database_keeps_static_pool():
+    """内存库不切换连接池，避免每个连接看到不同的数据库"""
+    engine = create_engine_for_profile("sqlite+aiosqlite:///:memory:", ENGINE_PROFILES["prod"])
+    try:
+        assert isinstance(engine.pool, StaticPool)
+    finally:
+        await engine.dispose()
@@ -0,0 +1,128 @@
+"""
+测试后台导出任务与结果复用
+"""
+import asyncio
+import io
+from datetime import datetime, timedelta
+import pytest
+import pytest_asyncio
+from openpyxl import load_workbook
+from sqlalchemy import update
+from app.models import User, Project, WorkItem, ExportJob
+from app.services.export_service import ExportJobService, export_service
+from app.services.version_service import version_service, ROW_VERSION_SCOPE
+
+
+@pytest_asyncio.fixture
+async def client(tmp_path, factory, api_client, current_user, monkeypatch):
+    async with factory() as session:
+        alice = User(username="alice", email_prefix="alice", full_name="爱丽丝", password_hash="x")
+        session.add(alice)
+        await session.flush()
+        projects = [Project(code=f"PRO-000{i}", name=f"p{i}", creator_id=alice.id, owner_id=alice.id) for i in (1, 2)]
+        session.add_all(projects)
+        await session.flush()
+        session.add_all([
+            WorkItem(code=f"JOB-{i:04d}", kind="JOB", project_id=projects[i % 2].id, title=f"t{i}",
+                     status="todo", creator_id=alice.id, assignee_id=alice.id, estimated_hours=8.0)
+            for i in range(25)
+        ])
+        await session.commit()
+
+    current_user.id = alice.id
+    monkeypatch.setattr(export_service, "spool_dir", tmp_path / "exports")
+    yield api_client, factory, [p.id for p in projects]
+    await export_service.stop()
+
+
+@pytest.mark.asyncio
+async def test_job_builds_file_and_downloads(client):
+    c, _, project_ids = client
+    resp = await c.post("/api/export/jobs", json={"project_ids": [project_ids[0]]})
+    assert resp.status_code == 200
+    job = resp.json()
+    assert job["status"] == "queued" and job["cached"] is False and job["download_url"] is None
+
+    await export_service.wait()
+    job = (await c.get(f"/api/export/jobs/{job['id']}")).json()
+    assert job["status"] == "done" and job["rows_total"] == 13 and job["rows_done"] == 13
+    assert job["download_url"] == f"/api/export/jobs/{job['id']}/download"
+
+    resp = await c.get(job["download_url"])
+    assert resp.status_code == 200 and len(resp.content) == job["size"]
+    wb = load_workbook(io.BytesIO(resp.content))
+    jobs = [r for r in wb["Jobs"].iter_rows(values_only=True)][1:]
+    assert len(jobs) == 13 and {j[2] for j in jobs} == {"PRO-0001"}
+
+    assert (await c.get("/api/export/jobs/missing")).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_same_filters_reuse_result_until_data_changes(client, monkeypatch):
+    c, factory, project_ids = client
+    first = (await c.post("/api/export/jobs", json={"project_ids": project_ids, "statuses": ["todo", "doing"]})).json()
+    # 排队中也复用
+    queued = (await c.post("/api/export/jobs", json={"project_ids": project_ids[::-1], "statuses": ["doing", "todo"]})).json()
+    assert queued["id"] == first["id"] and queued["cached"] is True
+
+    await export_service.wait()
+    again = (await c.post("/api/export/jobs", json={"project_ids": project_ids[::-1], "statuses": ["doing", "todo", "todo"]})).json()
+    assert again["id"] == first["id"] and again["cached"] is True and again["status"] == "done"
+
+    async with factory() as session:
+        await version_service.bump(session, ROW_VERSION_SCOPE)
+        await session.commit()
+    # 不启动工作协程，任务停在排队中
+    monkeypatch.setattr(export_service, "workers", 0)
+    fresh = (await c.post("/api/export/jobs", json={"project_ids": project_ids, "statuses": ["todo", "doing"]})).json()
+    assert fresh["id"] != first["id"] and fresh["cached"] is False
+    resp = await c.get(f"/api/export/jobs/{fresh['id']}/download")
+    assert resp.status_code == 409
+
+
+@pytest.mark.asyncio
+async def test_jobs_visible_only_to_creator(client, current_user):
+    c, _, project_ids = client
+    job = (await c.post("/api/export/jobs", json={"project_ids": [project_ids[0]]})).json()
+    await export_service.wait()
+    owner = current_user.id
+    current_user.id = owner + 1
+    assert (await c.get(f"/api/export/jobs/{job['id']}")).status_code == 404
+    assert (await c.get(f"/api/export/jobs/{job['id']}/download")).status_code == 404
+    # 其他用户相同条件的导出不复用他人的任务
+    other = (await c.post("/api/export/jobs", json={"project_ids": [project_ids[0]]})).json()
+    assert other["id"] != job["id"] and other["cached"] is False
+    current_user.id = owner
+    assert (await c.get(f"/api/export/jobs/{job['id']}/download")).status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_workers_claim_jobs_atomically(client, monkeypatch, tmp_path):
+    c, factory, project_ids = client
+    monkeypatch.setattr(export_service, "workers", 0)
+    job_id = (await c.post("/api/export/jobs", json={"project_ids": project_ids})).json()["id"]
+    bind = factory.kw["bind"]
+    a, b = ExportJobService(tmp_path / "exports"), ExportJobService(tmp_path / "exports")
+    await asyncio.gather(a._build(bind, job_id), b._build(bind, job_id))
+    async with factory() as session:
+        job = await session.get(ExportJob, job_id)
+    assert job.status == "done" and job.owner in (a.worker_id, b.worker_id)
+    assert [p.name for p in (tmp_path / "exports").iterdir()] == [f"{job_id}.xlsx"]
+
+
+@pytest.mark.asyncio
+async def test_startup_requeues_only_stale_running_jobs(client, monkeypatch):
+    c, factory, project_ids = client
+    monkeypatch.setattr(export_service, "workers", 0)
+    live = (await c.post("/api/export/jobs", json={"project_ids": [project_ids[0]]})).json()["id"]
+    dead = (await c.post("/api/export/jobs", json={"project_ids": [project_ids[1]]})).json()["id"]
+    now = datetime.utcnow()
+    async with factory() as session:
+        for job_id, beat in ((live, now), (dead, now - timedelta(seconds=export_service.stale_seconds + 1))):
+            await session.execute(update(ExportJob).where(ExportJob.id == job_id)
+                                  .values(status="running", owner="other-worker", heartbeat_at=beat))
+        await session.commit()
+    await export_service.startup(factory.kw["bind"])
+    async with factory() as session:
+        statuses = {j: (await session.get(ExportJob, j)).status for j in (live, dead)}
+    assert statuses == {live: "running", dead: "queued"}
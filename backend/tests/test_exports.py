@@ -0,0 +1,145 @@
+"""
+测试 jobs-tasks.xlsx 流式导出
+"""
+import io
+import json
+from datetime import date
+import pytest
+import pytest_asyncio
+from openpyxl import load_workbook
+from sqlalchemy import event
+from app.models import User, Project, WorkItem
+from app.schemas.export import ExportFilters
+from app.services import export_service as export_service_module
+from app.services.export_service import stream_jobs_tasks
+from app.utils.xlsx_stream import XlsxStreamWriter, column_letter
+
+
+@pytest_asyncio.fixture
+async def seeded(engine, factory, api_client, current_user):
+    async with factory() as session:
+        alice = User(username="alice", email_prefix="alice", full_name="爱丽丝", password_hash="x")
+        bob = User(username="bob", email_prefix="bob", full_name="", password_hash="x")
+        session.add_all([alice, bob])
+        await session.flush()
+        project = Project(code="PRO-0001", name="p", creator_id=alice.id, owner_id=alice.id)
+        session.add(project)
+        await session.flush()
+        job = WorkItem(code="JOB-0001", kind="JOB", project_id=project.id, title="j", status="doing", creator_id=alice.id,
+                       planned_start_date=date(2025, 3, 3), planned_end_date=date(2025, 3, 31), estimated_hours=160.0, actual_hours=40.0)
+        session.add(job)
+        await session.flush()
+        session.add_all([
+            WorkItem(code=f"TASK-{i:04d}", kind="TASK", project_id=project.id, parent_id=job.id, title=f"t{i} <&>",
+                     status="todo", creator_id=alice.id, assignee_id=bob.id if i % 2 else None,
+                     planned_start_date=date(2025, 3, 3), planned_end_date=date(2025, 3, 7), estimated_hours=40.0)
+            for i in range(30)
+        ])
+        await session.commit()
+
+    current_user.id = alice.id
+    yield api_client, engine
+
+
+def rows(wb, sheet) -> list:
+    return [tuple(r) for r in wb[sheet].iter_rows(values_only=True)]
+
+
+@pytest.mark.asyncio
+async def test_export_contents_with_one_query_per_sheet(seeded):
+    client, engine = seeded
+    statements = []
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    # 只导出 todo：父JOB不在结果中，ParentID 仍由联表取得
+    resp = await client.get("/api/export/jobs-tasks.xlsx", params={"status": "todo"})
+    event.remove(engine.sync_engine, "before_cursor_execute", _record)
+    assert resp.status_code == 200
+    assert sum(s.lstrip().upper().startswith("SELECT") for s in statements) == 3, statements
+
+    wb = load_workbook(io.BytesIO(resp.content))
+    assert wb.sheetnames == ["Jobs", "Tasks", "Summary"]
+    assert rows(wb, "Jobs") == [("ID", "标题", "项目", "Owner", "Assignee", "状态", "开始时间", "结束时间", "预计工时", "记录工时", "进度")]
+    tasks = rows(wb, "Tasks")
+    assert len(tasks) == 31
+    assert tasks[1] == ("TASK-0000", "t0 <&>", "PRO-0001", "爱丽丝", None, "todo", "2025-03-03", "2025-03-07", 40, None, "JOB-0001")
+    # full_name 为空时回退到用户名
+    assert tasks[2][4] == "bob"
+    assert set(rows(wb, "Summary")[1:]) == {("PRO-0001", None, 600, 0, 600), ("PRO-0001", "bob", 600, 0, 600)}
+
+    resp = await client.get("/api/export/jobs-tasks.xlsx")
+    job = rows(load_workbook(io.BytesIO(resp.content)), "Jobs")[1]
+    assert job[0] == "JOB-0001" and job[-1] == "25%"
+
+
+@pytest.mark.asyncio
+async def test_first_bytes_before_any_query(seeded):
+    client, engine = seeded
+    statements = []
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    stream = stream_jobs_tasks(engine, ExportFilters())
+    first = await stream.__anext__()
+    assert first.startswith(b"PK") and statements == []
+    await stream.aclose()
+    event.remove(engine.sync_engine, "before_cursor_execute", _record)
+
+
+def test_writer_buffer_stays_bounded():
+    writer = XlsxStreamWriter(["Data"])
+    out = bytearray(writer.drain())
+    writer.begin_sheet("Data")
+    largest = 0
+    for i in range(50000):
+        writer.append([i, f"row {i}", 1.5, None, "\x01text "])
+        largest = max(largest, writer.buffered)
+        if writer.buffered >= 64 * 1024:
+            out += writer.drain()
+    writer.close()
+    out += writer.drain()
+    assert largest < 256 * 1024
+    wb = load_workbook(io.BytesIO(bytes(out)), read_only=True)
+    data = list(wb["Data"].iter_rows(values_only=True))
+    assert len(data) == 50000 and data[-1] == (49999, "row 49999", 1.5, None, "text ")
+    assert [column_letter(i) for i in (0, 25, 26, 701, 702)] == ["A", "Z", "AA", "ZZ", "AAA"]
+
+
+@pytest.mark.asyncio
+async def test_row_formats_negotiated(seeded):
+    client, _ = seeded
+    resp = await client.get("/api/export/jobs-tasks", params={"status": "todo"})
+    assert resp.status_code == 200 and resp.headers["content-type"].startswith("text/csv")
+    lines = resp.text.splitlines()
+    assert len(lines) == 31
+    assert lines[0].startswith("id,code,kind,title,project_code,owner,assignee,parent_code,status")
+    assert ",TASK-0000,TASK,t0 <&>,PRO-0001,爱丽丝,,JOB-0001,todo,2025-03-03,2025-03-07,,,40.0," in lines[1]
+
+    resp = await client.get("/api/export/jobs-tasks", headers={"Accept": "text/csv;q=0.5, application/x-ndjson"})
+    assert resp.headers["content-type"] == "application/x-ndjson"
+    items = [json.loads(line) for line in resp.text.splitlines()]
+    assert len(items) == 31 and items[0]["code"] == "JOB-0001" and items[0]["parent_code"] is None
+    assert items[2]["assignee"] == "bob" and items[2]["planned_start_date"] == "2025-03-03"
+
+    resp = await client.get("/api/export/jobs-tasks", params={"format": "xml"})
+    assert resp.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_parquet_written_in_row_groups(seeded, monkeypatch):
+    pq = pytest.importorskip("pyarrow.parquet")
+    client, _ = seeded
+    monkeypatch.setattr(export_service_module, "EXPORT_ROW_GROUP_SIZE", 8)
+    resp = await client.get("/api/export/jobs-tasks", params={"format": "parquet"})
+    assert resp.status_code == 200
+    f = pq.ParquetFile(io.BytesIO(resp.content))
+    assert f.metadata.num_rows == 31 and f.metadata.num_row_groups == 4
+    table = f.read()
+    assert table.column("code").to_pylist()[:2] == ["JOB-0001", "TASK-0000"]
+    assert table.column("planned_start_date").to_pylist()[0] == date(2025, 3, 3)
+    assert table.column("estimated_hours").to_pylist()[1] == 40.0
@@ -0,0 +1,128 @@
+"""
+测试JOB子任务汇总的增量维护
+"""
+from datetime import date
+import pytest
+import pytest_asyncio
+from sqlalchemy import event
+from app.exceptions import ValidationException
+from app.models import User, Project, WorkItem, JobRollup
+from app.services.job_rollup_service import job_rollup_service, ROLLUP_STATUSES
+from app.services.work_item_service import work_item_service
+
+
+@pytest_asyncio.fixture
+async def seeded(factory):
+    async with factory() as session:
+        user = User(username="alice", email_prefix="alice", password_hash="x")
+        session.add(user)
+        await session.flush()
+        project = Project(code="PRO-0001", name="p", creator_id=user.id, owner_id=user.id)
+        session.add(project)
+        await session.flush()
+        job = await work_item_service.create(
+            session, project_id=project.id, kind="JOB", parent_id=None, title="j", status="todo",
+            creator_id=user.id, planned_start_date=date(2025, 3, 3), planned_end_date=date(2025, 3, 31),
+        )
+        tasks = [
+            await work_item_service.create(
+                session, project_id=project.id, kind="TASK", parent_id=job.id, title=f"t{i}", status="todo",
+                creator_id=user.id, planned_start_date=date(2025, 3, 3 + i), planned_end_date=date(2025, 3, 10 + i),
+            )
+            for i in range(3)
+        ]
+        await session.commit()
+        yield factory, user.id, job.id, [t.id for t in tasks]
+
+
+async def assert_matches_recount(factory, job_id: int):
+    """增量维护的汇总应与从子任务重新聚合的结果一致"""
+    async with factory() as session:
+        stored = job_rollup_service.to_dict(await session.get(JobRollup, job_id))
+        recount = job_rollup_service.to_dict(JobRollup(**(await job_rollup_service._aggregate(session, [job_id]))[job_id]))
+    assert stored == recount
+    return stored
+
+
+def record_selects(factory) -> list:
+    statements = []
+
+    @event.listens_for(factory.kw["bind"].sync_engine, "before_cursor_execute")
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append(statement)
+
+    return statements
+
+
+@pytest.mark.asyncio
+async def test_rollup_follows_every_write(seeded):
+    factory, uid, job_id, tasks = seeded
+    rollup = await assert_matches_recount(factory, job_id)
+    assert rollup["child_count"] == 3 and rollup["status_counts"]["todo"] == 3
+    assert rollup["child_min_planned_start"] == "2025-03-03" and rollup["child_max_planned_end"] == "2025-03-12"
+
+    async with factory() as session:
+        # 移出边界：最早开始与最晚结束都需重算
+        await work_item_service.update(session, id=tasks[0], data={"planned_start_date": date(2025, 3, 6)}, current_user_id=uid)
+        await work_item_service.update(session, id=tasks[1], data={"status": "done"}, current_user_id=uid)
+        await session.commit()
+    rollup = await assert_matches_recount(factory, job_id)
+    assert rollup["child_min_planned_start"] == "2025-03-04"
+    assert rollup["status_counts"]["done"] == 1 and rollup["child_actual_hours"] > 0
+
+    async with factory() as session:
+        await work_item_service.soft_delete(session, id=tasks[2], current_user_id=uid)
+        await session.commit()
+    rollup = await assert_matches_recount(factory, job_id)
+    assert rollup["child_count"] == 2 and rollup["child_max_planned_end"] == "2025-03-11"
+
+    async with factory() as session:
+        await work_item_service.cascade_status(session, job_id=job_id, target_status="done", current_user_id=uid)
+        await session.commit()
+    rollup = await assert_matches_recount(factory, job_id)
+    assert rollup["status_counts"]["done"] == 2
+
+
+@pytest.mark.asyncio
+async def test_parent_rollup_reads_one_row(seeded):
+    factory, uid, job_id, tasks = seeded
+    async with factory() as session:
+        for t in tasks[:2]:
+            await work_item_service.update(session, id=t, data={"status": "doing"}, current_user_id=uid)
+        await session.commit()
+
+    selects = record_selects(factory)
+    async with factory() as session:
+        await work_item_service.update(session, id=tasks[2], data={"status": "doing"}, current_user_id=uid)
+        await session.commit()
+    # 不再查询兄弟任务
+    assert not any("WHERE work_items.parent_id" in s for s in selects), selects
+    async with factory() as session:
+        assert (await session.get(WorkItem, job_id)).status == "doing"
+
+
+@pytest.mark.asyncio
+async def test_job_plan_validated_against_rollup(seeded):
+    factory, uid, job_id, tasks = seeded
+    selects = record_selects(factory)
+    async with factory() as session:
+        with pytest.raises(ValidationException):
+            await work_item_service.update(session, id=job_id, data={"planned_end_date": date(2025, 3, 11)}, current_user_id=uid)
+        await session.rollback()
+    assert not any("WHERE work_items.parent_id" in s for s in selects), selects
+
+
+@pytest.mark.asyncio
+async def test_missing_rollup_rebuilt_from_children(seeded):
+    """历史数据缺少汇总行时，首次写入按写入前状态补齐"""
+    factory, uid, job_id, tasks = seeded
+    async with factory() as session:
+        await session.delete(await session.get(JobRollup, job_id))
+        await session.commit()
+    async with factory() as session:
+        await work_item_service.update(session, id=tasks[0], data={"status": "done"}, current_user_id=uid)
+        await session.commit()
+    rollup = await assert_matches_recount(factory, job_id)
+    assert rollup["child_count"] == 3 and rollup["status_counts"]["done"] == 1
+    assert set(rollup["status_counts"]) == set(ROLLUP_STATUSES)
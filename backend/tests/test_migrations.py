@@ -0,0 +1,99 @@
+"""
+测试数据库版本校验与命令行迁移
+"""
+import json
+import pytest
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from app import cli
+from app.services.calendar_service import calendar_service
+from app.migrations import BACKEND_DIR, SCHEMA_REVISION, SchemaVersionError, check_schema, migrate, seed_demo_users
+
+
+def test_revision_matches_alembic_head():
+    cfg = Config(str(BACKEND_DIR / "alembic.ini"))
+    cfg.set_main_option("script_location", str(BACKEND_DIR / "alembic"))
+    assert ScriptDirectory.from_config(cfg).get_heads() == [SCHEMA_REVISION]
+
+
+@pytest.mark.asyncio
+async def test_migrate_empty_database(tmp_path):
+    url = f"sqlite+aiosqlite:///{tmp_path / 'new.db'}"
+    engine = create_async_engine(url)
+    with pytest.raises(SchemaVersionError):
+        await check_schema(engine)
+
+    assert migrate(url) == "created"
+    await check_schema(engine)
+    assert seed_demo_users(url) == 5 and seed_demo_users(url) == 0
+    # 已纳入版本管理：再次执行为 upgrade（无待执行迁移）
+    assert migrate(url) == "upgraded"
+    await check_schema(engine)
+    await engine.dispose()
+
+    sync = create_engine(url.replace("+aiosqlite", ""))
+    with sync.connect() as conn:
+        assert {"users", "work_items", "search_index", "project_snapshots"} <= set(inspect(conn).get_table_names())
+        hashes = conn.execute(text("SELECT DISTINCT password_hash FROM users")).all()
+    sync.dispose()
+    assert len(hashes) == 1
+
+
+def test_legacy_database_adopted(tmp_path, capsys):
+    url = f"sqlite+aiosqlite:///{tmp_path / 'legacy.db'}"
+    sync = create_engine(url.replace("+aiosqlite", ""))
+    with sync.begin() as conn:
+        # 早期版本启动时建立的表：缺少后来补充的列
+        conn.execute(text("CREATE TABLE users (id INTEGER PRIMARY KEY, username VARCHAR(50) NOT NULL, "
+                          "email_prefix VARCHAR(100) NOT NULL, password_hash VARCHAR(255) NOT NULL, is_active BOOLEAN NOT NULL, "
+                          "created_at DATETIME)"))
+        conn.execute(text("CREATE TABLE comments (id INTEGER PRIMARY KEY, entity_type VARCHAR(20) NOT NULL, "
+                          "entity_id INTEGER NOT NULL, author_id INTEGER NOT NULL, content TEXT NOT NULL)"))
+
+    assert cli.main(["--database-url", url, "check"]) == 1
+    assert cli.main(["--database-url", url, "migrate", "--seed", "--calendar-file", str(tmp_path / "none.json")]) == 0
+    assert "adopted" in capsys.readouterr().out
+    assert cli.main(["--database-url", url, "check"]) == 0
+
+    with sync.connect() as conn:
+        columns = {c["name"] for c in inspect(conn).get_columns("users")}
+        assert {"full_name", "phone", "avatar_key", "email"} <= columns
+        assert "row_version" in {c["name"] for c in inspect(conn).get_columns("comments")}
+        assert conn.execute(text("SELECT count(*) FROM users")).scalar() == 5
+    sync.dispose()
+
+
+def test_migrate_imports_calendar_file(tmp_path, capsys):
+    url = f"sqlite+aiosqlite:///{tmp_path / 'calendar.db'}"
+    path = tmp_path / "holidays.json"
+    path.write_text(json.dumps({"holidays": {"2025-05-01": "劳动节"}}), encoding="utf-8")
+    try:
+        assert cli.main(["--database-url", url, "migrate", "--calendar-file", str(path)]) == 0
+        assert "已导入（版本 1）" in capsys.readouterr().out
+        # 内容相同的重复导入不产生新版本
+        assert cli.main(["--database-url", url, "migrate", "--calendar-file", str(path)]) == 0
+        assert "无变化" in capsys.readouterr().out
+    finally:
+        calendar_service.invalidate()
+
+    sync = create_engine(url.replace("+aiosqlite", ""))
+    with sync.connect() as conn:
+        versions = dict(conn.execute(text("SELECT scope, value FROM data_versions")).all())
+    sync.dispose()
+    assert versions["calendar"] == versions["calendar_applied"] == 1
+
+
+def test_legacy_step_failure_logged_and_skipped(tmp_path, monkeypatch, caplog):
+    url = f"sqlite+aiosqlite:///{tmp_path / 'legacy.db'}"
+    sync = create_engine(url.replace("+aiosqlite", ""))
+    with sync.begin() as conn:
+        conn.execute(text("CREATE TABLE users (id INTEGER PRIMARY KEY, username VARCHAR(50) NOT NULL, "
+                          "email_prefix VARCHAR(100) NOT NULL, password_hash VARCHAR(255) NOT NULL, is_active BOOLEAN NOT NULL)"))
+    sync.dispose()
+    monkeypatch.setattr("app.services.job_rollup_service.BACKFILL_SQL", "INSERT INTO missing_table SELECT 1")
+
+    with caplog.at_level("ERROR", logger="app.migrations"):
+        assert migrate(url) == "adopted"
+    assert [r.getMessage() for r in caplog.records] == ["旧库补齐 JOB 子任务汇总失败"]
@@ -0,0 +1,115 @@
+"""
+测试操作日志异步批量写入
+"""
+import asyncio
+import pytest
+import pytest_asyncio
+from sqlalchemy import event, func, select
+from app.models import User, OperationLog, OperationType, EntityType
+from app.services.operation_log_service import operation_log_service
+from app.services.operation_log_writer import OperationLogWriter, operation_log_writer
+
+
+@pytest_asyncio.fixture
+async def session_factory(factory):
+    async with factory() as session:
+        session.add(User(username="alice", email_prefix="alice", password_hash="x"))
+        await session.commit()
+    yield factory
+    await operation_log_writer.flush()
+
+
+async def log_change(session, field: str, **kwargs):
+    return await operation_log_service.log_field_change(
+        session, user_id=1, username="alice", entity_type=EntityType.WORK_ITEM, entity_id=7,
+        field_name=field, old_value="a", new_value="b", operation_type=OperationType.UPDATE_TASK, **kwargs,
+    )
+
+
+async def count_logs(factory, **filters) -> int:
+    async with factory() as session:
+        stmt = select(func.count()).select_from(OperationLog).filter_by(**filters)
+        return (await session.execute(stmt)).scalar()
+
+
+@pytest.mark.asyncio
+async def test_logs_written_after_commit_in_one_insert(session_factory):
+    inserts = []
+
+    @event.listens_for(session_factory.kw["bind"].sync_engine, "before_cursor_execute")
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("INSERT INTO operation_logs"):
+            inserts.append(statement)
+
+    async with session_factory() as session:
+        for field in ("title", "status", "priority", "description", "planned_end_date"):
+            assert await log_change(session, field) is None
+        # 请求事务内不产生任何日志写入
+        assert inserts == []
+        await session.commit()
+    await operation_log_writer.flush()
+    assert len(inserts) == 1
+    assert await count_logs(session_factory, entity_id=7) == 5
+
+
+@pytest.mark.asyncio
+async def test_rollback_discards_success_but_keeps_failure(session_factory):
+    async with session_factory() as session:
+        await log_change(session, "title")
+        await operation_log_service.log_operation(
+            session, user_id=1, username="alice", operation_type=OperationType.UPDATE_TASK,
+            entity_type=EntityType.WORK_ITEM, entity_id=7, operation_content="更新失败",
+            result_status="failure", failure_reason="boom",
+        )
+        await session.rollback()
+    await operation_log_writer.flush()
+    assert await count_logs(session_factory) == 1
+    assert await count_logs(session_factory, result_status="failure") == 1
+
+
+@pytest.mark.asyncio
+async def test_strict_mode_writes_in_caller_transaction(session_factory):
+    async with session_factory() as session:
+        log = await log_change(session, "title", strict=True)
+        assert log.id is not None
+        await session.rollback()
+    assert await count_logs(session_factory) == 0
+
+
+@pytest.mark.asyncio
+async def test_strict_failure_log_committed_without_request_changes(session_factory):
+    async with session_factory() as session:
+        session.add(User(username="bob", email_prefix="bob", password_hash="x"))
+        await session.flush()
+        log = await operation_log_service.log_operation(
+            session, user_id=1, username="alice", operation_type=OperationType.UPDATE_TASK,
+            entity_type=EntityType.WORK_ITEM, entity_id=7, operation_content="更新失败",
+            result_status="failure", failure_reason="boom", strict=True,
+        )
+        assert log.id is not None and operation_log_writer.pending == 0
+        await session.rollback()
+    assert await count_logs(session_factory, result_status="failure") == 1
+    async with session_factory() as session:
+        assert (await session.execute(select(func.count()).select_from(User))).scalar() == 1
+
+
+@pytest.mark.asyncio
+async def test_backpressure_bounds_queue(session_factory):
+    writer = OperationLogWriter(max_pending=10, batch_size=4)
+    bind = session_factory.kw["bind"]
+    row = dict(user_id=1, username="alice", operation_type="update_task", entity_type="work_item",
+               entity_id=1, operation_content="x", result_status="success", failure_reason=None,
+               field_name=None, old_value=None, new_value=None)
+    peak = 0
+
+    async def produce():
+        nonlocal peak
+        for _ in range(10):
+            await writer.submit(bind, [row])
+            peak = max(peak, writer.pending)
+
+    await asyncio.gather(*(produce() for _ in range(5)))
+    await writer.flush()
+    assert writer.pending == 0
+    assert peak <= 10
+    assert await count_logs(session_factory) == 50
@@ -0,0 +1,75 @@
+"""
+测试线程池中的密码哈希
+"""
+import asyncio
+import time
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+from app.models import User
+from app.services import password_hasher as password_hasher_module
+from app.services.auth_service import auth_service
+from app.services.password_hasher import PasswordHasher
+
+
+@pytest.mark.asyncio
+async def test_hashing_does_not_block_loop():
+    hasher = PasswordHasher(workers=2)
+    gaps = []
+
+    async def ticker():
+        last = time.perf_counter()
+        while True:
+            await asyncio.sleep(0.005)
+            now = time.perf_counter()
+            gaps.append(now - last)
+            last = now
+
+    tick = asyncio.create_task(ticker())
+    try:
+        hashes = await asyncio.gather(*[hasher.hash(f"pw{i}") for i in range(4)])
+        assert await hasher.verify("pw3", hashes[3]) and not await hasher.verify("pw0", hashes[3])
+    finally:
+        tick.cancel()
+        hasher.shutdown()
+    assert max(gaps) < 0.1
+
+    stats = hasher.stats()
+    assert stats["completed"] == 6 and stats["running"] == 0 and stats["queued"] == 0
+    # 并发上限为 2：4 个同时提交的哈希中有两个需要排队
+    assert stats["queue_wait_max_ms"] > 0 and stats["run_avg_ms"] > 0
+
+
+@pytest_asyncio.fixture
+async def client(factory, api_client, current_user):
+    async with factory() as session:
+        admin = User(username="admin", email_prefix="admin", password_hash=auth_service.get_password_hash("123"))
+        session.add(admin)
+        await session.commit()
+    current_user.id, current_user.username = admin.id, "admin"
+    yield api_client, factory
+
+
+@pytest.mark.asyncio
+async def test_login_and_reset_use_pool(client, monkeypatch):
+    c, factory = client
+    calls = []
+    original = password_hasher_module.hash_password
+
+    def counting_hash(password):
+        calls.append(password)
+        return original(password)
+
+    monkeypatch.setattr(password_hasher_module, "hash_password", counting_hash)
+    seeds = [{"email": f"u{i}@example.com", "full_name": f"用户{i}"} for i in range(3)]
+    resp = await c.post("/api/users/reset", json=seeds)
+    assert resp.status_code == 200, resp.text
+    assert calls == ["123456"]
+    async with factory() as session:
+        hashes = (await session.execute(select(User.password_hash).where(User.username != "admin"))).scalars().all()
+    assert len(set(hashes)) == 1 and len(hashes) == 3
+
+    resp = await c.post("/api/auth/login", json={"login_field": "u1", "password": "123456"})
+    assert resp.status_code == 200, resp.text
+    resp = await c.post("/api/auth/login", json={"login_field": "u1", "password": "wrong"})
+    assert resp.status_code == 401
@@ -0,0 +1,100 @@
+"""
+测试项目每日快照与燃尽图/累积流图
+"""
+from datetime import date
+import pytest
+import pytest_asyncio
+from sqlalchemy import event, select
+from app.models import User, Project, WorkItem, ProjectSnapshot
+from app.services.snapshot_service import snapshot_service
+from app.services.version_service import version_service
+from app.services.work_item_service import work_item_service
+
+
+D1, D2, D3 = date(2026, 3, 2), date(2026, 3, 3), date(2026, 3, 4)
+
+
+@pytest_asyncio.fixture
+async def seeded(engine, factory, api_client, current_user):
+    async with factory() as session:
+        alice = User(username="alice", email_prefix="alice", password_hash="x")
+        session.add(alice)
+        await session.flush()
+        p1 = Project(code="PRO-0001", name="p1", creator_id=alice.id, owner_id=alice.id)
+        p2 = Project(code="PRO-0002", name="p2", creator_id=alice.id, owner_id=alice.id)
+        session.add_all([p1, p2])
+        await session.flush()
+        items = [
+            WorkItem(code=f"JOB-{i:04d}", kind="JOB", project_id=p1.id, title=f"j{i}", status="todo",
+                     creator_id=alice.id, estimated_hours=8.0)
+            for i in range(1, 4)
+        ] + [WorkItem(code="JOB-0009", kind="JOB", project_id=p2.id, title="other", status="doing", creator_id=alice.id)]
+        session.add_all(items)
+        await version_service.stamp_work_items(session, items)
+        await session.commit()
+        ids = {"alice": alice.id, "p1": p1.id, "p2": p2.id}
+
+    current_user.id = ids["alice"]
+    yield api_client, engine, factory, ids
+
+
+async def take(factory, day) -> int:
+    async with factory() as session:
+        count = await snapshot_service.take(session, day)
+        await session.commit()
+    return count
+
+
+@pytest.mark.asyncio
+async def test_snapshots_only_touched_projects(seeded):
+    _, engine, factory, ids = seeded
+    # 首次全量
+    assert await take(factory, D1) == 2
+    assert await take(factory, D1) == 0
+
+    async with factory() as session:
+        await work_item_service.update(session, id=1, data={"status": "done"}, current_user_id=ids["alice"])
+        await work_item_service.update(session, id=2, data={"status": "doing"}, current_user_id=ids["alice"])
+        await session.commit()
+    statements = []
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    assert await take(factory, D2) == 1
+    event.remove(engine.sync_engine, "before_cursor_execute", _record)
+    # 版本、变更项目、分组计数、写入快照、记录进度
+    assert len(statements) == 5, statements
+
+    async with factory() as session:
+        rows = (await session.execute(select(ProjectSnapshot).order_by(ProjectSnapshot.day, ProjectSnapshot.project_id))).scalars().all()
+    assert [(r.project_id, r.day) for r in rows] == [(ids["p1"], D1), (ids["p2"], D1), (ids["p1"], D2)]
+    assert (rows[2].todo_count, rows[2].doing_count, rows[2].done_count, rows[2].remaining_hours) == (1, 1, 1, 16.0)
+
+
+@pytest.mark.asyncio
+async def test_burndown_and_cumulative_flow(seeded):
+    client, _, factory, ids = seeded
+    await take(factory, D1)
+    async with factory() as session:
+        await work_item_service.update(session, id=1, data={"status": "done"}, current_user_id=ids["alice"])
+        await session.commit()
+    await take(factory, D2)
+
+    resp = await client.get("/api/stats/burndown", params={"project_id": ids["p1"], "start": "2026-03-01", "end": D3.isoformat()})
+    assert resp.status_code == 200
+    points = resp.json()["points"]
+    assert [p["remaining_count"] for p in points] == [0, 3, 2, 2]
+    assert [p["remaining_hours"] for p in points] == [0, 24.0, 16.0, 16.0]
+
+    resp = await client.get("/api/stats/cumulative-flow", params={"start": D1.isoformat(), "end": D3.isoformat()})
+    flow = resp.json()
+    assert flow["statuses"] == ["todo", "doing", "blocked", "done", "cancelled"]
+    # 无快照的日期沿用之前的值；未变化的项目二沿用首日快照
+    assert [(p["todo"], p["doing"], p["done"]) for p in flow["points"]] == [(3, 1, 0), (2, 1, 1), (2, 1, 1)]
+
+    resp = await client.get("/api/stats/cumulative-flow", params={"start": D3.isoformat(), "end": D1.isoformat()})
+    assert resp.status_code == 422
+    resp = await client.get("/api/stats/burndown", params={"project_id": 999})
+    assert resp.status_code == 404
@@ -0,0 +1,88 @@
+"""
+测试批量项目统计 POST /api/projects/statistics
+"""
+from datetime import date, timedelta
+import pytest
+import pytest_asyncio
+from sqlalchemy import event
+from app.models import User, Project, WorkItem
+from app.services.project_service import project_service
+from app.services.version_service import version_service
+from app.services.work_item_service import work_item_service
+
+
+@pytest_asyncio.fixture
+async def seeded(engine, factory, api_client, current_user):
+    past = date.today() - timedelta(days=3)
+    async with factory() as session:
+        alice = User(username="alice", email_prefix="alice", password_hash="x")
+        session.add(alice)
+        await session.flush()
+        p1 = Project(code="PRO-0001", name="p1", creator_id=alice.id, owner_id=alice.id)
+        p2 = Project(code="PRO-0002", name="p2", creator_id=alice.id, owner_id=alice.id)
+        session.add_all([p1, p2])
+        await session.flush()
+        job = WorkItem(code="JOB-0001", kind="JOB", project_id=p1.id, title="j", status="doing", creator_id=alice.id,
+                       planned_end_date=past, estimated_hours=10.0)
+        session.add(job)
+        await session.flush()
+        items = [job] + [
+            WorkItem(code=f"TASK-{i:04d}", kind="TASK", project_id=p1.id, parent_id=job.id, title=f"t{i}", status=status,
+                     creator_id=alice.id, planned_end_date=past, estimated_hours=2.0, actual_hours=1.0)
+            for i, status in enumerate(("todo", "blocked", "done", "cancelled"))
+        ] + [WorkItem(code="JOB-0002", kind="JOB", project_id=p2.id, title="j2", status="todo", creator_id=alice.id)]
+        session.add_all(items)
+        await version_service.stamp_work_items(session, items)
+        await session.commit()
+        ids = {"alice": alice.id, "p1": p1.id, "p2": p2.id}
+
+    current_user.id = ids["alice"]
+    yield api_client, engine, factory, ids
+    project_service._stats_cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_grouped_statistics(seeded):
+    client, _, _, ids = seeded
+    resp = await client.post("/api/projects/statistics", json={"project_ids": [ids["p2"], ids["p1"], 999]})
+    assert resp.status_code == 200
+    items = resp.json()["items"]
+    assert [s["project_id"] for s in items] == [ids["p2"], ids["p1"]]
+    p1 = items[1]
+    assert p1["total_work_items"] == 5
+    assert (p1["todo_count"], p1["doing_count"], p1["blocked_count"], p1["done_count"], p1["cancelled_count"]) == (1, 1, 1, 1, 1)
+    assert (p1["estimated_hours"], p1["actual_hours"], p1["overdue_count"]) == (18.0, 4.0, 3)
+    assert p1["by_kind"]["JOB"]["doing_count"] == 1 and p1["by_kind"]["JOB"]["overdue_count"] == 1
+    assert p1["by_kind"]["TASK"]["total_work_items"] == 4 and p1["by_kind"]["TASK"]["overdue_count"] == 2
+    assert items[0]["todo_count"] == 1 and items[0]["by_kind"]["TASK"]["total_work_items"] == 0
+
+    # 单项目接口返回同样结构
+    resp = await client.get(f"/api/projects/{ids['p1']}/statistics")
+    assert resp.status_code == 200 and resp.json() == p1
+
+
+@pytest.mark.asyncio
+async def test_statistics_memoized_per_project(seeded):
+    client, engine, factory, ids = seeded
+    body = {"project_ids": [ids["p1"], ids["p2"]]}
+    await client.post("/api/projects/statistics", json=body)
+    statements = []
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    # 未变化：只读取各项目代数
+    await client.post("/api/projects/statistics", json=body)
+    assert len(statements) == 1
+
+    async with factory() as session:
+        await work_item_service.update(session, id=2, data={"status": "doing"}, current_user_id=ids["alice"])
+        await session.commit()
+    statements.clear()
+    resp = await client.post("/api/projects/statistics", json=body)
+    event.remove(engine.sync_engine, "before_cursor_execute", _record)
+    # 只重算代数变化的项目
+    assert len(statements) == 2 and tuple(statements[1][1])[-1:] == (ids["p1"],)
+    p1 = resp.json()["items"][0]
+    assert (p1["todo_count"], p1["doing_count"]) == (0, 2)
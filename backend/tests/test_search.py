@@ -0,0 +1,107 @@
+"""
+测试 FTS5 全文检索 /api/search 与项目列表搜索
+"""
+from datetime import datetime
+import pytest
+import pytest_asyncio
+from app.models import User, Project, WorkItem, Comment
+from app.services.search_service import build_match, render_snippet, segment
+from app.services.version_service import version_service, COMMENTS_SCOPE, ROW_VERSION_SCOPE
+
+
+@pytest_asyncio.fixture
+async def seeded(factory, api_client, current_user):
+    async with factory() as session:
+        alice = User(username="alice", email_prefix="alice", password_hash="x")
+        session.add(alice)
+        await session.flush()
+        p1 = Project(code="PRO-0001", name="数据平台升级", description="<p>迁移到新的 Kafka 集群</p>",
+                     creator_id=alice.id, owner_id=alice.id)
+        p2 = Project(code="PRO-0002", name="移动端改版", creator_id=alice.id, owner_id=alice.id)
+        session.add_all([p1, p2])
+        await session.flush()
+        items = [
+            WorkItem(code="JOB-0001", kind="JOB", project_id=p1.id, title="数据迁移方案", status="doing", creator_id=alice.id),
+            WorkItem(code="JOB-0002", kind="JOB", project_id=p2.id, title="登录页改版", description="接入新的数据埋点",
+                     status="todo", creator_id=alice.id),
+        ]
+        session.add_all(items)
+        await version_service.stamp_work_items(session, items)
+        await session.flush()
+        comment = Comment(entity_type="work_item", entity_id=items[1].id, author_id=alice.id, content="<p>埋点字段已确认</p>",
+                          row_version=await version_service.bump(session, COMMENTS_SCOPE))
+        session.add(comment)
+        await session.commit()
+        ids = {"alice": alice.id, "p1": p1.id, "p2": p2.id, "job": items[0].id, "job2": items[1].id, "comment": comment.id}
+
+    current_user.id = ids["alice"]
+    yield api_client, factory, ids
+
+
+def hits(resp) -> list:
+    assert resp.status_code == 200, resp.text
+    return [(h["type"], h["id"]) for h in resp.json()["items"]]
+
+
+def test_query_building():
+    assert segment("<b>数据</b>平台 v2") == "  数  据   平  台  v2"
+    assert build_match("数据 kaf") == '"数 据" "kaf"*'
+    assert build_match('PRO-00"01') == '"pro 00 01"*'
+    assert build_match("  \"*  ") is None
+    assert render_snippet(" 迁 移 到 新 的 \x02Kafka\x03 集 群 <x>") == "迁移到新的<mark>Kafka</mark>集群&lt;x&gt;"
+
+
+@pytest.mark.asyncio
+async def test_search_across_entities(seeded):
+    client, _, ids = seeded
+    # 中文片段按相邻字短语匹配：标题命中排在正文命中之前
+    resp = await client.get("/api/search", params={"q": "数据"})
+    found = hits(resp)
+    assert set(found[:2]) == {("project", ids["p1"]), ("work_item", ids["job"])} and found[2] == ("work_item", ids["job2"])
+    project = next(h for h in resp.json()["items"] if h["type"] == "project")
+    assert project["title"] == "<mark>数据</mark>平台升级" and project["code"] == "PRO-0001"
+
+    # 单字、编号前缀、英文正文
+    assert ("project", ids["p2"]) in hits(await client.get("/api/search", params={"q": "移"}))
+    assert hits(await client.get("/api/search", params={"q": "JOB-0002"})) == [("work_item", ids["job2"])]
+    assert hits(await client.get("/api/search", params={"q": "kafka"})) == [("project", ids["p1"])]
+    # 多个词同时命中
+    assert hits(await client.get("/api/search", params={"q": "数据 埋点"})) == [("work_item", ids["job2"])]
+
+    resp = await client.get("/api/search", params={"q": "埋点", "types": "comment"})
+    assert hits(resp) == [("comment", ids["comment"])]
+    item = resp.json()["items"][0]
+    assert item["project_id"] == ids["p2"] and item["ref"] == f"work_item:{ids['job2']}"
+    assert item["snippet"] == "<mark>埋点</mark>字段已确认"
+
+    resp = await client.get("/api/search", params={"q": "数据", "types": "work_item", "size": 1, "page": 2})
+    assert resp.json()["total"] == 2 and hits(resp) == [("work_item", ids["job2"])]
+    assert (await client.get("/api/search", params={"q": "数据", "types": "user"})).status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_index_follows_writes(seeded):
+    client, factory, ids = seeded
+    assert len(hits(await client.get("/api/search", params={"q": "数据"}))) == 3
+
+    async with factory() as session:
+        job = await session.get(WorkItem, ids["job"])
+        job.deleted_at = datetime.utcnow()
+        job.row_version = await version_service.bump(session, ROW_VERSION_SCOPE)
+        job2 = await session.get(WorkItem, ids["job2"])
+        job2.title = "注册页改版"
+        job2.description = None
+        job2.row_version = await version_service.bump(session, ROW_VERSION_SCOPE)
+        await session.commit()
+
+    assert hits(await client.get("/api/search", params={"q": "数据"})) == [("project", ids["p1"])]
+    assert hits(await client.get("/api/search", params={"q": "注册"})) == [("work_item", ids["job2"])]
+
+    # 项目列表搜索走同一索引
+    resp = await client.put(f"/api/projects/{ids['p2']}", json={"name": "移动端数据看板"})
+    assert resp.status_code == 200, resp.text
+    resp = await client.get("/api/projects", params={"search": "数据"})
+    assert resp.status_code == 200
+    assert sorted(p["id"] for p in resp.json()["items"]) == sorted([ids["p1"], ids["p2"]])
+    resp = await client.get("/api/projects", params={"search": "看板"})
+    assert [p["id"] for p in resp.json()["items"]] == [ids["p2"]]
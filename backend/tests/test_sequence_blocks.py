@@ -0,0 +1,111 @@
+"""
+测试编号号段预留（hi/lo）与批量预留
+"""
+import asyncio
+import pytest
+import pytest_asyncio
+from sqlalchemy import event, select
+from app.models import Sequence, User
+from app.services.sequence_service import SequenceService
+
+
+@pytest_asyncio.fixture
+async def session_factory(factory):
+    async with factory() as session:
+        # 预置序列行，首次使用前缀的 INSERT 路径单独覆盖
+        session.add_all([Sequence(prefix="PRO", current_value=0), Sequence(prefix="JOB", current_value=0)])
+        await session.commit()
+    yield factory
+
+
+def count_sequence_updates(session_factory) -> list:
+    statements = []
+
+    @event.listens_for(session_factory.kw["bind"].sync_engine, "before_cursor_execute")
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("UPDATE SEQUENCES"):
+            statements.append(statement)
+
+    return statements
+
+
+async def current_value(session_factory, prefix: str) -> int:
+    async with session_factory() as session:
+        return (await session.execute(select(Sequence.current_value).where(Sequence.prefix == prefix))).scalar_one()
+
+
+@pytest.mark.asyncio
+async def test_codes_served_from_reserved_block(session_factory):
+    """一次预留整段编号，段内编号不再访问数据库"""
+    service = SequenceService(block_size=10)
+    updates = count_sequence_updates(session_factory)
+    async with session_factory() as session:
+        codes = [await service.generate_code(session, "JOB") for _ in range(10)]
+    assert codes == [f"JOB-{i:04d}" for i in range(1, 11)]
+    assert len(updates) == 1
+    assert await current_value(session_factory, "JOB") == 10
+
+    async with session_factory() as session:
+        assert await service.generate_code(session, "JOB") == "JOB-0011"
+    assert len(updates) == 2
+    assert await current_value(session_factory, "JOB") == 20
+
+
+@pytest.mark.asyncio
+async def test_workers_get_disjoint_blocks(session_factory):
+    """两个进程内实例（模拟两个worker）交错取号不重复"""
+    worker_a = SequenceService(block_size=5)
+    worker_b = SequenceService(block_size=5)
+    codes = []
+    async with session_factory() as session:
+        for _ in range(12):
+            codes.append(await worker_a.generate_code(session, "TASK"))
+            codes.append(await worker_b.generate_code(session, "TASK"))
+    assert len(set(codes)) == len(codes) == 24
+
+
+@pytest.mark.asyncio
+async def test_reserve_codes_single_round_trip(session_factory):
+    """批量预留只需一次UPDATE"""
+    service = SequenceService(block_size=20)
+    updates = count_sequence_updates(session_factory)
+    async with session_factory() as session:
+        codes = await service.reserve_codes(session, "JOB", 1000)
+        more = await service.reserve_codes(session, "JOB", 19)
+    assert len(updates) == 1
+    assert codes[0] == "JOB-0001" and codes[-1] == "JOB-1000"
+    assert more == [f"JOB-{i:04d}" for i in range(1001, 1020)]
+    assert await service.reserve_codes(session, "JOB", 0) == []
+
+
+@pytest.mark.asyncio
+async def test_does_not_commit_caller_transaction(session_factory):
+    """取号不提交调用方事务：调用方回滚后其数据不落库"""
+    service = SequenceService(block_size=10)
+    async with session_factory() as session:
+        session.add(User(username="rollback_me", email_prefix="rollback_me", password_hash="x"))
+        await service.generate_code(session, "PRO")
+        await session.rollback()
+    async with session_factory() as session:
+        res = await session.execute(select(User).where(User.username == "rollback_me"))
+        assert res.scalar_one_or_none() is None
+    # 号段已在独立事务中提交
+    assert await current_value(session_factory, "PRO") == 10
+
+
+@pytest.mark.asyncio
+async def test_caller_holding_write_lock_reserves_in_its_transaction(session_factory):
+    """调用方已持有写锁时在其事务内精确预留，回滚后序列一并回滚且不缓存"""
+    service = SequenceService(block_size=10)
+    async with session_factory() as session:
+        await service.generate_code(session, "PRO")  # 预留 1..10
+    async with session_factory() as session:
+        session.add(User(username="writer", email_prefix="writer", password_hash="x"))
+        await session.flush()
+        codes = await asyncio.wait_for(service.reserve_codes(session, "PRO", 3), timeout=10)
+        assert codes == ["PRO-0011", "PRO-0012", "PRO-0013"]
+        await session.rollback()
+    assert await current_value(session_factory, "PRO") == 10
+    async with session_factory() as session:
+        # 本地号段不受影响，继续发放 2..10
+        assert await service.generate_code(session, "PRO") == "PRO-0002"
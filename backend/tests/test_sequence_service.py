@@ -6,7 +6,7 @@ import asyncio
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from app.models import Base, Sequence
-from app.services.sequence_service import sequence_service
+from app.services.sequence_service import SequenceService
 
 
 # 使用内存数据库进行测试
@@ -15,6 +15,9 @@ TEST_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
 engine = create_async_engine(TEST_DATABASE_URL, echo=True)
 AsyncTestSession = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
+# 号段大小为1：每个编号都落库，便于逐一校验序列值
+sequence_service = SequenceService(block_size=1)
+
 
 async def create_tables():
     """创建所有表"""
@@ -0,0 +1,89 @@
+"""
+测试聚合统计 GET /api/stats/aggregate
+"""
+from datetime import date
+import pytest
+import pytest_asyncio
+from sqlalchemy import event
+from app.models import User, Project, WorkItem
+
+
+@pytest_asyncio.fixture
+async def seeded(engine, factory, api_client, current_user):
+    async with factory() as session:
+        alice = User(username="alice", email_prefix="alice", full_name="爱丽丝", password_hash="x")
+        bob = User(username="bob", email_prefix="bob", password_hash="x")
+        session.add_all([alice, bob])
+        await session.flush()
+        p1 = Project(code="PRO-0001", name="p1", creator_id=alice.id, owner_id=alice.id)
+        p2 = Project(code="PRO-0002", name="p2", creator_id=alice.id, owner_id=bob.id)
+        session.add_all([p1, p2])
+        await session.flush()
+        job = WorkItem(code="JOB-0001", kind="JOB", project_id=p1.id, title="j", status="doing", creator_id=alice.id,
+                       assignee_id=alice.id, label_path="研发/后端/API", planned_start_date=date(2025, 3, 5),
+                       estimated_hours=16.0, actual_hours=4.0)
+        session.add(job)
+        await session.flush()
+        session.add_all([
+            WorkItem(code="TASK-0001", kind="TASK", project_id=p1.id, parent_id=job.id, title="t1", status="done",
+                     creator_id=alice.id, assignee_id=bob.id, label_path="研发/后端/DB", planned_start_date=date(2025, 3, 9),
+                     estimated_hours=8.0, actual_hours=8.0),
+            WorkItem(code="TASK-0002", kind="TASK", project_id=p1.id, parent_id=job.id, title="t2", status="todo",
+                     creator_id=alice.id, assignee_id=bob.id, label_path="研发/前端", planned_start_date=date(2025, 3, 10),
+                     estimated_hours=8.0),
+            WorkItem(code="JOB-0002", kind="JOB", project_id=p2.id, title="j2", status="todo", creator_id=alice.id,
+                     estimated_hours=2.0),
+        ])
+        await session.commit()
+
+    current_user.id = alice.id
+    yield api_client, engine
+
+
+def by_keys(body, *names):
+    return {tuple(g["keys"][n] for n in names): g for g in body["groups"]}
+
+
+@pytest.mark.asyncio
+async def test_aggregate_by_project_and_assignee_in_one_query(seeded):
+    client, engine = seeded
+    statements = []
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    resp = await client.get("/api/stats/aggregate", params={"group_by": "project,assignee"})
+    event.remove(engine.sync_engine, "before_cursor_execute", _record)
+    assert resp.status_code == 200
+    assert len(statements) == 1 and "GROUP BY" in statements[0]
+    body = resp.json()
+    assert body["group_by"] == ["project", "assignee"]
+    groups = by_keys(body, "project_code", "assignee_name")
+    assert set(groups) == {("PRO-0001", "爱丽丝"), ("PRO-0001", "bob"), ("PRO-0002", "")}
+    bob = groups[("PRO-0001", "bob")]
+    assert bob["count"] == 2 and bob["estimated_hours"] == 16.0 and bob["actual_hours"] == 8.0
+    assert bob["by_status"]["done"] == 1 and bob["by_status"]["todo"] == 1 and bob["by_status"]["doing"] == 0
+
+    resp = await client.get("/api/stats/aggregate", params={"group_by": "project", "kind": "TASK", "project_ids": "1"})
+    assert [(g["keys"]["project_code"], g["count"]) for g in resp.json()["groups"]] == [("PRO-0001", 2)]
+
+
+@pytest.mark.asyncio
+async def test_aggregate_by_label_prefix_and_week(seeded):
+    client, _ = seeded
+    body = (await client.get("/api/stats/aggregate", params={"group_by": "label"})).json()
+    assert {g["keys"]["label"]: g["count"] for g in body["groups"]} == {None: 1, "研发": 3}
+
+    body = (await client.get("/api/stats/aggregate", params={"group_by": "label", "label_depth": 2})).json()
+    assert {g["keys"]["label"]: g["count"] for g in body["groups"]} == {None: 1, "研发/后端": 2, "研发/前端": 1}
+
+    body = (await client.get("/api/stats/aggregate", params={"group_by": "label", "label_depth": 4})).json()
+    assert "研发/后端/API" in {g["keys"]["label"] for g in body["groups"]}
+
+    # 2025-03-05（周三）与 2025-03-09（周日）同属 03-03 这周
+    body = (await client.get("/api/stats/aggregate", params={"group_by": "week"})).json()
+    assert {g["keys"]["week"]: g["count"] for g in body["groups"]} == {None: 1, "2025-03-03": 2, "2025-03-10": 1}
+
+    resp = await client.get("/api/stats/aggregate", params={"group_by": "owner"})
+    assert resp.status_code == 422
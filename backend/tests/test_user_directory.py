@@ -0,0 +1,165 @@
+"""
+测试进程内用户目录缓存
+"""
+import pytest
+import pytest_asyncio
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import event
+from app.main import app
+from app.database import get_db
+from app.dependencies.auth import get_current_user
+from app.models import User, Project, Comment
+from app.services.user_directory import UserDirectory
+from app.services.version_service import version_service, USERS_SCOPE
+
+
+@pytest_asyncio.fixture
+async def session_factory(factory):
+    async with factory() as session:
+        session.add_all([
+            User(username="alice", email_prefix="alice", full_name="爱丽丝", password_hash="x"),
+            User(username="bob", email_prefix="bob", password_hash="x"),
+        ])
+        await session.commit()
+    yield factory
+
+
+def record_user_selects(session_factory) -> list:
+    statements = []
+
+    @event.listens_for(session_factory.kw["bind"].sync_engine, "before_cursor_execute")
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and "FROM users" in statement:
+            statements.append(statement)
+
+    return statements
+
+
+@pytest.mark.asyncio
+async def test_lookups_served_from_memory(session_factory):
+    directory = UserDirectory()
+    async with session_factory() as session:
+        users = await directory.get_many(session, [1, 2, None])
+    assert users[1]["full_name"] == "爱丽丝" and users[2]["username"] == "bob"
+
+    selects = record_user_selects(session_factory)
+    async with session_factory() as session:
+        assert (await directory.get(session, 2))["email_prefix"] == "bob"
+        assert (await directory.find_by_prefix(session, "alice"))["id"] == 1
+        assert (await directory.find_by_username(session, "bob"))["id"] == 2
+    assert selects == []
+
+
+@pytest.mark.asyncio
+async def test_generation_change_reloads(session_factory):
+    """其他进程修改用户并推进代数后，本进程重载"""
+    directory = UserDirectory()
+    async with session_factory() as session:
+        await directory.get(session, 1)
+
+    async with session_factory() as session:
+        alice = await session.get(User, 1)
+        alice.full_name = "Alice"
+        alice.email_prefix = "alice.w"
+        await version_service.bump(session, USERS_SCOPE)
+        await session.commit()
+
+    async with session_factory() as session:
+        assert (await directory.get(session, 1))["full_name"] == "Alice"
+        assert (await directory.find_by_prefix(session, "alice.w"))["id"] == 1
+        assert await directory.find_by_prefix(session, "alice") is None
+
+
+@pytest.mark.asyncio
+async def test_unknown_users_loaded_on_demand(session_factory):
+    """未推进代数的新用户（如启动预置）按需补查"""
+    directory = UserDirectory()
+    async with session_factory() as session:
+        await directory.get(session, 1)
+    async with session_factory() as session:
+        session.add(User(username="carol", email_prefix="carol", password_hash="x"))
+        await session.commit()
+    async with session_factory() as session:
+        assert (await directory.find_by_prefix(session, "carol"))["username"] == "carol"
+        assert (await directory.get_many(session, [3, 99])).keys() == {3}
+
+
+@pytest.mark.asyncio
+async def test_list_comments_no_per_row_user_queries(session_factory):
+    async with session_factory() as session:
+        project = Project(code="PRO-0001", name="p", creator_id=1, owner_id=1)
+        session.add(project)
+        await session.flush()
+        session.add_all([
+            Comment(entity_type="project", entity_id=project.id, author_id=1 + i % 2, content=f"c{i}") for i in range(10)
+        ])
+        await session.commit()
+        project_id = project.id
+
+    async def override_get_db():
+        async with session_factory() as session:
+            yield session
+            await session.commit()
+
+    async def override_user():
+        return User(id=1, username="alice", email_prefix="alice", is_active=True)
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_current_user] = override_user
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            await client.get(f"/api/comments/project/{project_id}")
+            selects = record_user_selects(session_factory)
+            res = await client.get(f"/api/comments/project/{project_id}")
+    finally:
+        app.dependency_overrides.clear()
+    assert res.status_code == 200
+    assert [c["author"]["username"] for c in res.json()[:2]] == ["alice", "bob"]
+    assert selects == []
+
+
+@pytest.mark.asyncio
+async def test_suggest_by_prefix(session_factory):
+    directory = UserDirectory()
+    async with session_factory() as session:
+        session.add_all([
+            User(username="alan", email_prefix="zhang.al", full_name="张阿兰", password_hash="x"),
+            User(username="bobby", email_prefix="bobby", full_name="Bobby", password_hash="x", is_active=False),
+        ])
+        await session.commit()
+        assert [u["username"] for u in await directory.suggest(session, "AL")] == ["alice", "alan"]
+
+    selects = record_user_selects(session_factory)
+    async with session_factory() as session:
+        # 完全匹配在前；已停用用户默认不返回
+        assert [u["username"] for u in await directory.suggest(session, "bob")] == ["bob"]
+        assert [u["username"] for u in await directory.suggest(session, "bob", include_inactive=True)] == ["bob", "bobby"]
+        assert [u["username"] for u in await directory.suggest(session, "张")] == ["alan"]
+        assert [u["username"] for u in await directory.suggest(session, "zhang")] == ["alan"]
+        assert [u["username"] for u in await directory.suggest(session, "a", limit=1)] == ["alice"]
+        assert await directory.suggest(session, "  ") == []
+    assert selects == []
+
+    async def override_get_db():
+        async with session_factory() as session:
+            yield session
+
+    async def override_user():
+        return User(id=1, username="alice", email_prefix="alice", is_active=True)
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_current_user] = override_user
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            res = await client.get("/api/users/suggest", params={"q": "爱"})
+    finally:
+        app.dependency_overrides.clear()
+    assert res.json() == [{"id": 1, "username": "alice", "email_prefix": "alice", "full_name": "爱丽丝"}]
+
+
+@pytest.mark.asyncio
+async def test_suggest_by_pinyin_initials(session_factory):
+    directory = UserDirectory()
+    async with session_factory() as session:
+        assert [u["username"] for u in await directory.suggest(session, "al")] == ["alice"]
+        assert [u["username"] for u in await directory.suggest(session, "ALS")] == ["alice"]
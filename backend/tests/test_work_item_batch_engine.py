@@ -0,0 +1,110 @@
+"""
+测试集合式批量更新 WorkItemService.batch_update
+"""
+from datetime import date, timedelta
+import pytest
+import pytest_asyncio
+from sqlalchemy import event, select
+from app.exceptions import NotFoundException, ValidationException
+from app.models import User, Project, WorkItem, AuditLog
+from app.services.work_item_service import work_item_service
+
+
+D = date(2025, 11, 10)
+
+
+@pytest_asyncio.fixture
+async def seeded(factory):
+    async with factory() as session:
+        user = User(username="alice", email_prefix="alice", password_hash="x")
+        session.add(user)
+        await session.flush()
+        project = Project(code="PRO-0001", name="p", creator_id=user.id, owner_id=user.id)
+        session.add(project)
+        await session.flush()
+        jobs, tasks = [], []
+        for j in range(3):
+            job = WorkItem(code=f"JOB-{j:04d}", kind="JOB", project_id=project.id, title=f"j{j}", status="todo",
+                           creator_id=user.id, planned_start_date=D, planned_end_date=D + timedelta(days=10))
+            session.add(job)
+            await session.flush()
+            jobs.append(job.id)
+            for t in range(20):
+                task = WorkItem(code=f"TASK-{j:02d}{t:02d}", kind="TASK", project_id=project.id, parent_id=job.id,
+                                title=f"t{j}-{t}", status="todo", creator_id=user.id,
+                                planned_start_date=D + timedelta(days=1), planned_end_date=D + timedelta(days=3))
+                session.add(task)
+                await session.flush()
+                tasks.append(task.id)
+        await session.commit()
+        yield factory, user.id, jobs, tasks
+
+
+@pytest.mark.asyncio
+async def test_validates_final_state_of_whole_batch(seeded):
+    """子任务先于父任务出现时，按整批最终状态校验（逐项执行会误报越界）"""
+    factory, uid, jobs, tasks = seeded
+    shift = timedelta(days=20)
+    items = [{"id": t, "planned_start_date": D + timedelta(days=1) + shift, "planned_end_date": D + timedelta(days=3) + shift}
+             for t in tasks[:20]]
+    items.append({"id": jobs[0], "planned_start_date": D + shift, "planned_end_date": D + timedelta(days=10) + shift})
+    async with factory() as session:
+        updated = await work_item_service.batch_update(session, items=items, current_user_id=uid)
+        await session.commit()
+    assert len(updated) == 21
+    assert len({wi.row_version for wi in updated}) == 1
+    async with factory() as session:
+        job = await session.get(WorkItem, jobs[0])
+        assert job.planned_start_date == D + shift and job.estimated_hours
+
+
+@pytest.mark.asyncio
+async def test_invalid_batch_writes_nothing(seeded):
+    factory, uid, jobs, tasks = seeded
+    async with factory() as session:
+        with pytest.raises(ValidationException):
+            await work_item_service.batch_update(session, items=[
+                {"id": tasks[0], "title": "renamed"},
+                {"id": jobs[0], "planned_start_date": D + timedelta(days=2), "planned_end_date": D + timedelta(days=10)},
+            ], current_user_id=uid)
+        await session.rollback()
+    async with factory() as session:
+        with pytest.raises(NotFoundException):
+            await work_item_service.batch_update(session, items=[{"id": tasks[0], "title": "x"}, {"id": 99999}], current_user_id=uid)
+        await session.rollback()
+    async with factory() as session:
+        assert (await session.get(WorkItem, tasks[0])).title == "t0-0"
+
+
+@pytest.mark.asyncio
+async def test_parent_status_rollup(seeded):
+    factory, uid, jobs, tasks = seeded
+    async with factory() as session:
+        await work_item_service.batch_update(session, items=[{"id": t, "status": "done"} for t in tasks[20:40]], current_user_id=uid)
+        await session.commit()
+    async with factory() as session:
+        job = await session.get(WorkItem, jobs[1])
+        assert job.status == "done" and job.completed_at is not None
+        logs = (await session.execute(select(AuditLog).where(AuditLog.action == "status_sync"))).scalars().all()
+        assert [(l.entity_id, l.old_value, l.new_value) for l in logs] == [(jobs[1], "todo", "done")]
+        # 部分子任务变化不汇总
+        assert (await session.get(WorkItem, jobs[0])).status == "todo"
+
+
+@pytest.mark.asyncio
+async def test_statement_count_independent_of_batch_size(seeded):
+    factory, uid, jobs, tasks = seeded
+    statements = []
+
+    @event.listens_for(factory.kw["bind"].sync_engine, "before_cursor_execute")
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    items = [{"id": t, "planned_end_date": D + timedelta(days=4), "status": "doing"} for t in tasks]
+    async with factory() as session:
+        updated = await work_item_service.batch_update(session, items=items, current_user_id=uid)
+        await session.commit()
+    assert len(updated) == 60
+    # 3次加载 + 版本号 + 按主键连续分组的 executemany UPDATE + 1次审计插入，与条目数无关
+    assert len(statements) <= 16, statements
+    assert sum(s.startswith("INSERT INTO audit_logs") for s in statements) == 1
@@ -0,0 +1,113 @@
+"""
+测试工作项增量同步 GET /api/work-items/by-project/{id}/changes
+"""
+from datetime import date
+import pytest
+import pytest_asyncio
+from app.models import User, Project
+from app.services.work_item_service import work_item_service
+
+
+@pytest_asyncio.fixture
+async def seeded(factory, api_client, current_user):
+    async with factory() as session:
+        alice = User(username="alice", email_prefix="alice", password_hash="x")
+        session.add(alice)
+        await session.flush()
+        p1 = Project(code="PRO-0001", name="p1", creator_id=alice.id, owner_id=alice.id)
+        p2 = Project(code="PRO-0002", name="p2", creator_id=alice.id, owner_id=alice.id)
+        session.add_all([p1, p2])
+        await session.flush()
+        job = await work_item_service.create(
+            session, project_id=p1.id, kind="JOB", parent_id=None, title="j1", status="todo", creator_id=alice.id,
+            planned_start_date=date(2025, 1, 1), planned_end_date=date(2025, 1, 31),
+        )
+        tasks = [
+            await work_item_service.create(
+                session, project_id=p1.id, kind="TASK", parent_id=job.id, title=f"t{i}", status="todo",
+                creator_id=alice.id, planned_start_date=date(2025, 1, 2), planned_end_date=date(2025, 1, 3),
+            )
+            for i in range(2)
+        ]
+        await session.commit()
+        ids = {"alice": alice.id, "p1": p1.id, "p2": p2.id, "job": job.id, "t0": tasks[0].id, "t1": tasks[1].id}
+
+    current_user.id = ids["alice"]
+    yield api_client, factory, ids
+
+
+@pytest.mark.asyncio
+async def test_every_write_gets_a_larger_version(seeded):
+    """create/update/cascade/soft_delete 均分配更大的 row_version 并刷新 updated_at"""
+    client, factory, ids = seeded
+    res = await client.get(f"/api/work-items/by-project/{ids['p1']}")
+    tree = res.json()
+    cursor = tree["cursor"]
+    versions = [t["row_version"] for t in tree["items"][0]["subtasks"]]
+    assert versions == sorted(set(versions)) and cursor == versions[-1]
+    # 新建子任务改变了JOB汇总，JOB随之分配同一版本号
+    assert tree["items"][0]["row_version"] == cursor
+
+    async with factory() as session:
+        wi = await work_item_service.update(session, id=ids["t0"], data={"title": "t0'"}, current_user_id=ids["alice"])
+        await session.commit()
+    assert wi.row_version > cursor and wi.updated_at is not None
+
+    async with factory() as session:
+        updated = await work_item_service.cascade_status(session, job_id=ids["job"], target_status="doing", current_user_id=ids["alice"])
+        await session.commit()
+    # 级联内所有工作项共用一个版本号
+    assert len({u.row_version for u in updated}) == 1 and updated[0].row_version > wi.row_version
+
+    async with factory() as session:
+        deleted = await work_item_service.soft_delete(session, id=ids["t1"], current_user_id=ids["alice"])
+        await session.commit()
+    assert deleted.row_version > updated[0].row_version
+
+
+@pytest.mark.asyncio
+async def test_changes_returns_upserts_and_deletes(seeded):
+    client, factory, ids = seeded
+    cursor = (await client.get(f"/api/work-items/by-project/{ids['p1']}")).json()["cursor"]
+
+    # 无变化：空结果，游标不变
+    res = await client.get(f"/api/work-items/by-project/{ids['p1']}/changes", params={"since": cursor})
+    assert res.json() == {"upserted": [], "deleted": [], "cursor": cursor}
+
+    async with factory() as session:
+        await work_item_service.update(session, id=ids["t0"], data={"status": "doing"}, current_user_id=ids["alice"])
+        await work_item_service.soft_delete(session, id=ids["t1"], current_user_id=ids["alice"])
+        await session.commit()
+
+    res = await client.get(f"/api/work-items/by-project/{ids['p1']}/changes", params={"since": cursor})
+    data = res.json()
+    # 子任务变化使JOB汇总变化，JOB一并返回
+    upserted = {i["id"]: i for i in data["upserted"]}
+    assert upserted.keys() == {ids["t0"], ids["job"]}
+    task = upserted[ids["t0"]]
+    assert task["status"] == "doing"
+    assert task["parent_id"] == ids["job"] and task["kind"] == "TASK"
+    assert task["assignee_prefix"] is None
+    assert upserted[ids["job"]]["rollup"]["child_count"] == 1
+    assert upserted[ids["job"]]["rollup"]["status_counts"]["doing"] == 1
+    assert data["deleted"] == [ids["t1"]]
+    assert data["cursor"] > cursor
+
+    res = await client.get(f"/api/work-items/by-project/{ids['p1']}/changes", params={"since": data["cursor"]})
+    assert res.json()["upserted"] == [] and res.json()["deleted"] == []
+
+
+@pytest.mark.asyncio
+async def test_changes_are_scoped_to_project(seeded):
+    client, factory, ids = seeded
+    cursor = (await client.get(f"/api/work-items/by-project/{ids['p1']}")).json()["cursor"]
+    async with factory() as session:
+        await work_item_service.create(
+            session, project_id=ids["p2"], kind="JOB", parent_id=None, title="other", status="todo",
+            creator_id=ids["alice"], planned_start_date=None, planned_end_date=None,
+        )
+        await session.commit()
+    res = await client.get(f"/api/work-items/by-project/{ids['p1']}/changes", params={"since": cursor})
+    assert res.json() == {"upserted": [], "deleted": [], "cursor": cursor}
+    res = await client.get(f"/api/work-items/by-project/{ids['p2']}/changes", params={"since": cursor})
+    assert [i["title"] for i in res.json()["upserted"]] == ["other"]
@@ -0,0 +1,108 @@
+"""
+测试跨项目工作项批量查询 POST /api/work-items/query
+"""
+from datetime import date, datetime
+import pytest
+import pytest_asyncio
+from sqlalchemy import update
+from app.models import User, Project, WorkItem
+
+
+@pytest_asyncio.fixture
+async def seeded(factory, api_client, current_user):
+    async with factory() as session:
+        alice = User(username="alice", email_prefix="alice", full_name="爱丽丝", password_hash="x")
+        bob = User(username="bob", email_prefix="bob", password_hash="x")
+        session.add_all([alice, bob])
+        await session.flush()
+        p1 = Project(code="PRO-0001", name="p1", creator_id=alice.id, owner_id=alice.id)
+        p2 = Project(code="PRO-0002", name="p2", creator_id=alice.id, owner_id=alice.id)
+        session.add_all([p1, p2])
+        await session.flush()
+        j1 = WorkItem(code="JOB-0001", kind="JOB", project_id=p1.id, title="j1", status="doing", creator_id=alice.id,
+                      label_path="研发/后端", planned_start_date=date(2025, 1, 1), planned_end_date=date(2025, 1, 31))
+        j2 = WorkItem(code="JOB-0002", kind="JOB", project_id=p2.id, title="j2", status="todo", creator_id=bob.id,
+                      label_path="研发_测试", planned_start_date=date(2025, 3, 1), planned_end_date=date(2025, 3, 31))
+        session.add_all([j1, j2])
+        await session.flush()
+        t1 = WorkItem(code="TASK-0001", kind="TASK", project_id=p1.id, parent_id=j1.id, title="t1", status="done",
+                      creator_id=alice.id, assignee_id=bob.id)
+        t2 = WorkItem(code="TASK-0002", kind="TASK", project_id=p1.id, parent_id=j1.id, title="t2", status="todo",
+                      creator_id=alice.id, assignee_id=alice.id)
+        session.add_all([t1, t2])
+        await session.commit()
+        ids = {"p1": p1.id, "p2": p2.id, "j1": j1.id, "j2": j2.id, "t1": t1.id, "t2": t2.id, "alice": alice.id, "bob": bob.id}
+
+    current_user.id = ids["alice"]
+    yield api_client, ids
+
+
+@pytest.mark.asyncio
+async def test_query_returns_trees_keyed_by_project(seeded):
+    client, ids = seeded
+    res = await client.post("/api/work-items/query", json={"project_ids": [ids["p1"], ids["p2"], 999]})
+    assert res.status_code == 200
+    data = res.json()
+    assert set(data["projects"].keys()) == {str(ids["p1"]), str(ids["p2"]), "999"}
+    assert data["projects"]["999"] == []
+    p1_tree = data["projects"][str(ids["p1"])]
+    assert [j["id"] for j in p1_tree] == [ids["j1"]]
+    assert [t["id"] for t in p1_tree[0]["subtasks"]] == [ids["t1"], ids["t2"]]
+    # 用户信息去重到 users 表
+    assert set(data["users"].keys()) == {str(ids["alice"]), str(ids["bob"])}
+    assert data["users"][str(ids["alice"])]["full_name"] == "爱丽丝"
+
+
+@pytest.mark.asyncio
+async def test_task_filters_keep_parent_job_as_container(seeded):
+    client, ids = seeded
+    res = await client.post("/api/work-items/query", json={
+        "project_ids": [ids["p1"], ids["p2"]], "kind": "TASK", "status": ["done"],
+    })
+    data = res.json()
+    p1_tree = data["projects"][str(ids["p1"])]
+    assert len(p1_tree) == 1 and p1_tree[0]["matched"] is False
+    assert [t["id"] for t in p1_tree[0]["subtasks"]] == [ids["t1"]]
+    assert p1_tree[0]["subtasks"][0]["matched"] is True
+    assert data["projects"][str(ids["p2"])] == []
+
+
+@pytest.mark.asyncio
+async def test_deleted_parent_job_not_returned_as_container(seeded, factory):
+    client, ids = seeded
+    async with factory() as session:
+        await session.execute(update(WorkItem).where(WorkItem.id == ids["j1"]).values(deleted_at=datetime.utcnow()))
+        await session.commit()
+    body = {"project_ids": [ids["p1"]], "kind": "TASK", "status": ["done"]}
+    assert (await client.post("/api/work-items/query", json=body)).json()["projects"][str(ids["p1"])] == []
+    tree = (await client.post("/api/work-items/query", json={**body, "include_deleted": True})).json()["projects"][str(ids["p1"])]
+    assert [j["id"] for j in tree] == [ids["j1"]] and tree[0]["deleted_at"] is not None
+
+
+@pytest.mark.asyncio
+async def test_label_prefix_and_planned_window(seeded):
+    client, ids = seeded
+    # "_" 按字面匹配，不作为通配符
+    res = await client.post("/api/work-items/query", json={
+        "project_ids": [ids["p1"], ids["p2"]], "kind": "JOB", "label_prefix": "研发_",
+    })
+    data = res.json()
+    assert data["projects"][str(ids["p1"])] == []
+    assert [j["id"] for j in data["projects"][str(ids["p2"])]] == [ids["j2"]]
+
+    res = await client.post("/api/work-items/query", json={
+        "project_ids": [ids["p1"], ids["p2"]], "kind": "JOB",
+        "planned_from": "2025-01-15", "planned_to": "2025-02-15",
+    })
+    data = res.json()
+    assert [j["id"] for j in data["projects"][str(ids["p1"])]] == [ids["j1"]]
+    assert data["projects"][str(ids["p2"])] == []
+
+
+@pytest.mark.asyncio
+async def test_by_project_tree_shape_unchanged(seeded):
+    client, ids = seeded
+    res = await client.get(f"/api/work-items/by-project/{ids['p1']}")
+    items = res.json()["items"]
+    assert [j["id"] for j in items] == [ids["j1"]]
+    assert items[0]["subtasks"][0]["assignee_username"] == "bob"
@@ -0,0 +1,55 @@
+"""
+测试工作日计算与节假日索引
+"""
+import random
+from datetime import date, datetime, timedelta
+import pytest
+from app.utils import worktime
+from app.utils.worktime import WorkCalendar
+
+
+def count_by_loop(calendar: WorkCalendar, start: date, end: date) -> int:
+    """逐日累加的参考实现"""
+    days, cur = 0, start
+    while cur <= end:
+        days += calendar.is_workday(cur)
+        cur += timedelta(days=1)
+    return days
+
+
+HOLIDAYS = {date(2025, 1, 1), date(2025, 5, 1), date(2025, 5, 2), date(2025, 5, 3), date(2025, 10, 1), date(2025, 10, 4)}
+WORKDAYS = {date(2025, 4, 27), date(2025, 9, 28), date(2025, 10, 11), date(2025, 10, 4)}
+
+
+def test_matches_day_by_day_loop():
+    calendar = WorkCalendar(HOLIDAYS, WORKDAYS)
+    rng = random.Random(7)
+    base = date(2024, 11, 1)
+    for _ in range(500):
+        start = base + timedelta(days=rng.randrange(500))
+        end = start + timedelta(days=rng.randrange(-3, 400))
+        assert calendar.count_workdays(start, end) == count_by_loop(calendar, start, end), (start, end)
+
+
+def test_special_days_and_edges():
+    calendar = WorkCalendar(HOLIDAYS, WORKDAYS)
+    assert calendar.count_workdays(date(2025, 4, 27), date(2025, 4, 27)) == 1   # 周日调休
+    assert calendar.count_workdays(date(2025, 5, 1), date(2025, 5, 2)) == 0     # 工作日节假日
+    assert not calendar.is_workday(date(2025, 10, 4))                          # 两者皆有时按节假日
+    assert calendar.count_workdays(date(2025, 3, 10), date(2025, 3, 9)) == 0
+    assert calendar.count_workdays(None, date(2025, 3, 9)) == 0
+    assert WorkCalendar().count_workdays(date(2025, 1, 1), date(2025, 12, 31)) == 261
+
+
+def test_batch_api_and_module_calendar(monkeypatch):
+    starts = [date(2025, 4, 25), None, date(2025, 1, 1)]
+    ends = [date(2025, 5, 6), date(2025, 5, 6), date(2026, 12, 31)]
+    monkeypatch.setattr(worktime, "SPECIAL_HOLIDAYS", set(HOLIDAYS))
+    monkeypatch.setattr(worktime, "SPECIAL_WORKDAYS", set(WORKDAYS))
+    monkeypatch.setattr(worktime, "_calendar", None)
+    counts = worktime.count_workdays_many(starts, ends)
+    assert counts == [worktime.count_workdays(s, e) for s, e in zip(starts, ends)]
+    assert worktime.compute_estimated_hours_many(starts, ends) == [n * 8.0 for n in counts]
+    assert worktime.compute_actual_hours(date(2025, 4, 25), datetime(2025, 5, 6, 18)) == counts[0] * 8.0
+    with pytest.raises(ValueError):
+        worktime.count_workdays_many(starts, ends[:1])
@@ -81,6 +81,13 @@ if [ "$QUICK_MODE" = false ]; then
     pip install -r requirements.txt >/dev/null 2>&1
 fi
 
+# 迁移数据库并预置演示用户（应用启动时只校验版本）
+echo "🗄️  迁移数据库..."
+if ! python -m app.cli migrate --seed; then
+    echo "❌ 数据库迁移失败"
+    exit 1
+fi
+
 # 启动后端服务 (后台运行)
 echo "🚀 启动后端服务..."
 nohup python -m uvicorn app.main:app --host 0.0.0.0 --port $BACKEND_PORT > ../backend.log 2>&1 &